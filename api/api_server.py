@@ -13,20 +13,36 @@ Autor: JURIS_IA_CORE_V1
 Data: 2025-12-17
 """
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from enum import Enum
+import asyncio
+import json
+import os
 
 # Importa sistema principal
 from engines.juris_ia import JurisIA
 from engines.piece_engine import PieceType
 
 # Importa database
-from database.connection import get_db_session
-from database.repositories import RepositoryFactory
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from database.connection import (
+    get_db_session,
+    get_async_db_session,
+    engine_registry,
+    async_db_manager,
+)
+from database.repositories import RepositoryFactory, EstatisticaDisciplinaRepository
+from core.question_sampler import question_sampler
+from core.log_queue import fila_logs
+from auth.password_hasher import hasher_senhas
+from core.leaderboard import leaderboards
 
 # Importa gamificação
 from engines.gamification import (
@@ -36,6 +52,7 @@ from engines.gamification import (
     estado_de_dict,
     estado_para_dict,
     obter_catalogo_conquistas,
+    calcular_nivel_por_fp,
 )
 
 # Importa repetição espaçada
@@ -45,9 +62,9 @@ from engines.spaced_repetition import (
     DificuldadeResposta,
     processar_revisao,
     criar_cartao_inicial,
-    filtrar_cartoes_pendentes,
-    ordenar_cartoes_prioridade,
-    calcular_estatisticas_globais,
+    calcular_estatisticas_globais_lote,
+    criar_lote,
+    LoteCartoes,
     cartao_para_dict,
     dict_para_cartao,
 )
@@ -141,6 +158,15 @@ app.add_middleware(
 # Instância global do sistema
 sistema = JurisIA()
 
+
+async def _com_repositorios(db: AsyncSession, funcao):
+    """
+    Executa `funcao(repos)` com os repositórios (síncronos) sobre a conexão
+    da sessão assíncrona, sem bloquear o event loop.
+    """
+    return await db.run_sync(lambda session: funcao(RepositoryFactory(session)))
+
+
 # Importar e registrar routers
 from api.endpoints.admin import router as admin_router
 # from api.endpoints.auth import router as auth_router  # Temporariamente desabilitado para debug
@@ -191,6 +217,26 @@ async def health_check():
     }
 
 
+@app.get("/health/db-pool")
+async def health_db_pool():
+    """Status dos pools compartilhados e checkouts por componente"""
+    metricas = engine_registry.get_metrics()
+    metricas["async"] = async_db_manager.get_pool_status()
+    return metricas
+
+
+@app.get("/health/log-queue")
+async def health_log_queue():
+    """Profundidade, descartes e lotes da fila de gravação de logs"""
+    return fila_logs.metricas()
+
+
+@app.get("/health/password-hasher")
+async def health_password_hasher():
+    """Fila, rejeições e tempo médio do pool de hash de senhas"""
+    return hasher_senhas.metricas()
+
+
 # ============================================================
 # ENDPOINTS - SESSÃO DE ESTUDO (1ª FASE)
 # ============================================================
@@ -203,7 +249,9 @@ async def iniciar_sessao_estudo(request: SessaoEstudoRequest):
     Retorna conjunto de questões selecionadas baseado no perfil do estudante.
     """
     try:
-        resultado = sistema.iniciar_sessao_estudo(
+        # Motores síncronos (sessões próprias): executados no threadpool
+        resultado = await run_in_threadpool(
+            sistema.iniciar_sessao_estudo,
             aluno_id=request.aluno_id,
             disciplina=request.disciplina,
             tipo=request.tipo.value
@@ -230,7 +278,8 @@ async def responder_questao(request: RespostaQuestaoRequest):
     Retorna feedback completo com explicação adaptativa e próximas ações.
     """
     try:
-        resultado = sistema.responder_questao(
+        resultado = await run_in_threadpool(
+            sistema.responder_questao,
             aluno_id=request.aluno_id,
             questao_id=request.questao_id,
             alternativa_escolhida=request.alternativa_escolhida,
@@ -258,7 +307,7 @@ async def finalizar_sessao_estudo(aluno_id: str):
     Retorna análise completa do desempenho na sessão.
     """
     try:
-        resultado = sistema.finalizar_sessao_estudo(aluno_id)
+        resultado = await run_in_threadpool(sistema.finalizar_sessao_estudo, aluno_id)
 
         return Response(
             success=True,
@@ -360,7 +409,7 @@ async def obter_painel_estudante(aluno_id: str):
     Inclui: desempenho, memória, próximas revisões, recomendações.
     """
     try:
-        resultado = sistema.obter_painel_estudante(aluno_id)
+        resultado = await run_in_threadpool(sistema.obter_painel_estudante, aluno_id)
 
         return Response(
             success=True,
@@ -393,7 +442,7 @@ async def obter_relatorio_progresso(
                 detail="Período deve ser 'diario', 'semanal' ou 'mensal'"
             )
 
-        resultado = sistema.obter_relatorio_progresso(aluno_id, periodo)
+        resultado = await run_in_threadpool(sistema.obter_relatorio_progresso, aluno_id, periodo)
 
         return Response(
             success=True,
@@ -470,95 +519,89 @@ async def analise_memoria(aluno_id: str):
 # ============================================================
 
 @app.get("/estudante/analytics/{aluno_id}", response_model=Response)
-async def obter_analytics(aluno_id: str):
+async def obter_analytics(
+    aluno_id: str,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Retorna análise completa de desempenho por área + estatísticas comparativas.
 
     Inspirado no ENEM: mostra desempenho individual vs média geral.
     """
     try:
-        with get_db_session() as session:
-            repos = RepositoryFactory(session)
-
-            # 1. Buscar progresso por disciplina do aluno
-            progressos = repos.progresso_disciplina.get_all_by_user(aluno_id)
+        # 1. Progresso por disciplina do aluno
+        # 2. Média geral e histogramas: rollup pré-calculado (O(disciplinas))
+        progressos, estatisticas = await _com_repositorios(
+            db,
+            lambda repos: (
+                repos.progressos_disciplina.get_all_by_user(aluno_id),
+                repos.estatisticas_disciplina.get_all_map(),
+            )
+        )
 
-            # 2. Calcular média geral de todos os estudantes
-            query_media = """
-                SELECT
-                    disciplina,
-                    AVG(taxa_acerto) as media_taxa_acerto,
-                    COUNT(DISTINCT user_id) as total_estudantes
-                FROM progresso_disciplina
-                WHERE total_questoes > 0
-                GROUP BY disciplina
-            """
-            resultado_media = session.execute(query_media).fetchall()
-            medias_globais = {
-                row.disciplina: {
-                    "media": float(row.media_taxa_acerto),
-                    "total_estudantes": row.total_estudantes
-                }
-                for row in resultado_media
+        # 3. Montar análise comparativa
+        analise_por_area = []
+        for prog in progressos:
+            estat = estatisticas.get(prog.disciplina)
+            media_global = {
+                "media": float(estat.media_taxa_acerto) if estat else 0,
+                "total_estudantes": estat.total_estudantes if estat else 0
             }
 
-            # 3. Montar análise comparativa
-            analise_por_area = []
-            for prog in progressos:
-                media_global = medias_globais.get(prog.disciplina, {"media": 0, "total_estudantes": 0})
-
-                diferenca = float(prog.taxa_acerto) - media_global["media"]
-                percentil = 50  # Calcular percentil real depois
-
-                analise_por_area.append({
-                    "disciplina": prog.disciplina,
-                    "seu_desempenho": {
-                        "taxa_acerto": float(prog.taxa_acerto),
-                        "questoes_respondidas": prog.total_questoes,
-                        "acertos": prog.questoes_corretas,
-                        "erros": prog.total_questoes - prog.questoes_corretas,
-                        "nivel_dominio": prog.nivel_dominio.value,
-                        "tempo_medio_minutos": prog.tempo_total_minutos / max(prog.total_questoes, 1)
-                    },
-                    "comparativo": {
-                        "media_geral": media_global["media"],
-                        "diferenca": diferenca,
-                        "status": "acima_media" if diferenca > 5 else "na_media" if diferenca > -5 else "abaixo_media",
-                        "total_estudantes": media_global["total_estudantes"],
-                        "percentil_estimado": percentil
-                    },
-                    "distribuicao_dificuldade": prog.distribuicao_dificuldade
-                })
-
-            # 4. Calcular estatísticas gerais
-            total_questoes_aluno = sum(p.total_questoes for p in progressos)
-            total_acertos_aluno = sum(p.questoes_corretas for p in progressos)
-            taxa_global_aluno = (total_acertos_aluno / total_questoes_aluno * 100) if total_questoes_aluno > 0 else 0
-
-            # 5. Ranking de disciplinas (fortes e fracas)
-            areas_ordenadas = sorted(
-                analise_por_area,
-                key=lambda x: x["seu_desempenho"]["taxa_acerto"],
-                reverse=True
+            diferenca = float(prog.taxa_acerto) - media_global["media"]
+            percentil = EstatisticaDisciplinaRepository.calcular_percentil(
+                estat.histograma if estat else [], float(prog.taxa_acerto)
             )
 
-            return Response(
-                success=True,
-                data={
-                    "resumo_geral": {
-                        "taxa_acerto_global": round(taxa_global_aluno, 2),
-                        "total_questoes": total_questoes_aluno,
-                        "total_acertos": total_acertos_aluno,
-                        "areas_estudadas": len(progressos)
-                    },
-                    "analise_por_area": analise_por_area,
-                    "ranking": {
-                        "areas_fortes": areas_ordenadas[:3] if len(areas_ordenadas) >= 3 else areas_ordenadas,
-                        "areas_fracas": list(reversed(areas_ordenadas[-3:])) if len(areas_ordenadas) >= 3 else []
-                    }
+            analise_por_area.append({
+                "disciplina": prog.disciplina,
+                "seu_desempenho": {
+                    "taxa_acerto": float(prog.taxa_acerto),
+                    "questoes_respondidas": prog.total_questoes,
+                    "acertos": prog.questoes_corretas,
+                    "erros": prog.total_questoes - prog.questoes_corretas,
+                    "nivel_dominio": prog.nivel_dominio.value,
+                    "tempo_medio_minutos": prog.tempo_total_minutos / max(prog.total_questoes, 1)
                 },
-                message="Analytics gerado com sucesso"
-            )
+                "comparativo": {
+                    "media_geral": media_global["media"],
+                    "diferenca": diferenca,
+                    "status": "acima_media" if diferenca > 5 else "na_media" if diferenca > -5 else "abaixo_media",
+                    "total_estudantes": media_global["total_estudantes"],
+                    "percentil_estimado": percentil
+                },
+                "distribuicao_dificuldade": prog.distribuicao_dificuldade
+            })
+
+        # 4. Calcular estatísticas gerais
+        total_questoes_aluno = sum(p.total_questoes for p in progressos)
+        total_acertos_aluno = sum(p.questoes_corretas for p in progressos)
+        taxa_global_aluno = (total_acertos_aluno / total_questoes_aluno * 100) if total_questoes_aluno > 0 else 0
+
+        # 5. Ranking de disciplinas (fortes e fracas)
+        areas_ordenadas = sorted(
+            analise_por_area,
+            key=lambda x: x["seu_desempenho"]["taxa_acerto"],
+            reverse=True
+        )
+
+        return Response(
+            success=True,
+            data={
+                "resumo_geral": {
+                    "taxa_acerto_global": round(taxa_global_aluno, 2),
+                    "total_questoes": total_questoes_aluno,
+                    "total_acertos": total_acertos_aluno,
+                    "areas_estudadas": len(progressos)
+                },
+                "analise_por_area": analise_por_area,
+                "ranking": {
+                    "areas_fortes": areas_ordenadas[:3] if len(areas_ordenadas) >= 3 else areas_ordenadas,
+                    "areas_fracas": list(reversed(areas_ordenadas[-3:])) if len(areas_ordenadas) >= 3 else []
+                }
+            },
+            message="Analytics gerado com sucesso"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -570,7 +613,8 @@ async def obter_analytics(aluno_id: str):
 @app.get("/estudante/plano-estudos/{aluno_id}", response_model=Response)
 async def gerar_plano_estudos(
     aluno_id: str,
-    data_prova: str = None  # Formato: YYYY-MM-DD
+    data_prova: str = None,  # Formato: YYYY-MM-DD
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Gera plano de estudos personalizado baseado na data da prova e desempenho atual.
@@ -580,85 +624,84 @@ async def gerar_plano_estudos(
     try:
         from datetime import datetime, timedelta
 
-        with get_db_session() as session:
-            repos = RepositoryFactory(session)
-
-            # 1. Calcular dias até a prova
-            if data_prova:
-                data_prova_dt = datetime.strptime(data_prova, "%Y-%m-%d")
-            else:
-                # Padrão: próxima prova OAB (exemplo: 3 meses)
-                data_prova_dt = datetime.now() + timedelta(days=90)
-
-            dias_restantes = (data_prova_dt - datetime.now()).days
+        # 1. Calcular dias até a prova
+        if data_prova:
+            data_prova_dt = datetime.strptime(data_prova, "%Y-%m-%d")
+        else:
+            # Padrão: próxima prova OAB (exemplo: 3 meses)
+            data_prova_dt = datetime.now() + timedelta(days=90)
 
-            # 2. Buscar progresso por disciplina
-            progressos = repos.progresso_disciplina.get_all_by_user(aluno_id)
+        dias_restantes = (data_prova_dt - datetime.now()).days
 
-            # 3. Identificar áreas que precisam de mais atenção
-            areas_priorizadas = []
-            for prog in progressos:
-                peso_oab = float(prog.peso_prova_oab) if prog.peso_prova_oab else 1.0
-                taxa_acerto = float(prog.taxa_acerto)
-
-                # Calcular prioridade (quanto menor a taxa, maior a prioridade)
-                prioridade = (100 - taxa_acerto) * peso_oab
-
-                areas_priorizadas.append({
-                    "disciplina": prog.disciplina,
-                    "taxa_acerto": taxa_acerto,
-                    "peso_oab": peso_oab,
-                    "prioridade": prioridade,
-                    "questoes_estudadas": prog.total_questoes
-                })
+        # 2. Buscar progresso por disciplina
+        progressos = await _com_repositorios(
+            db, lambda repos: repos.progressos_disciplina.get_all_by_user(aluno_id)
+        )
 
-            # 4. Ordenar por prioridade
-            areas_priorizadas.sort(key=lambda x: x["prioridade"], reverse=True)
-
-            # 5. Distribuir tempo de estudo
-            total_prioridade = sum(a["prioridade"] for a in areas_priorizadas)
-            horas_semanais = 20  # Padrão: 20h/semana
-
-            plano_semanal = []
-            for area in areas_priorizadas:
-                proporcao = area["prioridade"] / total_prioridade if total_prioridade > 0 else 0
-                horas_por_semana = horas_semanais * proporcao
-                questoes_por_semana = int(horas_por_semana * 10)  # ~10 questões/hora
-
-                plano_semanal.append({
-                    "disciplina": area["disciplina"],
-                    "horas_por_semana": round(horas_por_semana, 1),
-                    "questoes_por_semana": questoes_por_semana,
-                    "dias_sugeridos": ["Segunda", "Quarta", "Sexta"] if horas_por_semana >= 3 else ["Sábado"],
-                    "status_atual": "crítico" if area["taxa_acerto"] < 50 else "atenção" if area["taxa_acerto"] < 70 else "reforço"
-                })
+        # 3. Identificar áreas que precisam de mais atenção
+        areas_priorizadas = []
+        for prog in progressos:
+            peso_oab = float(prog.peso_prova_oab) if prog.peso_prova_oab else 1.0
+            taxa_acerto = float(prog.taxa_acerto)
+
+            # Calcular prioridade (quanto menor a taxa, maior a prioridade)
+            prioridade = (100 - taxa_acerto) * peso_oab
+
+            areas_priorizadas.append({
+                "disciplina": prog.disciplina,
+                "taxa_acerto": taxa_acerto,
+                "peso_oab": peso_oab,
+                "prioridade": prioridade,
+                "questoes_estudadas": prog.total_questoes
+            })
+
+        # 4. Ordenar por prioridade
+        areas_priorizadas.sort(key=lambda x: x["prioridade"], reverse=True)
+
+        # 5. Distribuir tempo de estudo
+        total_prioridade = sum(a["prioridade"] for a in areas_priorizadas)
+        horas_semanais = 20  # Padrão: 20h/semana
+
+        plano_semanal = []
+        for area in areas_priorizadas:
+            proporcao = area["prioridade"] / total_prioridade if total_prioridade > 0 else 0
+            horas_por_semana = horas_semanais * proporcao
+            questoes_por_semana = int(horas_por_semana * 10)  # ~10 questões/hora
+
+            plano_semanal.append({
+                "disciplina": area["disciplina"],
+                "horas_por_semana": round(horas_por_semana, 1),
+                "questoes_por_semana": questoes_por_semana,
+                "dias_sugeridos": ["Segunda", "Quarta", "Sexta"] if horas_por_semana >= 3 else ["Sábado"],
+                "status_atual": "crítico" if area["taxa_acerto"] < 50 else "atenção" if area["taxa_acerto"] < 70 else "reforço"
+            })
+
+        # 6. Calcular meta de questões total
+        semanas_restantes = max(dias_restantes // 7, 1)
+        meta_questoes_total = sum(p["questoes_por_semana"] for p in plano_semanal) * semanas_restantes
 
-            # 6. Calcular meta de questões total
-            semanas_restantes = max(dias_restantes // 7, 1)
-            meta_questoes_total = sum(p["questoes_por_semana"] for p in plano_semanal) * semanas_restantes
-
-            return Response(
-                success=True,
-                data={
-                    "info_prova": {
-                        "data_prova": data_prova_dt.strftime("%Y-%m-%d"),
-                        "dias_restantes": dias_restantes,
-                        "semanas_restantes": semanas_restantes
-                    },
-                    "plano_semanal": plano_semanal,
-                    "metas": {
-                        "questoes_por_semana": sum(p["questoes_por_semana"] for p in plano_semanal),
-                        "questoes_ate_prova": meta_questoes_total,
-                        "horas_por_semana": horas_semanais
-                    },
-                    "recomendacoes": [
-                        f"Priorize {plano_semanal[0]['disciplina']} (área mais crítica)",
-                        f"Faça pelo menos {plano_semanal[0]['questoes_por_semana']} questões/semana dessa área",
-                        f"Revise áreas fortes nos últimos {min(30, dias_restantes)} dias"
-                    ]
+        return Response(
+            success=True,
+            data={
+                "info_prova": {
+                    "data_prova": data_prova_dt.strftime("%Y-%m-%d"),
+                    "dias_restantes": dias_restantes,
+                    "semanas_restantes": semanas_restantes
                 },
-                message="Plano de estudos gerado"
-            )
+                "plano_semanal": plano_semanal,
+                "metas": {
+                    "questoes_por_semana": sum(p["questoes_por_semana"] for p in plano_semanal),
+                    "questoes_ate_prova": meta_questoes_total,
+                    "horas_por_semana": horas_semanais
+                },
+                "recomendacoes": [
+                    f"Priorize {plano_semanal[0]['disciplina']} (área mais crítica)",
+                    f"Faça pelo menos {plano_semanal[0]['questoes_por_semana']} questões/semana dessa área",
+                    f"Revise áreas fortes nos últimos {min(30, dias_restantes)} dias"
+                ] if plano_semanal else []
+            },
+            message="Plano de estudos gerado"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -670,7 +713,8 @@ async def gerar_plano_estudos(
 @app.get("/estudante/gerar-simulado/{aluno_id}", response_model=Response)
 async def gerar_simulado_oab(
     aluno_id: str,
-    tipo: str = "completo"  # "completo" (80q) ou "medio" (40q)
+    tipo: str = "completo",  # "completo" (80q) ou "medio" (40q)
+    db: AsyncSession = Depends(get_async_db_session)
 ):
     """
     Gera simulado OAB com distribuição oficial de questões por disciplina.
@@ -679,85 +723,82 @@ async def gerar_simulado_oab(
         tipo: "completo" (80 questões, 4h) ou "medio" (40 questões, 2h)
     """
     try:
-        with get_db_session() as session:
-            repos = RepositoryFactory(session)
-
-            # Distribuição oficial OAB
-            if tipo == "completo":
-                distribuicao = {
-                    "Direito Civil": 12,
-                    "Direito Penal": 10,
-                    "Direito Constitucional": 10,
-                    "Direito Processual Civil": 10,
-                    "Direito Processual Penal": 8,
-                    "Direito do Trabalho": 8,
-                    "Direito Tributário": 6,
-                    "Direito Empresarial": 6,
-                    "Direito Administrativo": 5,
-                    "Ética Profissional": 5
-                }
-            else:  # medio
-                distribuicao = {
-                    "Direito Civil": 6,
-                    "Direito Penal": 5,
-                    "Direito Constitucional": 5,
-                    "Direito Processual Civil": 5,
-                    "Direito Processual Penal": 4,
-                    "Direito do Trabalho": 4,
-                    "Direito Tributário": 3,
-                    "Direito Empresarial": 3,
-                    "Direito Administrativo": 3,
-                    "Ética Profissional": 2
-                }
+        # Distribuição oficial OAB
+        if tipo == "completo":
+            distribuicao = {
+                "Direito Civil": 12,
+                "Direito Penal": 10,
+                "Direito Constitucional": 10,
+                "Direito Processual Civil": 10,
+                "Direito Processual Penal": 8,
+                "Direito do Trabalho": 8,
+                "Direito Tributário": 6,
+                "Direito Empresarial": 6,
+                "Direito Administrativo": 5,
+                "Ética Profissional": 5
+            }
+        else:  # medio
+            distribuicao = {
+                "Direito Civil": 6,
+                "Direito Penal": 5,
+                "Direito Constitucional": 5,
+                "Direito Processual Civil": 5,
+                "Direito Processual Penal": 4,
+                "Direito do Trabalho": 4,
+                "Direito Tributário": 3,
+                "Direito Empresarial": 3,
+                "Direito Administrativo": 3,
+                "Ética Profissional": 2
+            }
 
-            questoes = []
-
-            # Buscar questões de cada disciplina
-            for disciplina, quantidade in distribuicao.items():
-                query = """
-                    SELECT id, disciplina, enunciado,
-                           alternativa_a, alternativa_b, alternativa_c, alternativa_d,
-                           alternativa_correta, dificuldade
-                    FROM questoes_banco
-                    WHERE disciplina = :disciplina
-                    AND ativa = true
-                    ORDER BY RANDOM()
-                    LIMIT :quantidade
-                """
-
-                resultado = session.execute(query, {
-                    "disciplina": disciplina,
-                    "quantidade": quantidade
-                }).fetchall()
-
-                for row in resultado:
-                    questoes.append({
-                        "id": str(row.id),
-                        "disciplina": row.disciplina,
-                        "enunciado": row.enunciado,
-                        "alternativa_a": row.alternativa_a,
-                        "alternativa_b": row.alternativa_b,
-                        "alternativa_c": row.alternativa_c,
-                        "alternativa_d": row.alternativa_d,
-                        "alternativa_correta": row.alternativa_correta,
-                        "dificuldade": row.dificuldade or "medio"
-                    })
-
-            # Embaralhar questões
-            import random
-            random.shuffle(questoes)
-
-            return Response(
-                success=True,
-                data={
-                    "tipo": tipo,
-                    "total_questoes": len(questoes),
-                    "tempo_limite_minutos": 240 if tipo == "completo" else 120,
-                    "questoes": questoes,
-                    "distribuicao": distribuicao
-                },
-                message=f"Simulado {tipo} gerado com sucesso"
-            )
+        # Sortear IDs nos pools em memória (sem ORDER BY RANDOM() por disciplina)
+        sorteio = await db.run_sync(
+            lambda session: question_sampler.amostrar_distribuicao(distribuicao, session=session)
+        )
+        ids_sorteados = [qid for ids in sorteio.values() for qid in ids]
+
+        # Buscar todas as questões sorteadas em uma única query por PK
+        questoes = []
+        if ids_sorteados:
+            query = text("""
+                SELECT id, disciplina, enunciado,
+                       alternativa_a, alternativa_b, alternativa_c, alternativa_d,
+                       alternativa_correta, dificuldade
+                FROM questoes_banco
+                WHERE id = ANY(CAST(:ids AS uuid[]))
+                AND ativa = true
+            """)
+
+            resultado = (await db.execute(query, {"ids": ids_sorteados})).fetchall()
+
+            for row in resultado:
+                questoes.append({
+                    "id": str(row.id),
+                    "disciplina": row.disciplina,
+                    "enunciado": row.enunciado,
+                    "alternativa_a": row.alternativa_a,
+                    "alternativa_b": row.alternativa_b,
+                    "alternativa_c": row.alternativa_c,
+                    "alternativa_d": row.alternativa_d,
+                    "alternativa_correta": row.alternativa_correta,
+                    "dificuldade": row.dificuldade or "medio"
+                })
+
+        # Embaralhar questões
+        import random
+        random.shuffle(questoes)
+
+        return Response(
+            success=True,
+            data={
+                "tipo": tipo,
+                "total_questoes": len(questoes),
+                "tempo_limite_minutos": 240 if tipo == "completo" else 120,
+                "questoes": questoes,
+                "distribuicao": distribuicao
+            },
+            message=f"Simulado {tipo} gerado com sucesso"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -770,74 +811,121 @@ async def gerar_simulado_oab(
 # ENDPOINTS - GAMIFICAÇÃO (FP PATTERN)
 # ============================================================
 
+_COLUNAS_GAMIFICACAO = """
+    total_xp AS total_fp,
+    ARRAY(SELECT jsonb_array_elements_text(conquistas)) AS conquistas,
+    sequencia_dias_consecutivos AS streak_atual,
+    streak_maximo,
+    ultima_atividade,
+    total_questoes_respondidas AS total_questoes,
+    total_questoes_corretas AS total_acertos,
+    total_sessoes,
+    total_pecas,
+    taxa_acerto_global AS taxa_acerto
+"""
+
+_SQL_ESTADO_GAMIFICACAO = text(f"""
+    SELECT {_COLUNAS_GAMIFICACAO}
+    FROM perfil_juridico
+    WHERE user_id = CAST(:user_id AS uuid)
+""")
+
+# Trava a linha até o commit: streak e conquistas dependem do estado lido
+_SQL_ESTADO_GAMIFICACAO_TRAVADO = text(f"""
+    SELECT {_COLUNAS_GAMIFICACAO}
+    FROM perfil_juridico
+    WHERE user_id = CAST(:user_id AS uuid)
+    FOR UPDATE
+""")
+
+# Contadores e FP por incremento (não sobrescrevem escritas de outros fluxos);
+# sessões e peças são contadas pelos triggers da migration 021
+_SQL_APLICAR_ACAO_GAMIFICACAO = text(f"""
+    UPDATE perfil_juridico
+    SET
+        total_xp = total_xp + :delta_fp,
+        total_questoes_respondidas = total_questoes_respondidas + :delta_questoes,
+        total_questoes_corretas = total_questoes_corretas + :delta_acertos,
+        taxa_acerto_global = CASE
+            WHEN total_questoes_respondidas + :delta_questoes > 0 THEN ROUND(
+                (total_questoes_corretas + :delta_acertos) * 100.0
+                / (total_questoes_respondidas + :delta_questoes), 2
+            )
+            ELSE 0
+        END,
+        sequencia_dias_consecutivos = :streak_atual,
+        streak_maximo = GREATEST(streak_maximo, :streak_maximo),
+        ultima_atividade = :ultima_atividade,
+        data_ultima_atualizacao_perfil = :ultima_atividade,
+        conquistas = conquistas || CAST(:novas_conquistas AS jsonb)
+    WHERE user_id = CAST(:user_id AS uuid)
+    RETURNING {_COLUNAS_GAMIFICACAO}
+""")
+
+
+def _estado_de_linha(linha) -> EstadoGamificacao:
+    """EstadoGamificacao a partir de uma linha de _COLUNAS_GAMIFICACAO"""
+    return EstadoGamificacao(
+        total_fp=linha.total_fp,
+        nivel=calcular_nivel_por_fp(linha.total_fp),
+        conquistas=tuple(linha.conquistas or ()),
+        streak_atual=linha.streak_atual,
+        streak_maximo=max(linha.streak_maximo, linha.streak_atual),
+        ultima_atividade=linha.ultima_atividade,
+        total_questoes=linha.total_questoes,
+        total_acertos=linha.total_acertos,
+        total_sessoes=linha.total_sessoes,
+        total_pecas=linha.total_pecas,
+        taxa_acerto=float(linha.taxa_acerto),
+    )
+
+
 @app.get("/gamificacao/{user_id}", response_model=Response)
-async def obter_gamificacao(user_id: str):
+async def obter_gamificacao(
+    user_id: str,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Retorna estado atual de gamificação do usuário (XP, nível, conquistas, streak).
 
     Implementado com programação funcional pura.
     """
     try:
-        with get_db_session() as session:
-            repos = RepositoryFactory(session)
-
-            # Buscar perfil juridico
-            perfil = repos.perfil_juridico.get_by_user_id(user_id)
-
-            if not perfil:
-                # Criar estado inicial
-                estado = EstadoGamificacao(
-                    total_fp=0,
-                    nivel=1,
-                    conquistas=tuple(),
-                    streak_atual=0,
-                    streak_maximo=0,
-                    ultima_atividade=None,
-                    total_questoes=0,
-                    total_acertos=0,
-                    total_sessoes=0,
-                    total_pecas=0,
-                    taxa_acerto=0.0,
-                )
-            else:
-                # Buscar estatísticas de sessões e peças
-                sessoes = repos.sessao_estudo.get_by_user_id(user_id)
-                pecas = session.execute(
-                    f"SELECT COUNT(*) as total FROM pratica_peca WHERE user_id = '{user_id}'"
-                ).fetchone()
-
-                total_sessoes = len(sessoes) if sessoes else 0
-                total_pecas = pecas.total if pecas else 0
-
-                # Construir estado
-                estado = EstadoGamificacao(
-                    total_fp=perfil.pontuacao_global,
-                    nivel=int(perfil.nivel_geral.value) if hasattr(perfil.nivel_geral, 'value') else 1,
-                    conquistas=tuple(),  # TODO: implementar storage de conquistas
-                    streak_atual=perfil.sequencia_dias_consecutivos,
-                    streak_maximo=perfil.sequencia_dias_consecutivos,
-                    ultima_atividade=perfil.data_ultima_atualizacao_perfil,
-                    total_questoes=perfil.total_questoes_respondidas,
-                    total_acertos=perfil.total_questoes_corretas,
-                    total_sessoes=total_sessoes,
-                    total_pecas=total_pecas,
-                    taxa_acerto=float(perfil.taxa_acerto_global),
-                )
-
-            # Converter para dict
-            estado_dict = estado_para_dict(estado)
-
-            # Adicionar informações extras
-            from engines.gamification import calcular_fp_para_proximo_nivel, calcular_progresso_nivel
-
-            estado_dict['fp_para_proximo_nivel'] = calcular_fp_para_proximo_nivel(estado.nivel)
-            estado_dict['progresso_nivel'] = calcular_progresso_nivel(estado.total_fp, estado.nivel)
-
-            return Response(
-                success=True,
-                data=estado_dict,
-                message="Estado de gamificação recuperado"
+        # Agregado de gamificação: uma linha de perfil_juridico
+        linha = (await db.execute(_SQL_ESTADO_GAMIFICACAO, {"user_id": user_id})).one_or_none()
+
+        if linha is None:
+            # Criar estado inicial
+            estado = EstadoGamificacao(
+                total_fp=0,
+                nivel=1,
+                conquistas=tuple(),
+                streak_atual=0,
+                streak_maximo=0,
+                ultima_atividade=None,
+                total_questoes=0,
+                total_acertos=0,
+                total_sessoes=0,
+                total_pecas=0,
+                taxa_acerto=0.0,
             )
+        else:
+            estado = _estado_de_linha(linha)
+
+        # Converter para dict
+        estado_dict = estado_para_dict(estado)
+
+        # Adicionar informações extras
+        from engines.gamification import calcular_fp_para_proximo_nivel, calcular_progresso_nivel
+
+        estado_dict['fp_para_proximo_nivel'] = calcular_fp_para_proximo_nivel(estado.nivel)
+        estado_dict['progresso_nivel'] = calcular_progresso_nivel(estado.total_fp, estado.nivel)
+
+        return Response(
+            success=True,
+            data=estado_dict,
+            message="Estado de gamificação recuperado"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -847,78 +935,71 @@ async def obter_gamificacao(user_id: str):
 
 
 @app.post("/gamificacao/{user_id}/acao", response_model=Response)
-async def processar_acao_gamificacao(user_id: str, acao: AcaoGamificacaoRequest):
+async def processar_acao_gamificacao(
+    user_id: str,
+    acao: AcaoGamificacaoRequest,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Processa uma ação do usuário e atualiza gamificação (FP, nível, conquistas).
 
     Implementado com programação funcional pura - sem efeitos colaterais.
     """
     try:
-        with get_db_session() as session:
-            repos = RepositoryFactory(session)
-
-            # 1. Buscar estado atual (reutiliza lógica acima)
-            perfil = repos.perfil_juridico.get_by_user_id(user_id)
-
-            if not perfil:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Perfil do usuário não encontrado"
-                )
-
-            # Buscar estatísticas
-            sessoes = repos.sessao_estudo.get_by_user_id(user_id)
-            pecas = session.execute(
-                f"SELECT COUNT(*) as total FROM pratica_peca WHERE user_id = '{user_id}'"
-            ).fetchone()
-
-            total_sessoes = len(sessoes) if sessoes else 0
-            total_pecas = pecas.total if pecas else 0
-
-            estado_atual = EstadoGamificacao(
-                total_fp=perfil.pontuacao_global,
-                nivel=int(perfil.nivel_geral.value) if hasattr(perfil.nivel_geral, 'value') else 1,
-                conquistas=tuple(),
-                streak_atual=perfil.sequencia_dias_consecutivos,
-                streak_maximo=perfil.sequencia_dias_consecutivos,
-                ultima_atividade=perfil.data_ultima_atualizacao_perfil,
-                total_questoes=perfil.total_questoes_respondidas,
-                total_acertos=perfil.total_questoes_corretas,
-                total_sessoes=total_sessoes,
-                total_pecas=total_pecas,
-                taxa_acerto=float(perfil.taxa_acerto_global),
-            )
+        # 1. Buscar estado atual (linha travada até o commit)
+        linha = (await db.execute(_SQL_ESTADO_GAMIFICACAO_TRAVADO, {"user_id": user_id})).one_or_none()
 
-            # 2. Criar objeto de ação
-            acao_obj = AcaoUsuario(
-                tipo=acao.tipo,
-                valor=acao.valor,
-                bonus=acao.bonus,
-                timestamp=datetime.now()
+        if linha is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Perfil do usuário não encontrado"
             )
 
-            # 3. Processar ação (FUNÇÃO PURA)
-            novo_estado, resultado = processar_acao(estado_atual, acao_obj)
-
-            # 4. Persistir novo estado (side effect isolado)
-            perfil.pontuacao_global = novo_estado.total_fp
-            perfil.sequencia_dias_consecutivos = novo_estado.streak_atual
-            perfil.data_ultima_atualizacao_perfil = novo_estado.ultima_atividade
-            perfil.total_questoes_respondidas = novo_estado.total_questoes
-            perfil.total_questoes_corretas = novo_estado.total_acertos
-            perfil.taxa_acerto_global = novo_estado.taxa_acerto
-
-            session.commit()
-
-            # 5. Retornar resultado
-            return Response(
-                success=True,
-                data={
-                    "resultado": resultado,
-                    "novo_estado": estado_para_dict(novo_estado)
-                },
-                message="Ação processada com sucesso!"
-            )
+        estado_atual = _estado_de_linha(linha)
+
+        # 2. Criar objeto de ação
+        acao_obj = AcaoUsuario(
+            tipo=acao.tipo,
+            valor=acao.valor,
+            bonus=acao.bonus,
+            timestamp=datetime.now()
+        )
+
+        # 3. Processar ação (FUNÇÃO PURA)
+        novo_estado, resultado = processar_acao(estado_atual, acao_obj)
+
+        # 4. Persistir a diferença numa escrita atômica (side effect isolado)
+        novas_conquistas = novo_estado.conquistas[len(estado_atual.conquistas):]
+        persistido = (await db.execute(_SQL_APLICAR_ACAO_GAMIFICACAO, {
+            "user_id": user_id,
+            "delta_fp": novo_estado.total_fp - estado_atual.total_fp,
+            "delta_questoes": novo_estado.total_questoes - estado_atual.total_questoes,
+            "delta_acertos": novo_estado.total_acertos - estado_atual.total_acertos,
+            "streak_atual": novo_estado.streak_atual,
+            "streak_maximo": novo_estado.streak_maximo,
+            "ultima_atividade": novo_estado.ultima_atividade,
+            "novas_conquistas": json.dumps(list(novas_conquistas)),
+        })).one()
+
+        await db.commit()
+
+        novo_estado = _estado_de_linha(persistido)
+
+        await run_in_threadpool(
+            leaderboards.atualizar,
+            user_id,
+            delta=novo_estado.total_fp - estado_atual.total_fp
+        )
+
+        # 5. Retornar resultado
+        return Response(
+            success=True,
+            data={
+                "resultado": resultado,
+                "novo_estado": estado_para_dict(novo_estado)
+            },
+            message="Ação processada com sucesso!"
+        )
 
     except HTTPException:
         raise
@@ -968,127 +1049,142 @@ async def listar_conquistas():
 # ENDPOINTS - REVISÃO ESPAÇADA (FP PATTERN)
 # ============================================================
 
+# Cartões do usuário; o histórico de respostas por questão fica nos
+# contadores do cartão (migration 022).
+# Os filtros adicionais são concatenados (texto fixo); valores sempre por bind.
+_SQL_CARTOES_REVISAO = """
+    SELECT
+        ra.questao_id,
+        ra.disciplina,
+        ra.topico,
+        ra.intervalo_dias,
+        ra.numero_revisao,
+        ra.fator_facilidade,
+        ra.data_conclusao,
+        ra.data_agendada,
+        ra.total_revisoes,
+        ra.total_acertos,
+        ra.total_erros
+    FROM revisao_agendada ra
+    WHERE ra.user_id = CAST(:user_id AS uuid)
+"""
+
+# Vencidos na ordem de ordenar_cartoes_prioridade (data, ease factor,
+# repetições, com os defaults de _cartao_de_linha), servidos pelo índice
+# parcial idx_revisao_pendentes_prioridade: leitura de faixa, sem sort
+_SQL_CARTOES_PENDENTES = text(_SQL_CARTOES_REVISAO + """
+    AND ra.concluida = FALSE
+    AND ra.data_agendada <= :agora
+    ORDER BY
+        ra.data_agendada,
+        COALESCE(NULLIF(ra.fator_facilidade, 0), 2.5),
+        COALESCE(ra.numero_revisao, 0)
+    LIMIT :limite
+""")
+
+
+def _cartao_de_linha(row) -> CartaoRevisao:
+    """Converte uma linha de _SQL_CARTOES_REVISAO em CartaoRevisao"""
+    return CartaoRevisao(
+        questao_id=str(row.questao_id),
+        disciplina=row.disciplina,
+        topico=row.topico,
+        intervalo_dias=row.intervalo_dias or 1,
+        repeticoes=row.numero_revisao or 0,
+        ease_factor=float(row.fator_facilidade) if row.fator_facilidade else 2.5,
+        ultima_revisao=row.data_conclusao,
+        proxima_revisao=row.data_agendada,
+        total_revisoes=row.total_revisoes,
+        total_acertos=row.total_acertos,
+        total_erros=row.total_erros,
+    )
+
+
+def _lote_de_linhas(rows) -> LoteCartoes:
+    """Converte linhas de _SQL_CARTOES_REVISAO em lote colunar (defaults de _cartao_de_linha)"""
+    return criar_lote(
+        intervalo_dias=[row.intervalo_dias or 1 for row in rows],
+        repeticoes=[row.numero_revisao or 0 for row in rows],
+        ease_factor=[float(row.fator_facilidade) if row.fator_facilidade else 2.5 for row in rows],
+        proxima_revisao=[row.data_agendada for row in rows],
+        total_revisoes=[row.total_revisoes for row in rows],
+        total_acertos=[row.total_acertos for row in rows],
+        total_erros=[row.total_erros for row in rows],
+    )
+
+
 @app.get("/revisao/{user_id}/pendentes", response_model=Response)
-async def obter_revisoes_pendentes(user_id: str, limite: int = 20):
+async def obter_revisoes_pendentes(
+    user_id: str,
+    limite: int = 20,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Retorna cartões de revisão pendentes para o usuário.
 
     Usa algoritmo SuperMemo SM-2 (programação funcional).
     """
     try:
-        with get_db_session() as session:
-            # Buscar revisões agendadas do usuário
-            query = f"""
+        # Buscar os cartões vencidos já filtrados e ordenados por prioridade
+        resultados = (await db.execute(_SQL_CARTOES_PENDENTES, {
+            "user_id": user_id,
+            "agora": datetime.now(),
+            "limite": limite
+        })).fetchall()
+
+        # Converter para dicts
+        cartoes_dict = [cartao_para_dict(_cartao_de_linha(row)) for row in resultados]
+
+        # Buscar questões completas
+        if cartoes_dict:
+            questao_ids = [c["questao_id"] for c in cartoes_dict]
+            questoes_query = text("""
                 SELECT
-                    ra.id,
-                    ra.questao_id,
-                    ra.disciplina,
-                    ra.topico,
-                    ra.intervalo_dias,
-                    ra.numero_revisao as repeticoes,
-                    ra.fator_facilidade as ease_factor,
-                    ra.data_conclusao as ultima_revisao,
-                    ra.data_agendada as proxima_revisao,
-                    COALESCE(stats.total_revisoes, 0) as total_revisoes,
-                    COALESCE(stats.acertos, 0) as total_acertos,
-                    COALESCE(stats.erros, 0) as total_erros
-                FROM revisao_agendada ra
-                LEFT JOIN (
-                    SELECT
-                        questao_id,
-                        COUNT(*) as total_revisoes,
-                        SUM(CASE WHEN tipo_resposta = 'CORRETA' THEN 1 ELSE 0 END) as acertos,
-                        SUM(CASE WHEN tipo_resposta = 'INCORRETA' THEN 1 ELSE 0 END) as erros
-                    FROM interacao_questao
-                    WHERE user_id = '{user_id}'
-                    GROUP BY questao_id
-                ) stats ON ra.questao_id = stats.questao_id
-                WHERE ra.user_id = '{user_id}'
-                AND ra.concluida = FALSE
-                ORDER BY ra.data_agendada ASC
-                LIMIT {limite}
-            """
-
-            resultados = session.execute(query).fetchall()
-
-            agora = datetime.now()
-            cartoes = []
-
-            for row in resultados:
-                cartao = CartaoRevisao(
-                    questao_id=str(row.questao_id),
-                    disciplina=row.disciplina,
-                    topico=row.topico,
-                    intervalo_dias=row.intervalo_dias or 1,
-                    repeticoes=row.repeticoes or 0,
-                    ease_factor=float(row.ease_factor) if row.ease_factor else 2.5,
-                    ultima_revisao=row.ultima_revisao,
-                    proxima_revisao=row.proxima_revisao,
-                    total_revisoes=row.total_revisoes,
-                    total_acertos=row.total_acertos,
-                    total_erros=row.total_erros,
-                )
-                cartoes.append(cartao)
-
-            # Filtrar pendentes (FP)
-            pendentes = filtrar_cartoes_pendentes(cartoes, agora)
-
-            # Ordenar por prioridade (FP)
-            ordenados = ordenar_cartoes_prioridade(pendentes)
-
-            # Converter para dicts
-            cartoes_dict = [cartao_para_dict(c) for c in ordenados]
-
-            # Buscar questões completas
-            if cartoes_dict:
-                questao_ids = [c["questao_id"] for c in cartoes_dict]
-                questoes_query = f"""
-                    SELECT
-                        id,
-                        enunciado,
-                        alternativa_a,
-                        alternativa_b,
-                        alternativa_c,
-                        alternativa_d,
-                        alternativa_correta,
-                        disciplina,
-                        topico,
-                        dificuldade
-                    FROM questoes_banco
-                    WHERE id IN ('{"','".join(questao_ids)}')
-                """
-                questoes = session.execute(questoes_query).fetchall()
-
-                # Mapear questões por ID
-                questoes_map = {
-                    str(q.id): {
-                        "id": str(q.id),
-                        "enunciado": q.enunciado,
-                        "alternativas": {
-                            "A": q.alternativa_a,
-                            "B": q.alternativa_b,
-                            "C": q.alternativa_c,
-                            "D": q.alternativa_d,
-                        },
-                        "dificuldade": q.dificuldade,
-                        "disciplina": q.disciplina,
-                        "topico": q.topico,
-                    }
-                    for q in questoes
+                    id,
+                    enunciado,
+                    alternativa_a,
+                    alternativa_b,
+                    alternativa_c,
+                    alternativa_d,
+                    alternativa_correta,
+                    disciplina,
+                    topico,
+                    dificuldade
+                FROM questoes_banco
+                WHERE id = ANY(CAST(:ids AS uuid[]))
+            """)
+            questoes = (await db.execute(questoes_query, {"ids": questao_ids})).fetchall()
+
+            # Mapear questões por ID
+            questoes_map = {
+                str(q.id): {
+                    "id": str(q.id),
+                    "enunciado": q.enunciado,
+                    "alternativas": {
+                        "A": q.alternativa_a,
+                        "B": q.alternativa_b,
+                        "C": q.alternativa_c,
+                        "D": q.alternativa_d,
+                    },
+                    "dificuldade": q.dificuldade,
+                    "disciplina": q.disciplina,
+                    "topico": q.topico,
                 }
+                for q in questoes
+            }
 
-                # Adicionar questões aos cartões
-                for cartao in cartoes_dict:
-                    cartao["questao"] = questoes_map.get(cartao["questao_id"])
+            # Adicionar questões aos cartões
+            for cartao in cartoes_dict:
+                cartao["questao"] = questoes_map.get(cartao["questao_id"])
 
-            return Response(
-                success=True,
-                data={
-                    "total": len(cartoes_dict),
-                    "cartoes": cartoes_dict
-                },
-                message="Cartões pendentes recuperados"
-            )
+        return Response(
+            success=True,
+            data={
+                "total": len(cartoes_dict),
+                "cartoes": cartoes_dict
+            },
+            message="Cartões pendentes recuperados"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -1098,127 +1194,113 @@ async def obter_revisoes_pendentes(user_id: str, limite: int = 20):
 
 
 @app.post("/revisao/{user_id}/processar", response_model=Response)
-async def processar_revisao_cartao(user_id: str, revisao: RevisaoRequest):
+async def processar_revisao_cartao(
+    user_id: str,
+    revisao: RevisaoRequest,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Processa revisão de um cartão e atualiza próxima data.
 
     Implementado com programação funcional pura.
     """
     try:
-        with get_db_session() as session:
-            # Buscar cartão atual
-            query = f"""
-                SELECT
-                    ra.questao_id,
-                    ra.disciplina,
-                    ra.topico,
-                    ra.intervalo_dias,
-                    ra.numero_revisao,
-                    ra.fator_facilidade,
-                    ra.data_conclusao,
-                    ra.data_agendada,
-                    COALESCE(stats.total, 0) as total_revisoes,
-                    COALESCE(stats.acertos, 0) as total_acertos,
-                    COALESCE(stats.erros, 0) as total_erros
-                FROM revisao_agendada ra
-                LEFT JOIN (
-                    SELECT
-                        questao_id,
-                        COUNT(*) as total,
-                        SUM(CASE WHEN tipo_resposta = 'CORRETA' THEN 1 ELSE 0 END) as acertos,
-                        SUM(CASE WHEN tipo_resposta = 'INCORRETA' THEN 1 ELSE 0 END) as erros
-                    FROM interacao_questao
-                    WHERE user_id = '{user_id}'
-                    GROUP BY questao_id
-                ) stats ON ra.questao_id = stats.questao_id
-                WHERE ra.user_id = '{user_id}'
-                AND ra.questao_id = '{revisao.questao_id}'
-                AND ra.concluida = FALSE
-                LIMIT 1
-            """
-
-            row = session.execute(query).fetchone()
-
-            if not row:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Cartão de revisão não encontrado"
-                )
-
-            # Criar cartão atual
-            cartao_atual = CartaoRevisao(
-                questao_id=str(row.questao_id),
-                disciplina=row.disciplina,
-                topico=row.topico,
-                intervalo_dias=row.intervalo_dias or 1,
-                repeticoes=row.numero_revisao or 0,
-                ease_factor=float(row.fator_facilidade) if row.fator_facilidade else 2.5,
-                ultima_revisao=row.data_conclusao,
-                proxima_revisao=row.data_agendada,
-                total_revisoes=row.total_revisoes,
-                total_acertos=row.total_acertos,
-                total_erros=row.total_erros,
+        # Buscar cartão atual
+        query = text(_SQL_CARTOES_REVISAO + """
+            AND ra.questao_id = CAST(:questao_id AS uuid)
+            AND ra.concluida = FALSE
+            LIMIT 1
+        """)
+
+        row = (await db.execute(
+            query, {"user_id": user_id, "questao_id": revisao.questao_id}
+        )).fetchone()
+
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Cartão de revisão não encontrado"
             )
 
-            # Criar resultado da revisão
-            resultado = ResultadoRevisao(
-                acertou=revisao.acertou,
-                dificuldade=DificuldadeResposta(revisao.dificuldade),
-                tempo_segundos=revisao.tempo_segundos,
-                timestamp=datetime.now()
-            )
+        # Criar cartão atual
+        cartao_atual = _cartao_de_linha(row)
 
-            # Processar revisão (FUNÇÃO PURA)
-            novo_cartao = processar_revisao(cartao_atual, resultado)
-
-            # Persistir novo estado
-            update_query = f"""
-                UPDATE revisao_agendada
-                SET
-                    intervalo_dias = {novo_cartao.intervalo_dias},
-                    numero_revisao = {novo_cartao.repeticoes},
-                    fator_facilidade = {novo_cartao.ease_factor},
-                    data_conclusao = '{novo_cartao.ultima_revisao.isoformat()}',
-                    concluida = TRUE,
-                    resultado_revisao = '{("CORRETA" if revisao.acertou else "INCORRETA")}',
-                    proximo_intervalo_calculado = {novo_cartao.intervalo_dias}
-                WHERE user_id = '{user_id}'
-                AND questao_id = '{revisao.questao_id}'
-                AND concluida = FALSE
-            """
-            session.execute(update_query)
-
-            # Criar nova revisão agendada
-            insert_query = f"""
-                INSERT INTO revisao_agendada (
-                    user_id, questao_id, disciplina, topico,
-                    data_agendada, intervalo_dias, numero_revisao,
-                    fator_facilidade, concluida
-                ) VALUES (
-                    '{user_id}',
-                    '{novo_cartao.questao_id}',
-                    '{novo_cartao.disciplina}',
-                    '{novo_cartao.topico}',
-                    '{novo_cartao.proxima_revisao.isoformat()}',
-                    {novo_cartao.intervalo_dias},
-                    {novo_cartao.repeticoes},
-                    {novo_cartao.ease_factor},
-                    FALSE
-                )
-            """
-            session.execute(insert_query)
-
-            session.commit()
-
-            return Response(
-                success=True,
-                data={
-                    "cartao_anterior": cartao_para_dict(cartao_atual),
-                    "novo_cartao": cartao_para_dict(novo_cartao),
-                    "proxima_revisao_em": f"{novo_cartao.intervalo_dias} dias"
-                },
-                message="Revisão processada com sucesso"
+        # Criar resultado da revisão
+        resultado = ResultadoRevisao(
+            acertou=revisao.acertou,
+            dificuldade=DificuldadeResposta(revisao.dificuldade),
+            tempo_segundos=revisao.tempo_segundos,
+            timestamp=datetime.now()
+        )
+
+        # Processar revisão (FUNÇÃO PURA)
+        novo_cartao = processar_revisao(cartao_atual, resultado)
+
+        # Persistir novo estado
+        update_query = text("""
+            UPDATE revisao_agendada
+            SET
+                intervalo_dias = :intervalo_dias,
+                numero_revisao = :repeticoes,
+                fator_facilidade = :ease_factor,
+                data_conclusao = :data_conclusao,
+                concluida = TRUE,
+                resultado_revisao = :resultado,
+                proximo_intervalo_calculado = :intervalo_dias
+            WHERE user_id = CAST(:user_id AS uuid)
+            AND questao_id = CAST(:questao_id AS uuid)
+            AND concluida = FALSE
+        """)
+        await db.execute(update_query, {
+            "intervalo_dias": novo_cartao.intervalo_dias,
+            "repeticoes": novo_cartao.repeticoes,
+            "ease_factor": novo_cartao.ease_factor,
+            "data_conclusao": novo_cartao.ultima_revisao,
+            "resultado": "CORRETA" if revisao.acertou else "INCORRETA",
+            "user_id": user_id,
+            "questao_id": revisao.questao_id,
+        })
+
+        # Criar nova revisão agendada
+        insert_query = text("""
+            INSERT INTO revisao_agendada (
+                user_id, questao_id, disciplina, topico,
+                data_agendada, intervalo_dias, numero_revisao,
+                fator_facilidade, concluida
+            ) VALUES (
+                CAST(:user_id AS uuid),
+                CAST(:questao_id AS uuid),
+                :disciplina,
+                :topico,
+                :data_agendada,
+                :intervalo_dias,
+                :repeticoes,
+                :ease_factor,
+                FALSE
             )
+        """)
+        await db.execute(insert_query, {
+            "user_id": user_id,
+            "questao_id": novo_cartao.questao_id,
+            "disciplina": novo_cartao.disciplina,
+            "topico": novo_cartao.topico,
+            "data_agendada": novo_cartao.proxima_revisao,
+            "intervalo_dias": novo_cartao.intervalo_dias,
+            "repeticoes": novo_cartao.repeticoes,
+            "ease_factor": novo_cartao.ease_factor,
+        })
+
+        await db.commit()
+
+        return Response(
+            success=True,
+            data={
+                "cartao_anterior": cartao_para_dict(cartao_atual),
+                "novo_cartao": cartao_para_dict(novo_cartao),
+                "proxima_revisao_em": f"{novo_cartao.intervalo_dias} dias"
+            },
+            message="Revisão processada com sucesso"
+        )
 
     except HTTPException:
         raise
@@ -1230,69 +1312,29 @@ async def processar_revisao_cartao(user_id: str, revisao: RevisaoRequest):
 
 
 @app.get("/revisao/{user_id}/estatisticas", response_model=Response)
-async def obter_estatisticas_revisao(user_id: str):
+async def obter_estatisticas_revisao(
+    user_id: str,
+    db: AsyncSession = Depends(get_async_db_session)
+):
     """
     Retorna estatísticas de revisão espaçada do usuário.
 
     Função pura - cálculos feitos em memória.
     """
     try:
-        with get_db_session() as session:
-            # Buscar todas as revisões do usuário
-            query = f"""
-                SELECT
-                    ra.questao_id,
-                    ra.disciplina,
-                    ra.topico,
-                    ra.intervalo_dias,
-                    ra.numero_revisao,
-                    ra.fator_facilidade,
-                    ra.data_conclusao,
-                    ra.data_agendada,
-                    COALESCE(stats.total, 0) as total_revisoes,
-                    COALESCE(stats.acertos, 0) as total_acertos,
-                    COALESCE(stats.erros, 0) as total_erros
-                FROM revisao_agendada ra
-                LEFT JOIN (
-                    SELECT
-                        questao_id,
-                        COUNT(*) as total,
-                        SUM(CASE WHEN tipo_resposta = 'CORRETA' THEN 1 ELSE 0 END) as acertos,
-                        SUM(CASE WHEN tipo_resposta = 'INCORRETA' THEN 1 ELSE 0 END) as erros
-                    FROM interacao_questao
-                    WHERE user_id = '{user_id}'
-                    GROUP BY questao_id
-                ) stats ON ra.questao_id = stats.questao_id
-                WHERE ra.user_id = '{user_id}'
-            """
-
-            resultados = session.execute(query).fetchall()
-
-            cartoes = [
-                CartaoRevisao(
-                    questao_id=str(row.questao_id),
-                    disciplina=row.disciplina,
-                    topico=row.topico,
-                    intervalo_dias=row.intervalo_dias or 1,
-                    repeticoes=row.numero_revisao or 0,
-                    ease_factor=float(row.fator_facilidade) if row.fator_facilidade else 2.5,
-                    ultima_revisao=row.data_conclusao,
-                    proxima_revisao=row.data_agendada,
-                    total_revisoes=row.total_revisoes,
-                    total_acertos=row.total_acertos,
-                    total_erros=row.total_erros,
-                )
-                for row in resultados
-            ]
+        # Buscar todas as revisões do usuário
+        resultados = (await db.execute(
+            text(_SQL_CARTOES_REVISAO), {"user_id": user_id}
+        )).fetchall()
 
-            # Calcular estatísticas (FUNÇÃO PURA)
-            stats = calcular_estatisticas_globais(cartoes)
+        # Calcular estatísticas em lote (colunas, sem um CartaoRevisao por linha)
+        stats = calcular_estatisticas_globais_lote(_lote_de_linhas(resultados))
 
-            return Response(
-                success=True,
-                data=stats,
-                message="Estatísticas de revisão calculadas"
-            )
+        return Response(
+            success=True,
+            data=stats,
+            message="Estatísticas de revisão calculadas"
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -1452,9 +1494,52 @@ async def enviar_email_boas_vindas(user_id: str):
 # INICIALIZAÇÃO
 # ============================================================
 
+# Intervalo de recálculo do rollup de analytics (segundos)
+INTERVALO_ROLLUP_ANALYTICS = int(os.getenv("ANALYTICS_ROLLUP_REFRESH_SECONDS", "600"))
+
+
+def _atualizar_rollup_analytics():
+    """Recalcula estatisticas_disciplina (apenas um worker por vez, via advisory lock)"""
+    with get_db_session() as session:
+        return RepositoryFactory(session).estatisticas_disciplina.refresh()
+
+
+async def _agendar_rollup_analytics():
+    """Loop em background que mantém o rollup de analytics atualizado"""
+    while True:
+        await asyncio.sleep(INTERVALO_ROLLUP_ANALYTICS)
+        try:
+            await asyncio.to_thread(_atualizar_rollup_analytics)
+        except Exception as e:
+            print(f"Erro ao atualizar rollup de analytics: {e}")
+
+
+# Intervalo de reconciliação dos leaderboards do Redis com o banco (segundos)
+INTERVALO_RECONCILIACAO_LEADERBOARDS = int(os.getenv("LEADERBOARD_RECONCILE_SECONDS", "3600"))
+
+
+def _reconciliar_leaderboards():
+    """Reconstrói os leaderboards global/disciplina (apenas um worker por vez, via lock no Redis)"""
+    with get_db_session() as session:
+        return leaderboards.reconciliar(session)
+
+
+async def _agendar_reconciliacao_leaderboards():
+    """Loop em background: reconcilia na subida (Redis vazio) e depois periodicamente"""
+    while True:
+        try:
+            await asyncio.to_thread(_reconciliar_leaderboards)
+        except Exception as e:
+            print(f"Erro ao reconciliar leaderboards: {e}")
+        await asyncio.sleep(INTERVALO_RECONCILIACAO_LEADERBOARDS)
+
+
 @app.on_event("startup")
 async def startup_event():
     """Executado ao iniciar a API"""
+    asyncio.create_task(_agendar_rollup_analytics())
+    asyncio.create_task(_agendar_reconciliacao_leaderboards())
+
     print("=" * 60)
     print("JURIS_IA API - INICIANDO")
     print("=" * 60)
@@ -1466,6 +1551,8 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Executado ao desligar a API"""
+    await run_in_threadpool(fila_logs.encerrar)
+    await async_db_manager.dispose()
     print("JURIS_IA API - ENCERRANDO")
 
 
@@ -32,6 +32,7 @@ from engines.piece_engine import PieceType
 
 # Importa enforcement
 from core.enforcement import LimitsEnforcement, ReasonCode
+from core.log_queue import fila_logs
 from dotenv import load_dotenv
 
 # Importa routers
@@ -352,6 +353,9 @@ async def iniciar_sessao_estudo(request_body: SessaoEstudoRequest, request: Requ
             disciplina=request_body.disciplina,
             tipo=request_body.tipo.value
         )
+        enforcement.registrar_sessao_iniciada(
+            request_body.aluno_id, request_body.modo_estudo_continuo
+        )
 
         return Response(
             success=True,
@@ -406,6 +410,10 @@ async def responder_questao(request_body: RespostaQuestaoRequest, request: Reque
             alternativa_escolhida=request_body.alternativa_escolhida,
             tempo_segundos=request_body.tempo_segundos
         )
+        if request_body.session_id:
+            enforcement.registrar_questao_respondida(
+                request_body.aluno_id, request_body.session_id
+            )
 
         return Response(
             success=True,
@@ -725,6 +733,7 @@ async def iniciar_pratica_peca(request_body: IniciarPecaRequest, request: Reques
             tipo_peca=tipo_peca,
             enunciado=request_body.enunciado
         )
+        enforcement.registrar_peca_iniciada(request_body.aluno_id)
 
         return Response(
             success=True,
@@ -1047,6 +1056,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Executado ao desligar a API"""
+    fila_logs.encerrar()
     print("JURIS_IA API - ENCERRANDO")
 
 
@@ -3,27 +3,25 @@ Módulo de Autenticação - JWT e Password Hashing
 """
 import os
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
+from auth.password_hasher import hasher_senhas, HasherSobrecarregado
+
 # Configurações
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production-JURIS_IA_2025")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dias
 
-# Context para hash de senha
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Security scheme
 security = HTTPBearer()
 
 
 def hash_password(password: str) -> str:
     """
-    Faz hash de uma senha usando bcrypt
+    Faz hash de uma senha usando bcrypt (pool de hash; uso fora do event loop)
 
     Args:
         password: Senha em texto plano
@@ -31,12 +29,12 @@ def hash_password(password: str) -> str:
     Returns:
         str: Hash da senha
     """
-    return pwd_context.hash(password)
+    return hasher_senhas.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Verifica se uma senha corresponde ao hash
+    Verifica se uma senha corresponde ao hash (uso fora do event loop)
 
     Args:
         plain_password: Senha em texto plano
@@ -45,7 +43,45 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: True se a senha está correta
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return hasher_senhas.verificar(plain_password, hashed_password)
+
+
+def _servico_sobrecarregado() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Muitas autenticações simultâneas. Tente novamente em instantes.",
+        headers={"Retry-After": "1"}
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    """
+    Faz hash de uma senha no pool de hash, sem bloquear o event loop
+
+    Raises:
+        HTTPException: 503 se o pool estiver sobrecarregado
+    """
+    try:
+        return await hasher_senhas.hash_async(password)
+    except HasherSobrecarregado:
+        raise _servico_sobrecarregado()
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha no pool de hash, sem bloquear o event loop
+
+    Returns:
+        Tuple[bool, Optional[str]]: (senha correta, novo hash a gravar se o
+        armazenado usa custo menor ou formato legado)
+
+    Raises:
+        HTTPException: 503 se o pool estiver sobrecarregado
+    """
+    try:
+        return await hasher_senhas.verificar_e_atualizar_async(plain_password, hashed_password)
+    except HasherSobrecarregado:
+        raise _servico_sobrecarregado()
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
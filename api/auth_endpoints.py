@@ -21,6 +21,7 @@ from database.connection import get_db_session
 from database.repositories import RepositoryFactory
 from database.models import User, PasswordResetToken, UserSettings
 from engines.email_service import get_email_service
+from api.auth import hash_password_async
 
 router = APIRouter(prefix="/auth", tags=["autenticação"])
 user_router = APIRouter(prefix="/usuario", tags=["perfil"])
@@ -170,10 +171,8 @@ async def resetar_senha(request: ResetarSenhaRequest):
                     detail="Usuário não encontrado"
                 )
 
-            # Atualizar senha (usando hash seguro)
-            import bcrypt
-            senha_hash = bcrypt.hashpw(request.nova_senha.encode('utf-8'), bcrypt.gensalt())
-            user.password_hash = senha_hash.decode('utf-8')
+            # Atualizar senha (pool de hash, fora do event loop)
+            user.password_hash = await hash_password_async(request.nova_senha)
 
             # Marcar token como usado
             reset_token.usado = True
@@ -1122,6 +1122,7 @@ async def seed_questoes():
     Endpoint temporário para popular o sistema
     """
     from database.connection import DatabaseManager
+    from core.question_sampler import question_sampler
 
     db_manager = DatabaseManager()
     Session = db_manager.get_session_factory()
@@ -1137,6 +1138,9 @@ async def seed_questoes():
                 questao = QuestaoBanco(**q_data)
                 db.add(questao)
                 db.commit()
+                question_sampler.registrar_questao(
+                    questao.id, questao.disciplina, questao.dificuldade, questao.topico
+                )
                 adicionadas += 1
             except IntegrityError:
                 db.rollback()
@@ -1197,23 +1201,18 @@ async def get_database_stats():
 # AUTENTICAÇÃO (Temporariamente aqui até resolver problema de imports)
 # ============================================================================
 
-import hashlib
 import os
 
+from api.auth import hash_password_async, verify_password_async
+
 # Configurações JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production-JURIS_IA_2025")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dias
 
 # Funções auxiliares
-def hash_password_simple(password: str) -> str:
-    """Hash simples de senha usando SHA256"""
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def verify_password_simple(plain_password: str, hashed_password: str) -> bool:
-    """Verifica senha comparando hashes"""
-    return hash_password_simple(plain_password) == hashed_password
-
+# Senhas: bcrypt no pool de auth.password_hasher. Hashes SHA-256 antigos
+# deste módulo continuam aceitos e são regravados em bcrypt no login.
 def create_jwt_token(data: dict) -> str:
     """Cria token JWT"""
     from datetime import timedelta
@@ -1276,8 +1275,8 @@ async def register_user(request: RegisterRequest):
                     detail="CPF já cadastrado"
                 )
 
-        # Hash da senha
-        password_hash = hash_password_simple(request.senha)
+        # Hash da senha (pool de hash, fora do event loop)
+        password_hash = await hash_password_async(request.senha)
 
         # Criar novo usuário
         new_user = User(
@@ -1363,8 +1362,9 @@ async def login_user(request: LoginRequest):
                 detail="Email ou senha incorretos"
             )
 
-        # Verificar senha
-        if not verify_password_simple(request.senha, user.password_hash):
+        # Verificar senha (pool de hash, fora do event loop)
+        senha_correta, novo_hash = await verify_password_async(request.senha, user.password_hash)
+        if not senha_correta:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou senha incorretos"
@@ -1377,8 +1377,10 @@ async def login_user(request: LoginRequest):
                 detail="Usuário inativo"
             )
 
-        # Atualizar último acesso
+        # Atualizar último acesso (e o hash, se SHA-256 ou custo antigo)
         user.data_ultimo_acesso = datetime.utcnow()
+        if novo_hash:
+            user.password_hash = novo_hash
         db.commit()
 
         # Gerar token JWT
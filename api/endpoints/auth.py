@@ -9,7 +9,7 @@ from datetime import datetime
 
 from database.connection import DatabaseManager
 from database.models import User, UserStatus, PerfilJuridico, NivelDominio
-from api.auth import hash_password, verify_password, create_access_token, get_current_user_id
+from api.auth import hash_password_async, verify_password_async, create_access_token, get_current_user_id
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -81,8 +81,8 @@ async def register(request: RegisterRequest):
                     detail="CPF ja cadastrado"
                 )
 
-        # Hash da senha
-        password_hash = hash_password(request.senha)
+        # Hash da senha (pool de hash, fora do event loop)
+        password_hash = await hash_password_async(request.senha)
 
         # Criar novo usuario
         new_user = User(
@@ -176,8 +176,9 @@ async def login(request: LoginRequest):
                 detail="Email ou senha incorretos"
             )
 
-        # Verificar senha
-        if not verify_password(request.senha, user.password_hash):
+        # Verificar senha (pool de hash, fora do event loop)
+        senha_correta, novo_hash = await verify_password_async(request.senha, user.password_hash)
+        if not senha_correta:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou senha incorretos"
@@ -190,8 +191,10 @@ async def login(request: LoginRequest):
                 detail="Usuario inativo"
             )
 
-        # Atualizar ultimo acesso
+        # Atualizar ultimo acesso (e o hash, se gerado com custo antigo)
         user.ultimo_acesso = datetime.utcnow()
+        if novo_hash:
+            user.password_hash = novo_hash
         db.commit()
 
         # Gerar token JWT
@@ -1,12 +1,14 @@
 """
 Endpoints de Progresso e Dashboard - Acompanhamento do usuario
 """
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy import func
 
+from core.leaderboard import leaderboards, TIPOS
 from database.connection import DatabaseManager
-from database.models import SessaoEstudo, InteracaoQuestao, TipoResposta
+from database.models import SessaoEstudo, InteracaoQuestao, TipoResposta, ProgressoDisciplina
 from database.repositories import RepositoryFactory
 from api.auth import get_current_user_id
 from api.schemas import (
@@ -186,15 +188,57 @@ async def analise_erros(
         db.close()
 
 
+def _itens_ranking(repos: RepositoryFactory, entradas) -> list:
+    """
+    Monta RankingItem a partir de [(posicao, user_id, score)] com uma
+    única consulta de perfis (em vez de um lazy load de usuário por linha)
+    """
+    perfis = repos.perfis.get_by_user_ids([UUID(str(uid)) for _, uid, _ in entradas])
+
+    ranking = []
+    for posicao, uid, score in entradas:
+        perfil = perfis.get(UUID(str(uid)))
+        if perfil is None:
+            continue  # Perfil removido desde a última reconciliação
+        ranking.append(RankingItem(
+            posicao=posicao,
+            nome=perfil.user.nome if perfil.user else "Usuario",
+            nivel_geral=perfil.nivel_geral.value if perfil.nivel_geral else "INICIANTE",
+            pontuacao_global=perfil.pontuacao_global or 0,
+            taxa_acerto_global=float(perfil.taxa_acerto_global or 0),
+            pontuacao_ranking=score
+        ))
+    return ranking
+
+
+def _validar_tipo(tipo: str, disciplina: Optional[str]) -> None:
+    if tipo not in TIPOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Tipo de ranking inválido. Use: {', '.join(TIPOS)}"
+        )
+    if tipo == "disciplina" and not disciplina:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe a disciplina para o ranking por disciplina"
+        )
+
+
 @router.get("/ranking", response_model=RankingResponse)
 async def ranking_usuarios(
+    tipo: str = Query("global", description="global, semanal ou disciplina"),
+    disciplina: Optional[str] = Query(None),
+    limite: int = Query(10, ge=1, le=100),
     user_id: str = Depends(get_current_user_id)
 ):
     """
-    Ranking dos top 10 usuarios por pontuacao
+    Ranking dos top usuarios (global, da semana ou por disciplina)
 
-    Requer autenticacao para visualizar.
+    Lido dos sorted sets do Redis; sem Redis, global e disciplina
+    consultam o banco. Requer autenticacao para visualizar.
     """
+    _validar_tipo(tipo, disciplina)
+
     db_manager = DatabaseManager()
     Session = db_manager.get_session_factory()
     db = Session()
@@ -202,27 +246,77 @@ async def ranking_usuarios(
     try:
         repos = RepositoryFactory(db)
 
-        # Buscar top 10 perfis
-        top_perfis = repos.perfis.get_top_scores(limit=10)
-
-        ranking = []
-        for i, perfil in enumerate(top_perfis, start=1):
-            # Acessar nome via relacionamento User
-            nome = "Usuario"
-            if perfil.user:
-                nome = perfil.user.nome
-
-            ranking.append(RankingItem(
-                posicao=i,
-                nome=nome,
-                nivel_geral=perfil.nivel_geral.value if perfil.nivel_geral else "INICIANTE",
-                pontuacao_global=perfil.pontuacao_global or 0,
-                taxa_acerto_global=float(perfil.taxa_acerto_global or 0)
-            ))
+        top = leaderboards.top(limite, tipo, disciplina)
+        if top is not None:
+            entradas = [(i, uid, score) for i, (uid, score) in enumerate(top, start=1)]
+        elif tipo == "global":
+            entradas = [
+                (i, perfil.user_id, perfil.pontuacao_global or 0)
+                for i, perfil in enumerate(repos.perfis.get_top_scores(limit=limite), start=1)
+            ]
+        elif tipo == "disciplina":
+            linhas = db.query(
+                ProgressoDisciplina.user_id, ProgressoDisciplina.questoes_corretas
+            ).filter(
+                ProgressoDisciplina.disciplina == disciplina
+            ).order_by(
+                ProgressoDisciplina.questoes_corretas.desc()
+            ).limit(limite).all()
+            entradas = [(i, uid, corretas) for i, (uid, corretas) in enumerate(linhas, start=1)]
+        else:
+            # FP da semana só existem no Redis
+            entradas = []
+
+        ranking = _itens_ranking(repos, entradas)
+
+        return RankingResponse(
+            total=len(ranking),
+            ranking=ranking,
+            tipo=tipo,
+            disciplina=disciplina
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro ao buscar ranking: {str(e)}"
+        )
+    finally:
+        db.close()
+
+
+@router.get("/ranking/vizinhanca", response_model=RankingResponse)
+async def ranking_vizinhanca(
+    tipo: str = Query("global", description="global, semanal ou disciplina"),
+    disciplina: Optional[str] = Query(None),
+    k: int = Query(5, ge=1, le=50),
+    user_id: str = Depends(get_current_user_id)
+):
+    """
+    Posicao do usuario no ranking e os k usuarios acima e abaixo dele
+    """
+    _validar_tipo(tipo, disciplina)
+
+    vizinhos = leaderboards.vizinhanca(user_id, k, tipo, disciplina)
+    if vizinhos is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Ranking temporariamente indisponível",
+            headers={"Retry-After": "60"}
+        )
+
+    db_manager = DatabaseManager()
+    Session = db_manager.get_session_factory()
+    db = Session()
+
+    try:
+        ranking = _itens_ranking(RepositoryFactory(db), vizinhos)
 
         return RankingResponse(
             total=len(ranking),
-            ranking=ranking
+            ranking=ranking,
+            tipo=tipo,
+            disciplina=disciplina
         )
 
     except Exception as e:
@@ -12,6 +12,7 @@ from database.models import (
     TipoResposta, DificuldadeQuestao
 )
 from database.repositories import RepositoryFactory
+from core.seen_questions import seen_questions
 from api.auth import get_current_user_id
 from api.schemas import (
     IniciarSessaoRequest,
@@ -219,6 +220,7 @@ async def responder_questao(
             repos.perfis.update_accuracy_rate(uid)
 
         db.commit()
+        seen_questions.registrar(uid, [questao.id])
 
         # Calcular stats parciais da sessao
         respondidas = sessao.total_questoes or 0
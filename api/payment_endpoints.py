@@ -23,6 +23,7 @@ from sqlalchemy import and_
 from database.connection import get_db_session
 from database.models import User, Assinatura, Pagamento, PlanoStatus
 from engines.stripe_service import get_stripe_service
+from core.entitlements import invalidar_direitos
 import logging
 
 # Configurar logging
@@ -293,6 +294,7 @@ async def cancelar_assinatura(request: CancelarAssinaturaRequest, db: Session =
             # Status permanece ATIVO até o fim do período
 
         db.commit()
+        invalidar_direitos(request.user_id)
 
         return {
             'success': True,
@@ -330,6 +332,7 @@ async def reativar_assinatura(request: ReativarAssinaturaRequest, db: Session =
         assinatura.status = PlanoStatus.ATIVO
         assinatura.cancelado_em = None
         db.commit()
+        invalidar_direitos(request.user_id)
 
         return {
             'success': True,
@@ -442,6 +445,7 @@ async def _processar_checkout_completo(data: Dict[str, Any], db: Session):
         assinatura.data_inicio = datetime.now()
 
         db.commit()
+        invalidar_direitos(user_id)
         logger.info(f"Assinatura {plano} ativada para usuário {user_id}")
 
 
@@ -463,6 +467,7 @@ async def _processar_assinatura_atualizada(data: Dict[str, Any], db: Session):
             assinatura.status = PlanoStatus.PAUSADO
 
         db.commit()
+        invalidar_direitos(assinatura.user_id)
 
 
 async def _processar_assinatura_cancelada(data: Dict[str, Any], db: Session):
@@ -487,6 +492,7 @@ async def _processar_assinatura_cancelada(data: Dict[str, Any], db: Session):
         assinatura.data_fim = datetime.now()
 
         db.commit()
+        invalidar_direitos(assinatura.user_id)
         logger.info(f"Assinatura cancelada e revertida para GRATUITO: {assinatura.user_id}")
 
 
@@ -552,4 +558,5 @@ async def _processar_pagamento_falha(data: Dict[str, Any], db: Session):
         assinatura.status = PlanoStatus.PAUSADO
 
         db.commit()
+        invalidar_direitos(assinatura.user_id)
         logger.warning(f"Pagamento falhou: R$ {amount} - Usuário {assinatura.user_id}")
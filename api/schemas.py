@@ -202,9 +202,12 @@ class RankingItem(BaseModel):
     nivel_geral: str
     pontuacao_global: int
     taxa_acerto_global: float
+    pontuacao_ranking: Optional[float] = None  # FP da semana / acertos na disciplina
 
 
 class RankingResponse(BaseModel):
     """Ranking dos top usuarios"""
     total: int
     ranking: List[RankingItem]
+    tipo: str = "global"
+    disciplina: Optional[str] = None
@@ -18,13 +18,13 @@ Data: 2025-12-17
 ================================================================================
 """
 
-import bcrypt
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 from uuid import UUID, uuid4
 from sqlalchemy import text
-from database.connection import DatabaseConnection
+from database.connection import get_db_session
 from auth.jwt_manager import JWTManager
+from auth.password_hasher import hasher_senhas
 
 
 class AuthService:
@@ -35,7 +35,6 @@ class AuthService:
     TEMPO_BLOQUEIO = timedelta(minutes=15)
 
     def __init__(self):
-        self.db = DatabaseConnection()
         self.jwt_manager = JWTManager()
 
     # ============================================================================
@@ -52,8 +51,8 @@ class AuthService:
         Returns:
             Hash bcrypt
         """
-        salt = bcrypt.gensalt(rounds=12)
-        return bcrypt.hashpw(senha.encode('utf-8'), salt).decode('utf-8')
+        # Pool limitado de auth.password_hasher (custo em PASSWORD_BCRYPT_ROUNDS)
+        return hasher_senhas.hash(senha)
 
     def verificar_senha(self, senha: str, senha_hash: str) -> bool:
         """
@@ -66,7 +65,7 @@ class AuthService:
         Returns:
             True se senha correta
         """
-        return bcrypt.checkpw(senha.encode('utf-8'), senha_hash.encode('utf-8'))
+        return hasher_senhas.verificar(senha, senha_hash)
 
     # ============================================================================
     # REGISTRO DE USUÁRIOS
@@ -106,7 +105,7 @@ class AuthService:
         if role not in ['role_pedagogico', 'role_profissional']:
             return False, None, "Role inválido"
 
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Verificar se email já existe
             result = session.execute(
                 text("SELECT id FROM usuario WHERE email = :email"),
@@ -205,7 +204,7 @@ class AuthService:
                 "refresh_expires_at": datetime
             }
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Buscar usuário
             result = session.execute(
                 text("""
@@ -259,8 +258,9 @@ class AuthService:
                 )
                 return False, None, f"Usuário bloqueado. Tente novamente em {tempo_restante} minutos"
 
-            # Verificar senha
-            if not self.verificar_senha(senha, senha_hash):
+            # Verificar senha (novo_hash se o armazenado usa custo antigo)
+            senha_correta, novo_hash = hasher_senhas.verificar_e_atualizar(senha, senha_hash)
+            if not senha_correta:
                 # Incrementar tentativas falhas
                 tentativas_falhas += 1
 
@@ -329,11 +329,13 @@ class AuthService:
                     SET tentativas_login_falhas = 0,
                         bloqueado_ate = NULL,
                         ultimo_login = NOW(),
-                        ip_ultimo_login = :ip_origem
+                        ip_ultimo_login = :ip_origem,
+                        senha_hash = COALESCE(:novo_hash, senha_hash)
                     WHERE id = :usuario_id
                 """),
                 {
                     "ip_origem": ip_origem,
+                    "novo_hash": novo_hash,
                     "usuario_id": usuario_id
                 }
             )
@@ -419,7 +421,7 @@ class AuthService:
         self.jwt_manager.finalizar_sessao(jti)
 
         # Log de evento
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             self._log_evento_autenticacao(
                 session,
                 usuario_id,
@@ -446,7 +448,7 @@ class AuthService:
             self.jwt_manager.revogar_todos_tokens_usuario(usuario_id)
 
             # Log de evento
-            with self.db.get_session() as session:
+            with get_db_session() as session:
                 result = session.execute(
                     text("SELECT email FROM usuario WHERE id = :usuario_id"),
                     {"usuario_id": usuario_id}
@@ -498,7 +500,7 @@ class AuthService:
         # Log de evento
         valido, payload, _ = self.jwt_manager.validar_refresh_token(refresh_token)
         if valido:
-            with self.db.get_session() as session:
+            with get_db_session() as session:
                 self._log_evento_autenticacao(
                     session,
                     UUID(payload["sub"]),
@@ -536,7 +538,7 @@ class AuthService:
         if not senha_nova or len(senha_nova) < 8:
             return False, "Nova senha deve ter pelo menos 8 caracteres"
 
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Buscar usuário
             result = session.execute(
                 text("""
@@ -618,7 +620,7 @@ class AuthService:
         if novo_modo not in ['pedagogico', 'profissional']:
             return False, "Modo inválido"
 
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Buscar usuário
             result = session.execute(
                 text("""
@@ -27,6 +27,7 @@ from uuid import UUID, uuid4
 from sqlalchemy import text
 from database.connection import DatabaseConnection
 from auth.subscription_service import SubscriptionService
+from core.entitlements import invalidar_direitos
 
 # Stripe será importado condicionalmente
 try:
@@ -394,19 +395,24 @@ class BillingService:
 
         with self.db.get_session() as session:
             # Atualizar status local
-            session.execute(
+            usuarios = session.execute(
                 text("""
                     UPDATE assinatura
                     SET status = :status
                     WHERE stripe_subscription_id = :stripe_subscription_id
+                    RETURNING usuario_id
                 """),
                 {
                     "status": status,
                     "stripe_subscription_id": stripe_subscription_id
                 }
-            )
+            ).scalars().all()
             session.commit()
 
+            # Limites do plano em cache (core.entitlements)
+            for usuario_id in usuarios:
+                invalidar_direitos(usuario_id)
+
         return True, None
 
     def _handle_subscription_deleted(self, subscription) -> Tuple[bool, Optional[str]]:
@@ -415,18 +421,23 @@ class BillingService:
 
         with self.db.get_session() as session:
             # Marcar como cancelada
-            session.execute(
+            usuarios = session.execute(
                 text("""
                     UPDATE assinatura
                     SET status = 'canceled',
                         data_cancelamento = NOW(),
                         motivo_cancelamento = 'Cancelada via Stripe'
                     WHERE stripe_subscription_id = :stripe_subscription_id
+                    RETURNING usuario_id
                 """),
                 {"stripe_subscription_id": stripe_subscription_id}
-            )
+            ).scalars().all()
             session.commit()
 
+            # Limites do plano em cache (core.entitlements)
+            for usuario_id in usuarios:
+                invalidar_direitos(usuario_id)
+
         return True, None
 
     def _handle_payment_succeeded(self, invoice) -> Tuple[bool, Optional[str]]:
@@ -438,17 +449,22 @@ class BillingService:
 
         with self.db.get_session() as session:
             # Atualizar data de renovação
-            session.execute(
+            usuarios = session.execute(
                 text("""
                     UPDATE assinatura
                     SET data_renovacao = NOW(),
                         status = 'active'
                     WHERE stripe_subscription_id = :stripe_subscription_id
+                    RETURNING usuario_id
                 """),
                 {"stripe_subscription_id": stripe_subscription_id}
-            )
+            ).scalars().all()
             session.commit()
 
+            # Limites do plano em cache (core.entitlements)
+            for usuario_id in usuarios:
+                invalidar_direitos(usuario_id)
+
         return True, None
 
     def _handle_payment_failed(self, invoice) -> Tuple[bool, Optional[str]]:
@@ -460,16 +476,21 @@ class BillingService:
 
         with self.db.get_session() as session:
             # Marcar como past_due
-            session.execute(
+            usuarios = session.execute(
                 text("""
                     UPDATE assinatura
                     SET status = 'past_due'
                     WHERE stripe_subscription_id = :stripe_subscription_id
+                    RETURNING usuario_id
                 """),
                 {"stripe_subscription_id": stripe_subscription_id}
-            )
+            ).scalars().all()
             session.commit()
 
+            # Limites do plano em cache (core.entitlements)
+            for usuario_id in usuarios:
+                invalidar_direitos(usuario_id)
+
         return True, None
 
     # ============================================================================
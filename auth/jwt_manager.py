@@ -12,18 +12,96 @@ Gerenciador de tokens JWT com:
 - Rotação de secrets
 - Token family tracking (segurança contra reutilização)
 
+CAMINHO QUENTE (validar_access_token):
+- Secrets em cache no processo; o header "kid" indica o secret do token.
+  Após rotacionar_secret, os workers recebem aviso via Redis pub/sub e o
+  secret anterior continua aceito por JWT_SECRET_GRACE_SECONDS.
+- Sessões criadas ficam num conjunto de sessões conhecidas e as finalizadas
+  num conjunto de revogação no Redis (jti com score = expiração) + corte
+  por usuário para logout geral.
+  Token válido = assinatura ok + sessão conhecida + não revogado: nenhuma
+  query no Postgres. jti fora do conjunto de sessões vai ao banco.
+- Cada conjunto guarda um membro sentinela gravado na sincronização: se o
+  conjunto se perde no Redis (flush, evicção), o sentinela vai junto e a
+  próxima validação recarrega do banco.
+- Sem Redis, volta à consulta em sessao_usuario.
+
 Autor: JURIS IA CORE V1
 Data: 2025-12-17
 ================================================================================
 """
 
+import os
 import jwt
+import json
+import time
+import logging
 import secrets
-from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from uuid import UUID, uuid4
 from sqlalchemy import text
-from database.connection import DatabaseConnection
+from database.connection import get_db_session
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================================
+# CACHE DE SECRETS (POR PROCESSO)
+# ============================================================================
+
+class CacheSecretsJWT:
+    """
+    Secrets ativos e em período de graça, por tipo ('access'/'refresh').
+
+    Compartilhado por todas as instâncias de JWTManager do processo.
+    O TTL é apenas uma rede de segurança: a invalidação normal vem do
+    broadcast de rotação.
+    """
+
+    def __init__(self, ttl_segundos: int):
+        self.ttl_segundos = ttl_segundos
+        self._lock = threading.Lock()
+        self._por_tipo: Dict[str, Tuple[float, List[Dict[str, Any]]]] = {}
+
+    def obter(self, tipo: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            item = self._por_tipo.get(tipo)
+        if item is None or item[0] < time.monotonic():
+            return None
+        return item[1]
+
+    def definir(self, tipo: str, lista: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._por_tipo[tipo] = (time.monotonic() + self.ttl_segundos, lista)
+
+    def invalidar(self, tipo: Optional[str] = None) -> None:
+        with self._lock:
+            if tipo is None:
+                self._por_tipo.clear()
+            else:
+                self._por_tipo.pop(tipo, None)
+
+
+_cache_secrets = CacheSecretsJWT(int(os.getenv("JWT_SECRET_CACHE_TTL", "300")))
+
+# Cliente Redis compartilhado (None = indisponível; nova tentativa após intervalo)
+_redis_lock = threading.Lock()
+_redis_cliente = None
+_redis_proxima_tentativa = 0.0
+_assinatura_rotacao = None
+
+INTERVALO_RECONEXAO_REDIS = 30.0
+
+
+def _on_rotacao(mensagem: Dict) -> None:
+    """Broadcast de rotação: descarta os secrets do tipo no cache local"""
+    try:
+        _cache_secrets.invalidar(json.loads(mensagem["data"]).get("tipo"))
+    except Exception as e:
+        logger.error(f"Erro ao processar rotação de secret: {e}")
+        _cache_secrets.invalidar()
 
 
 class JWTManager:
@@ -36,8 +114,179 @@ class JWTManager:
     # Algoritmo de assinatura
     ALGORITHM = "HS256"
 
-    def __init__(self):
-        self.db = DatabaseConnection()
+    # Secret rotacionado continua aceito na verificação por este período
+    # (default = vida do access token)
+    GRACA_ROTACAO = timedelta(seconds=int(os.getenv("JWT_SECRET_GRACE_SECONDS", "900")))
+
+    # Redis: broadcast de rotação e conjunto de revogação
+    CANAL_ROTACAO = "juris_ia:jwt:rotacao"
+    CHAVE_REVOGADOS = "juris_ia:jwt:revogados"
+    CHAVE_SESSOES = "juris_ia:jwt:sessoes"
+    CHAVE_CORTE_USUARIO = "juris_ia:jwt:corte:{usuario_id}"
+
+    # Membro com score +inf (nunca podado) presente nos dois conjuntos após a
+    # sincronização com o banco; some junto com o conjunto
+    MEMBRO_SINCRONIZADO = "__sincronizado__"
+
+    def __init__(self, revogacao_redis: Optional[bool] = None):
+        """
+        Args:
+            revogacao_redis: Valida sessões pelo conjunto de revogação no Redis
+                (default: JWT_REVOCATION_CACHE_ENABLED, true)
+        """
+        if revogacao_redis is None:
+            revogacao_redis = os.getenv("JWT_REVOCATION_CACHE_ENABLED", "true").lower() == "true"
+        self.revogacao_redis = revogacao_redis
+
+    # ============================================================================
+    # REDIS (BROADCAST E REVOGAÇÃO)
+    # ============================================================================
+
+    def _redis(self):
+        """Cliente Redis do CacheService, ou None se indisponível"""
+        global _redis_cliente, _redis_proxima_tentativa, _assinatura_rotacao
+
+        if _redis_cliente is not None or time.monotonic() < _redis_proxima_tentativa:
+            return _redis_cliente
+
+        with _redis_lock:
+            if _redis_cliente is None and time.monotonic() >= _redis_proxima_tentativa:
+                try:
+                    from core.cache_service import obter_cache_service
+                    cliente = obter_cache_service().redis_client
+
+                    pubsub = cliente.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(**{self.CANAL_ROTACAO: _on_rotacao})
+                    _assinatura_rotacao = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+                    _redis_cliente = cliente
+                except Exception as e:
+                    logger.warning(f"Redis indisponível para JWT (fallback no banco): {e}")
+                    _redis_proxima_tentativa = time.monotonic() + INTERVALO_RECONEXAO_REDIS
+
+        return _redis_cliente
+
+    @staticmethod
+    def _timestamp_utc(data: datetime) -> float:
+        """Timestamps do banco/tokens são UTC sem timezone"""
+        if data.tzinfo is None:
+            data = data.replace(tzinfo=timezone.utc)
+        return data.timestamp()
+
+    def _gravar_conjunto(self, pipe, chave: str, sessoes: Iterable[Tuple[str, datetime]]) -> None:
+        """Enfileira (jti, expira_em) no conjunto, podando expirados"""
+        membros = {jti: self._timestamp_utc(expira_em) for jti, expira_em in sessoes}
+        if membros:
+            pipe.zadd(chave, membros)
+        pipe.zremrangebyscore(chave, "-inf", time.time())
+
+    def _registrar_no_conjunto(self, chave: str, sessoes: Iterable[Tuple[str, datetime]]) -> bool:
+        """Grava no conjunto; False se o Redis falhou (sem Redis não há o que gravar)"""
+        cliente = self._redis()
+        if cliente is None:
+            return True
+
+        try:
+            pipe = cliente.pipeline(transaction=False)
+            self._gravar_conjunto(pipe, chave, sessoes)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Erro ao registrar sessões em {chave}: {e}")
+            return False
+
+    def _registrar_revogacoes(self, sessoes: Iterable[Tuple[str, datetime]]) -> None:
+        """
+        Adiciona (jti, expira_em) ao conjunto de revogação.
+
+        Se a gravação falhar, tira os jtis e o sentinela do conjunto de
+        sessões conhecidas: a validação volta ao banco (e a próxima
+        consulta ressincroniza os conjuntos) em vez de seguir aceitando o
+        token até expirar.
+        """
+        sessoes = list(sessoes)
+        if self._registrar_no_conjunto(self.CHAVE_REVOGADOS, sessoes) or not sessoes:
+            return
+
+        try:
+            pipe = self._redis().pipeline(transaction=False)
+            pipe.zrem(self.CHAVE_SESSOES, *(jti for jti, _ in sessoes))
+            pipe.zrem(self.CHAVE_SESSOES, self.MEMBRO_SINCRONIZADO)
+            pipe.execute()
+        except Exception as e:
+            logger.error(
+                f"Revogação não registrada no Redis para {[jti for jti, _ in sessoes]}: {e}"
+            )
+
+    def _registrar_sessoes(self, sessoes: Iterable[Tuple[str, datetime]]) -> None:
+        """Adiciona (jti, expira_em) ao conjunto de sessões conhecidas"""
+        self._registrar_no_conjunto(self.CHAVE_SESSOES, sessoes)
+
+    def _sincronizar_revogacoes(self, cliente) -> None:
+        """
+        Carrega no Redis as sessões ainda não expiradas (ativas no conjunto
+        de sessões, finalizadas no de revogação) e grava os sentinelas.
+        Necessário no primeiro uso e após perda de dados do Redis.
+        """
+        with get_db_session() as session:
+            sessoes = session.execute(
+                text("""
+                    SELECT token_acesso_jti, expira_em, ativa
+                    FROM sessao_usuario
+                    WHERE expira_em > NOW()
+                """)
+            ).fetchall()
+
+        pipe = cliente.pipeline(transaction=False)
+        self._gravar_conjunto(pipe, self.CHAVE_SESSOES, ((row[0], row[1]) for row in sessoes if row[2]))
+        self._gravar_conjunto(pipe, self.CHAVE_REVOGADOS, ((row[0], row[1]) for row in sessoes if not row[2]))
+        for chave in (self.CHAVE_SESSOES, self.CHAVE_REVOGADOS):
+            pipe.zadd(chave, {self.MEMBRO_SINCRONIZADO: float("inf")})
+        pipe.execute()
+
+        logger.info(f"Conjuntos de sessões JWT sincronizados: {len(sessoes)} sessões")
+
+    def _sessao_revogada(self, payload: Dict) -> Optional[bool]:
+        """
+        Consulta os conjuntos de sessões e de revogação (1 round trip ao Redis).
+
+        Returns:
+            True/False, ou None se o Redis estiver indisponível ou a sessão
+            não estiver no conjunto de sessões conhecidas (decide o banco)
+        """
+        cliente = self._redis()
+        if cliente is None:
+            return None
+
+        chave_corte = self.CHAVE_CORTE_USUARIO.format(usuario_id=payload.get("sub"))
+        jti = payload.get("jti")
+        try:
+            for _ in range(2):
+                pipe = cliente.pipeline(transaction=False)
+                pipe.zscore(self.CHAVE_REVOGADOS, jti)
+                pipe.zscore(self.CHAVE_SESSOES, jti)
+                pipe.get(chave_corte)
+                pipe.zscore(self.CHAVE_REVOGADOS, self.MEMBRO_SINCRONIZADO)
+                pipe.zscore(self.CHAVE_SESSOES, self.MEMBRO_SINCRONIZADO)
+                revogado, conhecida, corte, *sentinelas = pipe.execute()
+
+                if all(sentinela is not None for sentinela in sentinelas):
+                    break
+                self._sincronizar_revogacoes(cliente)
+
+            if revogado is not None:
+                return True
+            # Logout geral: tokens emitidos antes do corte estão revogados
+            # (sessões persistidas já entram pelo jti; "<" evita revogar um
+            # login feito no mesmo segundo do logout)
+            if corte is not None and payload.get("iat", 0) < float(corte):
+                return True
+            # Sem linha em sessao_usuario (ou a gravação no Redis falhou)
+            if conhecida is None:
+                return None
+            return False
+        except Exception as e:
+            logger.error(f"Erro ao consultar revogação no Redis: {e}")
+            return None
 
     # ============================================================================
     # GERAÇÃO DE SECRETS
@@ -55,36 +304,42 @@ class JWTManager:
         """
         return secrets.token_hex(64)
 
-    def obter_secret_ativo(self, tipo: str = "access") -> str:
+    def _carregar_secrets(self, tipo: str) -> List[Dict[str, Any]]:
         """
-        Obtém o secret ativo para assinatura.
-
-        Args:
-            tipo: 'access' ou 'refresh'
-
-        Returns:
-            Secret ativo ou cria um novo se não existir
+        Busca no banco o secret ativo e os rotacionados ainda em período de graça
+        (mais recente primeiro). Cria um secret se não houver ativo.
         """
-        with self.db.get_session() as session:
-            # Buscar secret ativo
-            result = session.execute(
+        with get_db_session() as session:
+            rows = session.execute(
                 text("""
-                    SELECT secret_key
+                    SELECT id, secret_key, ativo, valido_ate
                     FROM jwt_secret
-                    WHERE ativo = TRUE
-                      AND tipo = :tipo
+                    WHERE tipo = :tipo
                       AND valido_de <= NOW()
-                      AND (valido_ate IS NULL OR valido_ate > NOW())
+                      AND (
+                          (ativo = TRUE AND (valido_ate IS NULL OR valido_ate > NOW()))
+                          OR valido_ate > NOW() - make_interval(secs => :graca)
+                      )
                     ORDER BY valido_de DESC
-                    LIMIT 1
                 """),
-                {"tipo": tipo}
-            ).fetchone()
+                {"tipo": tipo, "graca": self.GRACA_ROTACAO.total_seconds()}
+            ).fetchall()
+
+            lista = [
+                {
+                    "kid": str(row[0]),
+                    "secret": row[1],
+                    "ativo": bool(row[2]) and (row[3] is None or row[3] > datetime.utcnow()),
+                    "valido_ate": row[3],
+                }
+                for row in rows
+            ]
 
-            if result:
-                return result[0]
+            if any(item["ativo"] for item in lista):
+                return lista
 
             # Criar novo secret se não existe
+            novo_id = uuid4()
             novo_secret = self.gerar_secret(tipo)
 
             session.execute(
@@ -106,14 +361,78 @@ class JWTManager:
                     )
                 """),
                 {
-                    "id": uuid4(),
+                    "id": novo_id,
                     "secret_key": novo_secret,
                     "tipo": tipo
                 }
             )
             session.commit()
 
-            return novo_secret
+            return [{"kid": str(novo_id), "secret": novo_secret, "ativo": True, "valido_ate": None}] + lista
+
+    def _secrets(self, tipo: str, recarregar: bool = False) -> List[Dict[str, Any]]:
+        """Secrets do tipo, do cache do processo (recarrega do banco se necessário)"""
+        lista = None if recarregar else _cache_secrets.obter(tipo)
+        if lista is None:
+            # Garante a assinatura do broadcast antes de popular o cache
+            self._redis()
+            lista = self._carregar_secrets(tipo)
+            _cache_secrets.definir(tipo, lista)
+        return lista
+
+    def _secret_assinatura(self, tipo: str) -> Dict[str, Any]:
+        """Secret ativo mais recente (usado para assinar)"""
+        for item in self._secrets(tipo):
+            if item["ativo"]:
+                return item
+        return next(item for item in self._secrets(tipo, recarregar=True) if item["ativo"])
+
+    def obter_secret_ativo(self, tipo: str = "access") -> str:
+        """
+        Obtém o secret ativo para assinatura.
+
+        Args:
+            tipo: 'access' ou 'refresh'
+
+        Returns:
+            Secret ativo ou cria um novo se não existir
+        """
+        return self._secret_assinatura(tipo)["secret"]
+
+    def _decodificar(self, token: str, tipo: str) -> Dict:
+        """
+        Verifica assinatura/expiração com o secret indicado pelo "kid".
+
+        Tokens sem kid (emitidos antes do cache) são testados contra todos os
+        secrets aceitos. Um kid desconhecido força recarga (rotação feita em
+        outro worker antes do broadcast chegar).
+
+        Raises:
+            jwt.InvalidTokenError: Token inválido, expirado ou secret fora da graça
+        """
+        kid = jwt.get_unverified_header(token).get("kid")
+        agora = datetime.utcnow()
+
+        def candidatos(lista: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            return [
+                item for item in lista
+                if (kid is None or item["kid"] == kid)
+                and (item["ativo"] or (item["valido_ate"] and item["valido_ate"] + self.GRACA_ROTACAO > agora))
+            ]
+
+        aceitos = candidatos(self._secrets(tipo))
+        if not aceitos and kid is not None:
+            aceitos = candidatos(self._secrets(tipo, recarregar=True))
+        if not aceitos:
+            raise jwt.InvalidSignatureError("Secret do token não é mais aceito")
+
+        erro: Optional[Exception] = None
+        for item in aceitos:
+            try:
+                return jwt.decode(token, item["secret"], algorithms=[self.ALGORITHM])
+            except jwt.InvalidSignatureError as e:
+                erro = e
+        raise erro
 
     def rotacionar_secret(self, tipo: str = "access") -> str:
         """
@@ -125,7 +444,7 @@ class JWTManager:
         Returns:
             Novo secret gerado
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Desativar secret atual
             session.execute(
                 text("""
@@ -168,7 +487,21 @@ class JWTManager:
             )
             session.commit()
 
-            return novo_secret
+        self._publicar_rotacao(tipo)
+        return novo_secret
+
+    def _publicar_rotacao(self, tipo: str) -> None:
+        """Descarta o cache local e avisa os demais workers"""
+        _cache_secrets.invalidar(tipo)
+
+        cliente = self._redis()
+        if cliente is None:
+            # Demais workers convergem pelo TTL do cache / kid desconhecido
+            return
+        try:
+            cliente.publish(self.CANAL_ROTACAO, json.dumps({"tipo": tipo}))
+        except Exception as e:
+            logger.error(f"Erro ao publicar rotação de secret: {e}")
 
     # ============================================================================
     # GERAÇÃO DE TOKENS
@@ -208,8 +541,10 @@ class JWTManager:
             "exp": expiracao
         }
 
-        secret = self.obter_secret_ativo("access")
-        token = jwt.encode(payload, secret, algorithm=self.ALGORITHM)
+        secret = self._secret_assinatura("access")
+        token = jwt.encode(
+            payload, secret["secret"], algorithm=self.ALGORITHM, headers={"kid": secret["kid"]}
+        )
 
         return token, jti, expiracao
 
@@ -244,8 +579,10 @@ class JWTManager:
             "exp": expiracao
         }
 
-        secret = self.obter_secret_ativo("refresh")
-        token = jwt.encode(payload, secret, algorithm=self.ALGORITHM)
+        secret = self._secret_assinatura("refresh")
+        token = jwt.encode(
+            payload, secret["secret"], algorithm=self.ALGORITHM, headers={"kid": secret["kid"]}
+        )
 
         return token, token_id, token_family, expiracao
 
@@ -264,16 +601,22 @@ class JWTManager:
             Tupla (valido, payload, erro)
         """
         try:
-            secret = self.obter_secret_ativo("access")
-            payload = jwt.decode(token, secret, algorithms=[self.ALGORITHM])
+            payload = self._decodificar(token, "access")
 
             # Verificar tipo
             if payload.get("type") != "access":
                 return False, None, "Token não é do tipo access"
 
-            # Verificar se sessão está ativa
+            # Verificar se sessão foi revogada (Redis, sem ir ao banco)
+            revogada = self._sessao_revogada(payload) if self.revogacao_redis else None
+            if revogada is not None:
+                if revogada:
+                    return False, None, "Sessão inválida ou expirada"
+                return True, payload, None
+
+            # Fallback: verificar se sessão está ativa no banco
             jti = payload.get("jti")
-            with self.db.get_session() as session:
+            with get_db_session() as session:
                 result = session.execute(
                     text("""
                         SELECT ativa
@@ -306,8 +649,7 @@ class JWTManager:
             Tupla (valido, payload, erro)
         """
         try:
-            secret = self.obter_secret_ativo("refresh")
-            payload = jwt.decode(token, secret, algorithms=[self.ALGORITHM])
+            payload = self._decodificar(token, "refresh")
 
             # Verificar tipo
             if payload.get("type") != "refresh":
@@ -315,7 +657,7 @@ class JWTManager:
 
             # Verificar se token está revogado
             jti = payload.get("jti")
-            with self.db.get_session() as session:
+            with get_db_session() as session:
                 result = session.execute(
                     text("""
                         SELECT revogado
@@ -366,7 +708,7 @@ class JWTManager:
             ip_origem: IP de origem
             user_agent: User agent
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             session.execute(
                 text("""
                     INSERT INTO token_refresh (
@@ -421,7 +763,7 @@ class JWTManager:
             ip_origem: IP de origem
             user_agent: User agent
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             session.execute(
                 text("""
                     INSERT INTO sessao_usuario (
@@ -458,6 +800,8 @@ class JWTManager:
             )
             session.commit()
 
+        self._registrar_sessoes([(jti, expiracao)])
+
     # ============================================================================
     # REFRESH DE TOKENS (ROTAÇÃO)
     # ============================================================================
@@ -493,7 +837,7 @@ class JWTManager:
         usuario_id = UUID(payload["sub"])
         token_family = UUID(payload["family"])
 
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Buscar dados do usuário
             result = session.execute(
                 text("""
@@ -576,7 +920,7 @@ class JWTManager:
             token: Refresh token JWT
             motivo: Motivo da revogação
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             session.execute(
                 text("""
                     UPDATE token_refresh
@@ -596,14 +940,44 @@ class JWTManager:
         Args:
             usuario_id: ID do usuário
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             # Usar função do banco
             session.execute(
                 text("SELECT revogar_tokens_usuario(:usuario_id)"),
                 {"usuario_id": usuario_id}
             )
+            revogadas = session.execute(
+                text("""
+                    SELECT token_acesso_jti, expira_em
+                    FROM sessao_usuario
+                    WHERE usuario_id = :usuario_id
+                      AND ativa = FALSE
+                      AND expira_em > NOW()
+                """),
+                {"usuario_id": usuario_id}
+            ).fetchall()
             session.commit()
 
+        self._registrar_revogacoes((row[0], row[1]) for row in revogadas)
+        self._registrar_corte_usuario(usuario_id)
+
+    def _registrar_corte_usuario(self, usuario_id: UUID) -> None:
+        """
+        Marca o instante do logout geral: cobre tokens emitidos sem sessão
+        persistida. Expira junto com o último access token possível.
+        """
+        cliente = self._redis()
+        if cliente is None:
+            return
+        try:
+            cliente.set(
+                self.CHAVE_CORTE_USUARIO.format(usuario_id=usuario_id),
+                int(time.time()),
+                ex=int(self.ACCESS_TOKEN_EXPIRY.total_seconds())
+            )
+        except Exception as e:
+            logger.error(f"Erro ao registrar corte de tokens do usuário: {e}")
+
     def finalizar_sessao(self, jti: str):
         """
         Finaliza uma sessão (logout).
@@ -611,18 +985,21 @@ class JWTManager:
         Args:
             jti: JWT ID do access token
         """
-        with self.db.get_session() as session:
-            session.execute(
+        with get_db_session() as session:
+            finalizadas = session.execute(
                 text("""
                     UPDATE sessao_usuario
                     SET ativa = FALSE,
                         finalizada_em = NOW()
                     WHERE token_acesso_jti = :jti
+                    RETURNING token_acesso_jti, expira_em
                 """),
                 {"jti": jti}
-            )
+            ).fetchall()
             session.commit()
 
+        self._registrar_revogacoes((row[0], row[1]) for row in finalizadas)
+
     # ============================================================================
     # LIMPEZA
     # ============================================================================
@@ -634,7 +1011,7 @@ class JWTManager:
         Returns:
             Número de tokens removidos
         """
-        with self.db.get_session() as session:
+        with get_db_session() as session:
             result = session.execute(
                 text("SELECT limpar_tokens_expirados()")
             ).fetchone()
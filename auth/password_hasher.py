@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+================================================================================
+PASSWORD HASHER - POOL DEDICADO PARA BCRYPT
+================================================================================
+
+Hash e verificação de senhas fora do event loop:
+- Pool de threads dedicado e limitado (PASSWORD_HASH_WORKERS); o bcrypt
+  libera o GIL durante o cálculo, então threads usam vários núcleos
+- Controle de admissão: com mais de PASSWORD_HASH_MAX_QUEUE pedidos
+  esperando, novos pedidos falham na hora (HasherSobrecarregado -> 503)
+  em vez de acumular latência para todos
+- Custo configurável (PASSWORD_BCRYPT_ROUNDS); hashes com custo menor ou
+  em formato legado (SHA-256 hex do admin) são aceitos e regravados no
+  próximo login bem-sucedido
+- Métricas de fila: em execução, aguardando, rejeitados, tempo médio
+
+Autor: JURIS IA CORE V1
+Data: 2026-10-16
+================================================================================
+"""
+
+import os
+import re
+import hmac
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+
+# bcrypt considera só os primeiros 72 bytes (passlib e bcrypt < 5 truncavam
+# em silêncio; bcrypt >= 5 rejeita senhas maiores)
+BCRYPT_MAX_BYTES = 72
+
+_RE_BCRYPT = re.compile(r"^\$2[abxy]\$(\d{2})\$[./A-Za-z0-9]{53}$")
+_RE_SHA256_HEX = re.compile(r"^[0-9a-f]{64}$")
+
+
+class HasherSobrecarregado(Exception):
+    """Fila do pool de hash cheia; o pedido não foi aceito"""
+
+    def __init__(self, aguardando: int, limite: int):
+        self.aguardando = aguardando
+        self.limite = limite
+        super().__init__(f"Pool de hash de senhas sobrecarregado ({aguardando}/{limite} aguardando)")
+
+
+def _senha_bytes(senha: str) -> bytes:
+    return senha.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+
+class HasherSenhas:
+    """Hash/verificação de senhas num pool de threads limitado."""
+
+    ROUNDS = int(os.getenv("PASSWORD_BCRYPT_ROUNDS", "12"))
+    WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    MAX_FILA = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+    def __init__(
+        self,
+        rounds: Optional[int] = None,
+        workers: Optional[int] = None,
+        max_fila: Optional[int] = None
+    ):
+        self.rounds = rounds if rounds is not None else self.ROUNDS
+        self.workers = workers if workers is not None else self.WORKERS
+        self.max_fila = max_fila if max_fila is not None else self.MAX_FILA
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.pendentes = 0  # aceitos e ainda não concluídos
+        self.em_execucao = 0
+        self.concluidos = 0
+        self.rejeitados = 0
+        self.rehashes = 0
+        self._tempo_total = 0.0
+
+    # ------------------------------------------------------------------
+    # Operações (executadas nas threads do pool)
+    # ------------------------------------------------------------------
+
+    def _gerar_hash(self, senha: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(_senha_bytes(senha), salt).decode('utf-8')
+
+    @staticmethod
+    def _conferir(senha: str, senha_hash: str) -> bool:
+        if not senha_hash:
+            return False
+        if _RE_SHA256_HEX.match(senha_hash):
+            # Formato legado de api/endpoints/admin.py
+            calculado = hashlib.sha256(senha.encode('utf-8')).hexdigest()
+            return hmac.compare_digest(calculado, senha_hash)
+        try:
+            return bcrypt.checkpw(_senha_bytes(senha), senha_hash.encode('utf-8'))
+        except ValueError:
+            # Hash corrompido ou formato desconhecido
+            return False
+
+    def precisa_rehash(self, senha_hash: str) -> bool:
+        """True se o hash não é bcrypt ou usa custo menor que o atual"""
+        encontrado = _RE_BCRYPT.match(senha_hash or "")
+        return encontrado is None or int(encontrado.group(1)) < self.rounds
+
+    def _conferir_e_atualizar(self, senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+        if not self._conferir(senha, senha_hash):
+            return False, None
+        if not self.precisa_rehash(senha_hash):
+            return True, None
+        with self._lock:
+            self.rehashes += 1
+        return True, self._gerar_hash(senha)
+
+    # ------------------------------------------------------------------
+    # Pool e controle de admissão
+    # ------------------------------------------------------------------
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        pid = os.getpid()
+        if self._executor is None or self._pid != pid:
+            # Threads não sobrevivem a fork: cada worker cria o seu pool
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="hash-senhas"
+            )
+            self._pid = pid
+        return self._executor
+
+    def _executar(self, funcao: Callable, *args: Any) -> Any:
+        with self._lock:
+            self.em_execucao += 1
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args)
+        finally:
+            with self._lock:
+                self.em_execucao -= 1
+                self.concluidos += 1
+                self._tempo_total += time.perf_counter() - inicio
+
+    def _finalizar(self, _future: Future) -> None:
+        with self._lock:
+            self.pendentes -= 1
+
+    def _submeter(self, funcao: Callable, *args: Any) -> Future:
+        with self._lock:
+            aguardando = max(0, self.pendentes - self.workers)
+            if aguardando >= self.max_fila:
+                self.rejeitados += 1
+                raise HasherSobrecarregado(aguardando, self.max_fila)
+            self.pendentes += 1
+            try:
+                future = self._obter_executor().submit(self._executar, funcao, *args)
+            except Exception:
+                self.pendentes -= 1
+                raise
+        future.add_done_callback(self._finalizar)
+        return future
+
+    # ------------------------------------------------------------------
+    # API assíncrona (handlers FastAPI)
+    # ------------------------------------------------------------------
+
+    async def hash_async(self, senha: str) -> str:
+        """Gera hash bcrypt sem bloquear o event loop"""
+        return await asyncio.wrap_future(self._submeter(self._gerar_hash, senha))
+
+    async def verificar_async(self, senha: str, senha_hash: str) -> bool:
+        """Verifica senha sem bloquear o event loop"""
+        return await asyncio.wrap_future(self._submeter(self._conferir, senha, senha_hash))
+
+    async def verificar_e_atualizar_async(
+        self,
+        senha: str,
+        senha_hash: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verifica senha e, se correta e o hash estiver defasado, gera o novo.
+
+        Returns:
+            (senha_correta, novo_hash ou None se o atual continua válido)
+        """
+        return await asyncio.wrap_future(
+            self._submeter(self._conferir_e_atualizar, senha, senha_hash)
+        )
+
+    # ------------------------------------------------------------------
+    # API síncrona (mesmo pool e mesmo limite)
+    # ------------------------------------------------------------------
+
+    def hash(self, senha: str) -> str:
+        return self._submeter(self._gerar_hash, senha).result()
+
+    def verificar(self, senha: str, senha_hash: str) -> bool:
+        return self._submeter(self._conferir, senha, senha_hash).result()
+
+    def verificar_e_atualizar(self, senha: str, senha_hash: str) -> Tuple[bool, Optional[str]]:
+        return self._submeter(self._conferir_e_atualizar, senha, senha_hash).result()
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "em_execucao": self.em_execucao,
+                "aguardando": max(0, self.pendentes - self.em_execucao),
+                "max_fila": self.max_fila,
+                "concluidos": self.concluidos,
+                "rejeitados": self.rejeitados,
+                "rehashes": self.rehashes,
+                "tempo_medio_ms": round(self._tempo_total / self.concluidos * 1000, 2) if self.concluidos else 0.0,
+                "rounds": self.rounds,
+            }
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+hasher_senhas = HasherSenhas()
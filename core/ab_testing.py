@@ -17,9 +17,12 @@ Data: 2025-12-19
 
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from database.connection import engine_registry
+from core.feature_flags import obter_flags
+
 
 class ABTestingManager:
     """Gerenciador de experimentos A/B"""
@@ -31,8 +34,9 @@ class ABTestingManager:
         Args:
             database_url: URL de conexão PostgreSQL
         """
-        self.engine = create_engine(database_url)
+        self.engine = engine_registry.get_engine(database_url, componente="ab_testing")
         self.Session = sessionmaker(bind=self.engine)
+        self.flags = obter_flags(database_url)
 
     def assign_user_to_group(
         self,
@@ -49,28 +53,19 @@ class ABTestingManager:
         Returns:
             Dict com group_name e is_new_assignment, ou None se experimento inativo
         """
-        session = self.Session()
-        try:
-            result = session.execute(
-                text("SELECT * FROM atribuir_grupo_experimento(:experiment_name, :user_id)"),
-                {
-                    "experiment_name": experiment_name,
-                    "user_id": user_id
-                }
-            ).fetchone()
+        # Grupo calculado no processo (snapshot de ab_experiments); a
+        # atribuição só vai ao banco na primeira vez por usuário
+        result = self.flags.atribuir_grupo(experiment_name, user_id)
 
-            if not result or result[0] is None:
-                return None
+        if not result:
+            return None
 
-            group_assigned, is_new = result
+        group_assigned, is_new = result
 
-            return {
-                "group_name": group_assigned,
-                "is_new_assignment": is_new
-            }
-
-        finally:
-            session.close()
+        return {
+            "group_name": group_assigned,
+            "is_new_assignment": is_new
+        }
 
     def get_user_experiment_config(
         self,
@@ -87,28 +82,7 @@ class ABTestingManager:
         Returns:
             Dict com group_name e experiment_config, ou None se não participando
         """
-        session = self.Session()
-        try:
-            result = session.execute(
-                text("SELECT * FROM obter_config_experimento(:experiment_name, :user_id)"),
-                {
-                    "experiment_name": experiment_name,
-                    "user_id": user_id
-                }
-            ).fetchone()
-
-            if not result or result[0] is None:
-                return None
-
-            group_name, metadata = result
-
-            return {
-                "group_name": group_name,
-                "config": metadata.get(group_name, {}) if metadata else {}
-            }
-
-        finally:
-            session.close()
+        return self.flags.config_experimento(experiment_name, user_id)
 
     def record_metric(
         self,
@@ -285,6 +259,7 @@ class ABTestingManager:
             )
 
             session.commit()
+            self.flags.recarregar()
             return result.rowcount > 0
 
         finally:
@@ -315,6 +290,7 @@ class ABTestingManager:
             )
 
             session.commit()
+            self.flags.recarregar()
             return result.rowcount > 0
 
         finally:
@@ -380,24 +356,4 @@ class ABTestingManager:
         Returns:
             Nome do grupo ('control' ou 'variant') ou None
         """
-        session = self.Session()
-        try:
-            result = session.execute(
-                text("""
-                    SELECT aug.group_name
-                    FROM ab_user_groups aug
-                    INNER JOIN ab_experiments ae ON aug.experiment_id = ae.id
-                    WHERE ae.experiment_name = :experiment_name
-                      AND aug.user_id = :user_id
-                    LIMIT 1
-                """),
-                {
-                    "experiment_name": experiment_name,
-                    "user_id": user_id
-                }
-            ).fetchone()
-
-            return result[0] if result else None
-
-        finally:
-            session.close()
+        return self.flags.grupo_usuario(experiment_name, user_id, somente_habilitado=False)
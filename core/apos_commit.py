@@ -0,0 +1,114 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Efeitos Colaterais Após o Commit da Transação Externa
+================================================================================
+Objetivo: Publicar logs, atualizações de ranking etc. só quando a transação
+          da sessão realmente confirmar
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- after_commit/after_rollback do SQLAlchemy também disparam para SAVEPOINTs
+  (session.begin_nested()); usá-los direto publica o que a transação externa
+  ainda pode desfazer e descarta o que ela ainda vai confirmar
+- Cada item agendado guarda a transação em que foi criado (o SAVEPOINT mais
+  interno, ou a transação raiz)
+- Fim de um SAVEPOINT (after_transaction_end):
+  - liberado: os itens passam para a transação pai
+  - desfeito: só os itens criados dentro dele são descartados
+- Fim da transação raiz (transaction.parent is None): publica tudo se ela
+  confirmou; rollback ou close() sem commit descartam
+
+USO:
+    from core.apos_commit import agendar_apos_commit
+
+    agendar_apos_commit(session, "_meus_pendentes", item, publicar)
+    # publicar([item, ...]) roda após o commit da transação externa
+
+================================================================================
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+
+logger = logging.getLogger(__name__)
+
+
+_PENDENTES = "_apos_commit_pendentes"
+_CONFIRMADAS = "_apos_commit_confirmadas"
+
+
+def agendar_apos_commit(
+    session: Session,
+    chave: str,
+    item: Any,
+    publicar: Callable[[List[Any]], None]
+) -> None:
+    """
+    Agenda `item` para ser publicado quando a transação externa confirmar.
+
+    Args:
+        session: Sessão cuja transação controla a publicação
+        chave: Identifica a fila de pendentes (uma por tipo de efeito)
+        item: Item agendado
+        publicar: Recebe os itens da chave, na ordem de agendamento
+    """
+    pendentes: Dict[str, Tuple[Callable, List]] = session.info.get(_PENDENTES)
+    if pendentes is None:
+        pendentes = session.info[_PENDENTES] = {}
+        if not event.contains(session, "after_transaction_end", _encerrar_transacao):
+            event.listen(session, "after_commit", _marcar_confirmada)
+            event.listen(session, "after_transaction_end", _encerrar_transacao)
+
+    _, itens = pendentes.setdefault(chave, (publicar, []))
+    itens.append((_transacao_atual(session), item))
+
+
+def _transacao_atual(session: Session) -> Optional[SessionTransaction]:
+    # None: sessão ainda sem transação (o item pertence à próxima raiz)
+    return session.get_nested_transaction() or session.get_transaction()
+
+
+def _marcar_confirmada(session: Session) -> None:
+    # after_commit roda antes do close() da transação: ela ainda é a atual
+    transacao = _transacao_atual(session)
+    if transacao is not None:
+        session.info.setdefault(_CONFIRMADAS, set()).add(transacao)
+
+
+def _encerrar_transacao(session: Session, transacao: SessionTransaction) -> None:
+    confirmadas = session.info.get(_CONFIRMADAS)
+    confirmada = confirmadas is not None and transacao in confirmadas
+    if confirmada:
+        confirmadas.discard(transacao)
+
+    if transacao.parent is not None:
+        if not transacao.nested:
+            return
+        pendentes = session.info.get(_PENDENTES)
+        for _, itens in (pendentes or {}).values():
+            if confirmada:
+                itens[:] = [
+                    (transacao.parent if dono is transacao else dono, item)
+                    for dono, item in itens
+                ]
+            else:
+                itens[:] = [(dono, item) for dono, item in itens if dono is not transacao]
+        return
+
+    session.info.pop(_CONFIRMADAS, None)
+    pendentes = session.info.pop(_PENDENTES, None)
+    if not confirmada or not pendentes:
+        return
+
+    for chave, (publicar, itens) in pendentes.items():
+        if not itens:
+            continue
+        try:
+            publicar([item for _, item in itens])
+        except Exception as e:
+            logger.warning(f"Falha ao publicar {len(itens)} itens de {chave} após o commit: {e}")
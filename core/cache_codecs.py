@@ -0,0 +1,214 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Codecs de Serialização do Cache
+================================================================================
+Objetivo: Payloads compactos no Redis (menos memória e CPU que JSON texto)
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+FORMATO:
+- Legado: JSON UTF-8 puro (primeiro byte sempre imprimível, >= 0x20)
+- Versionado: [versão][codec][compressão] + payload
+    versão:     0x01
+    codec:      0 = json, 1 = orjson, 2 = msgpack
+    compressão: 0 = nenhuma, 1 = zlib, 2 = lz4
+
+Como o cabeçalho começa com um byte de controle (< 0x20), entradas legadas e
+novas convivem no mesmo Redis durante o rollout: o leitor reconhece ambas.
+
+DEPENDÊNCIAS OPCIONAIS:
+- msgpack, orjson, lz4 (se ausentes, cai para json / zlib)
+
+================================================================================
+"""
+
+import json
+import zlib
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Dependências opcionais
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+
+VERSAO_FORMATO = 0x01
+
+# Nível 1: ~5x mais rápido que o default (6) com ~20% a mais de bytes
+NIVEL_ZLIB = 1
+
+CODEC_JSON = "json"
+CODEC_ORJSON = "orjson"
+CODEC_MSGPACK = "msgpack"
+
+COMPRESSAO_NENHUMA = "nenhuma"
+COMPRESSAO_ZLIB = "zlib"
+COMPRESSAO_LZ4 = "lz4"
+
+_IDS_CODEC = {CODEC_JSON: 0, CODEC_ORJSON: 1, CODEC_MSGPACK: 2}
+_IDS_COMPRESSAO = {COMPRESSAO_NENHUMA: 0, COMPRESSAO_ZLIB: 1, COMPRESSAO_LZ4: 2}
+
+
+class ErroCodec(ValueError):
+    """Payload de cache com cabeçalho desconhecido ou corrompido"""
+
+
+# ============================================================================
+# SERIALIZADORES
+# ============================================================================
+
+def _json_dumps(valor: Any) -> bytes:
+    return json.dumps(valor, default=str).encode()
+
+
+def _json_loads(dados: bytes) -> Any:
+    return json.loads(dados)
+
+
+def _orjson_dumps(valor: Any) -> bytes:
+    return orjson.dumps(valor, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _orjson_loads(dados: bytes) -> Any:
+    return orjson.loads(dados)
+
+
+def _msgpack_dumps(valor: Any) -> bytes:
+    return msgpack.packb(valor, default=str, use_bin_type=True)
+
+
+def _msgpack_loads(dados: bytes) -> Any:
+    return msgpack.unpackb(dados, raw=False, strict_map_key=False)
+
+
+_SERIALIZADORES: Dict[int, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    0: (_json_dumps, _json_loads),
+}
+if ORJSON_AVAILABLE:
+    _SERIALIZADORES[1] = (_orjson_dumps, _orjson_loads)
+if MSGPACK_AVAILABLE:
+    _SERIALIZADORES[2] = (_msgpack_dumps, _msgpack_loads)
+
+_COMPRESSORES: Dict[int, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    0: (lambda d: d, lambda d: d),
+    1: (lambda d: zlib.compress(d, NIVEL_ZLIB), zlib.decompress),
+}
+if LZ4_AVAILABLE:
+    _COMPRESSORES[2] = (lz4.frame.compress, lz4.frame.decompress)
+
+
+# ============================================================================
+# CODEC
+# ============================================================================
+
+class CacheCodec:
+    """
+    Codifica/decodifica valores de cache.
+
+    Com versionado=False produz JSON legado (idêntico ao formato antigo);
+    decodificar() aceita sempre os dois formatos.
+    """
+
+    def __init__(
+        self,
+        serializador: str = CODEC_JSON,
+        compressao: str = COMPRESSAO_NENHUMA,
+        limite_compressao: int = 1024,
+        versionado: bool = True
+    ):
+        """
+        Args:
+            serializador: json, orjson ou msgpack (cai para json se indisponível)
+            compressao: nenhuma, zlib ou lz4 (lz4 cai para zlib se indisponível)
+            limite_compressao: Só comprime payloads com pelo menos N bytes
+            versionado: False = grava JSON legado sem cabeçalho
+        """
+        id_codec = _IDS_CODEC[serializador]
+        if id_codec not in _SERIALIZADORES:
+            logger.warning(f"Codec {serializador} indisponível, usando json")
+            id_codec = _IDS_CODEC[CODEC_JSON]
+
+        id_compressao = _IDS_COMPRESSAO[compressao]
+        if id_compressao not in _COMPRESSORES:
+            logger.warning(f"Compressão {compressao} indisponível, usando zlib")
+            id_compressao = _IDS_COMPRESSAO[COMPRESSAO_ZLIB]
+
+        self.id_codec = id_codec
+        self.id_compressao = id_compressao
+        self.limite_compressao = limite_compressao
+        self.versionado = versionado
+
+    def codificar(self, valor: Any) -> bytes:
+        """Serializa o valor (com cabeçalho, se versionado)"""
+        if not self.versionado:
+            return _json_dumps(valor)
+
+        dados = _SERIALIZADORES[self.id_codec][0](valor)
+
+        id_compressao = 0
+        if self.id_compressao and len(dados) >= self.limite_compressao:
+            comprimido = _COMPRESSORES[self.id_compressao][0](dados)
+            if len(comprimido) < len(dados):
+                dados = comprimido
+                id_compressao = self.id_compressao
+
+        return bytes((VERSAO_FORMATO, self.id_codec, id_compressao)) + dados
+
+    @staticmethod
+    def decodificar(dados: Any) -> Any:
+        """
+        Deserializa um payload legado (JSON) ou versionado.
+
+        Raises:
+            ErroCodec: Cabeçalho desconhecido ou codec indisponível neste processo
+        """
+        if isinstance(dados, str):
+            return json.loads(dados)
+
+        if not dados or dados[0] >= 0x20:
+            # JSON legado
+            return json.loads(dados)
+
+        if dados[0] != VERSAO_FORMATO or len(dados) < 3:
+            raise ErroCodec(f"Versão de payload desconhecida: {dados[0]}")
+
+        id_codec, id_compressao = dados[1], dados[2]
+        try:
+            loads = _SERIALIZADORES[id_codec][1]
+            descomprimir = _COMPRESSORES[id_compressao][1]
+        except KeyError:
+            raise ErroCodec(f"Codec/compressão indisponível: {id_codec}/{id_compressao}")
+
+        return loads(descomprimir(dados[3:]))
+
+
+CODEC_LEGADO = CacheCodec(versionado=False)
+
+
+def criar_codec(
+    serializador: Optional[str],
+    compressao: str = COMPRESSAO_NENHUMA,
+    limite_compressao: int = 1024
+) -> CacheCodec:
+    """Cria codec; serializador None ou 'legado' = JSON sem cabeçalho"""
+    if serializador in (None, "", "legado"):
+        return CODEC_LEGADO
+    return CacheCodec(serializador, compressao, limite_compressao)
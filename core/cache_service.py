@@ -18,18 +18,48 @@ ESTRATÉGIA DE CACHE:
 - Estatísticas de usuário: 1 hora (dados dinâmicos)
 - Gabaritos: NUNCA (segurança)
 
+CACHE L1 (OPCIONAL, CACHE_L1_ENABLED=true):
+- LRU em memória por worker na frente do Redis (questões e rankings)
+- TTL curto por prefixo, tamanho limitado (CACHE_L1_MAX_ITEMS)
+- Invalidação entre workers via pub/sub (canal juris_ia:cache:invalidacao)
+
+SERIALIZAÇÃO (CACHE_CODEC_ENABLED=true):
+- Codec por prefixo (msgpack/orjson + zlib/lz4 acima de um limite de tamanho)
+- Payload marcado com byte de versão; JSON legado continua legível
+
+SINGLE-FLIGHT (obter_ou_calcular):
+- Em um miss, só quem obtém o lock curto no Redis recalcula
+- Os demais recebem a cópia stale (se houver) ou aguardam o novo valor
+- Refresh antecipado probabilístico (XFetch) evita expirações simultâneas
+
+INVALIDAÇÃO POR TAG:
+- Chaves agrupadas em sets de tag (ex: sessões de um usuário, rankings)
+- invalidar_tag custa O(chaves na tag), sem varrer o keyspace com SCAN
+
 ================================================================================
 """
 
 import os
 import json
+import math
+import time
+import random
+import uuid
+import fnmatch
+import inspect
 import logging
-from typing import Any, Optional, Dict, List
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Dict, Iterable, List, Tuple
 from datetime import timedelta
 from uuid import UUID
 import redis
 from redis.connection import ConnectionPool
 
+from core.cache_codecs import (
+    CacheCodec, CODEC_LEGADO, CODEC_MSGPACK, COMPRESSAO_LZ4, criar_codec
+)
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -37,6 +67,85 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Retorno de _recalcular_com_lock quando outro worker detém o lock
+_LOCK_OCUPADO = object()
+
+
+class CacheLocalLRU:
+    """
+    Cache L1 em memória do processo (LRU com TTL por prefixo).
+
+    Guarda o valor já deserializado, evitando round trip ao Redis e json.loads.
+    Os valores retornados são compartilhados: quem chama NÃO deve mutá-los.
+    """
+
+    def __init__(self, max_itens: int, ttls_por_prefixo: Dict[str, int]):
+        """
+        Args:
+            max_itens: Número máximo de chaves mantidas (LRU)
+            ttls_por_prefixo: TTL (segundos) por prefixo; prefixos ausentes não usam L1
+        """
+        self.max_itens = max_itens
+        self.ttls_por_prefixo = ttls_por_prefixo
+        self._itens: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def extrair_prefixo(chave: str) -> Optional[str]:
+        """Extrai o prefixo de uma chave 'juris_ia:<prefixo>:<id>'"""
+        partes = chave.split(":", 2)
+        return partes[1] if len(partes) >= 3 else None
+
+    def aceita(self, chave: str) -> bool:
+        """True se a chave pertence a um prefixo habilitado no L1"""
+        return self.extrair_prefixo(chave) in self.ttls_por_prefixo
+
+    def get(self, chave: str) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor)"""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return False, None
+
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return False, None
+
+            self._itens.move_to_end(chave)
+            return True, valor
+
+    def set(self, chave: str, valor: Any, ttl: Optional[int] = None) -> None:
+        ttl_l1 = self.ttls_por_prefixo.get(self.extrair_prefixo(chave))
+        if ttl_l1 is None:
+            return
+        if ttl:
+            ttl_l1 = min(ttl_l1, ttl)
+
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl_l1, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def delete(self, chave: str) -> None:
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def delete_pattern(self, pattern: str) -> int:
+        with self._lock:
+            chaves = [c for c in self._itens if fnmatch.fnmatchcase(c, pattern)]
+            for chave in chaves:
+                del self._itens[chave]
+            return len(chaves)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
 
 class CacheService:
     """
@@ -62,10 +171,47 @@ class CacheService:
     TTL_ESTATISTICAS = 3600  # 1 hora
     TTL_RANKING = 1800  # 30 minutos
 
+    # Cache L1 (em processo): apenas dados quase imutáveis, TTL curto por prefixo
+    TTLS_L1 = {
+        PREFIX_QUESTAO: 600,  # 10 minutos
+        PREFIX_RANKING: 30,  # 30 segundos
+    }
+    L1_MAX_ITENS = 5000
+
+    # Canal pub/sub para invalidar o L1 de todos os workers
+    CANAL_INVALIDACAO = "juris_ia:cache:invalidacao"
+
+    # Tags de invalidação
+    TAG_RANKINGS = "rankings"
+    TAG_SESSOES_USUARIO = "sessoes_usuario:{usuario_id}"
+
+    # Chaves removidas por comando DEL ao invalidar uma tag
+    LOTE_DELETE = 500
+
+    # Codec por prefixo (serializador, compressão); ausentes usam JSON legado
+    # (lz4 cai para zlib se não instalado)
+    CODECS_POR_PREFIXO = {
+        PREFIX_QUESTAO: (CODEC_MSGPACK, COMPRESSAO_LZ4),
+        PREFIX_SESSAO: (CODEC_MSGPACK, COMPRESSAO_LZ4),
+        PREFIX_RANKING: (CODEC_MSGPACK, COMPRESSAO_LZ4),
+    }
+    LIMITE_COMPRESSAO = 1024  # bytes
+
+    # Single-flight
+    SF_LOCK_TTL = 10  # segundos; limite para um recálculo
+    SF_ESPERA_MAXIMA = 3.0  # segundos aguardando o recálculo de outro worker
+    SF_INTERVALO_ESPERA = 0.05  # segundos entre verificações
+    SF_GRACA_STALE = 300  # segundos em que a cópia stale sobrevive ao TTL
+    SF_BETA = 1.0  # agressividade do refresh antecipado (XFetch)
+
     def __init__(
         self,
         redis_url: Optional[str] = None,
-        max_connections: int = 50
+        max_connections: int = 50,
+        l1_habilitado: Optional[bool] = None,
+        l1_max_itens: Optional[int] = None,
+        l1_ttls: Optional[Dict[str, int]] = None,
+        codecs_habilitados: Optional[bool] = None
     ):
         """
         Inicializa o serviço de cache.
@@ -73,6 +219,11 @@ class CacheService:
         Args:
             redis_url: URL do Redis (se None, usa variável de ambiente)
             max_connections: Número máximo de conexões no pool
+            l1_habilitado: Ativa o cache L1 em processo (default: CACHE_L1_ENABLED)
+            l1_max_itens: Tamanho máximo do L1 (default: CACHE_L1_MAX_ITEMS)
+            l1_ttls: TTL do L1 por prefixo (default: TTLS_L1)
+            codecs_habilitados: Grava no formato binário por prefixo
+                (default: CACHE_CODEC_ENABLED; a leitura aceita sempre os dois formatos)
         """
         self.redis_url = redis_url or os.getenv(
             "REDIS_URL",
@@ -89,6 +240,14 @@ class CacheService:
         # Cliente Redis
         self.redis_client = redis.Redis(connection_pool=self.pool)
 
+        # Cliente binário para os valores de cache (payloads dos codecs)
+        self.pool_binario = ConnectionPool.from_url(
+            self.redis_url,
+            max_connections=max_connections,
+            decode_responses=False
+        )
+        self.redis_binario = redis.Redis(connection_pool=self.pool_binario)
+
         # Testar conexão
         try:
             self.redis_client.ping()
@@ -97,6 +256,43 @@ class CacheService:
             logger.error(f"Erro ao conectar ao Redis: {e}")
             raise
 
+        self._script_adicionar_tag = self.redis_client.register_script(self.SCRIPT_ADICIONAR_TAG)
+
+        # Codecs por prefixo
+        if codecs_habilitados is None:
+            codecs_habilitados = os.getenv("CACHE_CODEC_ENABLED", "false").lower() == "true"
+
+        self.codecs: Dict[str, CacheCodec] = {}
+        if codecs_habilitados:
+            compressao_env = os.getenv("CACHE_CODEC_COMPRESSION")
+            limite = int(os.getenv("CACHE_CODEC_COMPRESS_MIN_BYTES", str(self.LIMITE_COMPRESSAO)))
+            for prefixo, (serializador, compressao) in self.CODECS_POR_PREFIXO.items():
+                self.codecs[prefixo] = criar_codec(
+                    serializador, compressao_env or compressao, limite
+                )
+
+        # Métricas por camada
+        self.metricas = {
+            "l1_hits": 0, "l1_misses": 0, "l2_hits": 0, "l2_misses": 0,
+            "sf_recalculos": 0, "sf_refresh_antecipado": 0,
+            "sf_stale_servido": 0, "sf_esperas": 0, "sf_timeouts": 0,
+        }
+
+        # Cache L1 (opcional)
+        if l1_habilitado is None:
+            l1_habilitado = os.getenv("CACHE_L1_ENABLED", "false").lower() == "true"
+
+        self.l1: Optional[CacheLocalLRU] = None
+        self._id_instancia = uuid.uuid4().hex
+        self._pubsub_thread = None
+
+        if l1_habilitado:
+            self.l1 = CacheLocalLRU(
+                max_itens=l1_max_itens or int(os.getenv("CACHE_L1_MAX_ITEMS", str(self.L1_MAX_ITENS))),
+                ttls_por_prefixo=l1_ttls if l1_ttls is not None else dict(self.TTLS_L1)
+            )
+            self._iniciar_assinatura_invalidacao()
+
 
     def _construir_chave(self, prefix: str, identificador: str) -> str:
         """
@@ -112,6 +308,66 @@ class CacheService:
         return f"juris_ia:{prefix}:{identificador}"
 
 
+    def _codec(self, chave: str) -> CacheCodec:
+        """Codec de escrita para a chave (pelo prefixo)"""
+        return self.codecs.get(CacheLocalLRU.extrair_prefixo(chave), CODEC_LEGADO)
+
+
+    # ============================================================================
+    # CACHE L1 - INVALIDAÇÃO ENTRE WORKERS
+    # ============================================================================
+
+    def _iniciar_assinatura_invalidacao(self) -> None:
+        """Assina o canal de invalidação em uma thread daemon"""
+        try:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.CANAL_INVALIDACAO: self._on_invalidacao})
+            self._pubsub_thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+            logger.info("Cache L1 habilitado (invalidação via pub/sub)")
+        except Exception as e:
+            # Sem pub/sub não há como manter os workers coerentes
+            logger.error(f"Erro ao assinar invalidação do L1, L1 desabilitado: {e}")
+            self.l1 = None
+
+    def _on_invalidacao(self, mensagem: Dict) -> None:
+        """Processa mensagem de invalidação publicada por outro worker"""
+        if self.l1 is None:
+            return
+        try:
+            dados = json.loads(mensagem["data"])
+            if dados.get("origem") == self._id_instancia:
+                return
+            self._aplicar_invalidacao(dados["tipo"], dados["valor"])
+        except Exception as e:
+            logger.error(f"Erro ao processar invalidação do L1: {e}")
+
+    def _aplicar_invalidacao(self, tipo: str, valor: Any) -> None:
+        if tipo == "padrao":
+            self.l1.delete_pattern(valor)
+        elif tipo == "tudo":
+            self.l1.clear()
+        elif tipo == "chaves":
+            for chave in valor:
+                self.l1.delete(chave)
+        else:
+            self.l1.delete(valor)
+
+    def _publicar_invalidacao(self, tipo: str, valor: Any = "") -> None:
+        """Remove do L1 local e avisa os demais workers"""
+        if self.l1 is None:
+            return
+
+        self._aplicar_invalidacao(tipo, valor)
+
+        try:
+            self.redis_client.publish(
+                self.CANAL_INVALIDACAO,
+                json.dumps({"tipo": tipo, "valor": valor, "origem": self._id_instancia})
+            )
+        except Exception as e:
+            logger.error(f"Erro ao publicar invalidação do L1: {e}")
+
+
     def get(self, chave: str) -> Optional[Any]:
         """
         Busca valor no cache.
@@ -122,17 +378,34 @@ class CacheService:
         Returns:
             Valor deserializado ou None se não encontrado
         """
+        usa_l1 = self.l1 is not None and self.l1.aceita(chave)
+
+        if usa_l1:
+            encontrado, valor_l1 = self.l1.get(chave)
+            if encontrado:
+                self.metricas["l1_hits"] += 1
+                logger.debug(f"Cache HIT (L1): {chave}")
+                return valor_l1
+            self.metricas["l1_misses"] += 1
+
         try:
-            valor = self.redis_client.get(chave)
+            valor = self.redis_binario.get(chave)
 
             if valor is None:
+                self.metricas["l2_misses"] += 1
                 logger.debug(f"Cache MISS: {chave}")
                 return None
 
+            self.metricas["l2_hits"] += 1
             logger.debug(f"Cache HIT: {chave}")
 
-            # Deserializar JSON
-            return json.loads(valor)
+            # Deserializar (JSON legado ou payload versionado)
+            resultado = CacheCodec.decodificar(valor)
+
+            if usa_l1:
+                self.l1.set(chave, resultado)
+
+            return resultado
 
         except Exception as e:
             logger.error(f"Erro ao buscar cache {chave}: {e}")
@@ -143,28 +416,40 @@ class CacheService:
         self,
         chave: str,
         valor: Any,
-        ttl: Optional[int] = None
+        ttl: Optional[int] = None,
+        tags: Optional[List[str]] = None
     ) -> bool:
         """
         Define valor no cache.
 
         Args:
             chave: Chave de cache
-            valor: Valor a ser armazenado (será serializado como JSON)
+            valor: Valor a ser armazenado (serializado pelo codec do prefixo)
             ttl: Time-to-live em segundos (None = sem expiração)
+            tags: Tags de invalidação da chave (ver invalidar_tag)
 
         Returns:
             True se salvou com sucesso
         """
         try:
-            # Serializar para JSON
-            valor_json = json.dumps(valor, default=str)
+            # Serializar
+            codec = self._codec(chave)
+            payload = codec.codificar(valor)
 
-            # Salvar no Redis
+            # Salvar no Redis (valor + tags em um único round trip)
+            pipe = self.redis_binario.pipeline(transaction=False)
             if ttl:
-                self.redis_client.setex(chave, ttl, valor_json)
+                pipe.setex(chave, ttl, payload)
             else:
-                self.redis_client.set(chave, valor_json)
+                pipe.set(chave, payload)
+            self._adicionar_tags(pipe, chave, tags, ttl)
+            pipe.execute()
+
+            # Outros workers podem ter a versão anterior no L1
+            if self.l1 is not None and self.l1.aceita(chave):
+                self._publicar_invalidacao("chave", chave)
+                # Guarda a forma serializada/deserializada, idêntica à lida do L2
+                self.l1.set(chave, codec.decodificar(payload), ttl)
 
             logger.debug(f"Cache SET: {chave} (TTL: {ttl}s)")
             return True
@@ -185,7 +470,8 @@ class CacheService:
             True se removeu com sucesso
         """
         try:
-            self.redis_client.delete(chave)
+            self.redis_client.delete(chave, *self._chaves_single_flight(chave))
+            self._publicar_invalidacao("chave", chave)
             logger.debug(f"Cache DELETE: {chave}")
             return True
 
@@ -198,6 +484,9 @@ class CacheService:
         """
         Remove múltiplas chaves por padrão.
 
+        ATENÇÃO: varre o keyspace inteiro com SCAN. Uso administrativo apenas;
+        no caminho da aplicação, prefira tags (invalidar_tag).
+
         Args:
             pattern: Padrão de chave (ex: "juris_ia:questao:*")
 
@@ -205,6 +494,8 @@ class CacheService:
             Número de chaves removidas
         """
         try:
+            self._publicar_invalidacao("padrao", pattern)
+
             chaves = list(self.redis_client.scan_iter(match=pattern))
 
             if chaves:
@@ -219,21 +510,401 @@ class CacheService:
             return 0
 
 
+    # ============================================================================
+    # TAGS DE INVALIDAÇÃO
+    # ============================================================================
+
+    def _chave_tag(self, tag: str) -> str:
+        return f"juris_ia:tag:{tag}"
+
+    # O set da tag precisa durar tanto quanto o membro mais longevo: o TTL
+    # só sobe (um membro sem TTL torna o set persistente)
+    SCRIPT_ADICIONAR_TAG = """
+        local existia = redis.call('EXISTS', KEYS[1])
+        redis.call('SADD', KEYS[1], ARGV[1])
+        local ttl = tonumber(ARGV[2])
+        if ttl <= 0 then
+            redis.call('PERSIST', KEYS[1])
+        elseif existia == 0 then
+            redis.call('EXPIRE', KEYS[1], ttl)
+        else
+            local atual = redis.call('TTL', KEYS[1])
+            if atual >= 0 and atual < ttl then
+                redis.call('EXPIRE', KEYS[1], ttl)
+            end
+        end
+    """
+
+    def _adicionar_tags(
+        self,
+        pipe,
+        chave: str,
+        tags: Optional[List[str]],
+        ttl: Optional[int]
+    ) -> None:
+        """
+        Registra a chave nos sets das tags (dentro do pipeline recebido).
+
+        O set da tag expira com o membro de maior TTL (ttl None = nunca);
+        membros cujas chaves já expiraram são inofensivos (DEL de chave
+        inexistente).
+        """
+        for tag in tags or []:
+            self._script_adicionar_tag(
+                keys=[self._chave_tag(tag)], args=[chave, ttl or 0], client=pipe
+            )
+
+    def invalidar_tag(self, tag: str) -> int:
+        """
+        Remove todas as chaves associadas a uma tag.
+
+        Custo O(chaves na tag): lê e apaga o set atomicamente (MULTI) e
+        remove as chaves em lotes, sem varrer o keyspace.
+
+        Args:
+            tag: Nome da tag
+
+        Returns:
+            Número de chaves removidas
+        """
+        chave_tag = self._chave_tag(tag)
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.smembers(chave_tag)
+            pipe.delete(chave_tag)
+            membros, _ = pipe.execute()
+
+            if not membros:
+                return 0
+
+            chaves = list(membros)
+            self._publicar_invalidacao("chaves", chaves)
+
+            removidas = 0
+            for i in range(0, len(chaves), self.LOTE_DELETE):
+                removidas += self.redis_client.delete(*chaves[i:i + self.LOTE_DELETE])
+
+            logger.info(f"Cache INVALIDAR TAG: {tag} ({removidas} chaves)")
+            return removidas
+
+        except Exception as e:
+            logger.error(f"Erro ao invalidar tag {tag}: {e}")
+            return 0
+
+
+    # ============================================================================
+    # OPERAÇÕES EM LOTE
+    # ============================================================================
+
+    def get_many(self, chaves: Iterable[str]) -> Dict[str, Any]:
+        """
+        Busca várias chaves com um único round trip (MGET).
+
+        Chaves presentes no L1 não vão ao Redis.
+
+        Args:
+            chaves: Chaves de cache
+
+        Returns:
+            Dict {chave: valor} apenas com as chaves encontradas
+        """
+        resultado: Dict[str, Any] = {}
+        pendentes: List[str] = []
+
+        for chave in dict.fromkeys(chaves):
+            if self.l1 is not None and self.l1.aceita(chave):
+                encontrado, valor_l1 = self.l1.get(chave)
+                if encontrado:
+                    self.metricas["l1_hits"] += 1
+                    resultado[chave] = valor_l1
+                    continue
+                self.metricas["l1_misses"] += 1
+            pendentes.append(chave)
+
+        if not pendentes:
+            return resultado
+
+        try:
+            valores = self.redis_binario.mget(pendentes)
+        except Exception as e:
+            logger.error(f"Erro ao buscar cache em lote ({len(pendentes)} chaves): {e}")
+            return resultado
+
+        for chave, valor in zip(pendentes, valores):
+            if valor is None:
+                self.metricas["l2_misses"] += 1
+                continue
+
+            try:
+                resultado[chave] = CacheCodec.decodificar(valor)
+            except Exception as e:
+                # Corrompido, codec ausente neste processo ou erro de descompressão
+                self.metricas["l2_misses"] += 1
+                logger.error(f"Erro ao deserializar cache {chave}: {e}")
+                continue
+            self.metricas["l2_hits"] += 1
+
+            if self.l1 is not None and self.l1.aceita(chave):
+                self.l1.set(chave, resultado[chave])
+
+        logger.debug(f"Cache MGET: {len(resultado)}/{len(pendentes)} hits no Redis")
+        return resultado
+
+
+    def set_many(
+        self,
+        itens: Dict[str, Any],
+        ttl: Optional[int] = None,
+        ttls: Optional[Dict[str, int]] = None,
+        tags: Optional[List[str]] = None
+    ) -> bool:
+        """
+        Define várias chaves com um único round trip (pipeline).
+
+        Args:
+            itens: Dict {chave: valor}
+            ttl: TTL padrão em segundos (None = sem expiração)
+            ttls: TTL por chave, sobrepõe o padrão
+            tags: Tags de invalidação aplicadas a todas as chaves
+
+        Returns:
+            True se salvou com sucesso
+        """
+        if not itens:
+            return True
+
+        ttls = ttls or {}
+
+        try:
+            serializados = {
+                chave: self._codec(chave).codificar(valor) for chave, valor in itens.items()
+            }
+
+            pipe = self.redis_binario.pipeline(transaction=False)
+            for chave, payload in serializados.items():
+                ttl_chave = ttls.get(chave, ttl)
+                if ttl_chave:
+                    pipe.setex(chave, ttl_chave, payload)
+                else:
+                    pipe.set(chave, payload)
+                self._adicionar_tags(pipe, chave, tags, ttl_chave)
+            pipe.execute()
+
+            if self.l1 is not None:
+                chaves_l1 = [c for c in serializados if self.l1.aceita(c)]
+                if chaves_l1:
+                    self._publicar_invalidacao("chaves", chaves_l1)
+                    for chave in chaves_l1:
+                        self.l1.set(
+                            chave, CacheCodec.decodificar(serializados[chave]), ttls.get(chave, ttl)
+                        )
+
+            logger.debug(f"Cache SET em lote: {len(serializados)} chaves")
+            return True
+
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache em lote ({len(itens)} chaves): {e}")
+            return False
+
+
+    # ============================================================================
+    # SINGLE-FLIGHT E REFRESH ANTECIPADO
+    # ============================================================================
+
+    @staticmethod
+    def _chaves_single_flight(chave: str) -> Tuple[str, str]:
+        """Chaves auxiliares: (cópia stale, tempo de recálculo em ms)"""
+        return f"{chave}:__stale", f"{chave}:__delta"
+
+    def obter_ou_calcular(
+        self,
+        chave: str,
+        calcular: Callable[[], Any],
+        ttl: int,
+        tags: Optional[List[str]] = None,
+        cacheavel: Optional[Callable[[Any], bool]] = None,
+        beta: Optional[float] = None
+    ) -> Any:
+        """
+        Busca no cache; em caso de miss, recalcula com single-flight.
+
+        - Hit: retorna o valor; com probabilidade crescente perto do TTL
+          (XFetch: -delta * beta * ln(U) >= ttl restante) um único worker
+          recalcula antes da expiração
+        - Miss: quem obtém o lock recalcula e grava; os demais recebem a
+          cópia stale (mantida SF_GRACA_STALE além do TTL) ou aguardam até
+          SF_ESPERA_MAXIMA e, no limite, calculam por conta própria
+
+        Args:
+            chave: Chave de cache
+            calcular: Função que produz o valor (ex: query no banco)
+            ttl: TTL em segundos
+            tags: Tags de invalidação
+            cacheavel: Predicado; valores reprovados são retornados sem cachear
+            beta: Agressividade do refresh antecipado (default SF_BETA; 0 desliga)
+
+        Returns:
+            Valor do cache ou recém-calculado
+        """
+        beta = self.SF_BETA if beta is None else beta
+        chave_stale, chave_delta = self._chaves_single_flight(chave)
+
+        # L1: TTL curto, sem coordenação
+        if self.l1 is not None and self.l1.aceita(chave):
+            encontrado, valor_l1 = self.l1.get(chave)
+            if encontrado:
+                self.metricas["l1_hits"] += 1
+                return valor_l1
+            self.metricas["l1_misses"] += 1
+
+        try:
+            pipe = self.redis_binario.pipeline(transaction=False)
+            pipe.get(chave)
+            pipe.pttl(chave)
+            pipe.get(chave_delta)
+            payload, pttl, delta_ms = pipe.execute()
+        except Exception as e:
+            logger.error(f"Erro ao buscar cache {chave}: {e}")
+            return calcular()
+
+        if payload is not None:
+            try:
+                valor = CacheCodec.decodificar(payload)
+            except Exception as e:
+                # Payload ilegível (corrompido, codec ausente, erro de
+                # descompressão): vale como miss e sai do Redis
+                logger.error(f"Erro ao deserializar cache {chave}, recalculando: {e}")
+                payload = None
+                try:
+                    self.redis_binario.delete(chave)
+                except Exception:
+                    pass
+
+        if payload is not None:
+            self.metricas["l2_hits"] += 1
+
+            delta = int(delta_ms) / 1000 if delta_ms else 0.0
+            restante = pttl / 1000 if pttl and pttl > 0 else float("inf")
+            if beta > 0 and delta > 0 and -delta * beta * math.log(1.0 - random.random()) >= restante:
+                # Refresh antecipado: só um worker; os demais seguem com o valor atual
+                novo = self._recalcular_com_lock(chave, calcular, ttl, tags, cacheavel)
+                if novo is not _LOCK_OCUPADO:
+                    self.metricas["sf_refresh_antecipado"] += 1
+                    return novo
+
+            if self.l1 is not None and self.l1.aceita(chave):
+                self.l1.set(chave, valor)
+            return valor
+
+        self.metricas["l2_misses"] += 1
+
+        novo = self._recalcular_com_lock(chave, calcular, ttl, tags, cacheavel)
+        if novo is not _LOCK_OCUPADO:
+            return novo
+
+        # Outro worker está recalculando: stale ou espera
+        try:
+            stale = self.redis_binario.get(chave_stale)
+            if stale is not None:
+                self.metricas["sf_stale_servido"] += 1
+                return CacheCodec.decodificar(stale)
+
+            self.metricas["sf_esperas"] += 1
+            limite = time.monotonic() + self.SF_ESPERA_MAXIMA
+            while time.monotonic() < limite:
+                time.sleep(self.SF_INTERVALO_ESPERA)
+                payload = self.redis_binario.get(chave)
+                if payload is not None:
+                    return CacheCodec.decodificar(payload)
+        except Exception as e:
+            logger.error(f"Erro aguardando recálculo de {chave}: {e}")
+
+        self.metricas["sf_timeouts"] += 1
+        logger.warning(f"Single-flight: timeout aguardando {chave}, calculando localmente")
+        return calcular()
+
+    def _recalcular_com_lock(
+        self,
+        chave: str,
+        calcular: Callable[[], Any],
+        ttl: int,
+        tags: Optional[List[str]],
+        cacheavel: Optional[Callable[[Any], bool]]
+    ) -> Any:
+        """
+        Recalcula e grava se obtiver o lock da chave.
+
+        Returns:
+            Valor calculado, ou _LOCK_OCUPADO se outro worker detém o lock
+        """
+        lock = self.redis_client.lock(
+            f"juris_ia:lock:{chave}", timeout=self.SF_LOCK_TTL, blocking=False
+        )
+        try:
+            if not lock.acquire():
+                return _LOCK_OCUPADO
+        except Exception as e:
+            logger.error(f"Erro ao obter lock de {chave}: {e}")
+            return calcular()
+
+        try:
+            inicio = time.perf_counter()
+            valor = calcular()
+            delta_ms = max(1, int((time.perf_counter() - inicio) * 1000))
+            self.metricas["sf_recalculos"] += 1
+
+            if valor is None or (cacheavel is not None and not cacheavel(valor)):
+                return valor
+
+            self.set(chave, valor, ttl, tags=tags)
+
+            chave_stale, chave_delta = self._chaves_single_flight(chave)
+            pipe = self.redis_binario.pipeline(transaction=False)
+            pipe.setex(chave_stale, ttl + self.SF_GRACA_STALE, self._codec(chave).codificar(valor))
+            pipe.setex(chave_delta, ttl + self.SF_GRACA_STALE, delta_ms)
+            for chave_aux in (chave_stale, chave_delta):
+                self._adicionar_tags(pipe, chave_aux, tags, ttl + self.SF_GRACA_STALE)
+            pipe.execute()
+
+            return valor
+
+        finally:
+            try:
+                lock.release()
+            except redis.exceptions.LockError:
+                # Lock expirou durante o recálculo (SF_LOCK_TTL curto demais)
+                logger.warning(f"Lock de {chave} expirou antes do fim do recálculo")
+            except Exception as e:
+                # O lock expira sozinho em SF_LOCK_TTL
+                logger.error(f"Erro ao liberar lock de {chave}: {e}")
+
+
     # ============================================================================
     # CACHE DE QUESTÕES
     # ============================================================================
 
-    def get_questao(self, questao_id: UUID) -> Optional[Dict]:
+    def get_questao(
+        self,
+        questao_id: UUID,
+        calcular: Optional[Callable[[], Optional[Dict]]] = None
+    ) -> Optional[Dict]:
         """
         Busca questão no cache.
 
         Args:
             questao_id: ID da questão
+            calcular: Se informado, carrega a questão em caso de miss com
+                single-flight (ver obter_ou_calcular)
 
         Returns:
             Dict com dados da questão ou None
         """
         chave = self._construir_chave(self.PREFIX_QUESTAO, str(questao_id))
+        if calcular is not None:
+            return self.obter_ou_calcular(
+                chave, calcular, self.TTL_QUESTAO, cacheavel=self._questao_sem_gabarito
+            )
         return self.get(chave)
 
 
@@ -251,15 +922,61 @@ class CacheService:
             True se salvou com sucesso
         """
         # Garantir que gabarito não está incluído
+        if not self._questao_sem_gabarito(dados):
+            return False
+
+        chave = self._construir_chave(self.PREFIX_QUESTAO, str(questao_id))
+        return self.set(chave, dados, self.TTL_QUESTAO)
+
+
+    @staticmethod
+    def _questao_sem_gabarito(dados: Dict) -> bool:
+        """False (e log) se os dados da questão incluem o gabarito"""
         if "alternativa_correta" in dados or "gabarito" in dados:
             logger.warning(
-                f"Tentativa de cachear questão {questao_id} com gabarito. "
+                f"Tentativa de cachear questão {dados.get('id')} com gabarito. "
                 "BLOQUEADO por segurança."
             )
             return False
+        return True
 
-        chave = self._construir_chave(self.PREFIX_QUESTAO, str(questao_id))
-        return self.set(chave, dados, self.TTL_QUESTAO)
+
+    def get_questoes(self, questoes_ids: Iterable[UUID]) -> Dict[str, Dict]:
+        """
+        Busca várias questões no cache com um único round trip.
+
+        Args:
+            questoes_ids: IDs das questões
+
+        Returns:
+            Dict {questao_id (str): dados} apenas com as questões encontradas
+        """
+        ids = [str(qid) for qid in questoes_ids]
+        chaves = {self._construir_chave(self.PREFIX_QUESTAO, qid): qid for qid in ids}
+
+        encontrados = self.get_many(chaves)
+        return {chaves[chave]: dados for chave, dados in encontrados.items()}
+
+
+    def set_questoes(self, questoes: Dict[UUID, Dict]) -> bool:
+        """
+        Salva várias questões no cache com um único round trip.
+
+        IMPORTANTE: Dados NÃO devem incluir gabarito (segurança).
+
+        Args:
+            questoes: Dict {questao_id: dados sem gabarito}
+
+        Returns:
+            True se salvou com sucesso
+        """
+        itens = {}
+        for questao_id, dados in questoes.items():
+            if not self._questao_sem_gabarito(dados):
+                return False
+            itens[self._construir_chave(self.PREFIX_QUESTAO, str(questao_id))] = dados
+
+        return self.set_many(itens, self.TTL_QUESTAO)
 
 
     def invalidar_questao(self, questao_id: UUID) -> bool:
@@ -294,19 +1011,30 @@ class CacheService:
         return self.get(chave)
 
 
-    def set_sessao(self, sessao_id: UUID, dados: Dict) -> bool:
+    def set_sessao(
+        self,
+        sessao_id: UUID,
+        dados: Dict,
+        usuario_id: Optional[UUID] = None
+    ) -> bool:
         """
         Salva sessão no cache.
 
         Args:
             sessao_id: ID da sessão
             dados: Dict com dados da sessão
+            usuario_id: Dono da sessão (default: dados["user_id"] ou dados["usuario_id"]);
+                permite invalidar_sessoes_usuario
 
         Returns:
             True se salvou com sucesso
         """
         chave = self._construir_chave(self.PREFIX_SESSAO, str(sessao_id))
-        return self.set(chave, dados, self.TTL_SESSAO)
+
+        usuario_id = usuario_id or dados.get("user_id") or dados.get("usuario_id")
+        tags = [self.TAG_SESSOES_USUARIO.format(usuario_id=usuario_id)] if usuario_id else None
+
+        return self.set(chave, dados, self.TTL_SESSAO, tags=tags)
 
 
     def invalidar_sessao(self, sessao_id: UUID) -> bool:
@@ -333,20 +1061,24 @@ class CacheService:
         Returns:
             Número de sessões invalidadas
         """
-        pattern = self._construir_chave(self.PREFIX_SESSAO, f"*:usuario:{usuario_id}:*")
-        return self.delete_pattern(pattern)
+        return self.invalidar_tag(self.TAG_SESSOES_USUARIO.format(usuario_id=usuario_id))
 
 
     # ============================================================================
     # CACHE DE ESTATÍSTICAS DE USUÁRIO
     # ============================================================================
 
-    def get_estatisticas_usuario(self, usuario_id: UUID) -> Optional[Dict]:
+    def get_estatisticas_usuario(
+        self,
+        usuario_id: UUID,
+        calcular: Optional[Callable[[], Optional[Dict]]] = None
+    ) -> Optional[Dict]:
         """
         Busca estatísticas de usuário no cache.
 
         Args:
             usuario_id: ID do usuário
+            calcular: Se informado, calcula em caso de miss com single-flight
 
         Returns:
             Dict com estatísticas ou None
@@ -355,6 +1087,8 @@ class CacheService:
             self.PREFIX_ESTATISTICAS,
             f"usuario:{usuario_id}"
         )
+        if calcular is not None:
+            return self.obter_ou_calcular(chave, calcular, self.TTL_ESTATISTICAS)
         return self.get(chave)
 
 
@@ -397,17 +1131,26 @@ class CacheService:
     # CACHE DE RANKINGS
     # ============================================================================
 
-    def get_ranking(self, tipo: str = "geral") -> Optional[List[Dict]]:
+    def get_ranking(
+        self,
+        tipo: str = "geral",
+        calcular: Optional[Callable[[], Optional[List[Dict]]]] = None
+    ) -> Optional[List[Dict]]:
         """
         Busca ranking no cache.
 
         Args:
             tipo: Tipo de ranking (geral, semanal, disciplina_X)
+            calcular: Se informado, calcula em caso de miss com single-flight
 
         Returns:
             Lista de usuários no ranking ou None
         """
         chave = self._construir_chave(self.PREFIX_RANKING, tipo)
+        if calcular is not None:
+            return self.obter_ou_calcular(
+                chave, calcular, self.TTL_RANKING, tags=[self.TAG_RANKINGS]
+            )
         return self.get(chave)
 
 
@@ -423,7 +1166,7 @@ class CacheService:
             True se salvou com sucesso
         """
         chave = self._construir_chave(self.PREFIX_RANKING, tipo)
-        return self.set(chave, dados, self.TTL_RANKING)
+        return self.set(chave, dados, self.TTL_RANKING, tags=[self.TAG_RANKINGS])
 
 
     def invalidar_todos_rankings(self) -> int:
@@ -433,8 +1176,7 @@ class CacheService:
         Returns:
             Número de rankings invalidados
         """
-        pattern = self._construir_chave(self.PREFIX_RANKING, "*")
-        return self.delete_pattern(pattern)
+        return self.invalidar_tag(self.TAG_RANKINGS)
 
 
     # ============================================================================
@@ -532,6 +1274,7 @@ class CacheService:
         """
         try:
             self.redis_client.flushdb()
+            self._publicar_invalidacao("tudo")
             logger.warning("Cache totalmente limpo (FLUSH ALL)")
             return True
 
@@ -557,7 +1300,30 @@ class CacheService:
                 "conexoes_ativas": info.get("connected_clients"),
                 "memoria_usada_mb": info.get("used_memory") / (1024 * 1024),
                 "total_chaves": self.redis_client.dbsize(),
-                "hit_rate": self._calcular_hit_rate(info)
+                "hit_rate": self._calcular_hit_rate(info),
+                "l1": {
+                    "habilitado": self.l1 is not None,
+                    "itens": len(self.l1) if self.l1 is not None else 0,
+                    "hits": self.metricas["l1_hits"],
+                    "misses": self.metricas["l1_misses"],
+                    "hit_rate": self._calcular_taxa(
+                        self.metricas["l1_hits"], self.metricas["l1_misses"]
+                    ),
+                },
+                "l2": {
+                    "hits": self.metricas["l2_hits"],
+                    "misses": self.metricas["l2_misses"],
+                    "hit_rate": self._calcular_taxa(
+                        self.metricas["l2_hits"], self.metricas["l2_misses"]
+                    ),
+                },
+                "single_flight": {
+                    "recalculos": self.metricas["sf_recalculos"],
+                    "refresh_antecipado": self.metricas["sf_refresh_antecipado"],
+                    "stale_servido": self.metricas["sf_stale_servido"],
+                    "esperas": self.metricas["sf_esperas"],
+                    "timeouts": self.metricas["sf_timeouts"],
+                },
             }
 
         except Exception as e:
@@ -575,9 +1341,20 @@ class CacheService:
         Returns:
             Taxa de acerto (0.0 a 1.0)
         """
-        hits = info.get("keyspace_hits", 0)
-        misses = info.get("keyspace_misses", 0)
+        return self._calcular_taxa(
+            info.get("keyspace_hits", 0),
+            info.get("keyspace_misses", 0)
+        )
+
 
+    @staticmethod
+    def _calcular_taxa(hits: int, misses: int) -> float:
+        """
+        Calcula hits / (hits + misses).
+
+        Returns:
+            Taxa de acerto (0.0 a 1.0)
+        """
         total = hits + misses
 
         if total == 0:
@@ -609,6 +1386,31 @@ class CacheService:
             return False
 
 
+# ================================================================================
+# INSTÂNCIA COMPARTILHADA
+# ================================================================================
+
+_cache_service: Optional[CacheService] = None
+_cache_service_lock = threading.Lock()
+
+
+def obter_cache_service() -> CacheService:
+    """
+    Retorna o CacheService do processo (criado no primeiro uso).
+
+    Compartilhar a instância mantém um único pool de conexões e um único L1
+    por worker.
+    """
+    global _cache_service
+
+    if _cache_service is None:
+        with _cache_service_lock:
+            if _cache_service is None:
+                _cache_service = CacheService()
+
+    return _cache_service
+
+
 # ================================================================================
 # DECORADOR PARA CACHE AUTOMÁTICO
 # ================================================================================
@@ -616,7 +1418,9 @@ class CacheService:
 def cached(
     prefix: str,
     ttl: int,
-    key_builder=None
+    key_builder=None,
+    batch_arg: Optional[str] = None,
+    single_flight: bool = False
 ):
     """
     Decorador para cachear automaticamente resultado de função.
@@ -625,14 +1429,31 @@ def cached(
         prefix: Prefixo da chave de cache
         ttl: TTL em segundos
         key_builder: Função para construir chave (default: usa argumentos da função)
+        batch_arg: Nome de um argumento do tipo lista para resolver em lote.
+            A função recebe apenas os itens ausentes do cache e deve retornar
+            um dict {item: resultado}; cada item é cacheado em sua própria chave
+            e todos são lidos com um único MGET. O dict retornado segue a
+            ordem da lista recebida. Com batch_arg, key_builder recebe
+            (item, *args, **kwargs) e constrói a chave de um item.
+        single_flight: Em caso de miss, só um worker executa a função
+            (lock no Redis) e os demais recebem a cópia stale ou aguardam;
+            inclui refresh antecipado probabilístico (ver obter_ou_calcular)
 
     Exemplo:
         @cached(prefix="usuario", ttl=3600)
         def buscar_usuario(usuario_id):
             # ... query no banco ...
             return usuario
+
+        @cached(prefix="questao", ttl=86400, batch_arg="questoes_ids")
+        def buscar_questoes(questoes_ids):
+            # ... query no banco só para os IDs ausentes ...
+            return {questao.id: questao_para_dict(questao) for questao in questoes}
     """
     def decorator(func):
+        if batch_arg is not None:
+            return _cached_em_lote(func, prefix, ttl, key_builder, batch_arg)
+
         def wrapper(*args, **kwargs):
             # Construir chave de cache
             if key_builder:
@@ -644,7 +1465,11 @@ def cached(
                 chave = f"juris_ia:{prefix}:{chave_args}:{chave_kwargs}"
 
             # Tentar cache
-            cache = CacheService()
+            cache = obter_cache_service()
+
+            if single_flight:
+                return cache.obter_ou_calcular(chave, lambda: func(*args, **kwargs), ttl)
+
             resultado = cache.get(chave)
 
             if resultado is not None:
@@ -662,3 +1487,59 @@ def cached(
 
         return wrapper
     return decorator
+
+
+def _cached_em_lote(func, prefix: str, ttl: int, key_builder, batch_arg: str):
+    """Wrapper do @cached para funções que recebem uma lista (batch_arg)"""
+    assinatura = inspect.signature(func)
+
+    def wrapper(*args, **kwargs):
+        argumentos = assinatura.bind(*args, **kwargs)
+        argumentos.apply_defaults()
+        itens = list(argumentos.arguments[batch_arg])
+
+        # Demais argumentos compõem o namespace da chave de cada item
+        if key_builder:
+            chaves = {key_builder(item, *args, **kwargs): item for item in itens}
+        else:
+            contexto = ":".join(
+                f"{nome}={valor}"
+                for nome, valor in argumentos.arguments.items()
+                if nome != batch_arg
+            )
+            chaves = {f"juris_ia:{prefix}:{contexto}:{item}": item for item in itens}
+
+        cache = obter_cache_service()
+        encontrados = cache.get_many(chaves)
+
+        ausentes = [item for chave, item in chaves.items() if chave not in encontrados]
+        logger.debug(
+            f"Cache em lote (decorator): {func.__name__} "
+            f"{len(encontrados)} hits, {len(ausentes)} misses"
+        )
+
+        calculados = {}
+        if ausentes:
+            argumentos.arguments[batch_arg] = ausentes
+            calculados = func(*argumentos.args, **argumentos.kwargs) or {}
+
+            chave_por_item = {item: chave for chave, item in chaves.items()}
+            cache.set_many(
+                {
+                    chave_por_item[item]: valor
+                    for item, valor in calculados.items()
+                    if item in chave_por_item and valor is not None
+                },
+                ttl
+            )
+
+        # Mesma ordem da lista recebida (hits e itens calculados intercalados)
+        resultado = {}
+        for chave, item in chaves.items():
+            if chave in encontrados:
+                resultado[item] = encontrados[chave]
+            elif item in calculados:
+                resultado[item] = calculados[item]
+        return resultado
+
+    return wrapper
@@ -0,0 +1,146 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Cache Persistente de Embeddings
+================================================================================
+Objetivo: Pagar embedding só por texto novo (re-execuções, troca de modelo,
+          importação de bancos com questões duplicadas)
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+CHAVE:
+    (modelo, dimensões, sha256(texto normalizado))
+
+Normalização: Unicode NFC + espaços colapsados. Variações que só diferem em
+quebras de linha/espaçamento compartilham o mesmo vetor.
+
+Tabela: cache_embedding (migration 018), vetor em real[] (não exige
+pgvector). Falhas no cache nunca impedem a geração: o texto é tratado como
+miss e segue para o provedor.
+
+================================================================================
+"""
+
+import hashlib
+import logging
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_texto(texto: str) -> str:
+    """NFC + espaços colapsados"""
+    return " ".join(unicodedata.normalize("NFC", texto).split())
+
+
+def hash_texto(texto: str) -> str:
+    """SHA-256 (hex) do texto normalizado"""
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+class CacheEmbeddings:
+    """Read-through de embeddings sobre a tabela cache_embedding"""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, modelo: str, dimensoes: int, hashes: Sequence[str]) -> Dict[str, List[float]]:
+        """Busca os vetores em cache (hash -> vetor)"""
+        if not hashes:
+            return {}
+
+        with self.engine.connect() as conn:
+            linhas = conn.execute(
+                text("""
+                    SELECT hash_texto, embedding
+                    FROM cache_embedding
+                    WHERE modelo = :modelo
+                      AND dimensoes = :dimensoes
+                      AND hash_texto = ANY(:hashes)
+                """),
+                {"modelo": modelo, "dimensoes": dimensoes, "hashes": list(hashes)}
+            ).fetchall()
+
+        return {hash_: list(vetor) for hash_, vetor in linhas}
+
+    def gravar(self, modelo: str, dimensoes: int, vetores: Dict[str, List[float]]) -> None:
+        """Grava vetores novos (1 INSERT por chamada; conflitos são ignorados)"""
+        if not vetores:
+            return
+
+        valores = []
+        params = {"modelo": modelo, "dimensoes": dimensoes}
+        for i, (hash_, vetor) in enumerate(vetores.items()):
+            valores.append(f"(:modelo, :dimensoes, :hash{i}, :emb{i})")
+            params[f"hash{i}"] = hash_
+            params[f"emb{i}"] = [float(x) for x in vetor]
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(f"""
+                    INSERT INTO cache_embedding (modelo, dimensoes, hash_texto, embedding)
+                    VALUES {", ".join(valores)}
+                    ON CONFLICT (modelo, dimensoes, hash_texto) DO NOTHING
+                """),
+                params
+            )
+
+    def ler_atraves(
+        self,
+        modelo: str,
+        dimensoes: int,
+        textos: List[str],
+        gerar: Callable[[List[str]], List[List[float]]]
+    ) -> List[List[float]]:
+        """
+        Retorna os vetores dos textos, gerando apenas os ausentes do cache.
+
+        Textos repetidos no mesmo lote geram uma única chamada.
+
+        Args:
+            modelo: Nome do modelo
+            dimensoes: Dimensões do vetor
+            textos: Textos a embeddar
+            gerar: Função do provedor (textos -> vetores, mesma ordem)
+
+        Returns:
+            Vetores na ordem de `textos`
+        """
+        hashes = [hash_texto(t) for t in textos]
+
+        try:
+            encontrados = self.obter(modelo, dimensoes, set(hashes))
+        except Exception as e:
+            logger.warning(f"Cache de embeddings indisponível na leitura: {e}")
+            encontrados = {}
+
+        pendentes: Dict[str, str] = {}
+        for hash_, texto in zip(hashes, textos):
+            if hash_ not in encontrados:
+                pendentes.setdefault(hash_, texto)
+
+        with self._lock:
+            self.acertos += len(textos) - sum(1 for h in hashes if h in pendentes)
+            self.faltas += len(pendentes)
+
+        if pendentes:
+            novos = dict(zip(pendentes, gerar(list(pendentes.values()))))
+            try:
+                self.gravar(modelo, dimensoes, novos)
+            except Exception as e:
+                logger.warning(f"Cache de embeddings indisponível na escrita: {e}")
+            encontrados.update(novos)
+
+        return [encontrados[h] for h in hashes]
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"acertos": self.acertos, "faltas": self.faltas}
@@ -0,0 +1,404 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Pipeline de Backfill de Embeddings
+================================================================================
+Objetivo: Gerar embeddings do banco inteiro em minutos (não horas), com
+          retomada a partir de checkpoint
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ETAPAS:
+1. Leitura: cursor server-side (stream_results) sobre questao_oab ordenado
+   por id, numa conexão dedicada
+2. Embedding: até `concorrencia` lotes em voo (OpenAI: 1 request com N
+   inputs por lote; Ollama: chamadas em paralelo entre lotes)
+3. Escrita: 1 UPDATE ... FROM (VALUES ...) por lote + commit, em outra conexão
+4. Checkpoint: último id gravado (lotes são gravados em ordem), em JSON
+
+O checkpoint só avança depois do commit do lote; retomar a partir dele nunca
+pula questões não gravadas. Falha de uma questão isolada vira erro no
+resultado; falha do lote inteiro (provedor fora, banco) interrompe a execução.
+Ao terminar sem limite e sem interrupção, o arquivo é removido.
+
+================================================================================
+"""
+
+import os
+import json
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+if TYPE_CHECKING:
+    from core.local_vector_index import IndiceVetorialLocal
+
+logger = logging.getLogger(__name__)
+
+
+# (id, enunciado, alternativas[, numero_questao, disciplina, assunto, dificuldade])
+LinhaQuestao = Tuple[Any, ...]
+
+COLUNAS_METADADOS = ("numero_questao", "disciplina", "assunto", "dificuldade")
+
+
+class CheckpointEmbeddings:
+    """Checkpoint em arquivo JSON (escrita atômica)"""
+
+    def __init__(self, caminho: str, modelo: str):
+        self.caminho = caminho
+        self.modelo = modelo
+        self.dados: Dict[str, Any] = {"modelo": modelo, "ultimo_id": None, "processadas": 0, "falhas": []}
+
+        if os.path.exists(caminho):
+            with open(caminho) as f:
+                salvo = json.load(f)
+            if salvo.get("modelo") == modelo:
+                self.dados = salvo
+                logger.info(
+                    f"Retomando do checkpoint {caminho}: "
+                    f"{salvo.get('processadas', 0)} questões, último id {salvo.get('ultimo_id')}"
+                )
+            else:
+                logger.warning(
+                    f"Checkpoint {caminho} é do modelo {salvo.get('modelo')}, ignorando"
+                )
+
+    @property
+    def ultimo_id(self) -> Optional[str]:
+        return self.dados.get("ultimo_id")
+
+    def avancar(self, ultimo_id: Any, processadas: int, falhas: List[str]) -> None:
+        self.dados["ultimo_id"] = str(ultimo_id)
+        self.dados["processadas"] = self.dados.get("processadas", 0) + processadas
+        # Mantém só as últimas falhas (o log completo fica no resultado)
+        self.dados["falhas"] = (self.dados.get("falhas", []) + falhas)[-1000:]
+        self.dados["atualizado_em"] = datetime.now().isoformat()
+
+        temporario = f"{self.caminho}.tmp"
+        with open(temporario, "w") as f:
+            json.dump(self.dados, f)
+        os.replace(temporario, self.caminho)
+
+    def remover(self) -> None:
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+class PipelineEmbeddings:
+    """
+    Backfill de embeddings de questao_oab.
+
+    Independente do provedor: recebe a função de lote do serviço
+    (EmbeddingService / EmbeddingServiceOllama).
+    """
+
+    INTERVALO_RELATORIO = 10.0  # segundos entre logs de throughput
+    TENTATIVAS_LOTE = 3
+
+    def __init__(
+        self,
+        engine: Engine,
+        gerar_lote: Callable[[List[str]], List[List[float]]],
+        construir_texto: Callable[[str, Dict[str, str]], str],
+        modelo: str,
+        dimensoes: int,
+        tamanho_lote: int = 100,
+        concorrencia: int = 4,
+        checkpoint: Optional[str] = None,
+        indice_local: Optional["IndiceVetorialLocal"] = None,
+        gravar_banco: bool = True
+    ):
+        """
+        Args:
+            engine: Engine do banco (usa 2 conexões: leitura e escrita)
+            gerar_lote: textos -> vetores, na mesma ordem
+            construir_texto: (enunciado, alternativas) -> texto do embedding
+            modelo: Nome do modelo (valida o checkpoint)
+            dimensoes: Dimensões do vetor (cast na escrita)
+            tamanho_lote: Questões por lote (= inputs por request na OpenAI)
+            concorrencia: Lotes em voo simultaneamente
+            checkpoint: Caminho do arquivo de checkpoint (None = sem retomada)
+            indice_local: Também grava no índice vetorial local (NumPy)
+            gravar_banco: Grava em questao_oab.embedding (False sem pgvector)
+
+        Raises:
+            ValueError: Nenhum destino para os vetores (sem pgvector e sem
+                índice local): o backfill pagaria cada embedding e avançaria
+                o checkpoint sem gravar nada
+        """
+        if not gravar_banco and indice_local is None:
+            raise ValueError(
+                "Nenhum destino para os embeddings: questao_oab.embedding (pgvector) "
+                "indisponível e índice vetorial local desativado (numpy ausente ou "
+                "VECTOR_SEARCH_BACKEND=pgvector)"
+            )
+
+        self.engine = engine
+        self.gerar_lote = gerar_lote
+        self.construir_texto = construir_texto
+        self.modelo = modelo
+        self.dimensoes = dimensoes
+        self.tamanho_lote = tamanho_lote
+        self.concorrencia = max(1, concorrencia)
+        self.checkpoint = CheckpointEmbeddings(checkpoint, modelo) if checkpoint else None
+        self.indice_local = indice_local
+        self.gravar_banco = gravar_banco
+
+    # ============================================================================
+    # LEITURA
+    # ============================================================================
+
+    def _filtros(self, apenas_sem_embedding: bool) -> Tuple[str, Dict[str, Any]]:
+        condicoes = []
+        params: Dict[str, Any] = {}
+        if apenas_sem_embedding and self.gravar_banco:
+            condicoes.append("embedding IS NULL")
+        if self.checkpoint and self.checkpoint.ultimo_id:
+            condicoes.append("id > CAST(:ultimo_id AS uuid)")
+            params["ultimo_id"] = self.checkpoint.ultimo_id
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        return where, params
+
+    def contar(self, apenas_sem_embedding: bool = True) -> int:
+        where, params = self._filtros(apenas_sem_embedding)
+        with self.engine.connect() as conn:
+            total = conn.execute(text(f"SELECT COUNT(*) FROM questao_oab {where}"), params).scalar()
+        if apenas_sem_embedding and not self.gravar_banco and self.indice_local is not None:
+            total = max(0, total - len(self.indice_local))  # estimativa
+        return total
+
+    def _ler_lotes(self, conn, apenas_sem_embedding: bool, limite: Optional[int]):
+        """Gera lotes de LinhaQuestao via cursor server-side"""
+        where, params = self._filtros(apenas_sem_embedding)
+        colunas = "id, enunciado, alternativas"
+        if self.indice_local is not None:
+            colunas += ", " + ", ".join(COLUNAS_METADADOS)
+        sql = f"SELECT {colunas} FROM questao_oab {where} ORDER BY id"
+        if limite:
+            sql += " LIMIT :limite"
+            params["limite"] = limite
+
+        resultado = conn.execution_options(
+            stream_results=True, yield_per=self.tamanho_lote
+        ).execute(text(sql), params)
+
+        # Sem coluna embedding, "sem embedding" = ausente do índice local
+        ja_indexados = (
+            self.indice_local.ids()
+            if apenas_sem_embedding and not self.gravar_banco and self.indice_local is not None
+            else None
+        )
+
+        for particao in resultado.partitions(self.tamanho_lote):
+            lote = [tuple(row) for row in particao]
+            if ja_indexados:
+                lote = [linha for linha in lote if str(linha[0]) not in ja_indexados]
+            if lote:
+                yield lote
+
+    # ============================================================================
+    # EMBEDDING
+    # ============================================================================
+
+    def _embeddar(self, lote: List[LinhaQuestao]) -> List[Tuple[LinhaQuestao, Optional[List[float]], Optional[str]]]:
+        """
+        Gera os vetores do lote (com novas tentativas e backoff).
+
+        Se o lote continuar falhando, tenta questão a questão para isolar
+        textos problemáticos. Se nenhuma questão passar, a falha é do
+        provedor e a exceção sobe (a execução é interrompida).
+
+        Returns:
+            [(linha, vetor ou None, erro ou None)] na ordem do lote
+        """
+        textos = [self.construir_texto(linha[1], linha[2]) for linha in lote]
+
+        for tentativa in range(1, self.TENTATIVAS_LOTE + 1):
+            try:
+                vetores = self.gerar_lote(textos)
+                if len(vetores) != len(lote):
+                    raise ValueError(f"{len(vetores)} vetores para {len(lote)} textos")
+                return [(linha, vetor, None) for linha, vetor in zip(lote, vetores)]
+            except Exception as e:
+                erro_lote = e
+                if tentativa < self.TENTATIVAS_LOTE:
+                    espera = 2 ** tentativa
+                    logger.warning(f"Lote falhou ({e}), tentativa {tentativa}, nova tentativa em {espera}s")
+                    time.sleep(espera)
+
+        if len(lote) == 1:
+            raise erro_lote
+
+        resultados = []
+        for linha, texto in zip(lote, textos):
+            try:
+                resultados.append((linha, self.gerar_lote([texto])[0], None))
+            except Exception as e:
+                resultados.append((linha, None, str(e)))
+
+        if all(vetor is None for _, vetor, _ in resultados):
+            raise erro_lote
+        return resultados
+
+    # ============================================================================
+    # ESCRITA
+    # ============================================================================
+
+    def _gravar(self, conn, lote: List[LinhaQuestao], vetores: List[List[float]]) -> None:
+        """1 UPDATE ... FROM (VALUES ...) para o lote inteiro (e/ou append no índice local)"""
+        if self.gravar_banco:
+            self._gravar_banco(conn, lote, vetores)
+
+        if self.indice_local is not None:
+            self.indice_local.adicionar([
+                (linha[0], vetor, dict(zip(("enunciado",) + COLUNAS_METADADOS, (linha[1],) + tuple(linha[3:]))))
+                for linha, vetor in zip(lote, vetores)
+            ])
+
+    def _gravar_banco(self, conn, lote: List[LinhaQuestao], vetores: List[List[float]]) -> None:
+        valores = []
+        params: Dict[str, Any] = {}
+        for i, (linha, vetor) in enumerate(zip(lote, vetores)):
+            questao_id = linha[0]
+            valores.append(f"(CAST(:id{i} AS uuid), CAST(:emb{i} AS vector({self.dimensoes})))")
+            params[f"id{i}"] = str(questao_id)
+            params[f"emb{i}"] = str(vetor)
+
+        conn.execute(
+            text(f"""
+                UPDATE questao_oab AS q
+                SET embedding = v.embedding,
+                    updated_at = NOW()
+                FROM (VALUES {", ".join(valores)}) AS v(id, embedding)
+                WHERE q.id = v.id
+            """),
+            params
+        )
+        conn.commit()
+
+    # ============================================================================
+    # EXECUÇÃO
+    # ============================================================================
+
+    def executar(
+        self,
+        limite: Optional[int] = None,
+        apenas_sem_embedding: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Executa o backfill.
+
+        Returns:
+            Dict com total_questoes, sucessos, erros, tempo_total,
+            questoes_por_segundo, lotes, interrompido e erros_detalhes
+        """
+        total = self.contar(apenas_sem_embedding)
+        if limite:
+            total = min(total, limite)
+
+        logger.info(
+            f"Backfill de embeddings: {total} questões, lote={self.tamanho_lote}, "
+            f"concorrência={self.concorrencia}, modelo={self.modelo}"
+        )
+
+        inicio = time.perf_counter()
+        ultimo_relatorio = inicio
+        sucessos = 0
+        erros_detalhes: List[Dict[str, str]] = []
+        lotes = 0
+
+        interrompido = False
+
+        em_voo: Deque[Tuple[List[LinhaQuestao], Future]] = deque()
+
+        def concluir_mais_antigo() -> bool:
+            """
+            Grava o lote mais antigo (ordem preservada para o checkpoint).
+
+            Returns:
+                False se o provedor/banco falhou e a execução deve parar
+            """
+            nonlocal sucessos, lotes, ultimo_relatorio
+            lote, futuro = em_voo.popleft()
+            try:
+                resultados = futuro.result()
+                validos = [(linha, vetor) for linha, vetor, _ in resultados if vetor is not None]
+                self._gravar(
+                    conn_escrita,
+                    [linha for linha, _ in validos],
+                    [vetor for _, vetor in validos]
+                )
+            except Exception as e:
+                conn_escrita.rollback()
+                logger.error(
+                    f"Lote de {len(lote)} questões falhou: {e}. Execução interrompida; "
+                    f"rode novamente para retomar do checkpoint"
+                )
+                return False
+
+            falhas = [str(linha[0]) for linha, vetor, _ in resultados if vetor is None]
+            for linha, vetor, erro in resultados:
+                if vetor is None:
+                    erros_detalhes.append({"questao_id": str(linha[0]), "erro": erro})
+            sucessos += len(validos)
+            lotes += 1
+            if self.checkpoint:
+                self.checkpoint.avancar(lote[-1][0], len(validos), falhas)
+
+            agora = time.perf_counter()
+            if agora - ultimo_relatorio >= self.INTERVALO_RELATORIO:
+                ultimo_relatorio = agora
+                feitas = sucessos + len(erros_detalhes)
+                taxa = feitas / (agora - inicio)
+                restante = (total - feitas) / taxa if taxa > 0 else 0
+                logger.info(
+                    f"Progresso: {feitas}/{total} ({taxa:.1f} questões/s, "
+                    f"ETA {restante / 60:.1f} min, {len(erros_detalhes)} erros)"
+                )
+            return True
+
+        with self.engine.connect() as conn_leitura, \
+                self.engine.connect() as conn_escrita, \
+                ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix="embedding") as executor:
+
+            for lote in self._ler_lotes(conn_leitura, apenas_sem_embedding, limite):
+                em_voo.append((lote, executor.submit(self._embeddar, lote)))
+                if len(em_voo) >= self.concorrencia and not concluir_mais_antigo():
+                    interrompido = True
+                    break
+
+            while em_voo and not interrompido:
+                interrompido = not concluir_mais_antigo()
+
+            for _, futuro in em_voo:
+                futuro.cancel()
+
+        # ids são UUIDs aleatórios: questões inseridas depois podem cair antes
+        # do último id, então um backfill completo descarta o checkpoint
+        if self.checkpoint and not limite and not interrompido:
+            self.checkpoint.remover()
+
+        tempo_total = time.perf_counter() - inicio
+        velocidade = sucessos / tempo_total if tempo_total > 0 else 0.0
+        logger.info(
+            f"Backfill concluído: {sucessos} ok, {len(erros_detalhes)} erros, "
+            f"{tempo_total:.1f}s ({velocidade:.1f} questões/s)"
+        )
+
+        return {
+            "total_questoes": sucessos + len(erros_detalhes),
+            "sucessos": sucessos,
+            "erros": len(erros_detalhes),
+            "tempo_total": tempo_total,
+            "questoes_por_segundo": velocidade,
+            "lotes": lotes,
+            "interrompido": interrompido,
+            "erros_detalhes": erros_detalhes,
+        }
@@ -12,11 +12,15 @@ import os
 import logging
 from typing import List, Optional, Dict, Tuple
 from uuid import UUID
-from datetime import datetime
 from openai import OpenAI
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from core.embedding_cache import CacheEmbeddings
+from core.embedding_pipeline import PipelineEmbeddings
+from core.review_cache import recomendacoes_revisao
+from core.vector_index import IndiceVetorial
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -42,12 +46,20 @@ class EmbeddingService:
     # Tamanho do batch para geração
     BATCH_SIZE = 100
 
-    def __init__(self, api_key: Optional[str] = None):
+    # Recomendação de revisão: erros recentes usados como consulta,
+    # similaridade mínima e vizinhos por erro (folga para as já respondidas)
+    MAX_ERROS_REVISAO = 10
+    SIMILARIDADE_MINIMA_REVISAO = 0.6
+    FATOR_CANDIDATOS_REVISAO = 3
+
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[CacheEmbeddings] = None):
         """
         Inicializa o serviço de embeddings.
 
         Args:
             api_key: Chave da API OpenAI (se None, usa variável de ambiente)
+            cache: Cache de embeddings (se None, é criado na primeira sessão
+                recebida, a menos que EMBEDDING_CACHE_ENABLED=false)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
 
@@ -58,6 +70,9 @@ class EmbeddingService:
             )
 
         self.client = OpenAI(api_key=self.api_key)
+        self.cache = cache
+        self.indice = IndiceVetorial(self.EMBEDDING_DIMENSIONS)
+        self.usar_cache = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
         logger.info(f"EmbeddingService inicializado com modelo {self.EMBEDDING_MODEL}")
 
 
@@ -101,6 +116,9 @@ class EmbeddingService:
         Raises:
             Exception: Se falhar ao gerar embedding
         """
+        if self.cache is not None:
+            return self.gerar_embeddings_lote([texto])[0]
+
         try:
             response = self.client.embeddings.create(
                 model=self.EMBEDDING_MODEL,
@@ -140,6 +158,8 @@ class EmbeddingService:
         Returns:
             Tupla (sucesso, mensagem_erro)
         """
+        self._vincular_cache(session)
+
         try:
             # Buscar questão
             result = session.execute(
@@ -193,132 +213,97 @@ class EmbeddingService:
             return False, error_msg
 
 
-    def gerar_embeddings_batch(
-        self,
-        session: Session,
-        limite: Optional[int] = None,
-        apenas_sem_embedding: bool = True
-    ) -> Dict[str, any]:
+    def _gerar_embeddings_provedor(self, textos: List[str]) -> List[List[float]]:
         """
-        Gera embeddings em lote para múltiplas questões.
+        Gera embeddings de vários textos em uma única chamada à API.
 
         Args:
-            session: Sessão do SQLAlchemy
-            limite: Limite de questões a processar (None = todas)
-            apenas_sem_embedding: Se True, processa apenas questões sem embedding
+            textos: Textos (até BATCH_SIZE por chamada)
 
         Returns:
-            Dict com estatísticas do processamento
+            Vetores na mesma ordem dos textos
         """
-        inicio = datetime.now()
+        response = self.client.embeddings.create(
+            model=self.EMBEDDING_MODEL,
+            input=textos,
+            encoding_format="float"
+        )
 
-        logger.info("=" * 80)
-        logger.info("INICIANDO GERAÇÃO DE EMBEDDINGS EM LOTE")
-        logger.info("=" * 80)
+        embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
 
-        # Buscar questões para processar
-        query = """
-            SELECT id, enunciado, alternativas
-            FROM questao_oab
-        """
+        for embedding in embeddings:
+            if len(embedding) != self.EMBEDDING_DIMENSIONS:
+                raise ValueError(
+                    f"Embedding com {len(embedding)} dimensões, "
+                    f"esperado {self.EMBEDDING_DIMENSIONS}"
+                )
 
-        if apenas_sem_embedding:
-            query += " WHERE embedding IS NULL"
+        return embeddings
 
-        if limite:
-            query += f" LIMIT {limite}"
 
-        questoes = session.execute(text(query)).fetchall()
+    def gerar_embeddings_lote(self, textos: List[str]) -> List[List[float]]:
+        """
+        Gera embeddings de vários textos, lendo através do cache (se vinculado).
 
-        total_questoes = len(questoes)
-        logger.info(f"Total de questões a processar: {total_questoes}")
+        Args:
+            textos: Textos do lote
 
-        if total_questoes == 0:
-            logger.info("Nenhuma questão para processar")
-            return {
-                "total_questoes": 0,
-                "sucessos": 0,
-                "erros": 0,
-                "tempo_total": 0,
-                "erros_detalhes": []
-            }
+        Returns:
+            Vetores na mesma ordem dos textos
+        """
+        if self.cache is None:
+            return self._gerar_embeddings_provedor(textos)
+        return self.cache.ler_atraves(
+            self.EMBEDDING_MODEL, self.EMBEDDING_DIMENSIONS, textos, self._gerar_embeddings_provedor
+        )
 
-        # Processar em batches
-        sucessos = 0
-        erros = 0
-        erros_detalhes = []
 
-        for i in range(0, total_questoes, self.BATCH_SIZE):
-            batch = questoes[i:i + self.BATCH_SIZE]
-            batch_num = (i // self.BATCH_SIZE) + 1
-            total_batches = (total_questoes + self.BATCH_SIZE - 1) // self.BATCH_SIZE
+    def _vincular_cache(self, session: Session) -> None:
+        """Cria o cache de embeddings na engine da sessão (uma vez)"""
+        if self.cache is None and self.usar_cache:
+            self.cache = CacheEmbeddings(session.get_bind())
 
-            logger.info(f"\n--- Batch {batch_num}/{total_batches} ---")
 
-            for questao_id, enunciado, alternativas in batch:
-                try:
-                    # Construir texto
-                    texto_completo = self._construir_texto_questao(
-                        enunciado,
-                        alternativas
-                    )
+    def gerar_embeddings_batch(
+        self,
+        session: Session,
+        limite: Optional[int] = None,
+        apenas_sem_embedding: bool = True,
+        concorrencia: int = 4,
+        checkpoint: Optional[str] = None
+    ) -> Dict[str, any]:
+        """
+        Gera embeddings em lote para múltiplas questões.
 
-                    # Gerar embedding
-                    embedding = self.gerar_embedding(texto_completo)
-
-                    # Salvar no banco
-                    session.execute(
-                        text("""
-                            UPDATE questao_oab
-                            SET embedding = :embedding::vector,
-                                updated_at = NOW()
-                            WHERE id = :id
-                        """),
-                        {
-                            "id": questao_id,
-                            "embedding": str(embedding)
-                        }
-                    )
+        Usa o PipelineEmbeddings: BATCH_SIZE questões por request, até
+        `concorrencia` requests simultâneos e 1 UPDATE por lote.
 
-                    session.commit()
-                    sucessos += 1
-
-                    if sucessos % 10 == 0:
-                        logger.info(f"Progresso: {sucessos}/{total_questoes} questões processadas")
-
-                except Exception as e:
-                    session.rollback()
-                    erros += 1
-                    erro_detalhe = {
-                        "questao_id": str(questao_id),
-                        "erro": str(e)
-                    }
-                    erros_detalhes.append(erro_detalhe)
-                    logger.error(f"Erro ao processar questão {questao_id}: {e}")
-
-        # Calcular tempo total
-        tempo_total = (datetime.now() - inicio).total_seconds()
-
-        # Estatísticas finais
-        logger.info("\n" + "=" * 80)
-        logger.info("GERAÇÃO DE EMBEDDINGS CONCLUÍDA")
-        logger.info("=" * 80)
-        logger.info(f"Total de questões: {total_questoes}")
-        logger.info(f"Sucessos: {sucessos}")
-        logger.info(f"Erros: {erros}")
-        logger.info(f"Tempo total: {tempo_total:.2f}s")
-        logger.info(f"Taxa de sucesso: {(sucessos/total_questoes)*100:.1f}%")
-
-        if sucessos > 0:
-            logger.info(f"Velocidade: {sucessos/tempo_total:.2f} questões/segundo")
+        Args:
+            session: Sessão do SQLAlchemy (só fornece a engine)
+            limite: Limite de questões a processar (None = todas)
+            apenas_sem_embedding: Se True, processa apenas questões sem embedding
+            concorrencia: Requests simultâneos à API
+            checkpoint: Arquivo de checkpoint para retomada (None = desativado)
 
-        return {
-            "total_questoes": total_questoes,
-            "sucessos": sucessos,
-            "erros": erros,
-            "tempo_total": tempo_total,
-            "erros_detalhes": erros_detalhes
-        }
+        Returns:
+            Dict com estatísticas do processamento
+        """
+        self._vincular_cache(session)
+        acertos_antes = self.cache.acertos if self.cache else 0
+
+        pipeline = PipelineEmbeddings(
+            engine=session.get_bind(),
+            gerar_lote=self.gerar_embeddings_lote,
+            construir_texto=self._construir_texto_questao,
+            modelo=self.EMBEDDING_MODEL,
+            dimensoes=self.EMBEDDING_DIMENSIONS,
+            tamanho_lote=self.BATCH_SIZE,
+            concorrencia=concorrencia,
+            checkpoint=checkpoint
+        )
+        resultado = pipeline.executar(limite=limite, apenas_sem_embedding=apenas_sem_embedding)
+        resultado["cache_acertos"] = (self.cache.acertos - acertos_antes) if self.cache else 0
+        return resultado
 
 
     def buscar_questoes_similares(
@@ -326,7 +311,9 @@ class EmbeddingService:
         session: Session,
         questao_id: UUID,
         limite: int = 5,
-        threshold_similaridade: float = 0.7
+        threshold_similaridade: float = 0.7,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None
     ) -> List[Dict]:
         """
         Busca questões similares usando busca vetorial.
@@ -336,6 +323,8 @@ class EmbeddingService:
             questao_id: ID da questão de referência
             limite: Número máximo de questões similares
             threshold_similaridade: Threshold mínimo de similaridade (0-1)
+            ef_search: Candidatos do HNSW (None = padrão do IndiceVetorial)
+            probes: Listas do IVFFlat visitadas (None = padrão do IndiceVetorial)
 
         Returns:
             Lista de questões similares com score de similaridade
@@ -344,7 +333,7 @@ class EmbeddingService:
             # Buscar embedding da questão de referência
             result = session.execute(
                 text("""
-                    SELECT embedding
+                    SELECT embedding::text
                     FROM questao_oab
                     WHERE id = :id
                 """),
@@ -357,27 +346,22 @@ class EmbeddingService:
 
             embedding_ref = result[0]
 
-            # Busca vetorial usando similaridade de cosseno
+            # Busca vetorial usando similaridade de cosseno (k+1 vizinhos pelo
+            # índice; a própria questão e o threshold são filtrados depois)
+            distancia = self.indice.preparar_busca(
+                session, ef_search=ef_search, probes=probes, k=limite + 1
+            )
             questoes_similares = session.execute(
-                text("""
-                    SELECT
-                        id,
-                        numero_questao,
-                        enunciado,
-                        disciplina,
-                        assunto,
-                        1 - (embedding <=> :embedding::vector) as similaridade
-                    FROM questao_oab
-                    WHERE id != :questao_id
-                      AND embedding IS NOT NULL
-                      AND 1 - (embedding <=> :embedding::vector) >= :threshold
-                    ORDER BY embedding <=> :embedding::vector
-                    LIMIT :limite
-                """),
+                text(self.indice.consulta_vizinhos(
+                    distancia,
+                    colunas="id, numero_questao, enunciado, disciplina, assunto",
+                    filtro="id != :questao_id"
+                )),
                 {
                     "questao_id": questao_id,
                     "embedding": embedding_ref,
-                    "threshold": threshold_similaridade,
+                    "candidatos": limite + 1,
+                    "distancia_maxima": 1 - threshold_similaridade,
                     "limite": limite
                 }
             ).fetchall()
@@ -390,7 +374,7 @@ class EmbeddingService:
                     "enunciado": row[2][:200] + "...",  # Preview
                     "disciplina": row[3],
                     "assunto": row[4],
-                    "similaridade": float(row[5])
+                    "similaridade": 1 - float(row[5])
                 })
 
             logger.info(
@@ -414,7 +398,10 @@ class EmbeddingService:
         """
         Recomenda questões para revisão baseado em erros anteriores.
 
-        Usa embeddings para encontrar questões similares às que o usuário errou.
+        Usa embeddings para encontrar questões similares às que o usuário errou:
+        os vizinhos de cada erro recente são buscados juntos e mesclados pela
+        maior similaridade. O resultado fica em cache até a próxima resposta
+        do usuário (core.review_cache).
 
         Args:
             session: Sessão do SQLAlchemy
@@ -425,70 +412,11 @@ class EmbeddingService:
             Lista de questões recomendadas
         """
         try:
-            # Buscar questões que o usuário errou recentemente
-            questoes_erradas = session.execute(
-                text("""
-                    SELECT DISTINCT q.id, q.embedding
-                    FROM resposta r
-                    JOIN questao_oab q ON r.questao_id = q.id
-                    WHERE r.usuario_id = :usuario_id
-                      AND r.correta = FALSE
-                      AND q.embedding IS NOT NULL
-                    ORDER BY r.respondida_em DESC
-                    LIMIT 5
-                """),
-                {"usuario_id": usuario_id}
-            ).fetchall()
-
-            if not questoes_erradas:
-                logger.info(f"Usuário {usuario_id} não tem erros recentes")
-                return []
-
-            # Coletar embeddings das questões erradas
-            embeddings_erros = [row[1] for row in questoes_erradas]
-
-            # Calcular embedding médio (centroide)
-            # Em produção, isso seria feito com numpy, mas aqui fazemos manualmente
-            embedding_medio = embeddings_erros[0]  # Simplificado
-
-            # Buscar questões similares que o usuário ainda não respondeu
-            recomendacoes = session.execute(
-                text("""
-                    SELECT
-                        q.id,
-                        q.numero_questao,
-                        q.enunciado,
-                        q.disciplina,
-                        q.assunto,
-                        q.dificuldade,
-                        1 - (q.embedding <=> :embedding::vector) as relevancia
-                    FROM questao_oab q
-                    LEFT JOIN resposta r ON q.id = r.questao_id
-                        AND r.usuario_id = :usuario_id
-                    WHERE q.embedding IS NOT NULL
-                      AND r.id IS NULL  -- Não respondida
-                      AND 1 - (q.embedding <=> :embedding::vector) >= 0.6
-                    ORDER BY q.embedding <=> :embedding::vector
-                    LIMIT :limite
-                """),
-                {
-                    "usuario_id": usuario_id,
-                    "embedding": embedding_medio,
-                    "limite": limite
-                }
-            ).fetchall()
-
-            resultados = []
-            for row in recomendacoes:
-                resultados.append({
-                    "id": str(row[0]),
-                    "numero_questao": row[1],
-                    "enunciado": row[2][:200] + "...",
-                    "disciplina": row[3],
-                    "assunto": row[4],
-                    "dificuldade": row[5],
-                    "relevancia": float(row[6])
-                })
+            resultados = recomendacoes_revisao.obter(
+                usuario_id, session, limite,
+                lambda: self._recomendar_revisao_pgvector(session, usuario_id, limite),
+                origem=f"{self.EMBEDDING_MODEL}:{self.EMBEDDING_DIMENSIONS}:pgvector"
+            )
 
             logger.info(
                 f"Recomendadas {len(resultados)} questões "
@@ -502,6 +430,70 @@ class EmbeddingService:
             return []
 
 
+    def _recomendar_revisao_pgvector(
+        self,
+        session: Session,
+        usuario_id: UUID,
+        limite: int
+    ) -> List[Dict]:
+        """
+        recomendar_revisao em uma única consulta: os erros recentes viram
+        vetores de consulta (um index scan cada), e as já respondidas saem
+        por anti-join em idx_resposta_usuario_questao.
+        """
+        candidatos = limite * self.FATOR_CANDIDATOS_REVISAO + 1
+        distancia = self.indice.preparar_busca(session, k=candidatos, referencia="consultas.vetor")
+
+        recomendacoes = session.execute(
+            text(self.indice.consulta_vizinhos_lote(
+                distancia,
+                consultas="""
+                    SELECT row_number() OVER (ORDER BY erros.ultima DESC) AS ordem,
+                           q.embedding AS vetor
+                    FROM (
+                        SELECT questao_id, MAX(respondida_em) AS ultima
+                        FROM resposta
+                        WHERE usuario_id = :usuario_id
+                          AND correta = FALSE
+                        GROUP BY questao_id
+                        ORDER BY ultima DESC
+                        LIMIT :max_erros
+                    ) erros
+                    JOIN questao_oab q ON q.id = erros.questao_id
+                    WHERE q.embedding IS NOT NULL
+                """,
+                colunas="id, numero_questao, enunciado, disciplina, assunto, dificuldade",
+                filtro="""
+                    NOT EXISTS (
+                        SELECT 1 FROM resposta r
+                        WHERE r.usuario_id = :usuario_id
+                          AND r.questao_id = vizinhos.id
+                    )
+                """
+            )),
+            {
+                "usuario_id": usuario_id,
+                "max_erros": self.MAX_ERROS_REVISAO,
+                "candidatos": candidatos,
+                "distancia_maxima": 1 - self.SIMILARIDADE_MINIMA_REVISAO,
+                "limite": limite
+            }
+        ).fetchall()
+
+        return [
+            {
+                "id": str(row[0]),
+                "numero_questao": row[1],
+                "enunciado": row[2][:200] + "...",
+                "disciplina": row[3],
+                "assunto": row[4],
+                "dificuldade": row[5],
+                "relevancia": 1 - float(row[6])
+            }
+            for row in recomendacoes
+        ]
+
+
 # ================================================================================
 # FUNÇÕES AUXILIARES
 # ================================================================================
@@ -26,15 +26,28 @@ REQUISITOS:
 ================================================================================
 """
 
+import os
 import logging
 import requests
 import json
+import threading
 from typing import List, Optional, Dict, Tuple
 from uuid import UUID
-from datetime import datetime
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from core.embedding_cache import CacheEmbeddings
+from core.embedding_pipeline import PipelineEmbeddings
+from core.review_cache import recomendacoes_revisao
+from core.vector_index import IndiceVetorial
+
+# Índice vetorial local (NumPy) para ambientes sem pgvector
+try:
+    from core.local_vector_index import IndiceVetorialLocal
+    INDICE_LOCAL_AVAILABLE = True
+except ImportError:
+    INDICE_LOCAL_AVAILABLE = False
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -69,10 +82,18 @@ class EmbeddingServiceOllama:
     # Tamanho do batch para geração
     BATCH_SIZE = 50  # Menor que OpenAI porque é local
 
+    # Recomendação de revisão: erros recentes usados como consulta,
+    # similaridade mínima e vizinhos por erro (folga para as já respondidas)
+    MAX_ERROS_REVISAO = 10
+    SIMILARIDADE_MINIMA_REVISAO = 0.6
+    FATOR_CANDIDATOS_REVISAO = 3
+
     def __init__(
         self,
         model: str = DEFAULT_MODEL,
-        ollama_host: str = DEFAULT_HOST
+        ollama_host: str = DEFAULT_HOST,
+        cache: Optional[CacheEmbeddings] = None,
+        indice_local: Optional["IndiceVetorialLocal"] = None
     ):
         """
         Inicializa o serviço de embeddings com Ollama.
@@ -80,10 +101,24 @@ class EmbeddingServiceOllama:
         Args:
             model: Nome do modelo de embedding
             ollama_host: URL do servidor Ollama
+            cache: Cache de embeddings (se None, é criado na primeira sessão
+                recebida, a menos que EMBEDDING_CACHE_ENABLED=false)
+            indice_local: Índice vetorial local (se None, usa o diretório
+                padrão). Usado quando VECTOR_SEARCH_BACKEND=local, ou em auto
+                quando questao_oab.embedding (pgvector) não existe
         """
         self.model = model
         self.ollama_host = ollama_host
         self.embedding_dimensions = self.MODEL_DIMENSIONS.get(model, 768)
+        self._local = threading.local()
+        self.cache = cache
+        self.indice = IndiceVetorial(self.embedding_dimensions)
+        self.backend_busca = os.getenv("VECTOR_SEARCH_BACKEND", "auto").lower()
+        self._pgvector: Optional[bool] = None
+        self.indice_local = indice_local
+        if self.indice_local is None and INDICE_LOCAL_AVAILABLE:
+            self.indice_local = IndiceVetorialLocal(model, self.embedding_dimensions)
+        self.usar_cache = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
 
         # Verificar se Ollama está disponível
         if not self._verificar_ollama():
@@ -183,6 +218,9 @@ class EmbeddingServiceOllama:
         Raises:
             Exception: Se falhar ao gerar embedding
         """
+        if self.cache is not None:
+            return self.gerar_embeddings_lote([texto])[0]
+
         try:
             # Chamar API do Ollama
             response = requests.post(
@@ -232,11 +270,17 @@ class EmbeddingServiceOllama:
         Returns:
             Tupla (sucesso, mensagem_erro)
         """
+        self._vincular_cache(session)
+
         try:
+            banco = self._pgvector_disponivel(session)
+            local = self._busca_local(session)
+
             # Buscar questão
             result = session.execute(
-                text("""
-                    SELECT enunciado, alternativas, embedding
+                text(f"""
+                    SELECT enunciado, alternativas, numero_questao, disciplina,
+                           assunto, dificuldade, {"embedding IS NOT NULL" if banco else "FALSE"}
                     FROM questao_oab
                     WHERE id = :id
                 """),
@@ -246,10 +290,12 @@ class EmbeddingServiceOllama:
             if not result:
                 return False, f"Questão {questao_id} não encontrada"
 
-            enunciado, alternativas, embedding_atual = result
+            enunciado, alternativas, numero_questao, disciplina, assunto, dificuldade, tem_embedding = result
 
-            # Verificar se já tem embedding
-            if embedding_atual is not None:
+            # Verificar se já tem embedding (onde a busca vai ler)
+            if local:
+                tem_embedding = str(questao_id) in self.indice_local.ids()
+            if tem_embedding:
                 logger.info(f"Questão {questao_id} já possui embedding")
                 return True, None
 
@@ -259,19 +305,29 @@ class EmbeddingServiceOllama:
             # Gerar embedding
             embedding = self.gerar_embedding(texto_completo)
 
+            if local:
+                self.indice_local.adicionar([(questao_id, embedding, {
+                    "enunciado": enunciado,
+                    "numero_questao": numero_questao,
+                    "disciplina": disciplina,
+                    "assunto": assunto,
+                    "dificuldade": dificuldade,
+                })])
+
             # Salvar no banco (ajustar dimensão do vetor)
-            session.execute(
-                text(f"""
-                    UPDATE questao_oab
-                    SET embedding = :embedding::vector({self.embedding_dimensions}),
-                        updated_at = NOW()
-                    WHERE id = :id
-                """),
-                {
-                    "id": questao_id,
-                    "embedding": str(embedding)
-                }
-            )
+            if banco:
+                session.execute(
+                    text(f"""
+                        UPDATE questao_oab
+                        SET embedding = CAST(:embedding AS vector({self.embedding_dimensions})),
+                            updated_at = NOW()
+                        WHERE id = :id
+                    """),
+                    {
+                        "id": questao_id,
+                        "embedding": str(embedding)
+                    }
+                )
 
             session.commit()
 
@@ -285,136 +341,228 @@ class EmbeddingServiceOllama:
             return False, error_msg
 
 
+    def _sessao_http(self) -> requests.Session:
+        """Sessão HTTP por thread (keep-alive entre chamadas do mesmo worker)"""
+        sessao = getattr(self._local, "sessao", None)
+        if sessao is None:
+            sessao = requests.Session()
+            self._local.sessao = sessao
+        return sessao
+
+
+    def _gerar_embeddings_provedor(self, textos: List[str]) -> List[List[float]]:
+        """
+        Gera embeddings de vários textos.
+
+        A API /api/embeddings recebe um texto por chamada; o paralelismo vem
+        do pipeline, que mantém vários lotes em voo (um por worker).
+
+        Args:
+            textos: Textos do lote
+
+        Returns:
+            Vetores na mesma ordem dos textos
+        """
+        sessao = self._sessao_http()
+        embeddings = []
+
+        for texto in textos:
+            response = sessao.post(
+                f"{self.ollama_host}/api/embeddings",
+                json={"model": self.model, "prompt": texto},
+                timeout=30
+            )
+            if response.status_code != 200:
+                raise Exception(
+                    f"Ollama retornou status {response.status_code}: "
+                    f"{response.text}"
+                )
+
+            embedding = response.json()["embedding"]
+            if len(embedding) != self.embedding_dimensions:
+                raise ValueError(
+                    f"Embedding com {len(embedding)} dimensões, "
+                    f"esperado {self.embedding_dimensions}"
+                )
+            embeddings.append(embedding)
+
+        return embeddings
+
+
+    def gerar_embeddings_lote(self, textos: List[str]) -> List[List[float]]:
+        """
+        Gera embeddings de vários textos, lendo através do cache (se vinculado).
+
+        Args:
+            textos: Textos do lote
+
+        Returns:
+            Vetores na mesma ordem dos textos
+        """
+        if self.cache is None:
+            return self._gerar_embeddings_provedor(textos)
+        return self.cache.ler_atraves(
+            self.model, self.embedding_dimensions, textos, self._gerar_embeddings_provedor
+        )
+
+
+    def _vincular_cache(self, session: Session) -> None:
+        """Cria o cache de embeddings na engine da sessão (uma vez)"""
+        if self.cache is None and self.usar_cache:
+            self.cache = CacheEmbeddings(session.get_bind())
+
+
+    def _pgvector_disponivel(self, session: Session) -> bool:
+        """Extensão vector instalada e coluna questao_oab.embedding presente"""
+        if self._pgvector is None:
+            self._pgvector = verificar_suporte_pgvector(session) and bool(session.execute(
+                text("""
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_name = 'questao_oab' AND column_name = 'embedding'
+                """)
+            ).scalar())
+        return self._pgvector
+
+
+    def _busca_local(self, session: Session) -> bool:
+        """Decide o backend de busca (VECTOR_SEARCH_BACKEND: auto, pgvector, local)"""
+        if self.backend_busca == "pgvector" or self.indice_local is None:
+            return False
+        if self.backend_busca == "local":
+            return True
+        return not self._pgvector_disponivel(session)
+
+
     def gerar_embeddings_batch(
         self,
         session: Session,
         limite: Optional[int] = None,
-        apenas_sem_embedding: bool = True
+        apenas_sem_embedding: bool = True,
+        concorrencia: int = 4,
+        checkpoint: Optional[str] = None
     ) -> Dict[str, any]:
         """
         Gera embeddings em lote para múltiplas questões.
 
+        Usa o PipelineEmbeddings: até `concorrencia` chamadas simultâneas ao
+        Ollama e 1 UPDATE por lote de BATCH_SIZE questões.
+
         Args:
-            session: Sessão do SQLAlchemy
+            session: Sessão do SQLAlchemy (só fornece a engine)
             limite: Limite de questões a processar (None = todas)
             apenas_sem_embedding: Se True, processa apenas questões sem embedding
+            concorrencia: Chamadas simultâneas ao Ollama
+            checkpoint: Arquivo de checkpoint para retomada (None = desativado)
 
         Returns:
             Dict com estatísticas do processamento
-        """
-        inicio = datetime.now()
-
-        logger.info("=" * 80)
-        logger.info("INICIANDO GERAÇÃO DE EMBEDDINGS EM LOTE (OLLAMA)")
-        logger.info("=" * 80)
-        logger.info(f"Modelo: {self.model}")
-        logger.info(f"Dimensões: {self.embedding_dimensions}")
-
-        # Buscar questões para processar
-        query = """
-            SELECT id, enunciado, alternativas
-            FROM questao_oab
-        """
-
-        if apenas_sem_embedding:
-            query += " WHERE embedding IS NULL"
-
-        if limite:
-            query += f" LIMIT {limite}"
-
-        questoes = session.execute(text(query)).fetchall()
 
-        total_questoes = len(questoes)
-        logger.info(f"Total de questões a processar: {total_questoes}")
-
-        if total_questoes == 0:
-            logger.info("Nenhuma questão para processar")
-            return {
-                "total_questoes": 0,
-                "sucessos": 0,
-                "erros": 0,
-                "tempo_total": 0,
-                "erros_detalhes": []
-            }
-
-        # Processar em batches
-        sucessos = 0
-        erros = 0
-        erros_detalhes = []
-
-        for i in range(0, total_questoes, self.BATCH_SIZE):
-            batch = questoes[i:i + self.BATCH_SIZE]
-            batch_num = (i // self.BATCH_SIZE) + 1
-            total_batches = (total_questoes + self.BATCH_SIZE - 1) // self.BATCH_SIZE
+        Raises:
+            ValueError: Sem pgvector e sem índice local (nada onde gravar)
+        """
+        self._vincular_cache(session)
+        acertos_antes = self.cache.acertos if self.cache else 0
+
+        pipeline = PipelineEmbeddings(
+            engine=session.get_bind(),
+            gerar_lote=self.gerar_embeddings_lote,
+            construir_texto=self._construir_texto_questao,
+            modelo=self.model,
+            dimensoes=self.embedding_dimensions,
+            tamanho_lote=self.BATCH_SIZE,
+            concorrencia=concorrencia,
+            checkpoint=checkpoint,
+            indice_local=self.indice_local if self._busca_local(session) else None,
+            gravar_banco=self._pgvector_disponivel(session)
+        )
+        resultado = pipeline.executar(limite=limite, apenas_sem_embedding=apenas_sem_embedding)
+        resultado["cache_acertos"] = (self.cache.acertos - acertos_antes) if self.cache else 0
+        resultado["modelo"] = self.model
+        resultado["dimensoes"] = self.embedding_dimensions
+        return resultado
 
-            logger.info(f"\n--- Batch {batch_num}/{total_batches} ---")
 
-            for questao_id, enunciado, alternativas in batch:
-                try:
-                    # Construir texto
-                    texto_completo = self._construir_texto_questao(
-                        enunciado,
-                        alternativas
-                    )
+    def atualizar_indice(self, session: Session) -> None:
+        """
+        Manutenção do índice de busca após uma carga em lote.
 
-                    # Gerar embedding
-                    embedding = self.gerar_embedding(texto_completo)
-
-                    # Salvar no banco
-                    session.execute(
-                        text(f"""
-                            UPDATE questao_oab
-                            SET embedding = :embedding::vector({self.embedding_dimensions}),
-                                updated_at = NOW()
-                            WHERE id = :id
-                        """),
-                        {
-                            "id": questao_id,
-                            "embedding": str(embedding)
-                        }
-                    )
+        Com pgvector: IndiceVetorial.apos_carga (cria HNSW ou reconstrói
+        IVFFlat). O índice local é atualizado na própria gravação.
+        """
+        if self._pgvector_disponivel(session):
+            self.indice.apos_carga(session.get_bind())
+        else:
+            logger.info("Sem pgvector: índice vetorial local já atualizado na carga")
 
-                    session.commit()
-                    sucessos += 1
 
-                    if sucessos % 10 == 0:
-                        logger.info(f"Progresso: {sucessos}/{total_questoes} questões processadas")
+    def estatisticas_cobertura(self, session: Session) -> Dict:
+        """
+        Cobertura de embeddings no backend de busca em uso.
 
-                except Exception as e:
-                    session.rollback()
-                    erros += 1
-                    erro_detalhe = {
-                        "questao_id": str(questao_id),
-                        "erro": str(e)
-                    }
-                    erros_detalhes.append(erro_detalhe)
-                    logger.error(f"Erro ao processar questão {questao_id}: {e}")
+        No índice local conta as questões presentes no arquivo do modelo;
+        com pgvector, as linhas com questao_oab.embedding preenchido.
 
-        # Calcular tempo total
-        tempo_total = (datetime.now() - inicio).total_seconds()
+        Args:
+            session: Sessão do SQLAlchemy
 
-        # Estatísticas finais
-        logger.info("\n" + "=" * 80)
-        logger.info("GERAÇÃO DE EMBEDDINGS CONCLUÍDA")
-        logger.info("=" * 80)
-        logger.info(f"Total de questões: {total_questoes}")
-        logger.info(f"Sucessos: {sucessos}")
-        logger.info(f"Erros: {erros}")
-        logger.info(f"Tempo total: {tempo_total:.2f}s")
-        logger.info(f"Taxa de sucesso: {(sucessos/total_questoes)*100:.1f}%")
+        Returns:
+            Dict de estatisticas_embeddings + "por_disciplina" (vazio se
+            não há onde ler embeddings)
+        """
+        if self._busca_local(session):
+            ids_indice = self.indice_local.ids()
+            linhas = session.execute(text("SELECT id, disciplina FROM questao_oab")).fetchall()
+
+            com_embedding = 0
+            contagem: Dict[str, List[int]] = {}
+            for questao_id, disciplina in linhas:
+                tem = str(questao_id) in ids_indice
+                com_embedding += tem
+                if disciplina is not None:
+                    totais = contagem.setdefault(disciplina, [0, 0])
+                    totais[0] += 1
+                    totais[1] += tem
+
+            stats = {
+                "total_questoes": len(linhas),
+                "questoes_com_embedding": com_embedding,
+                "questoes_sem_embedding": len(linhas) - com_embedding,
+                "percentual_cobertura": round(com_embedding / len(linhas) * 100, 2) if linhas else 0.0
+            }
+            por_disciplina = [
+                (disciplina, total, com, round(com / total * 100, 1))
+                for disciplina, (total, com) in contagem.items()
+            ]
+
+        elif self._pgvector_disponivel(session):
+            stats = estatisticas_embeddings(session)
+            por_disciplina = [
+                tuple(linha) for linha in session.execute(
+                    text("""
+                        SELECT
+                            disciplina,
+                            COUNT(*) as total,
+                            COUNT(embedding) as com_embedding,
+                            ROUND(
+                                (COUNT(embedding)::FLOAT / NULLIF(COUNT(*), 0)) * 100,
+                                1
+                            ) as percentual
+                        FROM questao_oab
+                        WHERE disciplina IS NOT NULL
+                        GROUP BY disciplina
+                    """)
+                )
+            ]
 
-        if sucessos > 0:
-            logger.info(f"Velocidade: {sucessos/tempo_total:.2f} questões/segundo")
+        else:
+            logger.warning("Sem pgvector e sem índice vetorial local: cobertura indisponível")
+            return {}
 
-        return {
-            "total_questoes": total_questoes,
-            "sucessos": sucessos,
-            "erros": erros,
-            "tempo_total": tempo_total,
-            "erros_detalhes": erros_detalhes,
-            "modelo": self.model,
-            "dimensoes": self.embedding_dimensions
-        }
+        stats["por_disciplina"] = [
+            {"disciplina": d, "total": total, "com_embedding": com, "percentual": pct}
+            for d, total, com, pct in sorted(por_disciplina, key=lambda item: -item[1])
+        ]
+        return stats
 
 
     def buscar_questoes_similares(
@@ -422,7 +570,11 @@ class EmbeddingServiceOllama:
         session: Session,
         questao_id: UUID,
         limite: int = 5,
-        threshold_similaridade: float = 0.7
+        threshold_similaridade: float = 0.7,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        disciplina: Optional[str] = None,
+        assunto: Optional[str] = None
     ) -> List[Dict]:
         """
         Busca questões similares usando busca vetorial.
@@ -432,15 +584,24 @@ class EmbeddingServiceOllama:
             questao_id: ID da questão de referência
             limite: Número máximo de questões similares
             threshold_similaridade: Threshold mínimo de similaridade (0-1)
+            ef_search: Candidatos do HNSW (None = padrão do IndiceVetorial)
+            probes: Listas do IVFFlat visitadas (None = padrão do IndiceVetorial)
+            disciplina: Restringe à disciplina (opcional)
+            assunto: Restringe ao assunto (opcional)
 
         Returns:
             Lista de questões similares com score de similaridade
         """
         try:
+            if self._busca_local(session):
+                return self._buscar_similares_local(
+                    questao_id, limite, threshold_similaridade, disciplina, assunto
+                )
+
             # Buscar embedding da questão de referência
             result = session.execute(
                 text("""
-                    SELECT embedding
+                    SELECT embedding::text
                     FROM questao_oab
                     WHERE id = :id
                 """),
@@ -453,27 +614,32 @@ class EmbeddingServiceOllama:
 
             embedding_ref = result[0]
 
-            # Busca vetorial usando similaridade de cosseno
+            # Busca vetorial usando similaridade de cosseno (k+1 vizinhos pelo
+            # índice; a própria questão e o threshold são filtrados depois)
+            # Com filtros, amplia os candidatos (o filtro é aplicado depois do índice)
+            filtros = ["id != :questao_id"]
+            if disciplina is not None:
+                filtros.append("disciplina = :disciplina")
+            if assunto is not None:
+                filtros.append("assunto = :assunto")
+            candidatos = limite + 1 if len(filtros) == 1 else (limite + 1) * 10
+
+            distancia = self.indice.preparar_busca(
+                session, ef_search=ef_search, probes=probes, k=candidatos
+            )
             questoes_similares = session.execute(
-                text("""
-                    SELECT
-                        id,
-                        numero_questao,
-                        enunciado,
-                        disciplina,
-                        assunto,
-                        1 - (embedding <=> :embedding::vector) as similaridade
-                    FROM questao_oab
-                    WHERE id != :questao_id
-                      AND embedding IS NOT NULL
-                      AND 1 - (embedding <=> :embedding::vector) >= :threshold
-                    ORDER BY embedding <=> :embedding::vector
-                    LIMIT :limite
-                """),
+                text(self.indice.consulta_vizinhos(
+                    distancia,
+                    colunas="id, numero_questao, enunciado, disciplina, assunto",
+                    filtro=" AND ".join(filtros)
+                )),
                 {
                     "questao_id": questao_id,
                     "embedding": embedding_ref,
-                    "threshold": threshold_similaridade,
+                    "disciplina": disciplina,
+                    "assunto": assunto,
+                    "candidatos": candidatos,
+                    "distancia_maxima": 1 - threshold_similaridade,
                     "limite": limite
                 }
             ).fetchall()
@@ -486,7 +652,7 @@ class EmbeddingServiceOllama:
                     "enunciado": row[2][:200] + "...",
                     "disciplina": row[3],
                     "assunto": row[4],
-                    "similaridade": float(row[5])
+                    "similaridade": 1 - float(row[5])
                 })
 
             logger.info(
@@ -501,6 +667,42 @@ class EmbeddingServiceOllama:
             return []
 
 
+    def _buscar_similares_local(
+        self,
+        questao_id: UUID,
+        limite: int,
+        threshold_similaridade: float,
+        disciplina: Optional[str],
+        assunto: Optional[str]
+    ) -> List[Dict]:
+        """buscar_questoes_similares sobre o índice local (sem consulta ao banco)"""
+        referencia = self.indice_local.vetores([questao_id]).get(str(questao_id))
+        if referencia is None:
+            logger.warning(f"Questão {questao_id} não tem embedding no índice local")
+            return []
+
+        vizinhos = self.indice_local.buscar(
+            referencia,
+            k=limite,
+            disciplina=disciplina,
+            assunto=assunto,
+            excluir_ids=[questao_id],
+            similaridade_minima=threshold_similaridade
+        )[0]
+
+        return [
+            {
+                "id": item["id"],
+                "numero_questao": item["numero_questao"],
+                "enunciado": item["preview"] + "...",
+                "disciplina": item["disciplina"],
+                "assunto": item["assunto"],
+                "similaridade": item["similaridade"]
+            }
+            for item in vizinhos
+        ]
+
+
     def recomendar_revisao(
         self,
         session: Session,
@@ -510,7 +712,10 @@ class EmbeddingServiceOllama:
         """
         Recomenda questões para revisão baseado em erros anteriores.
 
-        Usa embeddings para encontrar questões similares às que o usuário errou.
+        Usa embeddings para encontrar questões similares às que o usuário errou:
+        os vizinhos de cada erro recente são buscados juntos e mesclados pela
+        maior similaridade. O resultado fica em cache até a próxima resposta
+        do usuário (core.review_cache).
 
         Args:
             session: Sessão do SQLAlchemy
@@ -521,69 +726,17 @@ class EmbeddingServiceOllama:
             Lista de questões recomendadas
         """
         try:
-            # Buscar questões que o usuário errou recentemente
-            questoes_erradas = session.execute(
-                text("""
-                    SELECT DISTINCT q.id, q.embedding
-                    FROM resposta r
-                    JOIN questao_oab q ON r.questao_id = q.id
-                    WHERE r.usuario_id = :usuario_id
-                      AND r.correta = FALSE
-                      AND q.embedding IS NOT NULL
-                    ORDER BY r.respondida_em DESC
-                    LIMIT 5
-                """),
-                {"usuario_id": usuario_id}
-            ).fetchall()
-
-            if not questoes_erradas:
-                logger.info(f"Usuário {usuario_id} não tem erros recentes")
-                return []
-
-            # Coletar embeddings das questões erradas
-            embeddings_erros = [row[1] for row in questoes_erradas]
-
-            # Usar primeiro embedding como referência (simplificado)
-            embedding_ref = embeddings_erros[0]
-
-            # Buscar questões similares que o usuário ainda não respondeu
-            recomendacoes = session.execute(
-                text("""
-                    SELECT
-                        q.id,
-                        q.numero_questao,
-                        q.enunciado,
-                        q.disciplina,
-                        q.assunto,
-                        q.dificuldade,
-                        1 - (q.embedding <=> :embedding::vector) as relevancia
-                    FROM questao_oab q
-                    LEFT JOIN resposta r ON q.id = r.questao_id
-                        AND r.usuario_id = :usuario_id
-                    WHERE q.embedding IS NOT NULL
-                      AND r.id IS NULL
-                      AND 1 - (q.embedding <=> :embedding::vector) >= 0.6
-                    ORDER BY q.embedding <=> :embedding::vector
-                    LIMIT :limite
-                """),
-                {
-                    "usuario_id": usuario_id,
-                    "embedding": embedding_ref,
-                    "limite": limite
-                }
-            ).fetchall()
-
-            resultados = []
-            for row in recomendacoes:
-                resultados.append({
-                    "id": str(row[0]),
-                    "numero_questao": row[1],
-                    "enunciado": row[2][:200] + "...",
-                    "disciplina": row[3],
-                    "assunto": row[4],
-                    "dificuldade": row[5],
-                    "relevancia": float(row[6])
-                })
+            if self._busca_local(session):
+                backend = "local"
+                calcular = lambda: self._recomendar_revisao_local(session, usuario_id, limite)
+            else:
+                backend = "pgvector"
+                calcular = lambda: self._recomendar_revisao_pgvector(session, usuario_id, limite)
+
+            resultados = recomendacoes_revisao.obter(
+                usuario_id, session, limite, calcular,
+                origem=f"{self.model}:{self.embedding_dimensions}:{backend}"
+            )
 
             logger.info(
                 f"Recomendadas {len(resultados)} questões "
@@ -597,6 +750,128 @@ class EmbeddingServiceOllama:
             return []
 
 
+    def _recomendar_revisao_pgvector(
+        self,
+        session: Session,
+        usuario_id: UUID,
+        limite: int
+    ) -> List[Dict]:
+        """
+        recomendar_revisao em uma única consulta: os erros recentes viram
+        vetores de consulta (um index scan cada), e as já respondidas saem
+        por anti-join em idx_resposta_usuario_questao.
+        """
+        candidatos = limite * self.FATOR_CANDIDATOS_REVISAO + 1
+        distancia = self.indice.preparar_busca(session, k=candidatos, referencia="consultas.vetor")
+
+        recomendacoes = session.execute(
+            text(self.indice.consulta_vizinhos_lote(
+                distancia,
+                consultas="""
+                    SELECT row_number() OVER (ORDER BY erros.ultima DESC) AS ordem,
+                           q.embedding AS vetor
+                    FROM (
+                        SELECT questao_id, MAX(respondida_em) AS ultima
+                        FROM resposta
+                        WHERE usuario_id = :usuario_id
+                          AND correta = FALSE
+                        GROUP BY questao_id
+                        ORDER BY ultima DESC
+                        LIMIT :max_erros
+                    ) erros
+                    JOIN questao_oab q ON q.id = erros.questao_id
+                    WHERE q.embedding IS NOT NULL
+                """,
+                colunas="id, numero_questao, enunciado, disciplina, assunto, dificuldade",
+                filtro="""
+                    NOT EXISTS (
+                        SELECT 1 FROM resposta r
+                        WHERE r.usuario_id = :usuario_id
+                          AND r.questao_id = vizinhos.id
+                    )
+                """
+            )),
+            {
+                "usuario_id": usuario_id,
+                "max_erros": self.MAX_ERROS_REVISAO,
+                "candidatos": candidatos,
+                "distancia_maxima": 1 - self.SIMILARIDADE_MINIMA_REVISAO,
+                "limite": limite
+            }
+        ).fetchall()
+
+        return [
+            {
+                "id": str(row[0]),
+                "numero_questao": row[1],
+                "enunciado": row[2][:200] + "...",
+                "disciplina": row[3],
+                "assunto": row[4],
+                "dificuldade": row[5],
+                "relevancia": 1 - float(row[6])
+            }
+            for row in recomendacoes
+        ]
+
+
+    def _recomendar_revisao_local(
+        self,
+        session: Session,
+        usuario_id: UUID,
+        limite: int
+    ) -> List[Dict]:
+        """
+        recomendar_revisao sobre o índice local.
+
+        O banco só fornece o histórico do usuário; os erros recentes são
+        buscados em um único lote no índice e mesclados pela maior similaridade.
+        """
+        historico = session.execute(
+            text("""
+                SELECT questao_id, correta
+                FROM resposta
+                WHERE usuario_id = :usuario_id
+                ORDER BY respondida_em DESC
+            """),
+            {"usuario_id": usuario_id}
+        ).fetchall()
+
+        respondidas = {str(row[0]) for row in historico}
+        erros_recentes = list(dict.fromkeys(
+            str(row[0]) for row in historico if row[1] is False
+        ))[:self.MAX_ERROS_REVISAO]
+        vetores_erros = list(self.indice_local.vetores(erros_recentes).values())
+
+        if not vetores_erros:
+            return []
+
+        melhores: Dict[str, Dict] = {}
+        for vizinhos in self.indice_local.buscar(
+            vetores_erros,
+            k=limite,
+            excluir_ids=respondidas,
+            similaridade_minima=self.SIMILARIDADE_MINIMA_REVISAO
+        ):
+            for item in vizinhos:
+                atual = melhores.get(item["id"])
+                if atual is None or item["similaridade"] > atual["similaridade"]:
+                    melhores[item["id"]] = item
+
+        recomendacoes = sorted(melhores.values(), key=lambda item: -item["similaridade"])[:limite]
+        return [
+            {
+                "id": item["id"],
+                "numero_questao": item["numero_questao"],
+                "enunciado": item["preview"] + "...",
+                "disciplina": item["disciplina"],
+                "assunto": item["assunto"],
+                "dificuldade": item["dificuldade"],
+                "relevancia": item["similaridade"]
+            }
+            for item in recomendacoes
+        ]
+
+
 # ================================================================================
 # FUNÇÕES AUXILIARES
 # ================================================================================
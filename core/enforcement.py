@@ -18,9 +18,11 @@ from datetime import datetime, date
 from enum import Enum
 import uuid
 
-from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 
+from database.connection import engine_registry
+
+from core.entitlements import obter_direitos
 from core.enforcement_messages import EnforcementMessages
 from core.enforcement_logger import EnforcementLogger
 from core.enforcement_heavy_user import HeavyUserEscapeValve
@@ -112,11 +114,14 @@ class LimitsEnforcement:
         Args:
             database_url: URL de conexão PostgreSQL
         """
-        self.engine = create_engine(database_url)
+        # Engine compartilhada por worker (pool único, métricas por componente)
+        self.engine = engine_registry.get_engine(database_url, componente="enforcement")
         self.Session = sessionmaker(bind=self.engine)
         self.messages = EnforcementMessages()
         self.logger = EnforcementLogger(database_url)
         self.heavy_user_escape = HeavyUserEscapeValve(database_url)
+        # Limites do plano e uso corrente em cache (core.entitlements)
+        self.direitos = obter_direitos(database_url)
 
     def check_can_start_session(
         self,
@@ -137,121 +142,82 @@ class LimitsEnforcement:
         Returns:
             EnforcementResult com decisão e mensagens
         """
-        session = self.Session()
-        try:
-            # Chamar função SQL pode_iniciar_sessao
-            result = session.execute(
-                text("SELECT * FROM pode_iniciar_sessao(:user_id, :modo_estudo_continuo)"),
-                {
-                    "user_id": user_id,
-                    "modo_estudo_continuo": modo_estudo_continuo
-                }
-            ).fetchone()
-
-            if result is None:
-                # Nenhum plano ativo
-                reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
-                msg = self.messages.get_message(reason)
-
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"],
-                    next_reset=None,
-                    current_usage=0,
-                    limit=0
-                )
+        # Mesma regra da função SQL pode_iniciar_sessao, sobre o snapshot
+        result = self.direitos.avaliar_inicio_sessao(user_id, modo_estudo_continuo)
 
-                # Log do bloqueio
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=0,
-                    limit=0,
-                    request_id=request_id
-                )
+        # Parse do resultado
+        pode_iniciar, motivo, sessoes_usadas, sessoes_disponiveis = result
 
-                return enforcement_result
+        if pode_iniciar:
+            # Permitido
+            return EnforcementResult(
+                allowed=True,
+                current_usage=sessoes_usadas,
+                limit=sessoes_usadas + sessoes_disponiveis
+            )
 
-            # Parse do resultado
-            pode_iniciar, motivo, sessoes_usadas, sessoes_disponiveis = result
+        # Bloqueado - determinar reason_code baseado no motivo
+        if "não permite estudo contínuo" in motivo.lower():
+            reason = ReasonCode.LIMIT_SESSIONS_CONTINUOUS_STUDY_NOT_ALLOWED
+        elif "limite de sessões diárias atingido" in motivo.lower():
+            reason = ReasonCode.LIMIT_SESSIONS_DAILY
+        elif "nenhuma assinatura ativa" in motivo.lower():
+            reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
+        else:
+            reason = ReasonCode.LIMIT_SESSIONS_DAILY  # fallback
+
+        # HEAVY USER ESCAPE VALVE
+        # Se bloqueio é por limite diário, tentar ativar escape para heavy users
+        if reason == ReasonCode.LIMIT_SESSIONS_DAILY:
+            escape_result = self.heavy_user_escape.check_and_activate(user_id)
+
+            if escape_result["activated"]:
+                # Escape ativado! Permitir sessão com mensagem especial
+                msg = self.messages.get_message(ReasonCode.HEAVY_USER_EXTRA_SESSION_GRANTED)
 
-            if pode_iniciar:
-                # Permitido
                 return EnforcementResult(
                     allowed=True,
                     current_usage=sessoes_usadas,
-                    limit=sessoes_usadas + sessoes_disponiveis
+                    limit=sessoes_usadas + sessoes_disponiveis + escape_result["extra_sessions"],
+                    metadata={
+                        "heavy_user_escape_activated": True,
+                        "escape_reason": escape_result["reason"],
+                        "extra_sessions_granted": escape_result["extra_sessions"],
+                        "sessions_last_7_days": escape_result["sessions_last_7_days"],
+                        "message_title": msg["title"],
+                        "message_body": msg["body"]
+                    }
                 )
 
-            # Bloqueado - determinar reason_code baseado no motivo
-            if "não permite estudo contínuo" in motivo.lower():
-                reason = ReasonCode.LIMIT_SESSIONS_CONTINUOUS_STUDY_NOT_ALLOWED
-            elif "limite de sessões diárias atingido" in motivo.lower():
-                reason = ReasonCode.LIMIT_SESSIONS_DAILY
-            elif "nenhuma assinatura ativa" in motivo.lower():
-                reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
-            else:
-                reason = ReasonCode.LIMIT_SESSIONS_DAILY  # fallback
-
-            # HEAVY USER ESCAPE VALVE
-            # Se bloqueio é por limite diário, tentar ativar escape para heavy users
-            if reason == ReasonCode.LIMIT_SESSIONS_DAILY:
-                escape_result = self.heavy_user_escape.check_and_activate(user_id)
-
-                if escape_result["activated"]:
-                    # Escape ativado! Permitir sessão com mensagem especial
-                    msg = self.messages.get_message(ReasonCode.HEAVY_USER_EXTRA_SESSION_GRANTED)
-
-                    return EnforcementResult(
-                        allowed=True,
-                        current_usage=sessoes_usadas,
-                        limit=sessoes_usadas + sessoes_disponiveis + escape_result["extra_sessions"],
-                        metadata={
-                            "heavy_user_escape_activated": True,
-                            "escape_reason": escape_result["reason"],
-                            "extra_sessions_granted": escape_result["extra_sessions"],
-                            "sessions_last_7_days": escape_result["sessions_last_7_days"],
-                            "message_title": msg["title"],
-                            "message_body": msg["body"]
-                        }
-                    )
-
-            # Escape não ativado ou outro motivo - prosseguir com bloqueio normal
-            msg = self.messages.get_message(reason)
-
-            # Calcular próximo reset (meia-noite)
-            tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            tomorrow = tomorrow.replace(day=tomorrow.day + 1)
-
-            enforcement_result = EnforcementResult(
-                allowed=False,
-                reason_code=reason,
-                message_title=msg["title"],
-                message_body=msg["body"],
-                upgrade_suggestion=msg["upgrade"],
-                next_reset=tomorrow,
-                current_usage=sessoes_usadas,
-                limit=sessoes_usadas + sessoes_disponiveis
-            )
-
-            # Log do bloqueio
-            self.logger.log_block(
-                user_id=user_id,
-                endpoint=endpoint,
-                reason_code=reason,
-                current_usage=sessoes_usadas,
-                limit=sessoes_usadas + sessoes_disponiveis,
-                request_id=request_id
-            )
-
-            return enforcement_result
-
-        finally:
-            session.close()
+        # Escape não ativado ou outro motivo - prosseguir com bloqueio normal
+        msg = self.messages.get_message(reason)
+
+        # Calcular próximo reset (meia-noite)
+        tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        tomorrow = tomorrow.replace(day=tomorrow.day + 1)
+
+        enforcement_result = EnforcementResult(
+            allowed=False,
+            reason_code=reason,
+            message_title=msg["title"],
+            message_body=msg["body"],
+            upgrade_suggestion=msg["upgrade"],
+            next_reset=tomorrow,
+            current_usage=sessoes_usadas,
+            limit=sessoes_usadas + sessoes_disponiveis
+        )
+
+        # Log do bloqueio
+        self.logger.log_block(
+            user_id=user_id,
+            endpoint=endpoint,
+            reason_code=reason,
+            current_usage=sessoes_usadas,
+            limit=sessoes_usadas + sessoes_disponiveis,
+            request_id=request_id
+        )
+
+        return enforcement_result
 
     def check_can_answer_question(
         self,
@@ -272,75 +238,56 @@ class LimitsEnforcement:
         Returns:
             EnforcementResult
         """
-        session = self.Session()
-        try:
-            # Buscar sessão e plano
-            result = session.execute(
-                text("""
-                    SELECT
-                        se.total_questoes,
-                        p.limite_questoes_por_sessao,
-                        p.limite_questoes_dia
-                    FROM sessao_estudo se
-                    INNER JOIN assinatura a ON se.user_id = a.user_id
-                    INNER JOIN plano p ON a.plano_id = p.id
-                    WHERE se.id = :session_id
-                      AND se.user_id = :user_id
-                      AND a.status = 'active'
-                      AND (a.data_fim IS NULL OR a.data_fim > NOW())
-                    ORDER BY a.data_inicio DESC
-                    LIMIT 1
-                """),
-                {"session_id": session_id, "user_id": user_id}
-            ).fetchone()
-
-            if not result:
-                return EnforcementResult(
-                    allowed=False,
-                    reason_code=ReasonCode.NO_ACTIVE_SUBSCRIPTION,
-                    message_title="Sessão inválida",
-                    message_body="Sessão não encontrada ou assinatura inativa.",
-                    upgrade_suggestion=None
-                )
+        snapshot = self.direitos.snapshot(user_id)
+        total_questoes = (
+            self.direitos.questoes_sessao(user_id, session_id)
+            if snapshot.vigente() else None
+        )
 
-            total_questoes, limite_por_sessao, limite_dia = result
-
-            # Verificar limite por sessão
-            if total_questoes >= limite_por_sessao:
-                reason = ReasonCode.LIMIT_QUESTIONS_SESSION
-                msg = self.messages.get_message(reason)
-
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"],
-                    current_usage=total_questoes,
-                    limit=limite_por_sessao
-                )
+        if total_questoes is None:
+            return EnforcementResult(
+                allowed=False,
+                reason_code=ReasonCode.NO_ACTIVE_SUBSCRIPTION,
+                message_title="Sessão inválida",
+                message_body="Sessão não encontrada ou assinatura inativa.",
+                upgrade_suggestion=None
+            )
 
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=total_questoes,
-                    limit=limite_por_sessao,
-                    request_id=request_id,
-                    metadata={"session_id": session_id}
-                )
+        limite_por_sessao = snapshot.limite_questoes_por_sessao
 
-                return enforcement_result
+        # Verificar limite por sessão (NULL = ilimitado)
+        if limite_por_sessao is not None and total_questoes >= limite_por_sessao:
+            reason = ReasonCode.LIMIT_QUESTIONS_SESSION
+            msg = self.messages.get_message(reason)
 
-            # Permitido
-            return EnforcementResult(
-                allowed=True,
+            enforcement_result = EnforcementResult(
+                allowed=False,
+                reason_code=reason,
+                message_title=msg["title"],
+                message_body=msg["body"],
+                upgrade_suggestion=msg["upgrade"],
                 current_usage=total_questoes,
                 limit=limite_por_sessao
             )
 
-        finally:
-            session.close()
+            self.logger.log_block(
+                user_id=user_id,
+                endpoint=endpoint,
+                reason_code=reason,
+                current_usage=total_questoes,
+                limit=limite_por_sessao,
+                request_id=request_id,
+                metadata={"session_id": session_id}
+            )
+
+            return enforcement_result
+
+        # Permitido
+        return EnforcementResult(
+            allowed=True,
+            current_usage=total_questoes,
+            limit=limite_por_sessao
+        )
 
     def check_can_practice_piece(
         self,
@@ -359,98 +306,74 @@ class LimitsEnforcement:
         Returns:
             EnforcementResult
         """
-        session = self.Session()
-        try:
-            # Buscar limite mensal de peças e uso atual
-            result = session.execute(
-                text("""
-                    SELECT
-                        p.limite_peca_mes,
-                        (
-                            SELECT COUNT(*)
-                            FROM pratica_peca pp
-                            WHERE pp.user_id = :user_id
-                              AND pp.criado_em >= DATE_TRUNC('month', CURRENT_DATE)
-                        ) as pecas_mes
-                    FROM assinatura a
-                    INNER JOIN plano p ON a.plano_id = p.id
-                    WHERE a.user_id = :user_id
-                      AND a.status = 'active'
-                      AND (a.data_fim IS NULL OR a.data_fim > NOW())
-                    ORDER BY a.data_inicio DESC
-                    LIMIT 1
-                """),
-                {"user_id": user_id}
-            ).fetchone()
-
-            if not result:
-                reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
-                msg = self.messages.get_message(reason)
-
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"]
-                )
+        snapshot = self.direitos.snapshot(user_id)
 
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=0,
-                    limit=0,
-                    request_id=request_id
-                )
+        if not snapshot.vigente():
+            reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
+            msg = self.messages.get_message(reason)
 
-                return enforcement_result
-
-            limite_mes, pecas_mes = result
-
-            # Verificar limite
-            if pecas_mes >= limite_mes:
-                reason = ReasonCode.LIMIT_PIECE_MONTHLY
-                msg = self.messages.get_message(reason)
-
-                # Próximo reset = início do próximo mês
-                next_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-                if next_month.month == 12:
-                    next_month = next_month.replace(year=next_month.year + 1, month=1)
-                else:
-                    next_month = next_month.replace(month=next_month.month + 1)
-
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"],
-                    next_reset=next_month,
-                    current_usage=pecas_mes,
-                    limit=limite_mes
-                )
+            enforcement_result = EnforcementResult(
+                allowed=False,
+                reason_code=reason,
+                message_title=msg["title"],
+                message_body=msg["body"],
+                upgrade_suggestion=msg["upgrade"]
+            )
 
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=pecas_mes,
-                    limit=limite_mes,
-                    request_id=request_id
-                )
+            self.logger.log_block(
+                user_id=user_id,
+                endpoint=endpoint,
+                reason_code=reason,
+                current_usage=0,
+                limit=0,
+                request_id=request_id
+            )
 
-                return enforcement_result
+            return enforcement_result
 
-            # Permitido
-            return EnforcementResult(
-                allowed=True,
+        limite_mes = snapshot.limite_peca_mes
+        pecas_mes = self.direitos.pecas_mes(user_id)
+
+        # Verificar limite (NULL = ilimitado)
+        if limite_mes is not None and pecas_mes >= limite_mes:
+            reason = ReasonCode.LIMIT_PIECE_MONTHLY
+            msg = self.messages.get_message(reason)
+
+            # Próximo reset = início do próximo mês
+            next_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            if next_month.month == 12:
+                next_month = next_month.replace(year=next_month.year + 1, month=1)
+            else:
+                next_month = next_month.replace(month=next_month.month + 1)
+
+            enforcement_result = EnforcementResult(
+                allowed=False,
+                reason_code=reason,
+                message_title=msg["title"],
+                message_body=msg["body"],
+                upgrade_suggestion=msg["upgrade"],
+                next_reset=next_month,
                 current_usage=pecas_mes,
                 limit=limite_mes
             )
 
-        finally:
-            session.close()
+            self.logger.log_block(
+                user_id=user_id,
+                endpoint=endpoint,
+                reason_code=reason,
+                current_usage=pecas_mes,
+                limit=limite_mes,
+                request_id=request_id
+            )
+
+            return enforcement_result
+
+        # Permitido
+        return EnforcementResult(
+            allowed=True,
+            current_usage=pecas_mes,
+            limit=limite_mes
+        )
 
     def check_can_access_complete_report(
         self,
@@ -469,75 +392,74 @@ class LimitsEnforcement:
         Returns:
             EnforcementResult
         """
-        session = self.Session()
-        try:
-            # Buscar tipo de relatório permitido
-            result = session.execute(
-                text("""
-                    SELECT p.acesso_relatorio_tipo
-                    FROM assinatura a
-                    INNER JOIN plano p ON a.plano_id = p.id
-                    WHERE a.user_id = :user_id
-                      AND a.status = 'active'
-                      AND (a.data_fim IS NULL OR a.data_fim > NOW())
-                    ORDER BY a.data_inicio DESC
-                    LIMIT 1
-                """),
-                {"user_id": user_id}
-            ).fetchone()
-
-            if not result:
-                reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
-                msg = self.messages.get_message(reason)
-
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"]
-                )
+        snapshot = self.direitos.snapshot(user_id)
 
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=0,
-                    limit=0,
-                    request_id=request_id
-                )
+        if not snapshot.vigente():
+            reason = ReasonCode.NO_ACTIVE_SUBSCRIPTION
+            msg = self.messages.get_message(reason)
 
-                return enforcement_result
+            enforcement_result = EnforcementResult(
+                allowed=False,
+                reason_code=reason,
+                message_title=msg["title"],
+                message_body=msg["body"],
+                upgrade_suggestion=msg["upgrade"]
+            )
 
-            tipo_relatorio = result[0]
+            self.logger.log_block(
+                user_id=user_id,
+                endpoint=endpoint,
+                reason_code=reason,
+                current_usage=0,
+                limit=0,
+                request_id=request_id
+            )
 
-            # Se é "basico", bloqueia acesso a relatório completo
-            if tipo_relatorio == 'basico':
-                reason = ReasonCode.FEATURE_REPORT_COMPLETE_NOT_ALLOWED
-                msg = self.messages.get_message(reason)
+            return enforcement_result
 
-                enforcement_result = EnforcementResult(
-                    allowed=False,
-                    reason_code=reason,
-                    message_title=msg["title"],
-                    message_body=msg["body"],
-                    upgrade_suggestion=msg["upgrade"]
-                )
+        tipo_relatorio = snapshot.acesso_relatorio_tipo
 
-                self.logger.log_block(
-                    user_id=user_id,
-                    endpoint=endpoint,
-                    reason_code=reason,
-                    current_usage=0,
-                    limit=0,
-                    request_id=request_id,
-                    metadata={"tipo_relatorio_atual": tipo_relatorio}
-                )
+        # Se é "basico", bloqueia acesso a relatório completo
+        if tipo_relatorio == 'basico':
+            reason = ReasonCode.FEATURE_REPORT_COMPLETE_NOT_ALLOWED
+            msg = self.messages.get_message(reason)
+
+            enforcement_result = EnforcementResult(
+                allowed=False,
+                reason_code=reason,
+                message_title=msg["title"],
+                message_body=msg["body"],
+                upgrade_suggestion=msg["upgrade"]
+            )
+
+            self.logger.log_block(
+                user_id=user_id,
+                endpoint=endpoint,
+                reason_code=reason,
+                current_usage=0,
+                limit=0,
+                request_id=request_id,
+                metadata={"tipo_relatorio_atual": tipo_relatorio}
+            )
+
+            return enforcement_result
+
+        # Permitido (completo ou nenhum - mas nenhum não deveria existir)
+        return EnforcementResult(allowed=True)
+
+    # ============================================================
+    # REGISTRO DE USO (contadores do snapshot de direitos)
+    # ============================================================
 
-                return enforcement_result
+    def registrar_sessao_iniciada(self, user_id: str, modo_estudo_continuo: bool = False) -> None:
+        """Conta a sessão iniciada após check_can_start_session permitir"""
+        # Estudo contínuo permitido não conta no limite (pode_iniciar_sessao)
+        self.direitos.registrar_sessao_iniciada(user_id, conta_limite_diario=not modo_estudo_continuo)
 
-            # Permitido (completo ou nenhum - mas nenhum não deveria existir)
-            return EnforcementResult(allowed=True)
+    def registrar_questao_respondida(self, user_id: str, session_id: str) -> None:
+        """Conta a questão respondida após check_can_answer_question permitir"""
+        self.direitos.registrar_questao_respondida(user_id, session_id)
 
-        finally:
-            session.close()
+    def registrar_peca_iniciada(self, user_id: str) -> None:
+        """Conta a peça iniciada após check_can_practice_piece permitir"""
+        self.direitos.registrar_peca_iniciada(user_id)
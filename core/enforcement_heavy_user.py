@@ -10,9 +10,12 @@ Data: 2025-12-19
 """
 
 from typing import Dict, Any, Optional
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from database.connection import engine_registry
+from core.feature_flags import obter_flags
+
 
 class HeavyUserEscapeValve:
     """Gerenciador de válvula de escape para heavy users"""
@@ -24,8 +27,9 @@ class HeavyUserEscapeValve:
         Args:
             database_url: URL de conexão PostgreSQL
         """
-        self.engine = create_engine(database_url)
+        self.engine = engine_registry.get_engine(database_url, componente="heavy_user_escape")
         self.Session = sessionmaker(bind=self.engine)
+        self.flags = obter_flags(database_url)
 
     def is_enabled(self) -> bool:
         """
@@ -34,28 +38,13 @@ class HeavyUserEscapeValve:
         Returns:
             True se habilitada, False caso contrário
         """
-        session = self.Session()
         try:
-            result = session.execute(
-                text("""
-                    SELECT enabled
-                    FROM feature_flags
-                    WHERE flag_name = 'heavy_user_escape_valve'
-                    LIMIT 1
-                """)
-            ).fetchone()
-
-            if not result:
-                # Se não existe flag, assume desabilitado
-                return False
-
-            return result[0]
+            # Snapshot local de feature_flags (sem consulta por chamada)
+            return self.flags.flag_habilitada('heavy_user_escape_valve')
 
         except Exception:
             # Se tabela não existe ou erro, assume desabilitado
             return False
-        finally:
-            session.close()
 
     def check_and_activate(self, user_id: str) -> Dict[str, Any]:
         """
@@ -268,6 +257,7 @@ class HeavyUserEscapeValve:
             session.commit()
         finally:
             session.close()
+        self.flags.recarregar()
 
     def disable(self) -> None:
         """Desabilita feature globalmente"""
@@ -283,3 +273,4 @@ class HeavyUserEscapeValve:
             session.commit()
         finally:
             session.close()
+        self.flags.recarregar()
@@ -15,11 +15,13 @@ Data: 2025-12-19
 
 from typing import Dict, Any, Optional
 from datetime import datetime
-import json
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 
+from database.connection import engine_registry
+from core.log_queue import fila_logs, destino_enforcement_log
+
 
 class EnforcementLogger:
     """Logger centralizado para eventos de enforcement"""
@@ -31,7 +33,7 @@ class EnforcementLogger:
         Args:
             database_url: URL de conexão PostgreSQL
         """
-        self.engine = create_engine(database_url)
+        self.engine = engine_registry.get_engine(database_url, componente="enforcement_logger")
         self.Session = sessionmaker(bind=self.engine)
 
         # Criar tabela de log se não existir
@@ -100,7 +102,11 @@ class EnforcementLogger:
         metadata: Optional[Dict[str, Any]] = None
     ) -> None:
         """
-        Registra evento de bloqueio.
+        Registra evento de bloqueio (sem bloquear a requisição).
+
+        O registro vai para a fila de logs (core.log_queue) e é gravado em
+        lote pela thread de fundo; com a fila cheia ele é descartado e
+        contado em fila_logs.metricas().
 
         Args:
             user_id: UUID do usuário
@@ -113,74 +119,18 @@ class EnforcementLogger:
             request_id: ID da requisição (correlação)
             metadata: Dados adicionais
         """
-        session = self.Session()
-        try:
-            # Buscar código do plano do usuário
-            plano_result = session.execute(
-                text("""
-                    SELECT p.codigo
-                    FROM assinatura a
-                    INNER JOIN plano p ON a.plano_id = p.id
-                    WHERE a.user_id = :user_id
-                      AND a.status = 'active'
-                      AND (a.data_fim IS NULL OR a.data_fim > NOW())
-                    ORDER BY a.data_inicio DESC
-                    LIMIT 1
-                """),
-                {"user_id": user_id}
-            ).fetchone()
-
-            plano_codigo = plano_result[0] if plano_result else None
-
-            # Inserir log
-            session.execute(
-                text("""
-                    INSERT INTO enforcement_log (
-                        user_id,
-                        endpoint,
-                        reason_code,
-                        plano_codigo,
-                        current_usage,
-                        limit_value,
-                        ip_address,
-                        user_agent,
-                        request_id,
-                        metadata
-                    ) VALUES (
-                        :user_id,
-                        :endpoint,
-                        :reason_code,
-                        :plano_codigo,
-                        :current_usage,
-                        :limit_value,
-                        :ip_address,
-                        :user_agent,
-                        :request_id,
-                        :metadata
-                    )
-                """),
-                {
-                    "user_id": user_id,
-                    "endpoint": endpoint,
-                    "reason_code": reason_code,
-                    "plano_codigo": plano_codigo,
-                    "current_usage": current_usage,
-                    "limit_value": limit,
-                    "ip_address": ip_address,
-                    "user_agent": user_agent,
-                    "request_id": request_id,
-                    "metadata": json.dumps(metadata) if metadata else None
-                }
-            )
-            session.commit()
-
-        except Exception as e:
-            session.rollback()
-            # Falha no log não deve quebrar o fluxo principal
-            print(f"[WARN] Erro ao registrar log de enforcement: {e}")
-
-        finally:
-            session.close()
+        # Gravação assíncrona em lote; plano_codigo é resolvido no lote
+        fila_logs.enfileirar(destino_enforcement_log(self.engine), {
+            "user_id": str(user_id),
+            "endpoint": endpoint,
+            "reason_code": reason_code,
+            "current_usage": current_usage,
+            "limit_value": limit,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "request_id": request_id,
+            "metadata": metadata or None
+        })
 
     def get_blocks_by_user(
         self,
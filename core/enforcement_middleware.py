@@ -94,8 +94,10 @@ class EnforcementMiddleware:
                         detail=result.to_dict()
                     )
 
-                # Permitido - executar função original
-                return await func(*args, **kwargs)
+                # Permitido - executar função original e contar a sessão
+                resposta = await func(*args, **kwargs)
+                self.enforcement.registrar_sessao_iniciada(user_id, modo_estudo_continuo)
+                return resposta
 
             return wrapper
         return decorator
@@ -149,7 +151,10 @@ class EnforcementMiddleware:
                             detail=result.to_dict()
                         )
 
-                return await func(*args, **kwargs)
+                resposta = await func(*args, **kwargs)
+                if session_id:
+                    self.enforcement.registrar_questao_respondida(user_id, session_id)
+                return resposta
 
             return wrapper
         return decorator
@@ -193,7 +198,9 @@ class EnforcementMiddleware:
                         detail=result.to_dict()
                     )
 
-                return await func(*args, **kwargs)
+                resposta = await func(*args, **kwargs)
+                self.enforcement.registrar_peca_iniciada(user_id)
+                return resposta
 
             return wrapper
         return decorator
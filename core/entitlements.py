@@ -0,0 +1,548 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Snapshot de Direitos do Plano por Usuário
+================================================================================
+Objetivo: Decidir o enforcement sem consultar assinatura/plano a cada requisição
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Snapshot por usuário com os limites do plano ativo (mesma seleção de
+  pode_iniciar_sessao: assinatura 'active', não expirada, mais recente),
+  guardado no Redis com TTL (ENTITLEMENT_SNAPSHOT_TTL_SECONDS); usuários sem
+  assinatura também são guardados
+- Uso corrente em contadores atômicos do Redis, um por período:
+  sessões do dia, peças do mês e questões de cada sessão. O contador é
+  semeado do banco (mesma contagem das funções SQL) quando não existe e
+  incrementado com INCR pelos registrar_*() após cada ação permitida
+- Verificação = uma ida ao Redis (snapshot + contador) e a regra de
+  pode_iniciar_sessao reproduzida em Python (incluindo NULL do SQL)
+- Webhooks de cobrança/assinatura chamam invalidar_direitos(user_id), que
+  descarta snapshot e contadores correntes (ressemeados do banco)
+- Sem Redis, um armazém em memória do processo (invalidação só local)
+- Falha do Redis em operação: leituras viram falta (snapshot e contagem
+  vêm do banco, como sem cache) e registrar_*() só registra o erro, sem
+  derrubar uma ação que já foi executada
+
+USO:
+    from core.entitlements import obter_direitos, invalidar_direitos
+
+    direitos = obter_direitos(database_url)
+    pode, motivo, usadas, disponiveis = direitos.avaliar_inicio_sessao(user_id, False)
+    direitos.registrar_sessao_iniciada(user_id)
+
+    invalidar_direitos(user_id)  # webhook de assinatura
+
+================================================================================
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from database.connection import engine_registry
+
+try:
+    from redis.exceptions import RedisError
+except ImportError:
+    # Sem o pacote redis só o armazém em memória é usado
+    RedisError = OSError
+
+try:
+    from zoneinfo import ZoneInfo
+    ZONEINFO_AVAILABLE = True
+except ImportError:
+    ZONEINFO_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+PREFIXO = "juris_ia:direitos"
+
+# Mensagens de pode_iniciar_sessao (migration 010 v2); LimitsEnforcement
+# classifica o motivo pelo texto
+MOTIVO_SEM_ASSINATURA = "Nenhuma assinatura ativa encontrada"
+MOTIVO_CONTINUO_PERMITIDO = "Estudo contínuo permitido (não conta no limite)"
+MOTIVO_CONTINUO_NEGADO = "Seu plano não permite estudo contínuo. Faça upgrade!"
+MOTIVO_LIMITE_DIARIO = "Limite de sessões diárias atingido. Continue amanhã ou estude conteúdo teórico!"
+MOTIVO_PERMITIDO = "Pode iniciar nova sessão"
+
+
+class SnapshotDireitos:
+    """Limites do plano ativo de um usuário (None = ilimitado, como no SQL)"""
+
+    __slots__ = (
+        "ativo", "plano_codigo", "limite_sessoes_dia", "sessoes_extras",
+        "permite_estudo_continuo", "limite_questoes_por_sessao",
+        "limite_questoes_dia", "limite_peca_mes", "acesso_relatorio_tipo",
+        "valido_ate"
+    )
+
+    def __init__(self, ativo: bool = False, valido_ate: Optional[float] = None, **limites: Any):
+        self.ativo = ativo
+        self.valido_ate = valido_ate  # epoch de data_fim (None = indeterminado)
+        for campo in self.__slots__[1:-1]:
+            setattr(self, campo, limites.get(campo))
+
+    def vigente(self) -> bool:
+        """Assinatura ativa e ainda dentro de data_fim"""
+        return self.ativo and (self.valido_ate is None or self.valido_ate > time.time())
+
+    def para_json(self) -> str:
+        return json.dumps({campo: getattr(self, campo) for campo in self.__slots__})
+
+    @classmethod
+    def de_json(cls, valor: str) -> "SnapshotDireitos":
+        return cls(**json.loads(valor))
+
+
+# ================================================================================
+# ARMAZÉNS
+# ================================================================================
+
+class ArmazemMemoria:
+    """Armazém chave/valor com TTL em memória do processo (sem Redis)"""
+
+    def __init__(self):
+        self._dados: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _valor(self, chave: str, agora: float) -> Optional[str]:
+        item = self._dados.get(chave)
+        if item is None:
+            return None
+        if item[1] <= agora:
+            del self._dados[chave]
+            return None
+        return item[0]
+
+    def obter(self, chaves: List[str]) -> List[Optional[str]]:
+        agora = time.monotonic()
+        with self._lock:
+            return [self._valor(chave, agora) for chave in chaves]
+
+    def gravar(self, chave: str, valor: Any, ttl: int, somente_se_ausente: bool = False) -> bool:
+        agora = time.monotonic()
+        with self._lock:
+            if somente_se_ausente and self._valor(chave, agora) is not None:
+                return False
+            self._dados[chave] = (str(valor), agora + ttl)
+            return True
+
+    def incrementar_se_existe(self, chave: str) -> Optional[int]:
+        agora = time.monotonic()
+        with self._lock:
+            valor = self._valor(chave, agora)
+            if valor is None:
+                return None
+            novo = int(valor) + 1
+            self._dados[chave] = (str(novo), self._dados[chave][1])
+            return novo
+
+    def remover(self, *chaves: str) -> None:
+        with self._lock:
+            for chave in chaves:
+                self._dados.pop(chave, None)
+
+
+class ArmazemRedis:
+    """
+    Armazém no Redis (compartilhado entre workers).
+
+    Erros do Redis não sobem: leitura devolve ausência (o chamador recorre
+    ao banco), gravação devolve False e um INCR que falhou tenta descartar
+    o contador, para ele ser ressemeado do banco no próximo uso.
+    """
+
+    # INCR que não cria a chave: contador ausente é semeado do banco
+    SCRIPT_INCR_SE_EXISTE = """
+        if redis.call('EXISTS', KEYS[1]) == 1 then
+            return redis.call('INCR', KEYS[1])
+        end
+        return false
+    """
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self._incr_se_existe = cliente.register_script(self.SCRIPT_INCR_SE_EXISTE)
+
+    def obter(self, chaves: List[str]) -> List[Optional[str]]:
+        try:
+            return self.cliente.mget(chaves)
+        except RedisError as e:
+            logger.warning(f"Redis indisponível ao ler direitos, consultando o banco: {e}")
+            return [None] * len(chaves)
+
+    def gravar(self, chave: str, valor: Any, ttl: int, somente_se_ausente: bool = False) -> bool:
+        try:
+            return bool(self.cliente.set(chave, valor, ex=ttl, nx=somente_se_ausente))
+        except RedisError as e:
+            logger.warning(f"Redis indisponível ao gravar {chave}: {e}")
+            return False
+
+    def incrementar_se_existe(self, chave: str) -> Optional[int]:
+        try:
+            resultado = self._incr_se_existe(keys=[chave])
+        except RedisError as e:
+            logger.warning(f"Redis indisponível ao incrementar {chave}: {e}")
+            # Contador sem este incremento ficaria abaixo do banco até expirar
+            try:
+                self.cliente.delete(chave)
+            except RedisError:
+                logger.error(f"Contador {chave} pode estar defasado até expirar")
+            return None
+        return int(resultado) if resultado is not None else None
+
+    def remover(self, *chaves: str) -> None:
+        if chaves:
+            self.cliente.delete(*chaves)
+
+
+_armazem_padrao = None
+_armazem_lock = threading.Lock()
+
+
+def obter_armazem():
+    """Armazém do processo: Redis (ENTITLEMENTS_BACKEND=redis) ou memória"""
+    global _armazem_padrao
+
+    if _armazem_padrao is None:
+        with _armazem_lock:
+            if _armazem_padrao is None:
+                if os.getenv("ENTITLEMENTS_BACKEND", "redis").lower() == "redis":
+                    try:
+                        from core.cache_service import obter_cache_service
+                        _armazem_padrao = ArmazemRedis(obter_cache_service().redis_client)
+                    except Exception as e:
+                        logger.warning(f"Redis indisponível para direitos, usando memória: {e}")
+                if _armazem_padrao is None:
+                    _armazem_padrao = ArmazemMemoria()
+
+    return _armazem_padrao
+
+
+# ================================================================================
+# CACHE DE DIREITOS
+# ================================================================================
+
+class CacheDireitos:
+    """
+    Snapshot de limites + contadores de uso por usuário.
+
+    Thread-safe; instâncias com o mesmo armazém compartilham os dados.
+    """
+
+    TTL_SNAPSHOT = int(os.getenv("ENTITLEMENT_SNAPSHOT_TTL_SECONDS", "300"))
+    TTL_CONTADOR_DIA = 2 * 86400
+    TTL_CONTADOR_MES = 32 * 86400
+
+    def __init__(self, database_url: Optional[str] = None, armazem=None):
+        """
+        Args:
+            database_url: URL do banco com assinatura/plano (None = aplicação)
+            armazem: Armazém do snapshot e contadores (default: obter_armazem())
+        """
+        self.engine = engine_registry.get_engine(database_url, componente="entitlements")
+        self.armazem = armazem if armazem is not None else obter_armazem()
+        self._fuso_banco = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    # ------------------------------------------------------------------
+    # Chaves e período corrente
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def chave_snapshot(user_id: Any) -> str:
+        return f"{PREFIXO}:snapshot:{user_id}"
+
+    @staticmethod
+    def chave_sessoes(user_id: Any, dia: date) -> str:
+        return f"{PREFIXO}:sessoes:{user_id}:{dia.isoformat()}"
+
+    @staticmethod
+    def chave_pecas(user_id: Any, dia: date) -> str:
+        return f"{PREFIXO}:pecas:{user_id}:{dia.strftime('%Y-%m')}"
+
+    @staticmethod
+    def chave_questoes_sessao(user_id: Any, session_id: Any) -> str:
+        return f"{PREFIXO}:questoes:{user_id}:{session_id}"
+
+    def hoje(self) -> date:
+        """CURRENT_DATE do banco (fuso da sessão do PostgreSQL, lido uma vez)"""
+        if self._fuso_banco is None:
+            with self.engine.connect() as conn:
+                fuso = conn.execute(text("SELECT current_setting('TimeZone')")).scalar()
+            try:
+                self._fuso_banco = ZoneInfo(fuso) if ZONEINFO_AVAILABLE else False
+            except Exception:
+                logger.warning(f"Fuso do banco desconhecido ({fuso}); usando o fuso local")
+                self._fuso_banco = False
+
+        if self._fuso_banco:
+            return datetime.now(self._fuso_banco).date()
+        return date.today()
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _carregar_snapshot(self, user_id: Any) -> SnapshotDireitos:
+        with self.engine.connect() as conn:
+            linha = conn.execute(
+                text("""
+                    SELECT
+                        p.codigo,
+                        p.limite_sessoes_dia,
+                        p.sessoes_extras_condicionais,
+                        p.permite_estudo_continuo,
+                        p.limite_questoes_por_sessao,
+                        p.limite_questoes_dia,
+                        p.limite_peca_mes,
+                        p.acesso_relatorio_tipo,
+                        EXTRACT(EPOCH FROM a.data_fim::timestamptz)
+                    FROM assinatura a
+                    INNER JOIN plano p ON a.plano_id = p.id
+                    WHERE a.user_id = :user_id
+                      AND a.status = 'active'
+                      AND (a.data_fim IS NULL OR a.data_fim > NOW())
+                    ORDER BY a.data_inicio DESC
+                    LIMIT 1
+                """),
+                {"user_id": str(user_id)}
+            ).fetchone()
+
+        if linha is None:
+            return SnapshotDireitos(ativo=False)
+
+        return SnapshotDireitos(
+            ativo=True,
+            plano_codigo=linha[0],
+            limite_sessoes_dia=linha[1],
+            sessoes_extras=linha[2],
+            permite_estudo_continuo=linha[3],
+            limite_questoes_por_sessao=linha[4],
+            limite_questoes_dia=linha[5],
+            limite_peca_mes=linha[6],
+            acesso_relatorio_tipo=linha[7],
+            valido_ate=float(linha[8]) if linha[8] is not None else None
+        )
+
+    def _resolver_snapshot(self, user_id: Any, valor: Optional[str]) -> SnapshotDireitos:
+        """Snapshot lido do armazém ou recarregado do banco"""
+        if valor is not None:
+            snapshot = SnapshotDireitos.de_json(valor)
+            # Expirada desde a carga: outra assinatura pode ter passado a valer
+            if not snapshot.ativo or snapshot.vigente():
+                with self._lock:
+                    self.acertos += 1
+                return snapshot
+
+        with self._lock:
+            self.faltas += 1
+        snapshot = self._carregar_snapshot(user_id)
+        self.armazem.gravar(self.chave_snapshot(user_id), snapshot.para_json(), self.TTL_SNAPSHOT)
+        return snapshot
+
+    def snapshot(self, user_id: Any) -> SnapshotDireitos:
+        """Limites do plano ativo do usuário"""
+        valor, = self.armazem.obter([self.chave_snapshot(user_id)])
+        return self._resolver_snapshot(user_id, valor)
+
+    # ------------------------------------------------------------------
+    # Contadores
+    # ------------------------------------------------------------------
+
+    def _semear(self, chave: str, ttl: int, sql: str, parametros: Dict[str, Any]) -> Optional[int]:
+        """Conta no banco e grava o contador se ninguém o criou antes"""
+        with self.engine.connect() as conn:
+            valor = conn.execute(text(sql), parametros).scalar()
+        if valor is None:
+            return None
+        if not self.armazem.gravar(chave, int(valor), ttl, somente_se_ausente=True):
+            atual, = self.armazem.obter([chave])
+            if atual is not None:
+                return int(atual)
+        return int(valor)
+
+    def _sessoes_do_dia(self, user_id: Any, dia: date, valor: Optional[str]) -> int:
+        if valor is not None:
+            return int(valor)
+        return self._semear(
+            self.chave_sessoes(user_id, dia),
+            self.TTL_CONTADOR_DIA,
+            """
+                SELECT COUNT(*)::INTEGER
+                FROM sessao_estudo
+                WHERE user_id = :user_id
+                  AND DATE(iniciado_em AT TIME ZONE 'America/Sao_Paulo') = :dia
+                  AND conta_limite_diario = true
+            """,
+            {"user_id": str(user_id), "dia": dia}
+        )
+
+    def sessoes_hoje(self, user_id: Any) -> int:
+        """Sessões de hoje que contam no limite diário"""
+        dia = self.hoje()
+        valor, = self.armazem.obter([self.chave_sessoes(user_id, dia)])
+        return self._sessoes_do_dia(user_id, dia, valor)
+
+    def pecas_mes(self, user_id: Any) -> int:
+        """Peças praticadas no mês corrente"""
+        dia = self.hoje()
+        chave = self.chave_pecas(user_id, dia)
+        valor, = self.armazem.obter([chave])
+        if valor is not None:
+            return int(valor)
+        return self._semear(
+            chave,
+            self.TTL_CONTADOR_MES,
+            """
+                SELECT COUNT(*)
+                FROM pratica_peca pp
+                WHERE pp.user_id = :user_id
+                  AND pp.criado_em >= DATE_TRUNC('month', CAST(:dia AS date))
+            """,
+            {"user_id": str(user_id), "dia": dia}
+        )
+
+    def questoes_sessao(self, user_id: Any, session_id: Any) -> Optional[int]:
+        """Questões respondidas na sessão (None = sessão não é do usuário)"""
+        chave = self.chave_questoes_sessao(user_id, session_id)
+        valor, = self.armazem.obter([chave])
+        if valor is not None:
+            return int(valor)
+        return self._semear(
+            chave,
+            self.TTL_CONTADOR_DIA,
+            """
+                SELECT COALESCE(total_questoes, 0)
+                FROM sessao_estudo
+                WHERE id = :session_id
+                  AND user_id = :user_id
+            """,
+            {"user_id": str(user_id), "session_id": str(session_id)}
+        )
+
+    # ------------------------------------------------------------------
+    # Decisões
+    # ------------------------------------------------------------------
+
+    def avaliar_inicio_sessao(
+        self,
+        user_id: Any,
+        modo_estudo_continuo: bool = False
+    ) -> Tuple[bool, str, int, Optional[int]]:
+        """
+        Equivalente a pode_iniciar_sessao(user_id, modo_estudo_continuo).
+
+        Returns:
+            (pode_iniciar, motivo, sessoes_usadas, sessoes_disponiveis)
+        """
+        dia = self.hoje()
+        valor_snapshot, valor_sessoes = self.armazem.obter([
+            self.chave_snapshot(user_id), self.chave_sessoes(user_id, dia)
+        ])
+        snapshot = self._resolver_snapshot(user_id, valor_snapshot)
+
+        if not snapshot.vigente():
+            return False, MOTIVO_SEM_ASSINATURA, 0, 0
+
+        # Lógica de três valores do SQL: NULL em permite_estudo_continuo
+        # não entra em nenhum dos dois ramos
+        if modo_estudo_continuo and snapshot.permite_estudo_continuo is True:
+            return True, MOTIVO_CONTINUO_PERMITIDO, 0, 999
+        if modo_estudo_continuo and snapshot.permite_estudo_continuo is False:
+            return False, MOTIVO_CONTINUO_NEGADO, 0, 0
+
+        usadas = self._sessoes_do_dia(user_id, dia, valor_sessoes)
+
+        if snapshot.limite_sessoes_dia is None or snapshot.sessoes_extras is None:
+            # NULL + n = NULL; a comparação com NULL nunca bloqueia
+            return True, MOTIVO_PERMITIDO, usadas, None
+
+        limite = snapshot.limite_sessoes_dia + snapshot.sessoes_extras
+        if usadas >= limite:
+            return False, MOTIVO_LIMITE_DIARIO, usadas, limite
+        return True, MOTIVO_PERMITIDO, usadas, limite
+
+    # ------------------------------------------------------------------
+    # Registro de uso e invalidação
+    # ------------------------------------------------------------------
+
+    # Chamados depois que a ação já aconteceu: falhas são registradas e não
+    # sobem (contador ausente ou descartado é semeado do banco no próximo uso)
+
+    def registrar_sessao_iniciada(self, user_id: Any, conta_limite_diario: bool = True) -> None:
+        """Conta uma sessão iniciada (contador ausente é semeado no próximo uso)"""
+        if not conta_limite_diario:
+            return
+        try:
+            self.armazem.incrementar_se_existe(self.chave_sessoes(user_id, self.hoje()))
+        except Exception as e:
+            logger.error(f"Erro ao registrar sessão do usuário {user_id}: {e}")
+
+    def registrar_questao_respondida(self, user_id: Any, session_id: Any) -> None:
+        try:
+            self.armazem.incrementar_se_existe(self.chave_questoes_sessao(user_id, session_id))
+        except Exception as e:
+            logger.error(f"Erro ao registrar questão do usuário {user_id}: {e}")
+
+    def registrar_peca_iniciada(self, user_id: Any) -> None:
+        try:
+            self.armazem.incrementar_se_existe(self.chave_pecas(user_id, self.hoje()))
+        except Exception as e:
+            logger.error(f"Erro ao registrar peça do usuário {user_id}: {e}")
+
+    def invalidar(self, user_id: Any) -> None:
+        """Descarta snapshot e contadores do período corrente do usuário"""
+        dia = self.hoje()
+        self.armazem.remover(
+            self.chave_snapshot(user_id),
+            self.chave_sessoes(user_id, dia),
+            self.chave_pecas(user_id, dia)
+        )
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"acertos": self.acertos, "faltas": self.faltas}
+
+
+# ================================================================================
+# INSTÂNCIAS COMPARTILHADAS
+# ================================================================================
+
+_instancias: Dict[Optional[str], CacheDireitos] = {}
+_instancias_lock = threading.Lock()
+
+
+def obter_direitos(database_url: Optional[str] = None) -> CacheDireitos:
+    """CacheDireitos do processo para o banco (criado no primeiro uso)"""
+    direitos = _instancias.get(database_url)
+    if direitos is None:
+        with _instancias_lock:
+            direitos = _instancias.get(database_url)
+            if direitos is None:
+                direitos = _instancias[database_url] = CacheDireitos(database_url)
+    return direitos
+
+
+def invalidar_direitos(user_id: Any) -> None:
+    """
+    Descarta os direitos em cache do usuário (webhooks de assinatura/cobrança).
+
+    Falhas são registradas e não interrompem quem chama; o TTL do snapshot
+    limita a defasagem nesse caso.
+    """
+    try:
+        obter_direitos().invalidar(user_id)
+    except Exception as e:
+        logger.error(f"Erro ao invalidar direitos do usuário {user_id}: {e}")
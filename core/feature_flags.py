@@ -0,0 +1,483 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Snapshot Local de Feature Flags e Experimentos A/B
+================================================================================
+Objetivo: Verificar flags e grupos de experimento sem consultar o banco
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Snapshot em memória do processo com as três tabelas de configuração:
+  feature_flags (válvulas globais), feature_flag (go-live: rollout,
+  whitelist, limite de usuários) e ab_experiments. Verificar uma flag é
+  uma leitura de dict; o snapshot é trocado por inteiro (sem lock na leitura)
+- Atualização:
+  - LISTEN no canal juris_ia_flags (triggers da migration 020 notificam
+    qualquer escrita nessas tabelas): recarga imediata
+  - Poll de flags_versao a cada FLAGS_POLL_SECONDS cobre notificações
+    perdidas (reconexão, driver sem LISTEN); sem a migration, o poll
+    recarrega as tabelas inteiras (poucas linhas)
+- Grupo de experimento calculado no processo com o mesmo hash de
+  atribuir_grupo_experimento (migration 012). A atribuição continua
+  gravada em ab_user_groups (métricas dependem dela), uma vez por
+  usuário/experimento; depois fica num LRU local
+- As regras de verificar_feature_habilitada (migration 005) são
+  reproduzidas em Python
+
+USO:
+    from core.feature_flags import obter_flags
+
+    flags = obter_flags(database_url)
+    if flags.flag_habilitada("heavy_user_escape_valve"):
+        ...
+    grupo, nova = flags.atribuir_grupo("oab_mensal_limite_ajustado_2025_q1", user_id)
+
+================================================================================
+"""
+
+import os
+import time
+import random
+import select
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from sqlalchemy import text
+
+from database.connection import engine_registry
+
+logger = logging.getLogger(__name__)
+
+
+CANAL = "juris_ia_flags"
+
+
+class SnapshotFlags:
+    """Configuração lida do banco num instante (imutável após a carga)"""
+
+    __slots__ = ("versao", "flags", "features", "experimentos", "carregado_em")
+
+    def __init__(
+        self,
+        versao: Optional[int],
+        flags: Dict[str, Optional[bool]],
+        features: Dict[str, Dict[str, Any]],
+        experimentos: Dict[str, Dict[str, Any]]
+    ):
+        self.versao = versao
+        self.flags = flags
+        self.features = features
+        self.experimentos = experimentos
+        self.carregado_em = time.time()
+
+
+def grupo_hash_modulo(user_id: Any, percentual_controle: float) -> str:
+    """
+    Grupo da estratégia hash_modulo, idêntico ao SQL:
+    ('x' || substring(user_id::text, 1, 8))::bit(32)::int, ABS, % 100.
+    """
+    valor = int(str(user_id)[:8], 16)
+    if valor >= 2 ** 31:
+        valor -= 2 ** 32  # bit(32)::int é com sinal
+    return "control" if abs(valor) % 100 < percentual_controle else "variant"
+
+
+class ClienteFlags:
+    """
+    Cliente de flags/experimentos com snapshot local.
+
+    Thread-safe. A carga inicial é síncrona (no primeiro uso); a thread de
+    atualização é iniciada junto (e reiniciada após fork).
+    """
+
+    INTERVALO_POLL = float(os.getenv("FLAGS_POLL_SECONDS", "5"))
+    MAX_ATRIBUICOES = int(os.getenv("FLAGS_MAX_ASSIGNMENTS", "100000"))
+    TTL_SEM_GRUPO = float(os.getenv("FLAGS_UNASSIGNED_TTL_SECONDS", "30"))
+
+    def __init__(self, database_url: Optional[str] = None, intervalo_poll: Optional[float] = None):
+        """
+        Args:
+            database_url: URL do banco com as tabelas de flags (None = aplicação)
+            intervalo_poll: Segundos entre verificações de versão
+        """
+        self.engine = engine_registry.get_engine(database_url, componente="feature_flags")
+        self.intervalo_poll = intervalo_poll if intervalo_poll is not None else self.INTERVALO_POLL
+
+        self._snapshot: Optional[SnapshotFlags] = None
+        self._lock = threading.Lock()
+        self._carga_lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._escutando = False
+
+        # (experiment_id, user_id) -> (grupo ou None, expira_em)
+        self._atribuicoes: "OrderedDict[Tuple[str, str], Tuple[Optional[str], float]]" = OrderedDict()
+        self.recargas = 0
+
+    # ------------------------------------------------------------------
+    # Carga do snapshot
+    # ------------------------------------------------------------------
+
+    def _carregar(self) -> SnapshotFlags:
+        with self.engine.connect() as conn:
+            existe_versao, existe_flags, existe_features, existe_experimentos = conn.execute(
+                text("""
+                    SELECT
+                        to_regclass('flags_versao') IS NOT NULL,
+                        to_regclass('feature_flags') IS NOT NULL,
+                        to_regclass('feature_flag') IS NOT NULL,
+                        to_regclass('ab_experiments') IS NOT NULL
+                """)
+            ).fetchone()
+
+            versao = None
+            if existe_versao:
+                versao = conn.execute(text("SELECT versao FROM flags_versao WHERE id = 1")).scalar()
+
+            flags = {}
+            if existe_flags:
+                flags = {
+                    nome: habilitada
+                    for nome, habilitada in conn.execute(
+                        text("SELECT flag_name, enabled FROM feature_flags")
+                    )
+                }
+
+            features = {}
+            if existe_features:
+                for codigo, habilitado, limite, atuais, whitelist in conn.execute(
+                    text("""
+                        SELECT codigo, habilitado, limite_usuarios, usuarios_atuais,
+                               whitelist_usuarios::text[]
+                        FROM feature_flag
+                    """)
+                ):
+                    features[codigo] = {
+                        "habilitado": habilitado,
+                        "limite_usuarios": limite,
+                        "usuarios_atuais": atuais,
+                        "whitelist": frozenset(whitelist) if whitelist is not None else None,
+                    }
+
+            experimentos = {}
+            if existe_experimentos:
+                for exp_id, nome, habilitado, estrategia, controle, metadata in conn.execute(
+                    text("""
+                        SELECT id::text, experiment_name, enabled, assignment_strategy,
+                               control_group_percentage, metadata
+                        FROM ab_experiments
+                    """)
+                ):
+                    experimentos[nome] = {
+                        "id": exp_id,
+                        "enabled": habilitado,
+                        "assignment_strategy": estrategia,
+                        "control_group_percentage": float(controle) if controle is not None else None,
+                        "metadata": metadata,
+                    }
+
+        return SnapshotFlags(versao, flags, features, experimentos)
+
+    def recarregar(self) -> SnapshotFlags:
+        """Recarrega o snapshot agora (ex.: após uma escrita local)"""
+        snapshot = self._carregar()
+        with self._lock:
+            self._snapshot = snapshot
+            self.recargas += 1
+        return snapshot
+
+    def snapshot(self) -> SnapshotFlags:
+        """Snapshot corrente (carregado no primeiro uso)"""
+        self._garantir_thread()
+        if self._snapshot is None:
+            with self._carga_lock:
+                if self._snapshot is None:
+                    self.recarregar()
+        return self._snapshot
+
+    # ------------------------------------------------------------------
+    # Flags
+    # ------------------------------------------------------------------
+
+    def flag_habilitada(self, nome: str) -> bool:
+        """Flag global de feature_flags (ausente = desabilitada)"""
+        return bool(self.snapshot().flags.get(nome))
+
+    def feature_habilitada(self, codigo: str, usuario_id: Optional[Any] = None) -> bool:
+        """Equivalente a verificar_feature_habilitada(codigo, usuario_id)"""
+        feature = self.snapshot().features.get(codigo)
+
+        # NOT NULL é NULL no plpgsql: habilitado NULL não cai no IF
+        if feature is None or feature["habilitado"] is False:
+            return False
+        if usuario_id is None:
+            return bool(feature["habilitado"])
+
+        whitelist: Optional[FrozenSet[str]] = feature["whitelist"]
+        if whitelist is not None and str(usuario_id) in whitelist:
+            return True
+
+        limite = feature["limite_usuarios"]
+        atuais = feature["usuarios_atuais"]
+        if limite is not None and atuais is not None and atuais >= limite:
+            return False
+
+        return True
+
+    # ------------------------------------------------------------------
+    # Experimentos
+    # ------------------------------------------------------------------
+
+    def experimento(self, nome: str) -> Optional[Dict[str, Any]]:
+        return self.snapshot().experimentos.get(nome)
+
+    def _atribuicao_local(self, exp_id: str, user_id: str) -> Tuple[bool, Optional[str]]:
+        """(encontrada, grupo) no LRU local"""
+        chave = (exp_id, user_id)
+        with self._lock:
+            entrada = self._atribuicoes.get(chave)
+            if entrada is None:
+                return False, None
+            if entrada[1] <= time.monotonic():
+                del self._atribuicoes[chave]
+                return False, None
+            self._atribuicoes.move_to_end(chave)
+            return True, entrada[0]
+
+    def _guardar_atribuicao(self, exp_id: str, user_id: str, grupo: Optional[str]) -> None:
+        # Atribuições não mudam; "sem grupo" pode mudar em outro worker
+        expira_em = float("inf") if grupo is not None else time.monotonic() + self.TTL_SEM_GRUPO
+        with self._lock:
+            self._atribuicoes[(exp_id, user_id)] = (grupo, expira_em)
+            self._atribuicoes.move_to_end((exp_id, user_id))
+            while len(self._atribuicoes) > self.MAX_ATRIBUICOES:
+                self._atribuicoes.popitem(last=False)
+
+    def atribuir_grupo(self, nome: str, user_id: Any) -> Optional[Tuple[str, bool]]:
+        """
+        Equivalente a atribuir_grupo_experimento(nome, user_id).
+
+        Returns:
+            (grupo, atribuicao_nova), ou None se o experimento não existe ou
+            está desabilitado
+        """
+        experimento = self.experimento(nome)
+        if experimento is None or not experimento["enabled"]:
+            return None
+
+        user_id = str(user_id)
+        encontrada, grupo = self._atribuicao_local(experimento["id"], user_id)
+        if encontrada and grupo is not None:
+            return grupo, False
+
+        estrategia = experimento["assignment_strategy"]
+        controle = experimento["control_group_percentage"]
+        if estrategia == "hash_modulo":
+            grupo = grupo_hash_modulo(user_id, controle)
+        elif estrategia == "random":
+            grupo = "control" if random.random() * 100 < controle else "variant"
+        else:
+            grupo = "control"
+
+        # Grava a atribuição; se já existia (outro worker, estratégia
+        # random/manual ou percentual alterado depois), vale a gravada
+        parametros = {"experiment_id": experimento["id"], "user_id": user_id, "grupo": grupo}
+        with self.engine.begin() as conn:
+            linha = conn.execute(
+                text("""
+                    WITH nova AS (
+                        INSERT INTO ab_user_groups (experiment_id, user_id, group_name)
+                        VALUES (CAST(:experiment_id AS uuid), CAST(:user_id AS uuid), :grupo)
+                        ON CONFLICT (experiment_id, user_id) DO NOTHING
+                        RETURNING group_name
+                    )
+                    SELECT group_name, true FROM nova
+                    UNION ALL
+                    SELECT group_name, false
+                    FROM ab_user_groups
+                    WHERE experiment_id = CAST(:experiment_id AS uuid)
+                      AND user_id = CAST(:user_id AS uuid)
+                    LIMIT 1
+                """),
+                parametros
+            ).fetchone()
+
+            if linha is None:
+                # INSERT concorrente confirmado depois do snapshot da instrução:
+                # o ON CONFLICT esperou por ele, mas o SELECT não o enxerga.
+                # Em READ COMMITTED uma nova instrução já lê a linha gravada
+                linha = conn.execute(
+                    text("""
+                        SELECT group_name, false
+                        FROM ab_user_groups
+                        WHERE experiment_id = CAST(:experiment_id AS uuid)
+                          AND user_id = CAST(:user_id AS uuid)
+                    """),
+                    parametros
+                ).fetchone()
+
+        grupo, nova = linha
+        self._guardar_atribuicao(experimento["id"], user_id, grupo)
+        return grupo, nova
+
+    def grupo_usuario(self, nome: str, user_id: Any, somente_habilitado: bool = True) -> Optional[str]:
+        """Grupo já atribuído ao usuário (não atribui)"""
+        experimento = self.experimento(nome)
+        if experimento is None or (somente_habilitado and not experimento["enabled"]):
+            return None
+
+        user_id = str(user_id)
+        encontrada, grupo = self._atribuicao_local(experimento["id"], user_id)
+        if encontrada:
+            return grupo
+
+        with self.engine.connect() as conn:
+            grupo = conn.execute(
+                text("""
+                    SELECT group_name
+                    FROM ab_user_groups
+                    WHERE experiment_id = CAST(:experiment_id AS uuid)
+                      AND user_id = CAST(:user_id AS uuid)
+                    LIMIT 1
+                """),
+                {"experiment_id": experimento["id"], "user_id": user_id}
+            ).scalar()
+
+        self._guardar_atribuicao(experimento["id"], user_id, grupo)
+        return grupo
+
+    def config_experimento(self, nome: str, user_id: Any) -> Optional[Dict[str, Any]]:
+        """Equivalente a obter_config_experimento: grupo e config do grupo"""
+        grupo = self.grupo_usuario(nome, user_id)
+        if grupo is None:
+            return None
+        metadata = self.experimento(nome)["metadata"]
+        return {
+            "group_name": grupo,
+            "config": metadata.get(grupo, {}) if metadata else {}
+        }
+
+    # ------------------------------------------------------------------
+    # Atualização em segundo plano
+    # ------------------------------------------------------------------
+
+    def _abrir_escuta(self):
+        """Conexão dedicada (fora do pool) em LISTEN; None se indisponível"""
+        if self.engine.dialect.driver != "psycopg2":
+            return None
+        try:
+            conexao = self.engine.raw_connection()
+            conexao.detach()
+            dbapi = conexao.dbapi_connection
+            dbapi.rollback()  # Transação aberta pelo evento "connect" do pool
+            dbapi.autocommit = True
+            with dbapi.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL}")
+            return dbapi
+        except Exception as e:
+            logger.warning(f"LISTEN {CANAL} indisponível, usando só poll: {e}")
+            return None
+
+    def _aguardar_notificacao(self, dbapi) -> bool:
+        """Espera até o próximo poll; True se chegou notificação"""
+        if dbapi is None:
+            self._parar.wait(self.intervalo_poll)
+            return False
+        if select.select([dbapi], [], [], self.intervalo_poll) == ([], [], []):
+            return False
+        dbapi.poll()
+        notificado = bool(dbapi.notifies)
+        dbapi.notifies.clear()
+        return notificado
+
+    def _versao_mudou(self) -> bool:
+        atual = self._snapshot
+        if atual is None or atual.versao is None:
+            return True  # Sem flags_versao (migration 020): recarga completa
+        with self.engine.connect() as conn:
+            versao = conn.execute(text("SELECT versao FROM flags_versao WHERE id = 1")).scalar()
+        return versao != atual.versao
+
+    def _executar(self) -> None:
+        dbapi = None
+        while not self._parar.is_set():
+            if dbapi is None:
+                dbapi = self._abrir_escuta()
+                self._escutando = dbapi is not None
+            try:
+                notificado = self._aguardar_notificacao(dbapi)
+            except Exception as e:
+                logger.warning(f"Conexão LISTEN perdida: {e}")
+                try:
+                    dbapi.close()
+                except Exception:
+                    pass
+                dbapi = None
+                self._escutando = False
+                notificado = True  # Pode ter perdido notificações
+
+            if self._parar.is_set():
+                break
+            try:
+                if notificado or self._versao_mudou():
+                    self.recarregar()
+            except Exception as e:
+                logger.error(f"Erro ao atualizar snapshot de flags: {e}")
+
+        if dbapi is not None:
+            dbapi.close()
+
+    def _garantir_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._executar, name="feature-flags", daemon=True
+            )
+            self._thread.start()
+
+    def encerrar(self) -> None:
+        """Para a thread de atualização"""
+        self._parar.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(self.intervalo_poll + 1)
+        self._thread = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        with self._lock:
+            return {
+                "versao": snapshot.versao if snapshot else None,
+                "carregado_em": snapshot.carregado_em if snapshot else None,
+                "recargas": self.recargas,
+                "escutando": self._escutando,
+                "atribuicoes_em_cache": len(self._atribuicoes),
+            }
+
+
+# ================================================================================
+# INSTÂNCIAS COMPARTILHADAS
+# ================================================================================
+
+_instancias: Dict[Optional[str], ClienteFlags] = {}
+_instancias_lock = threading.Lock()
+
+
+def obter_flags(database_url: Optional[str] = None) -> ClienteFlags:
+    """ClienteFlags do processo para o banco (criado no primeiro uso)"""
+    cliente = _instancias.get(database_url)
+    if cliente is None:
+        with _instancias_lock:
+            cliente = _instancias.get(database_url)
+            if cliente is None:
+                cliente = _instancias[database_url] = ClienteFlags(database_url)
+    return cliente
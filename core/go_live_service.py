@@ -21,6 +21,7 @@ from typing import Dict, Optional, Tuple, List
 from uuid import UUID, uuid4
 from sqlalchemy import text
 from database.connection import DatabaseConnection
+from core.feature_flags import obter_flags
 
 
 class GoLiveService:
@@ -48,18 +49,8 @@ class GoLiveService:
         Returns:
             True se habilitada
         """
-        with self.db.get_session() as session:
-            result = session.execute(
-                text("""
-                    SELECT verificar_feature_habilitada(:codigo, :usuario_id)
-                """),
-                {
-                    "codigo": codigo_feature,
-                    "usuario_id": usuario_id
-                }
-            ).fetchone()
-
-            return result[0] if result else False
+        # Regras de verificar_feature_habilitada sobre o snapshot local
+        return obter_flags().feature_habilitada(codigo_feature, usuario_id)
 
     def obter_features_habilitadas(self) -> List[Dict]:
         """
@@ -121,6 +112,7 @@ class GoLiveService:
                 }
             )
             session.commit()
+            obter_flags().recarregar()
 
             # Log evento
             self.registrar_evento(
@@ -159,6 +151,7 @@ class GoLiveService:
                 {"codigo": codigo_feature}
             )
             session.commit()
+            obter_flags().recarregar()
 
             # Log evento
             self.registrar_evento(
@@ -0,0 +1,361 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Leaderboards em Sorted Sets do Redis
+================================================================================
+Objetivo: Ranking top-N e "minha posição ± k" em O(log n), sem ORDER BY no banco
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Três tipos de sorted set (membro = user_id):
+  - global: pontuacao_global de perfil_juridico (ZADD do valor absoluto)
+  - disciplina: questoes_corretas de progresso_disciplina na disciplina
+  - semanal: FP de gamificação ganhos na semana ISO (ZINCRBY do delta;
+    expira em 5 semanas)
+- Atualização incremental após o commit da transação externa de quem
+  mudou a pontuação (increment_score, update_stats, ação de gamificação;
+  core.apos_commit); rollback descarta, inclusive o de um SAVEPOINT
+- Reconciliação periódica (global e disciplinas) reconstrói os sets a
+  partir do banco em chaves temporárias e troca com RENAME (atômico);
+  um worker por vez (lock no Redis)
+- Antes da primeira reconciliação (Redis novo) ou com Redis indisponível,
+  consultas global/disciplina devolvem None e o chamador usa o banco
+
+USO:
+    from core.leaderboard import leaderboards
+
+    leaderboards.top(10)                              # [(user_id, score), ...]
+    leaderboards.vizinhanca(user_id, k=5)             # [(posicao, user_id, score), ...]
+    leaderboards.top(10, tipo="disciplina", disciplina="Direito Civil")
+
+================================================================================
+"""
+
+import time
+import logging
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from core.apos_commit import agendar_apos_commit
+
+logger = logging.getLogger(__name__)
+
+
+TIPOS = ("global", "semanal", "disciplina")
+
+
+class Leaderboards:
+    """
+    Leaderboards mantidos em sorted sets do Redis.
+
+    Thread-safe (o cliente Redis é). Falhas do Redis são registradas e não
+    interrompem quem atualiza a pontuação.
+    """
+
+    PREFIXO = "juris_ia:leaderboard"
+    TTL_SEMANAL = 5 * 7 * 86400
+    LOTE_RECONCILIACAO = 1000
+    ESPERA_RECONEXAO = 60
+
+    def __init__(self, cliente=None):
+        """
+        Args:
+            cliente: Cliente Redis (decode_responses=True); None = o do CacheService
+        """
+        self._cliente = cliente
+        self._falhou_em: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def cliente(self):
+        """Cliente Redis, ou None se indisponível (nova tentativa a cada minuto)"""
+        if self._cliente is not None:
+            return self._cliente
+        if self._falhou_em is not None and time.monotonic() - self._falhou_em < self.ESPERA_RECONEXAO:
+            return None
+        with self._lock:
+            if self._cliente is None:
+                try:
+                    from core.cache_service import obter_cache_service
+                    self._cliente = obter_cache_service().redis_client
+                    self._falhou_em = None
+                except Exception as e:
+                    self._falhou_em = time.monotonic()
+                    logger.warning(f"Redis indisponível para leaderboards: {e}")
+        return self._cliente
+
+    # ------------------------------------------------------------------
+    # Chaves
+    # ------------------------------------------------------------------
+
+    def chave(self, tipo: str = "global", disciplina: Optional[str] = None, dia: Optional[date] = None) -> str:
+        if tipo == "global":
+            return f"{self.PREFIXO}:global"
+        if tipo == "disciplina":
+            if not disciplina:
+                raise ValueError("disciplina é obrigatória para o leaderboard por disciplina")
+            return f"{self.PREFIXO}:disciplina:{disciplina}"
+        if tipo == "semanal":
+            ano, semana, _ = (dia or date.today()).isocalendar()
+            return f"{self.PREFIXO}:semanal:{ano}-W{semana:02d}"
+        raise ValueError(f"Tipo de leaderboard desconhecido: {tipo}")
+
+    def chave_reconciliado(self) -> str:
+        """Marcador da última reconciliação (sets global/disciplina completos)"""
+        return f"{self.PREFIXO}:reconciliado_em"
+
+    # ------------------------------------------------------------------
+    # Atualização
+    # ------------------------------------------------------------------
+
+    def atualizar(
+        self,
+        user_id: Any,
+        pontuacao_global: Optional[int] = None,
+        delta: int = 0,
+        disciplina: Optional[str] = None,
+        corretas_disciplina: Optional[int] = None
+    ) -> None:
+        """Aplica uma mudança de pontuação já confirmada no banco"""
+        self.aplicar([{
+            "user_id": user_id,
+            "pontuacao_global": pontuacao_global,
+            "delta": delta,
+            "disciplina": disciplina,
+            "corretas_disciplina": corretas_disciplina,
+        }])
+
+    def aplicar(self, atualizacoes: List[Dict[str, Any]]) -> None:
+        """Aplica várias atualizações num único pipeline"""
+        cliente = self.cliente()
+        if cliente is None or not atualizacoes:
+            return
+
+        chave_semanal = self.chave("semanal")
+        try:
+            pipe = cliente.pipeline(transaction=False)
+            for item in atualizacoes:
+                membro = str(item["user_id"])
+                if item.get("pontuacao_global") is not None:
+                    pipe.zadd(self.chave("global"), {membro: item["pontuacao_global"]})
+                if item.get("delta"):
+                    pipe.zincrby(chave_semanal, item["delta"], membro)
+                    pipe.expire(chave_semanal, self.TTL_SEMANAL)
+                if item.get("disciplina") and item.get("corretas_disciplina") is not None:
+                    pipe.zadd(
+                        self.chave("disciplina", item["disciplina"]),
+                        {membro: item["corretas_disciplina"]}
+                    )
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar leaderboards ({len(atualizacoes)} itens): {e}")
+
+    def registrar_apos_commit(self, session: Session, user_id: Any, **mudanca: Any) -> None:
+        """
+        Agenda atualizar(user_id, **mudanca) para quando a transação externa
+        de `session` confirmar (SAVEPOINT desfeito descarta o que fez)
+        """
+        agendar_apos_commit(
+            session, "_leaderboard_pendentes",
+            {"user_id": user_id, **mudanca},
+            _publicar_pendentes
+        )
+
+    # ------------------------------------------------------------------
+    # Consultas (O(log n + resultado))
+    # ------------------------------------------------------------------
+
+    def top(
+        self,
+        n: int = 10,
+        tipo: str = "global",
+        disciplina: Optional[str] = None
+    ) -> Optional[List[Tuple[str, float]]]:
+        """
+        Top-N do leaderboard.
+
+        Returns:
+            [(user_id, score)] em ordem decrescente, ou None se o leaderboard
+            não está disponível no Redis (usar o banco)
+        """
+        cliente = self.cliente()
+        if cliente is None:
+            return None
+        chave = self.chave(tipo, disciplina)
+        try:
+            pipe = cliente.pipeline(transaction=False)
+            pipe.exists(self.chave_reconciliado())
+            pipe.zrevrange(chave, 0, n - 1, withscores=True)
+            reconciliado, itens = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao ler leaderboard {chave}: {e}")
+            return None
+        if not reconciliado and tipo != "semanal":
+            return None  # Set parcial (só incrementos) até a primeira reconciliação
+        return itens
+
+    def posicao(
+        self,
+        user_id: Any,
+        tipo: str = "global",
+        disciplina: Optional[str] = None
+    ) -> Optional[Tuple[Optional[int], Optional[float]]]:
+        """
+        Posição (1 = primeiro) e score do usuário.
+
+        Returns:
+            (posicao, score), (None, None) se o usuário não está no ranking,
+            ou None se o leaderboard não está disponível
+        """
+        cliente = self.cliente()
+        if cliente is None:
+            return None
+        chave = self.chave(tipo, disciplina)
+        try:
+            pipe = cliente.pipeline(transaction=False)
+            pipe.exists(self.chave_reconciliado())
+            pipe.zrevrank(chave, str(user_id))
+            pipe.zscore(chave, str(user_id))
+            reconciliado, rank, score = pipe.execute()
+        except Exception as e:
+            logger.warning(f"Falha ao ler posição em {chave}: {e}")
+            return None
+        if not reconciliado and tipo != "semanal":
+            return None
+        if rank is None:
+            return None, None
+        return rank + 1, score
+
+    def vizinhanca(
+        self,
+        user_id: Any,
+        k: int = 5,
+        tipo: str = "global",
+        disciplina: Optional[str] = None
+    ) -> Optional[List[Tuple[int, str, float]]]:
+        """
+        Usuários em posição ± k em torno do usuário (ele incluído).
+
+        Returns:
+            [(posicao, user_id, score)], [] se o usuário não está no ranking,
+            ou None se o leaderboard não está disponível
+        """
+        resultado = self.posicao(user_id, tipo, disciplina)
+        if resultado is None:
+            return None
+        posicao, _ = resultado
+        if posicao is None:
+            return []
+
+        inicio = max(0, posicao - 1 - k)
+        try:
+            itens = self.cliente().zrevrange(
+                self.chave(tipo, disciplina), inicio, posicao - 1 + k, withscores=True
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao ler vizinhança no leaderboard: {e}")
+            return None
+        return [(inicio + i + 1, membro, score) for i, (membro, score) in enumerate(itens)]
+
+    # ------------------------------------------------------------------
+    # Reconciliação com o banco
+    # ------------------------------------------------------------------
+
+    def _reconstruir(self, cliente, chave: str, linhas) -> int:
+        """Grava as linhas (membro, score) em chave temporária e troca"""
+        temporaria = f"{chave}:reconstrucao"
+        cliente.delete(temporaria)
+        total = 0
+        lote: Dict[str, float] = {}
+        for membro, score in linhas:
+            lote[str(membro)] = score
+            if len(lote) >= self.LOTE_RECONCILIACAO:
+                cliente.zadd(temporaria, lote)
+                total += len(lote)
+                lote = {}
+        if lote:
+            cliente.zadd(temporaria, lote)
+            total += len(lote)
+
+        # Atualizações entre a leitura e o RENAME se perdem só até a
+        # próxima mudança do usuário (ZADD grava o valor absoluto)
+        if total:
+            cliente.rename(temporaria, chave)
+        else:
+            cliente.delete(chave)
+        return total
+
+    def reconciliar(self, session: Session) -> Optional[Dict[str, int]]:
+        """
+        Reconstrói os leaderboards global e por disciplina a partir do banco.
+
+        O semanal não tem fonte no banco (FP por semana não é persistido) e
+        segue só incremental.
+
+        Returns:
+            Membros por leaderboard, ou None se Redis indisponível ou outro
+            worker já está reconciliando
+        """
+        cliente = self.cliente()
+        if cliente is None:
+            return None
+
+        lock = cliente.lock(f"{self.PREFIXO}:reconciliacao:lock", timeout=600, blocking=False)
+        if not lock.acquire():
+            return None
+
+        try:
+            resultado = {}
+            lotes = {"yield_per": self.LOTE_RECONCILIACAO}
+            global_ = session.execute(
+                text("SELECT user_id, pontuacao_global FROM perfil_juridico"),
+                execution_options=lotes
+            )
+            resultado["global"] = self._reconstruir(cliente, self.chave("global"), global_)
+
+            disciplinas = session.execute(
+                text("SELECT DISTINCT disciplina FROM progresso_disciplina")
+            ).scalars().all()
+            chaves_atuais = {self.chave("disciplina", d) for d in disciplinas}
+
+            for disciplina in disciplinas:
+                linhas = session.execute(
+                    text("""
+                        SELECT user_id, questoes_corretas
+                        FROM progresso_disciplina
+                        WHERE disciplina = :disciplina
+                    """),
+                    {"disciplina": disciplina},
+                    execution_options=lotes
+                )
+                resultado[f"disciplina:{disciplina}"] = self._reconstruir(
+                    cliente, self.chave("disciplina", disciplina), linhas
+                )
+
+            # Disciplinas que não existem mais no banco
+            for chave in cliente.scan_iter(match=f"{self.PREFIXO}:disciplina:*"):
+                if chave not in chaves_atuais and not chave.endswith(":reconstrucao"):
+                    cliente.delete(chave)
+
+            cliente.set(self.chave_reconciliado(), int(time.time()))
+            return resultado
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                pass
+
+
+def _publicar_pendentes(pendentes: List[Dict[str, Any]]) -> None:
+    leaderboards.aplicar(pendentes)
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+leaderboards = Leaderboards()
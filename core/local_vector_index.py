@@ -0,0 +1,404 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Índice Vetorial Local (NumPy + memmap)
+================================================================================
+Objetivo: Busca por similaridade sem pgvector e sem round trip ao banco
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ARQUIVOS (por modelo/dimensão, em VECTOR_INDEX_LOCAL_DIR):
+- <modelo>_<dims>.f32     Matriz float32 (linhas x dims), vetores L2-normalizados,
+                          somente append; lida via np.memmap
+- <modelo>_<dims>.jsonl   Uma linha de metadados por vetor (id, numero_questao,
+                          disciplina, assunto, dificuldade, preview)
+
+Reescrever o embedding de uma questão acrescenta uma linha nova; a anterior
+fica inativa (vale a última ocorrência do id). compactar() regrava sem elas.
+
+CONSISTÊNCIA:
+- Escrita: vetores primeiro, metadados depois (sob lock). Leitores usam
+  min(linhas de vetor, linhas de metadados), então um append interrompido
+  nunca expõe vetor sem metadados.
+- Leitura: carga preguiçosa no primeiro uso; a cada busca, se o arquivo
+  cresceu (outro processo/worker escreveu), só as linhas novas são lidas.
+- Recarga com lock compartilhado no arquivo .lock; escrita e compactar()
+  com lock exclusivo. compactar() troca os dois arquivos com dois
+  os.replace: sob o lock, nenhum leitor vê a matriz nova com os metadados
+  antigos. Sem mudança (inodes e tamanho iguais) a busca não trava nada.
+
+BUSCA:
+- Similaridade de cosseno = produto interno (vetores normalizados)
+- Top-k em lote: (consultas x dims) @ (dims x linhas) por blocos de linhas,
+  com máscara de filtros (disciplina/assunto) e exclusão de ids
+
+================================================================================
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Lock entre processos (workers uvicorn); ausente no Windows
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+DIRETORIO_PADRAO = os.getenv(
+    "VECTOR_INDEX_LOCAL_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "indices_vetoriais")
+)
+
+# Linhas por bloco no produto matricial (limita memória temporária)
+LINHAS_POR_BLOCO = 65536
+
+TAMANHO_PREVIEW = 200
+
+CAMPOS_METADADOS = ("numero_questao", "disciplina", "assunto", "dificuldade", "preview")
+
+
+def normalizar(vetores: np.ndarray) -> np.ndarray:
+    """L2-normaliza as linhas (float32); vetores nulos ficam nulos"""
+    vetores = np.asarray(vetores, dtype=np.float32)
+    normas = np.linalg.norm(vetores, axis=-1, keepdims=True)
+    return vetores / np.where(normas == 0, 1, normas)
+
+
+class _Categorias:
+    """Códigos inteiros de uma coluna categórica (filtro vetorizado)"""
+
+    def __init__(self):
+        self.codigo_por_valor: Dict[Optional[str], int] = {}
+        self.codigos = np.empty(0, dtype=np.int32)
+
+    def acrescentar(self, valores: Iterable[Optional[str]]) -> None:
+        novos = [self.codigo_por_valor.setdefault(v, len(self.codigo_por_valor)) for v in valores]
+        self.codigos = np.concatenate([self.codigos, np.asarray(novos, dtype=np.int32)])
+
+    def mascara(self, valor: str) -> np.ndarray:
+        codigo = self.codigo_por_valor.get(valor)
+        if codigo is None:
+            return np.zeros(len(self.codigos), dtype=bool)
+        return self.codigos == codigo
+
+
+class IndiceVetorialLocal:
+    """Índice de embeddings em arquivo (um por modelo/dimensão)"""
+
+    def __init__(self, modelo: str, dimensoes: int, diretorio: Optional[str] = None):
+        self.modelo = modelo
+        self.dimensoes = dimensoes
+        self.diretorio = diretorio or DIRETORIO_PADRAO
+
+        base = os.path.join(self.diretorio, f"{re.sub(r'[^A-Za-z0-9_.-]', '_', modelo)}_{dimensoes}")
+        self.caminho_vetores = f"{base}.f32"
+        self.caminho_metadados = f"{base}.jsonl"
+        self.caminho_lock = f"{base}.lock"
+
+        self._lock = threading.RLock()
+        self._resetar()
+
+    def _resetar(self) -> None:
+        self._carregado = False
+        self._inodes: Optional[Tuple[int, int]] = None
+        self._matriz: Optional[np.ndarray] = None
+        self._linhas = 0
+        self._offset_metadados = 0
+        self._metadados: List[Dict[str, Any]] = []
+        self._linha_por_id: Dict[str, int] = {}
+        self._ativo = np.empty(0, dtype=bool)
+        self._disciplinas = _Categorias()
+        self._assuntos = _Categorias()
+
+    # ============================================================================
+    # CARGA / ATUALIZAÇÃO
+    # ============================================================================
+
+    @property
+    def _bytes_por_linha(self) -> int:
+        return 4 * self.dimensoes
+
+    def _atualizar(self, travado: bool = False) -> None:
+        """
+        Carrega (1ª vez) ou acrescenta as linhas escritas desde a última leitura.
+
+        Args:
+            travado: Quem chama já detém o lock exclusivo do arquivo .lock
+        """
+        if travado:
+            self._recarregar()
+            return
+
+        try:
+            estado_vetores = os.stat(self.caminho_vetores)
+            estado_metadados = os.stat(self.caminho_metadados)
+        except FileNotFoundError:
+            self._resetar()
+            self._carregado = True
+            return
+
+        if (
+            self._carregado
+            and self._inodes == (estado_vetores.st_ino, estado_metadados.st_ino)
+            and estado_vetores.st_size // self._bytes_por_linha <= self._linhas
+        ):
+            return
+
+        with open(self.caminho_lock, "a") as trava:
+            self._lock_arquivo(trava, compartilhado=True)
+            self._recarregar()
+
+    def _recarregar(self) -> None:
+        if not os.path.exists(self.caminho_metadados) or not os.path.exists(self.caminho_vetores):
+            self._resetar()
+            self._carregado = True
+            return
+
+        estado = os.stat(self.caminho_vetores)
+        inodes = (estado.st_ino, os.stat(self.caminho_metadados).st_ino)
+        if self._inodes is not None and inodes != self._inodes:
+            # Arquivos substituídos por compactar() em outro processo
+            self._resetar()
+        self._inodes = inodes
+
+        linhas_vetor = estado.st_size // self._bytes_por_linha
+        if self._carregado and linhas_vetor <= self._linhas:
+            return
+
+        novos = []
+        with open(self.caminho_metadados, "rb") as f:
+            f.seek(self._offset_metadados)
+            for linha in f:
+                if self._linhas + len(novos) >= linhas_vetor or not linha.endswith(b"\n"):
+                    break  # append em andamento
+                novos.append(json.loads(linha))
+                self._offset_metadados += len(linha)
+
+        total = self._linhas + len(novos)
+        if novos:
+            self._acrescentar_em_memoria(novos)
+            self._matriz = np.memmap(
+                self.caminho_vetores, dtype=np.float32, mode="r", shape=(total, self.dimensoes)
+            )
+            self._linhas = total
+
+        if not self._carregado:
+            logger.info(f"Índice vetorial local carregado: {self._linhas} vetores ({self.caminho_vetores})")
+        self._carregado = True
+
+    def _acrescentar_em_memoria(self, metadados: List[Dict[str, Any]]) -> None:
+        inicio = self._linhas
+        ativos = np.ones(len(metadados), dtype=bool)
+        for deslocamento, item in enumerate(metadados):
+            anterior = self._linha_por_id.get(item["id"])
+            if anterior is not None:
+                if anterior >= inicio:
+                    ativos[anterior - inicio] = False
+                else:
+                    self._ativo[anterior] = False
+            self._linha_por_id[item["id"]] = inicio + deslocamento
+            self._metadados.append(item)
+
+        self._ativo = np.concatenate([self._ativo, ativos])
+        self._disciplinas.acrescentar(item.get("disciplina") for item in metadados)
+        self._assuntos.acrescentar(item.get("assunto") for item in metadados)
+
+    def _garantir_atualizado(self) -> None:
+        with self._lock:
+            self._atualizar()
+
+    # ============================================================================
+    # ESCRITA
+    # ============================================================================
+
+    @staticmethod
+    def _truncar(caminho: str, tamanho: int) -> None:
+        if os.path.exists(caminho) and os.path.getsize(caminho) > tamanho:
+            logger.warning(f"Índice vetorial local: descartando cauda incompleta de {caminho}")
+            os.truncate(caminho, tamanho)
+
+    def _lock_arquivo(self, arquivo, compartilhado: bool = False) -> None:
+        if FCNTL_AVAILABLE:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_SH if compartilhado else fcntl.LOCK_EX)
+
+    def adicionar(self, itens: Sequence[Tuple[Any, Sequence[float], Dict[str, Any]]]) -> int:
+        """
+        Acrescenta (ou substitui) embeddings.
+
+        Args:
+            itens: [(questao_id, vetor, metadados)] com metadados opcionais
+                numero_questao, disciplina, assunto, dificuldade, enunciado
+
+        Returns:
+            Número de vetores gravados
+        """
+        if not itens:
+            return 0
+
+        vetores = normalizar(np.asarray([vetor for _, vetor, _ in itens], dtype=np.float32))
+        if vetores.shape[1] != self.dimensoes:
+            raise ValueError(f"Vetores com {vetores.shape[1]} dimensões, índice de {self.dimensoes}")
+
+        linhas_meta = []
+        for questao_id, _, meta in itens:
+            registro = {"id": str(questao_id)}
+            for campo in CAMPOS_METADADOS[:-1]:
+                registro[campo] = meta.get(campo)
+            registro["preview"] = (meta.get("enunciado") or "")[:TAMANHO_PREVIEW]
+            linhas_meta.append(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        with self._lock, open(self.caminho_lock, "a") as trava:
+            self._lock_arquivo(trava)
+
+            # Append interrompido (crash entre vetores e metadados) deixa
+            # cauda sem par: volta ao último ponto consistente antes de escrever
+            self._atualizar(travado=True)
+            self._truncar(self.caminho_vetores, self._linhas * self._bytes_por_linha)
+            self._truncar(self.caminho_metadados, self._offset_metadados)
+
+            with open(self.caminho_vetores, "ab") as f:
+                f.write(vetores.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with open(self.caminho_metadados, "a", encoding="utf-8") as f:
+                f.writelines(linhas_meta)
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._atualizar(travado=True)
+
+        return len(itens)
+
+    def compactar(self) -> int:
+        """Regrava os arquivos só com as linhas ativas; retorna linhas removidas"""
+        with self._lock, open(self.caminho_lock, "a") as trava:
+            self._lock_arquivo(trava)
+            self._atualizar(travado=True)
+            if self._matriz is None:
+                return 0
+
+            ativas = np.flatnonzero(self._ativo)
+            removidas = self._linhas - len(ativas)
+            if not removidas:
+                return 0
+
+            temporario_vetores = f"{self.caminho_vetores}.tmp"
+            temporario_meta = f"{self.caminho_metadados}.tmp"
+            np.asarray(self._matriz[ativas]).tofile(temporario_vetores)
+            with open(temporario_meta, "w", encoding="utf-8") as f:
+                for linha in ativas:
+                    f.write(json.dumps(self._metadados[linha], ensure_ascii=False, default=str) + "\n")
+
+            os.replace(temporario_vetores, self.caminho_vetores)
+            os.replace(temporario_meta, self.caminho_metadados)
+            self._resetar()
+            self._atualizar(travado=True)
+
+        logger.info(f"Índice vetorial local compactado: {removidas} linhas inativas removidas")
+        return removidas
+
+    # ============================================================================
+    # CONSULTA
+    # ============================================================================
+
+    def __len__(self) -> int:
+        self._garantir_atualizado()
+        return int(self._ativo.sum())
+
+    def ids(self) -> set:
+        """Ids com embedding no índice"""
+        self._garantir_atualizado()
+        return set(self._linha_por_id)
+
+    def vetores(self, ids: Iterable[Any]) -> Dict[str, np.ndarray]:
+        """Vetores normalizados dos ids presentes (id -> vetor)"""
+        with self._lock:
+            self._atualizar()
+            linhas = {str(i): self._linha_por_id.get(str(i)) for i in ids}
+            return {i: np.array(self._matriz[linha]) for i, linha in linhas.items() if linha is not None}
+
+    def buscar(
+        self,
+        consultas: np.ndarray,
+        k: int = 10,
+        disciplina: Optional[str] = None,
+        assunto: Optional[str] = None,
+        excluir_ids: Iterable[Any] = (),
+        similaridade_minima: float = -1.0
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k por similaridade de cosseno para um lote de consultas.
+
+        Args:
+            consultas: Vetor (dims,) ou matriz (n, dims)
+            k: Resultados por consulta
+            disciplina, assunto: Filtros exatos (opcionais)
+            excluir_ids: Ids que não podem aparecer no resultado
+            similaridade_minima: Descarta resultados abaixo deste score
+
+        Returns:
+            Por consulta: [{id, similaridade, numero_questao, disciplina,
+            assunto, dificuldade, preview}] em ordem decrescente
+        """
+        consultas = normalizar(np.atleast_2d(consultas))
+
+        with self._lock:
+            self._atualizar()
+            if self._matriz is None or k <= 0:
+                return [[] for _ in range(len(consultas))]
+
+            matriz = self._matriz
+            mascara = self._ativo.copy()
+            if disciplina is not None:
+                mascara &= self._disciplinas.mascara(disciplina)
+            if assunto is not None:
+                mascara &= self._assuntos.mascara(assunto)
+            for questao_id in excluir_ids:
+                linha = self._linha_por_id.get(str(questao_id))
+                if linha is not None:
+                    mascara[linha] = False
+            metadados = self._metadados
+
+        # Top-k por bloco e merge: memória temporária O(consultas x bloco)
+        melhores_scores = np.full((len(consultas), 0), -np.inf, dtype=np.float32)
+        melhores_linhas = np.empty((len(consultas), 0), dtype=np.int64)
+
+        for inicio in range(0, len(mascara), LINHAS_POR_BLOCO):
+            fim = min(inicio + LINHAS_POR_BLOCO, len(mascara))
+            mascara_bloco = mascara[inicio:fim]
+            if not mascara_bloco.any():
+                continue
+
+            scores = consultas @ np.asarray(matriz[inicio:fim]).T
+            scores[:, ~mascara_bloco] = -np.inf
+
+            k_bloco = min(k, fim - inicio)
+            topo = np.argpartition(-scores, k_bloco - 1, axis=1)[:, :k_bloco]
+            melhores_scores = np.concatenate([melhores_scores, np.take_along_axis(scores, topo, axis=1)], axis=1)
+            melhores_linhas = np.concatenate([melhores_linhas, topo + inicio], axis=1)
+
+        ordem = np.argsort(-melhores_scores, axis=1)[:, :k]
+        resultados = []
+        for linha_scores, linha_indices, linha_ordem in zip(melhores_scores, melhores_linhas, ordem):
+            itens = []
+            for posicao in linha_ordem:
+                score = float(linha_scores[posicao])
+                if score == -np.inf or score < similaridade_minima:
+                    break
+                item = dict(metadados[linha_indices[posicao]])
+                item["similaridade"] = score
+                itens.append(item)
+            resultados.append(itens)
+        return resultados
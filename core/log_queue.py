@@ -0,0 +1,394 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Fila de Gravação Assíncrona de Logs (Write-Behind)
+================================================================================
+Objetivo: Tirar os INSERTs de log_sistema/enforcement_log do caminho da requisição
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Fila em memória limitada (LOG_QUEUE_MAX_SIZE); cheia, o registro é
+  descartado e contado (a requisição nunca espera pelo log)
+- Uma thread por processo grava em lote a cada LOG_QUEUE_FLUSH_MS ou ao
+  acumular LOG_QUEUE_BATCH_SIZE registros: um INSERT multi-linha por tabela
+- Cada tabela é um DestinoLog (engine + colunas tipadas + preparo opcional
+  do lote, ex.: resolver plano_codigo de todos os usuários numa consulta)
+- Logs feitos dentro de uma transação (LogSistemaRepository) só entram na
+  fila após o commit da transação externa (core.apos_commit); rollback os
+  descarta, inclusive o de um SAVEPOINT para os logs feitos dentro dele
+- encerrar() drena a fila (atexit e shutdown da API)
+
+USO:
+    from core.log_queue import fila_logs, destino_log_sistema
+
+    fila_logs.enfileirar(destino_log_sistema(), {
+        "user_id": user_id, "evento": "SIMULADO_GERADO", "detalhes": {...}
+    })
+
+    fila_logs.metricas()  # profundidade, descartados, gravados, lotes...
+
+================================================================================
+"""
+
+import os
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import Boolean, DateTime, Integer, String, Text, insert, text
+from sqlalchemy.dialects.postgresql import INET, JSONB, UUID
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+
+from core.apos_commit import agendar_apos_commit
+
+logger = logging.getLogger(__name__)
+
+
+class DestinoLog:
+    """
+    Tabela de destino de registros de log.
+
+    Registros são dicts com um subconjunto de `colunas`; as ausentes vão como
+    NULL. Como o INSERT multi-linha lista todas as colunas, os defaults do
+    banco não se aplicam: colunas com default entram em `padroes`, avaliados
+    no enfileiramento (o instante gravado é o do evento, não o do lote).
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        engine: Engine,
+        colunas: Sequence,
+        padroes: Optional[Dict[str, Callable[[], Any]]] = None,
+        preparar: Optional[Callable[[Connection, List[Dict[str, Any]]], None]] = None
+    ):
+        """
+        Args:
+            nome: Nome da tabela
+            engine: Engine onde a tabela vive
+            colunas: column(nome, tipo) de cada coluna gravada
+            padroes: Valores default por coluna (fábricas)
+            preparar: Completa os registros do lote antes do INSERT (opcional)
+        """
+        self.nome = nome
+        self.engine = engine
+        self.tabela = table(nome, *colunas)
+        self.nomes_colunas = [c.name for c in colunas]
+        self.padroes = padroes or {}
+        self.preparar = preparar
+
+    def completar(self, registro: Dict[str, Any]) -> Dict[str, Any]:
+        """Aplica os defaults ausentes do registro"""
+        for nome, fabrica in self.padroes.items():
+            if registro.get(nome) is None:
+                registro[nome] = fabrica()
+        return registro
+
+    def gravar(self, registros: List[Dict[str, Any]]) -> None:
+        """Grava o lote numa transação (um INSERT multi-linha)"""
+        with self.engine.begin() as conn:
+            if self.preparar is not None:
+                self.preparar(conn, registros)
+            linhas = [
+                {nome: registro.get(nome) for nome in self.nomes_colunas}
+                for registro in registros
+            ]
+            conn.execute(insert(self.tabela).values(linhas))
+
+
+class FilaLogs:
+    """
+    Fila limitada de registros de log com gravação em lote em segundo plano.
+
+    Thread-safe. A thread gravadora é iniciada no primeiro enfileiramento
+    (e reiniciada após fork, já que threads não sobrevivem a ele).
+    """
+
+    CAPACIDADE = int(os.getenv("LOG_QUEUE_MAX_SIZE", "10000"))
+    INTERVALO_MS = int(os.getenv("LOG_QUEUE_FLUSH_MS", "500"))
+    TAMANHO_LOTE = int(os.getenv("LOG_QUEUE_BATCH_SIZE", "500"))
+
+    def __init__(
+        self,
+        capacidade: Optional[int] = None,
+        intervalo_ms: Optional[int] = None,
+        tamanho_lote: Optional[int] = None
+    ):
+        self.capacidade = capacidade if capacidade is not None else self.CAPACIDADE
+        self.intervalo = (intervalo_ms if intervalo_ms is not None else self.INTERVALO_MS) / 1000.0
+        self.tamanho_lote = tamanho_lote if tamanho_lote is not None else self.TAMANHO_LOTE
+
+        self._fila: "queue.Queue" = queue.Queue(maxsize=self.capacidade)
+        self._lock = threading.Lock()
+        self._gravando = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+        self.enfileirados = 0
+        self.descartados = 0
+        self.gravados = 0
+        self.perdidos = 0
+        self.lotes = 0
+        self.ultimo_lote_ms = 0.0
+
+    # ------------------------------------------------------------------
+    # Produtores
+    # ------------------------------------------------------------------
+
+    def enfileirar(self, destino: DestinoLog, registro: Dict[str, Any]) -> bool:
+        """
+        Enfileira um registro sem bloquear.
+
+        Returns:
+            False se a fila estava cheia (registro descartado)
+        """
+        self._garantir_thread()
+        try:
+            self._fila.put_nowait((destino, destino.completar(dict(registro))))
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            return False
+
+        with self._lock:
+            self.enfileirados += 1
+        if self._fila.qsize() >= self.tamanho_lote:
+            self._acordar.set()
+        return True
+
+    def enfileirar_apos_commit(
+        self,
+        session: Session,
+        destino: DestinoLog,
+        registro: Dict[str, Any]
+    ) -> None:
+        """
+        Enfileira o registro quando a transação externa de `session` confirmar.
+
+        Registros feitos dentro de um SAVEPOINT desfeito são descartados;
+        nada é enfileirado antes do commit da transação raiz.
+        """
+        agendar_apos_commit(
+            session, "_logs_pendentes",
+            (destino, destino.completar(dict(registro))),
+            _publicar_pendentes
+        )
+
+    # ------------------------------------------------------------------
+    # Gravação
+    # ------------------------------------------------------------------
+
+    def descarregar(self) -> int:
+        """
+        Grava tudo o que está na fila agora (na thread de quem chama).
+
+        Returns:
+            Número de registros gravados
+        """
+        total = 0
+        with self._gravando:
+            while True:
+                lote = self._retirar_lote()
+                if not lote:
+                    return total
+                total += self._gravar_lote(lote)
+
+    def _retirar_lote(self) -> List[tuple]:
+        lote = []
+        while len(lote) < self.tamanho_lote:
+            try:
+                lote.append(self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _gravar_lote(self, lote: List[tuple]) -> int:
+        inicio = time.perf_counter()
+
+        por_destino: Dict[int, tuple] = {}
+        for destino, registro in lote:
+            por_destino.setdefault(id(destino), (destino, []))[1].append(registro)
+
+        gravados = 0
+        for destino, registros in por_destino.values():
+            try:
+                destino.gravar(registros)
+                gravados += len(registros)
+            except Exception as e:
+                with self._lock:
+                    self.perdidos += len(registros)
+                logger.warning(f"Falha ao gravar {len(registros)} registros em {destino.nome}: {e}")
+
+        with self._lock:
+            self.gravados += gravados
+            self.lotes += 1
+            self.ultimo_lote_ms = (time.perf_counter() - inicio) * 1000
+        return gravados
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            self._acordar.wait(self.intervalo)
+            self._acordar.clear()
+            try:
+                self.descarregar()
+            except Exception as e:
+                logger.error(f"Erro na thread da fila de logs: {e}")
+
+    def _garantir_thread(self) -> None:
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # Processo filho: o lock de gravação pode ter sido copiado preso
+                self._gravando = threading.Lock()
+            self._parar.clear()
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._executar, name="fila-logs", daemon=True
+            )
+            self._thread.start()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida e métricas
+    # ------------------------------------------------------------------
+
+    def encerrar(self, timeout: float = 10.0) -> None:
+        """Para a thread gravadora e drena a fila"""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self._thread = None
+        self.descarregar()
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "profundidade": self._fila.qsize(),
+                "capacidade": self.capacidade,
+                "enfileirados": self.enfileirados,
+                "descartados": self.descartados,
+                "gravados": self.gravados,
+                "perdidos": self.perdidos,
+                "lotes": self.lotes,
+                "ultimo_lote_ms": round(self.ultimo_lote_ms, 2),
+            }
+
+
+def _publicar_pendentes(pendentes: List[tuple]) -> None:
+    for destino, registro in pendentes:
+        fila_logs.enfileirar(destino, registro)
+
+
+# ================================================================================
+# DESTINOS
+# ================================================================================
+
+_destinos: Dict[Any, DestinoLog] = {}
+_destinos_lock = threading.Lock()
+
+
+def destino_log_sistema(engine: Optional[Engine] = None) -> DestinoLog:
+    """Destino log_sistema no banco da aplicação (ou em `engine`)"""
+    if engine is None:
+        from database.connection import engine_registry
+        engine = engine_registry.get_engine(componente="log_queue")
+
+    chave = ("log_sistema", str(engine.url))
+    with _destinos_lock:
+        destino = _destinos.get(chave)
+        if destino is None or destino.engine.pool is not engine.pool:
+            destino = _destinos[chave] = DestinoLog(
+                "log_sistema",
+                engine,
+                [
+                    column("id", UUID(as_uuid=True)),
+                    column("user_id", UUID(as_uuid=True)),
+                    column("evento", String),
+                    column("detalhes", JSONB),
+                    column("sucesso", Boolean),
+                    column("mensagem_erro", Text),
+                    column("timestamp", DateTime),
+                ],
+                padroes={
+                    # Defaults do modelo LogSistema (id é gerado pelo ORM)
+                    "id": uuid.uuid4,
+                    "sucesso": lambda: True,
+                    "timestamp": datetime.utcnow,
+                },
+            )
+        return destino
+
+
+def destino_enforcement_log(engine: Engine) -> DestinoLog:
+    """Destino enforcement_log; plano_codigo é resolvido por lote na gravação"""
+    chave = ("enforcement_log", str(engine.url))
+    with _destinos_lock:
+        destino = _destinos.get(chave)
+        if destino is None or destino.engine.pool is not engine.pool:
+            destino = _destinos[chave] = DestinoLog(
+                "enforcement_log",
+                engine,
+                [
+                    column("user_id", UUID(as_uuid=False)),
+                    column("timestamp", DateTime(timezone=True)),
+                    column("endpoint", String),
+                    column("reason_code", String),
+                    column("plano_codigo", String),
+                    column("current_usage", Integer),
+                    column("limit_value", Integer),
+                    column("ip_address", INET),
+                    column("user_agent", Text),
+                    column("request_id", String),
+                    column("metadata", JSONB),
+                ],
+                padroes={"timestamp": lambda: datetime.now(timezone.utc)},
+                preparar=_resolver_planos,
+            )
+        return destino
+
+
+def _resolver_planos(conn: Connection, registros: List[Dict[str, Any]]) -> None:
+    """Plano ativo de todos os usuários do lote numa única consulta"""
+    usuarios = sorted({str(r["user_id"]) for r in registros if r.get("plano_codigo") is None})
+    if not usuarios:
+        return
+
+    linhas = conn.execute(
+        text("""
+            SELECT DISTINCT ON (a.user_id) a.user_id::text, p.codigo
+            FROM assinatura a
+            INNER JOIN plano p ON a.plano_id = p.id
+            WHERE a.user_id = ANY(CAST(:usuarios AS uuid[]))
+              AND a.status = 'active'
+              AND (a.data_fim IS NULL OR a.data_fim > NOW())
+            ORDER BY a.user_id, a.data_inicio DESC
+        """),
+        {"usuarios": usuarios}
+    ).fetchall()
+    planos = {user_id: codigo for user_id, codigo in linhas}
+
+    for registro in registros:
+        if registro.get("plano_codigo") is None:
+            registro["plano_codigo"] = planos.get(str(registro["user_id"]))
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+fila_logs = FilaLogs()
+atexit.register(fila_logs.encerrar)
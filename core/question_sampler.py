@@ -0,0 +1,552 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Amostrador de Questões (Pools em Memória)
+================================================================================
+Objetivo: Sortear questões sem ORDER BY RANDOM() no PostgreSQL
+Prioridade: P0 (CRÍTICA)
+Data: 2026-10-16
+================================================================================
+
+PROBLEMA:
+- Cada `ORDER BY RANDOM() LIMIT n` ordena toda a fatia filtrada de questoes_banco
+- Um simulado completo fazia ~10 ordenações completas (uma por disciplina)
+
+ESTRATÉGIA:
+- Pools de IDs em memória por (disciplina, tópico, dificuldade), apenas questões ativas
+- Carga inicial única; depois atualização incremental por `updated_at`,
+  relendo uma margem antes da marca (updated_at é o início da transação:
+  uma linha confirmada depois que a marca passou do seu timestamp ainda
+  entra); a atualização periódica lê só essa janela
+- Conferência dos IDs ativos em intervalo bem mais longo (exclusões
+  físicas e desativações que não mexem em updated_at saem dos pools)
+- Sorteio uniforme e sem repetição em O(k) sobre a união dos pools elegíveis
+- Busca final dos dados por chave primária (uma única query)
+
+USO:
+    from core.question_sampler import question_sampler
+
+    ids = question_sampler.amostrar(10, disciplina="Direito Civil", session=session)
+
+================================================================================
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from bisect import bisect_right
+from itertools import accumulate
+from datetime import datetime, timedelta
+from typing import Any, Container, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+ChavePool = Tuple[str, str, str]
+
+
+def _normalizar_dificuldade(dificuldade: Any) -> str:
+    """Converte Enum/str de dificuldade para a chave usada nos pools"""
+    if dificuldade is None:
+        return ""
+    return str(getattr(dificuldade, "value", dificuldade))
+
+
+def _chave_pool(disciplina: str, dificuldade: Any, topico: Optional[str]) -> ChavePool:
+    """Chave (disciplina, tópico, dificuldade) do pool de uma questão"""
+    return (disciplina, topico or "", _normalizar_dificuldade(dificuldade))
+
+
+class _PoolIds:
+    """
+    Conjunto de IDs com inserção, remoção e acesso por índice em O(1).
+
+    Remoção troca o elemento com o último da lista (swap-pop), mantendo
+    a lista densa para que o sorteio por índice continue uniforme.
+    """
+
+    __slots__ = ("ids", "posicao")
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.posicao: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def adicionar(self, questao_id: str) -> None:
+        if questao_id in self.posicao:
+            return
+        self.posicao[questao_id] = len(self.ids)
+        self.ids.append(questao_id)
+
+    def remover(self, questao_id: str) -> None:
+        indice = self.posicao.pop(questao_id, None)
+        if indice is None:
+            return
+        ultimo = self.ids.pop()
+        if indice < len(self.ids):
+            self.ids[indice] = ultimo
+            self.posicao[ultimo] = indice
+
+
+class QuestionPoolSampler:
+    """
+    Mantém pools de IDs de questões ativas e sorteia subconjuntos aleatórios.
+
+    Thread-safe: todas as mutações e sorteios acontecem sob um único lock,
+    que nunca é mantido durante I/O (queries rodam fora dele).
+    A atualização contra o banco é feita no máximo a cada
+    `intervalo_atualizacao` segundos, de forma incremental; a conferência
+    completa dos IDs ativos, a cada `intervalo_conferencia` segundos.
+    """
+
+    # Intervalo padrão entre verificações incrementais (segundos)
+    INTERVALO_ATUALIZACAO = int(os.getenv("QUESTION_POOL_REFRESH_SECONDS", "60"))
+
+    # Margem relida antes da marca: cobre transações que gravaram updated_at
+    # (NOW() = início da transação) e confirmaram depois (segundos)
+    MARGEM_ATUALIZACAO = int(os.getenv("QUESTION_POOL_REFRESH_OVERLAP_SECONDS", "300"))
+
+    # Intervalo padrão entre conferências completas dos IDs ativos (segundos):
+    # varre o índice inteiro, então roda bem menos que a atualização
+    INTERVALO_CONFERENCIA = int(os.getenv("QUESTION_POOL_FULL_CHECK_SECONDS", "3600"))
+
+    def __init__(
+        self,
+        intervalo_atualizacao: Optional[int] = None,
+        intervalo_conferencia: Optional[int] = None
+    ):
+        """
+        Inicializa o amostrador (sem acessar o banco).
+
+        Args:
+            intervalo_atualizacao: Segundos entre atualizações incrementais
+            intervalo_conferencia: Segundos entre conferências dos IDs ativos
+        """
+        self.intervalo_atualizacao = (
+            self.INTERVALO_ATUALIZACAO
+            if intervalo_atualizacao is None
+            else intervalo_atualizacao
+        )
+        self.intervalo_conferencia = (
+            self.INTERVALO_CONFERENCIA
+            if intervalo_conferencia is None
+            else intervalo_conferencia
+        )
+
+        self._pools: Dict[ChavePool, _PoolIds] = {}
+        self._localizacao: Dict[str, ChavePool] = {}
+        # Protege só estruturas em memória: nunca é mantido durante uma query
+        self._lock = threading.Lock()
+
+        self._carregado = False
+        self._atualizacoes_em_andamento = 0
+        self._marca_atualizacao: Optional[datetime] = None
+        self._ultima_verificacao = 0.0
+        self._ultima_conferencia = 0.0
+
+    # ========================================================================
+    # MANUTENÇÃO DOS POOLS
+    # ========================================================================
+
+    def registrar_questao(
+        self, questao_id: Any, disciplina: str, dificuldade: Any, topico: Optional[str] = None
+    ) -> bool:
+        """
+        Adiciona (ou move) uma questão ativa nos pools.
+
+        Args:
+            questao_id: ID da questão
+            disciplina: Disciplina da questão
+            dificuldade: Dificuldade (Enum ou str)
+            topico: Tópico da questão
+
+        Returns:
+            True se os pools mudaram (False se já estava no pool certo)
+        """
+        with self._lock:
+            return self._registrar_sem_lock(
+                str(questao_id), _chave_pool(disciplina, dificuldade, topico)
+            )
+
+    def _registrar_sem_lock(self, qid: str, chave: ChavePool) -> bool:
+        chave_atual = self._localizacao.get(qid)
+        if chave_atual == chave:
+            return False
+        if chave_atual is not None:
+            self._remover_sem_lock(qid)
+
+        self._pools.setdefault(chave, _PoolIds()).adicionar(qid)
+        self._localizacao[qid] = chave
+        return True
+
+    def remover_questao(self, questao_id: Any) -> bool:
+        """
+        Remove uma questão dos pools (ex: desativada ou excluída).
+
+        Args:
+            questao_id: ID da questão
+
+        Returns:
+            True se a questão estava nos pools
+        """
+        with self._lock:
+            return self._remover_sem_lock(str(questao_id))
+
+    def _remover_sem_lock(self, qid: str) -> bool:
+        chave = self._localizacao.pop(qid, None)
+        if chave is None:
+            return False
+        pool = self._pools[chave]
+        pool.remover(qid)
+        if not pool:
+            del self._pools[chave]
+        return True
+
+    def invalidar(self) -> None:
+        """Força recarga completa na próxima amostragem"""
+        with self._lock:
+            self._carregado = False
+            self._ultima_verificacao = 0.0
+
+    def atualizar(self, session: Session) -> int:
+        """
+        Sincroniza os pools com questoes_banco.
+
+        Na primeira chamada (ou após `invalidar`) carrega todos os IDs ativos.
+        Nas seguintes:
+        1. Aplica as linhas com `updated_at` a partir de MARGEM_ATUALIZACAO
+           antes da última marca (linhas já aplicadas não contam de novo)
+        2. Se passou `intervalo_conferencia` desde a última conferência,
+           confere os IDs ativos no banco: remove dos pools os excluídos ou
+           desativados e carrega os ativos que faltarem
+
+        As queries rodam fora do lock: ele só protege a leitura da marca e a
+        aplicação em memória, então nenhuma thread (nem o event loop, via
+        `run_sync`) espera pela query de outra. Com os pools já carregados,
+        uma atualização concorrente não repete as queries: retorna 0 e os
+        pools atuais continuam servindo.
+
+        Args:
+            session: Sessão SQLAlchemy
+
+        Returns:
+            Número de questões incluídas, movidas ou removidas dos pools
+        """
+        with self._lock:
+            if self._carregado and self._atualizacoes_em_andamento:
+                return 0
+            self._atualizacoes_em_andamento += 1
+            carregado = self._carregado
+            marca = self._marca_atualizacao
+            conferir = (
+                time.monotonic() - self._ultima_conferencia >= self.intervalo_conferencia
+            )
+
+        try:
+            if not carregado:
+                return self._carregar_completo(session)
+            return self._atualizar_incremental(session, marca, conferir)
+        finally:
+            with self._lock:
+                self._atualizacoes_em_andamento -= 1
+
+    def _atualizar_incremental(self, session: Session, marca: datetime, conferir: bool) -> int:
+        linhas = session.execute(
+            text("""
+                SELECT id, disciplina, topico, dificuldade, ativa, updated_at
+                FROM questoes_banco
+                WHERE updated_at >= :marca
+                ORDER BY updated_at
+            """),
+            {"marca": marca - timedelta(seconds=self.MARGEM_ATUALIZACAO)}
+        ).fetchall()
+
+        ativos: Optional[Set[str]] = None
+        if conferir:
+            # Só IDs (index scan); lido depois da janela para cobrir inserções entre as duas
+            ativos = {
+                str(questao_id) for (questao_id,) in session.execute(
+                    text("SELECT id FROM questoes_banco WHERE ativa = true")
+                )
+            }
+
+        with self._lock:
+            aplicadas = 0
+            for linha in linhas:
+                if linha.ativa:
+                    aplicadas += self._registrar_sem_lock(
+                        str(linha.id), _chave_pool(linha.disciplina, linha.dificuldade, linha.topico)
+                    )
+                else:
+                    aplicadas += self._remover_sem_lock(str(linha.id))
+                if self._marca_atualizacao is None or linha.updated_at > self._marca_atualizacao:
+                    self._marca_atualizacao = linha.updated_at
+
+            removidos: List[str] = []
+            faltantes: Set[str] = set()
+            if ativos is not None:
+                removidos = [qid for qid in self._localizacao if qid not in ativos]
+                for qid in removidos:
+                    self._remover_sem_lock(qid)
+
+                faltantes = ativos.difference(self._localizacao)
+
+        if faltantes:
+            novas = session.execute(
+                text("""
+                    SELECT id, disciplina, topico, dificuldade
+                    FROM questoes_banco
+                    WHERE id IN :ids AND ativa = true
+                """).bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(faltantes)}
+            ).fetchall()
+
+            with self._lock:
+                for linha in novas:
+                    self._registrar_sem_lock(
+                        str(linha.id), _chave_pool(linha.disciplina, linha.dificuldade, linha.topico)
+                    )
+
+        aplicadas += len(removidos) + len(faltantes)
+
+        with self._lock:
+            self._ultima_verificacao = time.monotonic()
+            if conferir:
+                self._ultima_conferencia = self._ultima_verificacao
+
+        if aplicadas:
+            logger.debug(f"Pools de questões: {aplicadas} alterações aplicadas")
+
+        return aplicadas
+
+    def _carregar_completo(self, session: Session) -> int:
+        linhas = session.execute(
+            text("""
+                SELECT id, disciplina, topico, dificuldade, updated_at
+                FROM questoes_banco
+                WHERE ativa = true
+            """)
+        ).fetchall()
+
+        # Monta os pools novos fora do lock e só troca as referências sob ele
+        pools: Dict[ChavePool, _PoolIds] = {}
+        localizacao: Dict[str, ChavePool] = {}
+        marca = None
+
+        for linha in linhas:
+            qid = str(linha.id)
+            if qid not in localizacao:
+                chave = _chave_pool(linha.disciplina, linha.dificuldade, linha.topico)
+                pools.setdefault(chave, _PoolIds()).adicionar(qid)
+                localizacao[qid] = chave
+            if linha.updated_at is not None and (marca is None or linha.updated_at > marca):
+                marca = linha.updated_at
+
+        with self._lock:
+            self._pools = pools
+            self._localizacao = localizacao
+            self._marca_atualizacao = marca or datetime.utcnow()
+            self._carregado = True
+            self._ultima_verificacao = time.monotonic()
+            self._ultima_conferencia = self._ultima_verificacao
+
+        logger.info(
+            f"Pools de questões carregados: {len(linhas)} questões em {len(pools)} pools"
+        )
+        return len(linhas)
+
+    def _garantir_atualizado(self, session: Optional[Session]) -> None:
+        """Atualiza os pools se a última verificação expirou"""
+        if (
+            self._carregado
+            and time.monotonic() - self._ultima_verificacao < self.intervalo_atualizacao
+        ):
+            return
+
+        if session is not None:
+            self.atualizar(session)
+            return
+
+        from database.connection import get_db_session
+
+        with get_db_session() as nova_sessao:
+            self.atualizar(nova_sessao)
+
+    # ========================================================================
+    # AMOSTRAGEM
+    # ========================================================================
+
+    def amostrar(
+        self,
+        quantidade: int,
+        disciplina: Optional[str] = None,
+        dificuldade: Any = None,
+        excluir: Optional[Container[str]] = None,
+        session: Optional[Session] = None,
+        topicos: Optional[Iterable[str]] = None
+    ) -> List[str]:
+        """
+        Sorteia IDs de questões ativas, uniformemente e sem repetição.
+
+        Args:
+            quantidade: Número de IDs desejados
+            disciplina: Filtrar por disciplina (None = todas)
+            dificuldade: Filtrar por dificuldade (None = todas)
+            excluir: IDs que não podem ser sorteados (set, filtro de Bloom, ...)
+            session: Sessão usada para atualizar os pools, se necessário
+            topicos: Filtrar por tópicos (None = todos)
+
+        Returns:
+            Lista com até `quantidade` IDs (str), em ordem aleatória
+        """
+        if quantidade <= 0:
+            return []
+
+        self._garantir_atualizado(session)
+
+        excluidos: Container[str] = excluir if excluir is not None else frozenset()
+
+        with self._lock:
+            pools = self._pools_elegiveis(disciplina, dificuldade, topicos)
+            total = sum(len(p) for p in pools)
+
+            if total == 0:
+                return []
+
+            # Pedidos que cobrem boa parte do universo: embaralhar direto
+            if quantidade * 2 >= total:
+                return self._amostrar_completo(pools, quantidade, excluidos, set())
+
+            acumulado = list(accumulate(len(p) for p in pools))
+            sorteados: List[str] = []
+            vistos: Set[int] = set()
+            falhas = 0
+            limite_falhas = 4 * quantidade + 32
+
+            while len(sorteados) < quantidade:
+                indice = random.randrange(total)
+                if indice in vistos:
+                    falhas += 1
+                    if falhas > limite_falhas:
+                        break
+                    continue
+                vistos.add(indice)
+
+                pool_idx = bisect_right(acumulado, indice)
+                base = acumulado[pool_idx - 1] if pool_idx else 0
+                qid = pools[pool_idx].ids[indice - base]
+
+                if qid in excluidos:
+                    falhas += 1
+                    if falhas > limite_falhas:
+                        break
+                    continue
+
+                sorteados.append(qid)
+
+            if len(sorteados) < quantidade:
+                # Muitos excluídos: completar varrendo os elegíveis restantes
+                sorteados.extend(
+                    self._amostrar_completo(
+                        pools, quantidade - len(sorteados), excluidos, set(sorteados)
+                    )
+                )
+
+            return sorteados
+
+    def amostrar_distribuicao(
+        self,
+        distribuicao: Dict[str, int],
+        dificuldade: Any = None,
+        excluir: Optional[Container[str]] = None,
+        session: Optional[Session] = None
+    ) -> Dict[str, List[str]]:
+        """
+        Sorteia IDs para várias disciplinas de uma vez (ex: simulado OAB).
+
+        Args:
+            distribuicao: {disciplina: quantidade}
+            dificuldade: Filtrar por dificuldade (None = todas)
+            excluir: IDs que não podem ser sorteados
+            session: Sessão usada para atualizar os pools, se necessário
+
+        Returns:
+            {disciplina: [ids sorteados]}
+        """
+        self._garantir_atualizado(session)
+
+        return {
+            disciplina: self.amostrar(
+                quantidade, disciplina=disciplina, dificuldade=dificuldade,
+                excluir=excluir, session=session
+            )
+            for disciplina, quantidade in distribuicao.items()
+        }
+
+    def _pools_elegiveis(
+        self, disciplina: Optional[str], dificuldade: Any, topicos: Optional[Iterable[str]] = None
+    ) -> List[_PoolIds]:
+        dif = _normalizar_dificuldade(dificuldade) if dificuldade is not None else None
+        tops = set(topicos) if topicos else None
+        return [
+            pool
+            for (disc, top, d), pool in self._pools.items()
+            if (disciplina is None or disc == disciplina)
+            and (dif is None or d == dif)
+            and (tops is None or top in tops)
+        ]
+
+    @staticmethod
+    def _amostrar_completo(
+        pools: List[_PoolIds], quantidade: int, excluidos: Container[str], ja_sorteados: Set[str]
+    ) -> List[str]:
+        candidatos = [
+            qid
+            for pool in pools
+            for qid in pool.ids
+            if qid not in excluidos and qid not in ja_sorteados
+        ]
+        return random.sample(candidatos, min(quantidade, len(candidatos)))
+
+    # ========================================================================
+    # OBSERVABILIDADE
+    # ========================================================================
+
+    def estatisticas(self) -> Dict:
+        """
+        Retorna tamanho dos pools (para /health e benchmarks).
+
+        Returns:
+            Dict com totais por disciplina e dificuldade
+        """
+        with self._lock:
+            por_disciplina: Dict[str, int] = {}
+            por_dificuldade: Dict[str, int] = {}
+            for (disciplina, _topico, dificuldade), pool in self._pools.items():
+                por_disciplina[disciplina] = por_disciplina.get(disciplina, 0) + len(pool)
+                por_dificuldade[dificuldade] = por_dificuldade.get(dificuldade, 0) + len(pool)
+
+            return {
+                "carregado": self._carregado,
+                "total_questoes": len(self._localizacao),
+                "total_pools": len(self._pools),
+                "por_disciplina": por_disciplina,
+                "por_dificuldade": por_dificuldade,
+                "marca_atualizacao": (
+                    self._marca_atualizacao.isoformat() if self._marca_atualizacao else None
+                ),
+            }
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+# Um amostrador por processo (os pools são compartilhados entre requisições)
+question_sampler = QuestionPoolSampler()
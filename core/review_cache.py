@@ -0,0 +1,142 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Cache de Recomendações de Revisão por Usuário
+================================================================================
+Objetivo: Recalcular recomendar_revisao só quando o usuário responde algo novo
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Uma entrada por usuário (LRU em memória do processo), separada por
+  origem (modelo, dimensões e backend de busca): serviços OpenAI/Ollama e
+  backends pgvector/local não servem as recomendações uns dos outros
+- Versão da entrada = MAX(respondida_em) do usuário em resposta (index scan
+  em idx_resposta_usuario_respondida, migration 019); uma nova resposta
+  registrada em qualquer worker muda a versão e descarta a entrada
+- TTL limita a defasagem em relação a questões/embeddings novos
+- Pedidos com limite maior que o calculado recalculam
+
+USO:
+    from core.review_cache import recomendacoes_revisao
+
+    resultados = recomendacoes_revisao.obter(
+        usuario_id, session, limite, lambda: calcular(limite),
+        origem="nomic-embed-text:768:local"
+    )
+
+================================================================================
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class CacheRecomendacoesRevisao:
+    """
+    Cache LRU de recomendações de revisão, por usuário.
+
+    Thread-safe. As listas devolvidas são cópias; os dicts são novos a cada
+    chamada.
+    """
+
+    TTL_SEGUNDOS = int(os.getenv("REVIEW_RECOMMENDATIONS_TTL_SECONDS", "3600"))
+    MAX_USUARIOS = int(os.getenv("REVIEW_RECOMMENDATIONS_MAX_USERS", "10000"))
+
+    def __init__(
+        self,
+        ttl_segundos: Optional[int] = None,
+        max_usuarios: Optional[int] = None
+    ):
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else self.TTL_SEGUNDOS
+        self.max_usuarios = max_usuarios if max_usuarios is not None else self.MAX_USUARIOS
+
+        # usuario -> {origem: (versao, limite, resultados, calculado_em)}
+        self._entradas: "OrderedDict[str, Dict[str, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    @staticmethod
+    def versao(session: Session, usuario_id: Any) -> Any:
+        """Instante da última resposta do usuário (None se nunca respondeu)"""
+        return session.execute(
+            text("SELECT MAX(respondida_em) FROM resposta WHERE usuario_id = :usuario_id"),
+            {"usuario_id": usuario_id}
+        ).scalar()
+
+    def obter(
+        self,
+        usuario_id: Any,
+        session: Session,
+        limite: int,
+        calcular: Callable[[], List[Dict]],
+        *,
+        origem: str
+    ) -> List[Dict]:
+        """
+        Retorna as recomendações em cache ou calcula e guarda.
+
+        Args:
+            usuario_id: ID do usuário
+            session: Sessão SQLAlchemy (usada para ler a versão)
+            limite: Número de recomendações pedidas
+            calcular: Calcula as recomendações (até `limite`) em caso de miss
+            origem: Modelo, dimensões e backend que produzem as recomendações
+                (ex.: "text-embedding-3-large:3072:pgvector")
+
+        Returns:
+            Até `limite` recomendações
+        """
+        chave = str(usuario_id)
+        versao = self.versao(session, usuario_id)
+        agora = time.monotonic()
+
+        with self._lock:
+            entrada = self._entradas.get(chave, {}).get(origem)
+            if entrada is not None:
+                versao_entrada, limite_entrada, resultados, calculado_em = entrada
+                if (
+                    versao_entrada == versao
+                    and limite_entrada >= limite
+                    and agora - calculado_em < self.ttl_segundos
+                ):
+                    self._entradas.move_to_end(chave)
+                    self.acertos += 1
+                    return [dict(item) for item in resultados[:limite]]
+            self.faltas += 1
+
+        resultados = calcular()
+
+        with self._lock:
+            self._entradas.setdefault(chave, {})[origem] = (versao, limite, resultados, agora)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_usuarios:
+                self._entradas.popitem(last=False)
+
+        return [dict(item) for item in resultados]
+
+    def invalidar(self, usuario_id: Any) -> None:
+        """Descarta as recomendações do usuário, de todas as origens"""
+        with self._lock:
+            self._entradas.pop(str(usuario_id), None)
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {"acertos": self.acertos, "faltas": self.faltas, "usuarios": len(self._entradas)}
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+recomendacoes_revisao = CacheRecomendacoesRevisao()
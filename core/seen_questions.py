@@ -0,0 +1,212 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Questões Já Vistas por Usuário (Filtro de Bloom)
+================================================================================
+Objetivo: Não repetir questões já respondidas na seleção adaptativa
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+ESTRATÉGIA:
+- Um filtro de Bloom por usuário com os IDs respondidos na janela recente
+- Carregado de interacao_questao no primeiro uso (e após o TTL)
+- Atualizado em memória a cada resposta registrada neste processo
+- Falso positivo apenas pula uma questão não vista; nunca repete uma vista
+
+USO:
+    from core.seen_questions import seen_questions
+
+    vistas = seen_questions.obter(user_id, session)
+    ids = question_sampler.amostrar(10, excluir=vistas, session=session)
+
+================================================================================
+"""
+
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Container, Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom sobre IDs de questões (str).
+
+    Usa double hashing sobre um único blake2b de 128 bits:
+    posição_i = (h1 + i * h2) mod m.
+    """
+
+    __slots__ = ("tamanho_bits", "num_hashes", "capacidade", "total_itens", "_bits")
+
+    def __init__(self, capacidade: int, taxa_falso_positivo: float = 0.01):
+        """
+        Args:
+            capacidade: Número esperado de itens
+            taxa_falso_positivo: Taxa de falso positivo alvo na capacidade
+        """
+        capacidade = max(1, capacidade)
+        tamanho_bits = int(-capacidade * math.log(taxa_falso_positivo) / (math.log(2) ** 2))
+
+        self.tamanho_bits = max(64, tamanho_bits)
+        self.num_hashes = max(1, round(self.tamanho_bits / capacidade * math.log(2)))
+        self.capacidade = capacidade
+        self.total_itens = 0
+        self._bits = bytearray((self.tamanho_bits + 7) // 8)
+
+    def _posicoes(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.tamanho_bits
+
+    def adicionar(self, item: Any) -> None:
+        for pos in self._posicoes(str(item)):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.total_itens += 1
+
+    def __contains__(self, item: Any) -> bool:
+        return all(
+            self._bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._posicoes(str(item))
+        )
+
+    @property
+    def saturado(self) -> bool:
+        """True quando recebeu mais itens do que a capacidade planejada"""
+        return self.total_itens > self.capacidade
+
+
+class ExclusaoComposta:
+    """União de vários containers para uso como `excluir` no amostrador"""
+
+    __slots__ = ("_partes",)
+
+    def __init__(self, *partes: Optional[Container[str]]):
+        self._partes = [p for p in partes if p is not None]
+
+    def __contains__(self, item: Any) -> bool:
+        return any(item in parte for parte in self._partes)
+
+
+class SeenQuestionsCache:
+    """
+    Cache LRU de filtros de Bloom de questões vistas, por usuário.
+
+    Thread-safe. Cada worker mantém seus próprios filtros; o TTL garante
+    que respostas registradas em outros workers sejam absorvidas.
+    """
+
+    JANELA_DIAS = int(os.getenv("SEEN_QUESTIONS_WINDOW_DAYS", "30"))
+    TTL_SEGUNDOS = int(os.getenv("SEEN_QUESTIONS_TTL_SECONDS", "600"))
+    MAX_USUARIOS = int(os.getenv("SEEN_QUESTIONS_MAX_USERS", "10000"))
+
+    # Capacidade mínima e folga para respostas após a carga
+    CAPACIDADE_MINIMA = 512
+    FATOR_FOLGA = 2
+
+    def __init__(
+        self,
+        janela_dias: Optional[int] = None,
+        ttl_segundos: Optional[int] = None,
+        max_usuarios: Optional[int] = None,
+        taxa_falso_positivo: float = 0.01
+    ):
+        self.janela_dias = janela_dias if janela_dias is not None else self.JANELA_DIAS
+        self.ttl_segundos = ttl_segundos if ttl_segundos is not None else self.TTL_SEGUNDOS
+        self.max_usuarios = max_usuarios if max_usuarios is not None else self.MAX_USUARIOS
+        self.taxa_falso_positivo = taxa_falso_positivo
+
+        self._filtros: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, user_id: Any, session: Session) -> FiltroBloom:
+        """
+        Retorna o filtro de questões vistas do usuário (carrega se preciso).
+
+        Args:
+            user_id: ID do usuário
+            session: Sessão SQLAlchemy (usada só na carga)
+
+        Returns:
+            FiltroBloom com os IDs respondidos na janela
+        """
+        chave = str(user_id)
+        agora = time.monotonic()
+
+        with self._lock:
+            entrada = self._filtros.get(chave)
+            if entrada is not None:
+                filtro, carregado_em = entrada
+                if agora - carregado_em < self.ttl_segundos and not filtro.saturado:
+                    self._filtros.move_to_end(chave)
+                    return filtro
+
+        filtro = self._carregar(chave, session)
+
+        with self._lock:
+            self._filtros[chave] = (filtro, agora)
+            self._filtros.move_to_end(chave)
+            while len(self._filtros) > self.max_usuarios:
+                self._filtros.popitem(last=False)
+
+        return filtro
+
+    def registrar(self, user_id: Any, questoes_ids: Iterable[Any]) -> None:
+        """
+        Marca questões como vistas (se o filtro do usuário já está em memória).
+
+        Args:
+            user_id: ID do usuário
+            questoes_ids: IDs das questões respondidas
+        """
+        with self._lock:
+            entrada = self._filtros.get(str(user_id))
+            if entrada is None:
+                return
+            for qid in questoes_ids:
+                entrada[0].adicionar(qid)
+
+    def invalidar(self, user_id: Any) -> None:
+        """Descarta o filtro do usuário (recarrega no próximo uso)"""
+        with self._lock:
+            self._filtros.pop(str(user_id), None)
+
+    def _carregar(self, user_id: str, session: Session) -> FiltroBloom:
+        desde = datetime.utcnow() - timedelta(days=self.janela_dias)
+        linhas = session.execute(
+            text("""
+                SELECT DISTINCT questao_id
+                FROM interacao_questao
+                WHERE user_id = :user_id
+                AND created_at >= :desde
+            """),
+            {"user_id": user_id, "desde": desde}
+        ).fetchall()
+
+        filtro = FiltroBloom(
+            max(self.CAPACIDADE_MINIMA, len(linhas) * self.FATOR_FOLGA),
+            self.taxa_falso_positivo
+        )
+        for linha in linhas:
+            filtro.adicionar(linha.questao_id)
+
+        logger.debug(f"Questões vistas carregadas para user {user_id}: {len(linhas)}")
+        return filtro
+
+
+# ================================================================================
+# INSTÂNCIA GLOBAL
+# ================================================================================
+
+seen_questions = SeenQuestionsCache()
@@ -0,0 +1,360 @@
+"""
+================================================================================
+JURIS_IA_CORE_V1 - Índice Vetorial (pgvector)
+================================================================================
+Objetivo: Busca vetorial por índice ANN (HNSW/IVFFlat) em vez de seq scan
+Prioridade: P1
+Data: 2026-10-16
+================================================================================
+
+CICLO DE VIDA:
+- criar():        CREATE INDEX CONCURRENTLY (hnsw ou ivfflat, distância cosseno)
+- reconstruir():  REINDEX CONCURRENTLY + ANALYZE após cargas em massa
+                  (IVFFlat treina as listas na criação: sem rebuild, listas
+                  antigas degradam o recall)
+- apos_carga():   cria HNSW se não houver índice; reconstrói IVFFlat
+
+BUSCA:
+- preparar_busca() ajusta hnsw.ef_search / ivfflat.probes só para a
+  transação atual (set_config local) e devolve a expressão de distância
+  que casa com o índice.
+- O threshold de similaridade deve ser aplicado FORA do ORDER BY ... LIMIT
+  (ver consulta_vizinhos()): o índice só é usado para "k mais próximos".
+- consulta_vizinhos_lote(): vários vetores de consulta em um único
+  round trip (LATERAL, uma varredura de índice por vetor), com os
+  vizinhos deduplicados pela menor distância.
+
+DIMENSÕES:
+- vector: HNSW/IVFFlat até 2000 dimensões
+- acima disso (text-embedding-3-large = 3072): índice de expressão
+  embedding::halfvec(N), que exige pgvector >= 0.7
+
+================================================================================
+"""
+
+import math
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+
+LIMITE_DIMENSOES_VECTOR = 2000
+LIMITE_DIMENSOES_HALFVEC = 4000
+VERSAO_MINIMA_HALFVEC = (0, 7, 0)
+
+METODOS = ("hnsw", "ivfflat")
+
+# Defaults do pgvector: ef_search=40, probes=1
+EF_SEARCH_PADRAO = 100
+PROBES_PADRAO = 10
+
+
+def versao_pgvector(conn) -> Optional[Tuple[int, ...]]:
+    """Versão da extensão vector instalada (None se ausente)"""
+    versao = conn.execute(
+        text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+    ).scalar()
+    if not versao:
+        return None
+    return tuple(int(parte) for parte in versao.split("."))
+
+
+def dimensoes_coluna(conn, tabela: str = "questao_oab", coluna: str = "embedding") -> Optional[int]:
+    """Dimensões declaradas na coluna vector(N) (None se sem dimensão fixa)"""
+    typmod = conn.execute(
+        text("""
+            SELECT atttypmod FROM pg_attribute
+            WHERE attrelid = CAST(:tabela AS regclass) AND attname = :coluna
+        """),
+        {"tabela": tabela, "coluna": coluna}
+    ).scalar()
+    return typmod if typmod and typmod > 0 else None
+
+
+class IndiceVetorial:
+    """Índice ANN de uma coluna de embeddings (distância cosseno)"""
+
+    def __init__(self, dimensoes: int, tabela: str = "questao_oab", coluna: str = "embedding"):
+        self.dimensoes = dimensoes
+        self.tabela = tabela
+        self.coluna = coluna
+        self._halfvec_disponivel: Optional[bool] = None
+
+    @property
+    def usa_halfvec(self) -> bool:
+        return self.dimensoes > LIMITE_DIMENSOES_VECTOR
+
+    def nome(self, metodo: str) -> str:
+        return f"idx_{self.tabela}_{self.coluna}_{metodo}"
+
+    def _tipo(self, halfvec: bool) -> str:
+        return f"halfvec({self.dimensoes})" if halfvec else "vector"
+
+    def _expressao(self, halfvec: bool, prefixo: str = "") -> str:
+        coluna = f"{prefixo}{self.coluna}"
+        return f"({coluna}::halfvec({self.dimensoes}))" if halfvec else coluna
+
+    def _verificar_halfvec(self, conn) -> bool:
+        """Indexar acima de 2000 dimensões exige halfvec (pgvector >= 0.7)"""
+        if self._halfvec_disponivel is None:
+            versao = versao_pgvector(conn)
+            self._halfvec_disponivel = (
+                self.usa_halfvec
+                and versao is not None
+                and versao >= VERSAO_MINIMA_HALFVEC
+            )
+        return self._halfvec_disponivel
+
+    # ============================================================================
+    # CICLO DE VIDA
+    # ============================================================================
+
+    def status(self, conn) -> Dict[str, Any]:
+        """Versão do pgvector, índices ANN existentes e linhas estimadas"""
+        versao = versao_pgvector(conn)
+        indices = conn.execute(
+            text("""
+                SELECT i.relname, am.amname, pg_get_indexdef(i.oid),
+                       pg_size_pretty(pg_relation_size(i.oid)), x.indisvalid
+                FROM pg_index x
+                JOIN pg_class i ON i.oid = x.indexrelid
+                JOIN pg_class t ON t.oid = x.indrelid
+                JOIN pg_am am ON am.oid = i.relam
+                WHERE t.relname = :tabela
+                  AND am.amname IN ('hnsw', 'ivfflat')
+                ORDER BY i.relname
+            """),
+            {"tabela": self.tabela}
+        ).fetchall()
+        linhas = conn.execute(
+            text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = :tabela"),
+            {"tabela": self.tabela}
+        ).scalar()
+
+        return {
+            "pgvector": ".".join(map(str, versao)) if versao else None,
+            "dimensoes": self.dimensoes,
+            "halfvec": self.usa_halfvec,
+            "linhas_estimadas": linhas or 0,
+            "indices": [
+                {"nome": nome, "metodo": metodo, "definicao": definicao, "tamanho": tamanho, "valido": valido}
+                for nome, metodo, definicao, tamanho, valido in indices
+            ],
+        }
+
+    def criar(
+        self,
+        engine: Engine,
+        metodo: str = "hnsw",
+        m: int = 16,
+        ef_construction: int = 64,
+        listas: Optional[int] = None,
+        concorrente: bool = True,
+        memoria_manutencao: str = "512MB"
+    ) -> str:
+        """
+        Cria o índice ANN (idempotente; remove build inválido anterior).
+
+        Args:
+            engine: Engine do banco (o build roda em AUTOCOMMIT)
+            metodo: hnsw (melhor recall/latência) ou ivfflat (build rápido)
+            m, ef_construction: Parâmetros do HNSW
+            listas: Listas do IVFFlat (default: linhas/1000 até 1M, sqrt acima)
+            concorrente: CREATE INDEX CONCURRENTLY (não bloqueia escritas)
+            memoria_manutencao: maintenance_work_mem da sessão de build
+
+        Returns:
+            Nome do índice
+        """
+        if metodo not in METODOS:
+            raise ValueError(f"Método de índice inválido: {metodo}")
+
+        nome = self.nome(metodo)
+
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            halfvec = self._verificar_halfvec(conn)
+            if self.usa_halfvec and not halfvec:
+                raise ValueError(
+                    f"{self.dimensoes} dimensões excedem o limite de {LIMITE_DIMENSOES_VECTOR} "
+                    f"para índice sobre vector; atualize o pgvector para >= 0.7 (halfvec)"
+                )
+            if self.dimensoes > LIMITE_DIMENSOES_HALFVEC:
+                raise ValueError(f"{self.dimensoes} dimensões excedem o limite de índice do pgvector")
+
+            # Build CONCURRENTLY interrompido deixa índice inválido com o mesmo nome
+            invalido = conn.execute(
+                text("""
+                    SELECT 1 FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+                    WHERE i.relname = :nome AND NOT x.indisvalid
+                """),
+                {"nome": nome}
+            ).scalar()
+            if invalido:
+                logger.warning(f"Removendo índice inválido {nome}")
+                conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concorrente else ''}IF EXISTS {nome}"))
+
+            if metodo == "hnsw":
+                opcoes = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+            else:
+                if listas is None:
+                    linhas = conn.execute(
+                        text(f"SELECT COUNT(*) FROM {self.tabela} WHERE {self.coluna} IS NOT NULL")
+                    ).scalar()
+                    if not linhas:
+                        raise ValueError("IVFFlat treina as listas na criação: popule os embeddings antes")
+                    listas = max(10, linhas // 1000) if linhas <= 1_000_000 else int(math.sqrt(linhas))
+                opcoes = f"lists = {int(listas)}"
+
+            operadores = "halfvec_cosine_ops" if halfvec else "vector_cosine_ops"
+            conn.execute(text("SELECT set_config('maintenance_work_mem', :memoria, false)"), {"memoria": memoria_manutencao})
+            conn.execute(text(f"""
+                CREATE INDEX {'CONCURRENTLY ' if concorrente else ''}IF NOT EXISTS {nome}
+                ON {self.tabela} USING {metodo} ({self._expressao(halfvec)} {operadores})
+                WITH ({opcoes})
+            """))
+            conn.execute(text(f"ANALYZE {self.tabela}"))
+
+        logger.info(f"Índice vetorial {nome} criado ({opcoes})")
+        return nome
+
+    def reconstruir(self, engine: Engine, concorrente: bool = True) -> List[str]:
+        """REINDEX dos índices ANN da tabela + ANALYZE"""
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            nomes = [indice["nome"] for indice in self.status(conn)["indices"]]
+            for nome in nomes:
+                conn.execute(text(f"REINDEX INDEX {'CONCURRENTLY ' if concorrente else ''}{nome}"))
+                logger.info(f"Índice vetorial {nome} reconstruído")
+            conn.execute(text(f"ANALYZE {self.tabela}"))
+        return nomes
+
+    def remover(self, engine: Engine, metodo: str, concorrente: bool = True) -> None:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f"DROP INDEX {'CONCURRENTLY ' if concorrente else ''}IF EXISTS {self.nome(metodo)}"))
+
+    def apos_carga(self, engine: Engine) -> None:
+        """
+        Manutenção após carga em massa de embeddings.
+
+        Sem índice: cria HNSW. IVFFlat: reconstrói (listas re-treinadas).
+        HNSW absorve inserções incrementalmente: só ANALYZE.
+        """
+        with engine.connect() as conn:
+            metodos = {indice["metodo"] for indice in self.status(conn)["indices"] if indice["valido"]}
+
+        if not metodos:
+            self.criar(engine, "hnsw")
+        elif "ivfflat" in metodos:
+            self.reconstruir(engine)
+        else:
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text(f"ANALYZE {self.tabela}"))
+
+    # ============================================================================
+    # BUSCA
+    # ============================================================================
+
+    def preparar_busca(
+        self,
+        conn,
+        ef_search: Optional[int] = None,
+        probes: Optional[int] = None,
+        k: int = 0,
+        prefixo: str = "",
+        parametro: str = "embedding",
+        referencia: Optional[str] = None
+    ) -> str:
+        """
+        Ajusta recall/latência para a transação atual e devolve a expressão
+        de distância cosseno compatível com o índice.
+
+        Args:
+            conn: Connection ou Session (dentro de uma transação)
+            ef_search: Candidatos do HNSW (>= k; maior = mais recall)
+            probes: Listas visitadas no IVFFlat (maior = mais recall)
+            k: Vizinhos pedidos no LIMIT (ef_search nunca fica abaixo disso)
+            prefixo: Alias da tabela na consulta (ex.: "q.")
+            parametro: Nome do bind com o vetor de consulta
+            referencia: Coluna com o vetor de consulta, no lugar do bind
+                (ex.: "consultas.vetor" em consulta_vizinhos_lote)
+
+        Returns:
+            SQL da distância, ex.: "embedding <=> CAST(:embedding AS vector)"
+        """
+        conn.execute(
+            text("SELECT set_config('hnsw.ef_search', :ef, true), set_config('ivfflat.probes', :probes, true)"),
+            {"ef": str(max(ef_search or EF_SEARCH_PADRAO, k)), "probes": str(probes or PROBES_PADRAO)}
+        )
+        halfvec = self._verificar_halfvec(conn)
+        if referencia is not None:
+            consulta = f"({referencia}::halfvec({self.dimensoes}))" if halfvec else referencia
+        else:
+            consulta = f"CAST(:{parametro} AS {self._tipo(halfvec)})"
+        return f"{self._expressao(halfvec, prefixo)} <=> {consulta}"
+
+    def consulta_vizinhos(self, distancia: str, colunas: str, filtro: str = "TRUE") -> str:
+        """
+        SQL dos k vizinhos mais próximos com filtros aplicados depois do índice.
+
+        A subconsulta é um ORDER BY distância LIMIT :candidatos puro (servido
+        pelo índice); threshold (:distancia_maxima) e `filtro` ficam fora.
+
+        Binds: :candidatos, :distancia_maxima, :limite e o do vetor.
+        """
+        return f"""
+            SELECT *
+            FROM (
+                SELECT {colunas}, {distancia} AS distancia
+                FROM {self.tabela}
+                WHERE {self.coluna} IS NOT NULL
+                ORDER BY {distancia}
+                LIMIT :candidatos
+            ) vizinhos
+            WHERE distancia <= :distancia_maxima
+              AND ({filtro})
+            ORDER BY distancia
+            LIMIT :limite
+        """
+
+    def consulta_vizinhos_lote(
+        self,
+        distancia: str,
+        consultas: str,
+        colunas: str,
+        filtro: str = "TRUE"
+    ) -> str:
+        """
+        Vizinhos de vários vetores de consulta em uma única consulta.
+
+        `consultas` é um SELECT com as colunas `ordem` e `vetor`; cada linha
+        vira um ORDER BY distância LIMIT :candidatos servido pelo índice
+        (LATERAL). O resultado é deduplicado por id (fica a menor distância
+        e a `consulta` que a produziu) e ordenado por distância.
+
+        `distancia` deve vir de preparar_busca(..., referencia="consultas.vetor")
+        e `colunas` deve incluir `id`.
+
+        Binds: :candidatos, :distancia_maxima, :limite e os de `consultas`.
+        """
+        return f"""
+            SELECT *
+            FROM (
+                SELECT DISTINCT ON (vizinhos.id) vizinhos.*, consultas.ordem AS consulta
+                FROM ({consultas}) consultas
+                CROSS JOIN LATERAL (
+                    SELECT {colunas}, {distancia} AS distancia
+                    FROM {self.tabela}
+                    WHERE {self.coluna} IS NOT NULL
+                    ORDER BY {distancia}
+                    LIMIT :candidatos
+                ) vizinhos
+                WHERE vizinhos.distancia <= :distancia_maxima
+                  AND ({filtro})
+                ORDER BY vizinhos.id, vizinhos.distancia
+            ) unicos
+            ORDER BY distancia
+            LIMIT :limite
+        """
@@ -11,11 +11,13 @@ Versão: 1.0.0
 """
 
 import os
-from typing import Generator, Optional
+import time
+import threading
+from typing import AsyncGenerator, Dict, Generator, Optional
 from contextlib import contextmanager
 from sqlalchemy import create_engine, event, pool
 from sqlalchemy.orm import sessionmaker, Session, scoped_session
-from sqlalchemy.engine import Engine
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.pool import QueuePool
 import logging
 
@@ -137,9 +139,24 @@ class DatabaseManager:
 
         logger.info(f"Criando engine para {self.config.host}:{self.config.port}/{self.config.database}")
 
+        self._engine = self.build_engine(self.config.get_database_url())
+
+        logger.info(f"Engine criada com sucesso. Pool size: {self.config.pool_size}")
+        return self._engine
+
+    def build_engine(self, database_url: str) -> Engine:
+        """
+        Cria uma engine com o pool e os eventos padrão da aplicação.
+
+        Args:
+            database_url: URL de conexão PostgreSQL
+
+        Returns:
+            Engine: SQLAlchemy engine (não registrada no DatabaseManager)
+        """
         # Criar engine com pool de conexões configurado
-        self._engine = create_engine(
-            self.config.get_database_url(),
+        engine = create_engine(
+            database_url,
             poolclass=QueuePool,
             pool_size=self.config.pool_size,
             max_overflow=self.config.max_overflow,
@@ -152,10 +169,8 @@ class DatabaseManager:
         )
 
         # Configurar eventos do engine
-        self._setup_engine_events(self._engine)
-
-        logger.info(f"Engine criada com sucesso. Pool size: {self.config.pool_size}")
-        return self._engine
+        self._setup_engine_events(engine)
+        return engine
 
     def _setup_engine_events(self, engine: Engine):
         """Configura eventos do engine para logging e otimizações"""
@@ -269,6 +284,272 @@ class DatabaseManager:
         }
 
 
+# ============================================================================
+# REGISTRO DE ENGINES COMPARTILHADAS
+# ============================================================================
+
+class EngineRegistry:
+    """
+    Registro de engines compartilhadas por URL de banco.
+
+    Serviços que recebem database_url (enforcement, A/B testing, etc.) obtêm
+    daqui a engine em vez de chamar create_engine(), de modo que cada worker
+    mantém um único pool por banco, dimensionado por DB_POOL_SIZE /
+    DB_MAX_OVERFLOW. A URL da aplicação reaproveita a engine do DatabaseManager.
+
+    Cada componente recebe uma visão da engine (execution_options) com o
+    próprio nome; checkouts e tempo de uso das conexões são contabilizados
+    por componente.
+    """
+
+    COMPONENTE_PADRAO = "default"
+
+    def __init__(self, manager: DatabaseManager):
+        self.manager = manager
+        self._engines: Dict[str, Engine] = {}
+        self._metricas: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalizar_url(database_url: str) -> str:
+        """Normaliza a URL para que variantes equivalentes compartilhem o pool"""
+        if database_url.startswith("postgres://"):
+            database_url = database_url.replace("postgres://", "postgresql://", 1)
+        url = make_url(database_url)
+        if url.drivername == "postgresql":
+            url = url.set(drivername="postgresql+psycopg2")
+        return url.render_as_string(hide_password=False)
+
+    def get_engine(self, database_url: Optional[str] = None, componente: str = COMPONENTE_PADRAO) -> Engine:
+        """
+        Retorna a engine compartilhada para a URL, marcada com o componente.
+
+        Args:
+            database_url: URL de conexão (None = banco da aplicação)
+            componente: Nome do componente para as métricas de checkout
+
+        Returns:
+            Engine: Visão da engine compartilhada (mesmo pool)
+        """
+        url_app = self._normalizar_url(self.manager.config.get_database_url())
+        chave = self._normalizar_url(database_url) if database_url else url_app
+
+        with self._lock:
+            engine = self._engines.get(chave)
+            if chave == url_app:
+                # Acompanha a engine do DatabaseManager (pode ter sido recriada)
+                engine = self.manager.create_engine()
+            elif engine is None:
+                engine = self.manager.build_engine(chave)
+
+            if self._engines.get(chave) is not engine:
+                self._instrumentar(engine)
+                self._engines[chave] = engine
+                logger.info(f"Engine compartilhada registrada (componente inicial: {componente})")
+
+        return engine.execution_options(componente=componente)
+
+    def get_session_factory(
+        self,
+        database_url: Optional[str] = None,
+        componente: str = COMPONENTE_PADRAO
+    ) -> sessionmaker:
+        """Session factory ligada à engine compartilhada do componente"""
+        return sessionmaker(bind=self.get_engine(database_url, componente))
+
+    def _instrumentar(self, engine: Engine) -> None:
+        """Registra eventos de checkout/checkin por componente"""
+
+        @event.listens_for(engine, "engine_connect")
+        def registrar_checkout(connection):
+            componente = connection.get_execution_options().get(
+                "componente", self.COMPONENTE_PADRAO
+            )
+            info = connection.connection.info
+            info["componente"] = componente
+            info["checkout_em"] = time.perf_counter()
+
+            with self._lock:
+                metricas = self._metricas.setdefault(componente, {
+                    "checkouts": 0, "em_uso": 0, "tempo_uso_total_ms": 0.0, "tempo_uso_max_ms": 0.0
+                })
+                metricas["checkouts"] += 1
+                metricas["em_uso"] += 1
+
+        @event.listens_for(engine, "checkin")
+        def registrar_checkin(dbapi_connection, connection_record):
+            componente = connection_record.info.pop("componente", None)
+            inicio = connection_record.info.pop("checkout_em", None)
+            if componente is None or inicio is None:
+                return
+
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            with self._lock:
+                metricas = self._metricas.get(componente)
+                if metricas is not None:
+                    metricas["em_uso"] -= 1
+                    metricas["tempo_uso_total_ms"] += duracao_ms
+                    metricas["tempo_uso_max_ms"] = max(metricas["tempo_uso_max_ms"], duracao_ms)
+
+    def get_metrics(self) -> dict:
+        """
+        Retorna status dos pools e métricas por componente.
+
+        Returns:
+            dict: {"pools": [...], "componentes": {nome: {...}}}
+        """
+        with self._lock:
+            componentes = {}
+            for nome, metricas in self._metricas.items():
+                componentes[nome] = {
+                    **metricas,
+                    "tempo_uso_medio_ms": (
+                        metricas["tempo_uso_total_ms"] / metricas["checkouts"]
+                        if metricas["checkouts"] else 0.0
+                    ),
+                }
+
+            pools = []
+            for engine in self._engines.values():
+                pool_engine = engine.pool
+                pools.append({
+                    "database": engine.url.database,
+                    "size": pool_engine.size(),
+                    "checked_in": pool_engine.checkedin(),
+                    "checked_out": pool_engine.checkedout(),
+                    "overflow": pool_engine.overflow(),
+                })
+
+        return {"pools": pools, "componentes": componentes}
+
+    def dispose_all(self):
+        """Fecha os pools registrados que não pertencem ao DatabaseManager"""
+        with self._lock:
+            for engine in self._engines.values():
+                if engine is not self.manager._engine:
+                    engine.dispose()
+            self._engines.clear()
+
+
+# ============================================================================
+# ENGINE ASSÍNCRONA (asyncpg)
+# ============================================================================
+
+class AsyncDatabaseManager:
+    """
+    Engine e session factory assíncronas (SQLAlchemy async + asyncpg).
+
+    Usada pelos handlers FastAPI: as queries não bloqueiam o event loop,
+    então um único worker uvicorn atende requisições concorrentes.
+    A engine é criada sob demanda (o import de sqlalchemy.ext.asyncio e do
+    driver asyncpg só acontece no primeiro uso).
+    """
+
+    def __init__(self, config: Optional[DatabaseConfig] = None):
+        self.config = config or DatabaseConfig()
+        self._engine = None
+        self._session_factory = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _preparar_url(database_url: str):
+        """
+        Adapta a URL para o asyncpg, que não entende sslmode/sslrootcert
+        na query string (o libpq entende).
+
+        Returns:
+            Tuple[URL, dict]: URL sem parâmetros SSL e connect_args equivalentes
+        """
+        url = make_url(database_url)
+        query = dict(url.query)
+        connect_args: Dict[str, object] = {}
+
+        sslmode = query.pop("sslmode", None)
+        sslrootcert = query.pop("sslrootcert", None)
+        if sslrootcert:
+            import ssl
+            connect_args["ssl"] = ssl.create_default_context(cafile=sslrootcert)
+        elif sslmode and sslmode != "disable":
+            connect_args["ssl"] = sslmode
+
+        return url.set(query=query), connect_args
+
+    def get_engine(self):
+        """
+        Cria ou retorna a AsyncEngine
+
+        Returns:
+            AsyncEngine: Engine assíncrona com o mesmo dimensionamento de pool da síncrona
+        """
+        if self._engine is not None:
+            return self._engine
+
+        with self._lock:
+            if self._engine is None:
+                from sqlalchemy.ext.asyncio import create_async_engine
+
+                url, connect_args = self._preparar_url(self.config.get_database_url(async_mode=True))
+                # Mesmo efeito do evento "connect" da engine síncrona
+                connect_args["server_settings"] = {
+                    "timezone": "UTC",
+                    "statement_timeout": "60000",
+                }
+
+                self._engine = create_async_engine(
+                    url,
+                    pool_size=self.config.pool_size,
+                    max_overflow=self.config.max_overflow,
+                    pool_timeout=self.config.pool_timeout,
+                    pool_recycle=self.config.pool_recycle,
+                    pool_pre_ping=True,
+                    echo=self.config.echo,
+                    echo_pool=self.config.echo_pool,
+                    connect_args=connect_args,
+                )
+                logger.info(f"AsyncEngine criada. Pool size: {self.config.pool_size}")
+
+        return self._engine
+
+    def get_session_factory(self):
+        """
+        Returns:
+            async_sessionmaker: Factory de AsyncSession
+        """
+        if self._session_factory is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self._session_factory = async_sessionmaker(
+                bind=self.get_engine(),
+                autoflush=False,
+                # Atributos expirados exigiriam lazy load (I/O implícito),
+                # que não é permitido em AsyncSession
+                expire_on_commit=False,
+            )
+        return self._session_factory
+
+    def get_pool_status(self) -> dict:
+        """Status do pool da engine assíncrona"""
+        if self._engine is None:
+            return {"status": "Engine não inicializada"}
+
+        pool = self._engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+
+    async def dispose(self):
+        """Fecha todas as conexões do pool assíncrono"""
+        if self._engine is not None:
+            await self._engine.dispose()
+            logger.info("AsyncEngine disposed")
+
+        self._engine = None
+        self._session_factory = None
+
+
 # ============================================================================
 # CONTEXT MANAGERS PARA SESSÕES
 # ============================================================================
@@ -334,6 +615,56 @@ def get_db_session_no_commit() -> Generator[Session, None, None]:
         logger.debug("Sessão fechada (no auto-commit)")
 
 
+@contextmanager
+def usar_sessao(session: Optional[Session] = None) -> Generator[Session, None, None]:
+    """
+    Reusa a sessão recebida ou abre uma nova com get_db_session().
+
+    Permite que métodos de engines participem da unidade de trabalho de quem
+    chama: com `session`, não há commit nem fechamento aqui (o dono da
+    sessão decide); sem ela, o comportamento é o de get_db_session().
+
+    Uso:
+        def registrar(self, user_id, session=None):
+            with usar_sessao(session) as s:
+                ...
+
+    Yields:
+        Session: Sessão SQLAlchemy
+    """
+    if session is not None:
+        yield session
+        return
+
+    with get_db_session() as nova:
+        yield nova
+
+
+async def get_async_db_session() -> AsyncGenerator:
+    """
+    Dependency FastAPI que fornece uma AsyncSession.
+    Commit ao final da requisição, rollback em caso de erro.
+
+    Uso:
+        @app.get("/rota")
+        async def rota(db: AsyncSession = Depends(get_async_db_session)):
+            result = await db.execute(text("SELECT 1"))
+
+    Yields:
+        AsyncSession: Sessão SQLAlchemy assíncrona
+    """
+    SessionFactory = async_db_manager.get_session_factory()
+
+    async with SessionFactory() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Erro na transação assíncrona, rollback executado: {e}")
+            raise
+
+
 # ============================================================================
 # FUNÇÕES UTILITÁRIAS
 # ============================================================================
@@ -386,6 +717,7 @@ def check_database_health() -> dict:
     try:
         # Status do pool
         health["pool_status"] = db_manager.get_pool_status()
+        health["pool_registry"] = engine_registry.get_metrics()
 
         # Testar conexão
         with get_db_session() as session:
@@ -410,6 +742,7 @@ def check_database_health() -> dict:
 
 def close_all_connections():
     """Fecha todas as conexões do pool"""
+    engine_registry.dispose_all()
     db_manager = DatabaseManager()
     db_manager.dispose()
     logger.info("Todas as conexões fechadas")
@@ -471,6 +804,12 @@ def get_db_connection():
 # Instância global do DatabaseManager
 db_manager = DatabaseManager()
 
+# Registro global de engines compartilhadas
+engine_registry = EngineRegistry(db_manager)
+
+# Engine assíncrona dos handlers FastAPI (criada no primeiro uso)
+async_db_manager = AsyncDatabaseManager(db_manager.config)
+
 
 # ============================================================================
 # EXEMPLO DE USO
@@ -0,0 +1,83 @@
+-- Migration 017: Rollup de estatísticas globais por disciplina
+-- Data: 2026-10-16
+-- Descrição: Agregados por disciplina (média, total de estudantes) e histograma
+--            de taxa de acerto, para o endpoint de analytics ler em O(disciplinas)
+--            e calcular percentil por bucket em vez de varrer progresso_disciplina.
+
+CREATE TABLE IF NOT EXISTS estatisticas_disciplina (
+    disciplina VARCHAR(100) PRIMARY KEY,
+    total_estudantes INTEGER NOT NULL DEFAULT 0,
+    media_taxa_acerto DECIMAL(5, 2) NOT NULL DEFAULT 0,
+    -- 20 buckets de 5 pontos: [0,5), [5,10), ..., [95,100]
+    histograma INTEGER[] NOT NULL DEFAULT array_fill(0, ARRAY[20]),
+    atualizado_em TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE estatisticas_disciplina IS 'Rollup de progresso_disciplina por disciplina (recalculado periodicamente)';
+COMMENT ON COLUMN estatisticas_disciplina.histograma IS 'Contagem de estudantes por faixa de 5 pontos de taxa_acerto (20 buckets)';
+
+-- Recalcula agregados e histogramas em uma única passada sobre progresso_disciplina.
+-- Usa advisory lock para que apenas um worker recalcule por vez; os demais retornam -1.
+CREATE OR REPLACE FUNCTION atualizar_estatisticas_disciplina()
+RETURNS INTEGER AS $$
+DECLARE
+    v_total INTEGER;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('estatisticas_disciplina')) THEN
+        RETURN -1;
+    END IF;
+
+    WITH base AS (
+        SELECT user_id, disciplina, taxa_acerto,
+               LEAST(FLOOR(taxa_acerto / 5)::INTEGER, 19) AS bucket
+        FROM progresso_disciplina
+        WHERE total_questoes > 0
+    ),
+    agregados AS (
+        SELECT disciplina,
+               COUNT(DISTINCT user_id) AS total_estudantes,
+               AVG(taxa_acerto) AS media_taxa_acerto
+        FROM base
+        GROUP BY disciplina
+    ),
+    buckets AS (
+        SELECT disciplina, bucket, COUNT(*) AS total
+        FROM base
+        GROUP BY disciplina, bucket
+    ),
+    histogramas AS (
+        SELECT a.disciplina,
+               array_agg(COALESCE(b.total, 0)::INTEGER ORDER BY s.bucket) AS histograma
+        FROM agregados a
+        CROSS JOIN generate_series(0, 19) AS s(bucket)
+        LEFT JOIN buckets b ON b.disciplina = a.disciplina AND b.bucket = s.bucket
+        GROUP BY a.disciplina
+    )
+    INSERT INTO estatisticas_disciplina (
+        disciplina, total_estudantes, media_taxa_acerto, histograma, atualizado_em
+    )
+    SELECT a.disciplina, a.total_estudantes, ROUND(a.media_taxa_acerto, 2), h.histograma, NOW()
+    FROM agregados a
+    JOIN histogramas h ON h.disciplina = a.disciplina
+    ON CONFLICT (disciplina) DO UPDATE SET
+        total_estudantes = EXCLUDED.total_estudantes,
+        media_taxa_acerto = EXCLUDED.media_taxa_acerto,
+        histograma = EXCLUDED.histograma,
+        atualizado_em = EXCLUDED.atualizado_em;
+
+    GET DIAGNOSTICS v_total = ROW_COUNT;
+
+    DELETE FROM estatisticas_disciplina e
+    WHERE NOT EXISTS (
+        SELECT 1 FROM progresso_disciplina p
+        WHERE p.disciplina = e.disciplina AND p.total_questoes > 0
+    );
+
+    RETURN v_total;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION atualizar_estatisticas_disciplina() IS 'Recalcula estatisticas_disciplina (agendado pela API; retorna -1 se outro worker já está recalculando)';
+
+-- Carga inicial
+SELECT atualizar_estatisticas_disciplina();
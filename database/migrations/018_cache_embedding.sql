@@ -0,0 +1,35 @@
+-- Migration 018: Cache persistente de embeddings por conteúdo
+-- Data: 2026-10-16
+-- Descrição: Embeddings indexados por (modelo, dimensões, sha256 do texto
+--            normalizado). Backfills, trocas de modelo e importações de bancos
+--            com questões duplicadas só chamam o provedor para texto novo.
+--            Vetor em real[] (não depende de pgvector): o cache também serve
+--            instalações que usam o índice vetorial local.
+
+CREATE TABLE IF NOT EXISTS cache_embedding (
+    modelo VARCHAR(100) NOT NULL,
+    dimensoes INTEGER NOT NULL,
+    hash_texto CHAR(64) NOT NULL,
+    -- Sem dimensão fixa: modelos diferentes convivem na mesma tabela
+    embedding REAL[] NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (modelo, dimensoes, hash_texto)
+);
+
+-- Instalações que aplicaram a versão anterior (coluna do tipo vector)
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1
+        FROM information_schema.columns
+        WHERE table_name = 'cache_embedding'
+          AND column_name = 'embedding'
+          AND udt_name = 'vector'
+    ) THEN
+        ALTER TABLE cache_embedding
+            ALTER COLUMN embedding TYPE REAL[] USING embedding::real[];
+    END IF;
+END $$;
+
+COMMENT ON TABLE cache_embedding IS 'Cache de embeddings por conteúdo (lido por EmbeddingService e EmbeddingServiceOllama)';
+COMMENT ON COLUMN cache_embedding.hash_texto IS 'SHA-256 do texto normalizado (NFC, espaços colapsados) enviado ao modelo';
@@ -0,0 +1,20 @@
+-- Migration 019: Índices de resposta para a recomendação de revisão
+-- Data: 2026-10-16
+-- Descrição: recomendar_revisao exclui as questões já respondidas por anti-join
+--            (usuario_id, questao_id) e versiona o cache por usuário com
+--            MAX(respondida_em). Sem estes índices, as duas consultas varrem
+--            resposta inteira a cada chamada.
+--            resposta é a tabela legada lida pelos serviços de embeddings;
+--            bancos sem ela ignoram esta migration.
+
+DO $$
+BEGIN
+    IF to_regclass('resposta') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_resposta_usuario_questao
+            ON resposta (usuario_id, questao_id);
+
+        -- Última resposta do usuário (versão do cache) e erros recentes
+        CREATE INDEX IF NOT EXISTS idx_resposta_usuario_respondida
+            ON resposta (usuario_id, respondida_em DESC);
+    END IF;
+END $$;
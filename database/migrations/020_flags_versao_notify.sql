@@ -0,0 +1,49 @@
+-- Migration 020: Versão e notificação de mudanças em flags/experimentos
+-- Data: 2026-10-16
+-- Descrição: core.feature_flags mantém um snapshot local de feature_flags,
+--            feature_flag e ab_experiments. Qualquer escrita nessas tabelas
+--            incrementa flags_versao (lida pelo poll) e envia NOTIFY no canal
+--            juris_ia_flags (recarga imediata nos workers em LISTEN).
+--            Tabelas ausentes no banco são ignoradas.
+
+CREATE TABLE IF NOT EXISTS flags_versao (
+    id INTEGER PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO flags_versao (id, versao) VALUES (1, 0)
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION notificar_mudanca_flags()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE flags_versao
+    SET versao = versao + 1,
+        atualizado_em = NOW()
+    WHERE id = 1;
+
+    PERFORM pg_notify('juris_ia_flags', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Um disparo por comando (não por linha)
+DO $$
+DECLARE
+    v_tabela TEXT;
+BEGIN
+    FOREACH v_tabela IN ARRAY ARRAY['feature_flags', 'feature_flag', 'ab_experiments'] LOOP
+        IF to_regclass(v_tabela) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_notificar ON %I', v_tabela, v_tabela);
+            EXECUTE format(
+                'CREATE TRIGGER trg_%s_notificar
+                 AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+                 FOR EACH STATEMENT EXECUTE FUNCTION notificar_mudanca_flags()',
+                v_tabela, v_tabela
+            );
+        END IF;
+    END LOOP;
+END $$;
+
+COMMENT ON TABLE flags_versao IS 'Versão da configuração de flags/experimentos (poll do snapshot local)';
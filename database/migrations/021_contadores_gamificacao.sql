@@ -0,0 +1,77 @@
+-- Migration 021: Contadores de gamificação no perfil_juridico
+-- Data: 2026-10-16
+-- Descrição: perfil_juridico passa a ser o agregado de gamificação do usuário
+--            (FP, sessões, peças, streak, conquistas). total_sessoes e
+--            total_pecas são mantidos por trigger em sessao_estudo e
+--            pratica_peca (x = x ± 1), então GET /gamificacao/{user_id} lê
+--            uma linha em vez de contar as tabelas a cada chamada.
+--            FP da gamificação ficam em total_xp (014): pontuacao_global é
+--            limitada a 1000 pelo check_pontuacao_range.
+--            Colunas de 014 são recriadas com IF NOT EXISTS (idempotente).
+
+-- 1. Colunas do agregado
+ALTER TABLE perfil_juridico ADD COLUMN IF NOT EXISTS total_xp INTEGER;
+UPDATE perfil_juridico SET total_xp = pontuacao_global WHERE total_xp IS NULL;
+ALTER TABLE perfil_juridico
+ALTER COLUMN total_xp SET DEFAULT 0,
+ALTER COLUMN total_xp SET NOT NULL;
+
+ALTER TABLE perfil_juridico
+ADD COLUMN IF NOT EXISTS total_sessoes INTEGER DEFAULT 0 NOT NULL,
+ADD COLUMN IF NOT EXISTS total_pecas INTEGER DEFAULT 0 NOT NULL,
+ADD COLUMN IF NOT EXISTS conquistas JSONB DEFAULT '[]'::jsonb NOT NULL,
+ADD COLUMN IF NOT EXISTS ultima_atividade TIMESTAMP,
+ADD COLUMN IF NOT EXISTS streak_maximo INTEGER DEFAULT 0 NOT NULL;
+
+-- 2. Triggers de contagem (criados antes do backfill: o lock do CREATE
+--    TRIGGER segura inserts concorrentes até o fim da migration)
+CREATE OR REPLACE FUNCTION contar_gamificacao()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_user_id UUID;
+    v_delta INTEGER;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_user_id := NEW.user_id;
+        v_delta := 1;
+    ELSE
+        v_user_id := OLD.user_id;
+        v_delta := -1;
+    END IF;
+
+    IF TG_TABLE_NAME = 'sessao_estudo' THEN
+        UPDATE perfil_juridico
+        SET total_sessoes = GREATEST(total_sessoes + v_delta, 0)
+        WHERE user_id = v_user_id;
+    ELSE
+        UPDATE perfil_juridico
+        SET total_pecas = GREATEST(total_pecas + v_delta, 0)
+        WHERE user_id = v_user_id;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_sessao_estudo_contar ON sessao_estudo;
+CREATE TRIGGER trg_sessao_estudo_contar
+AFTER INSERT OR DELETE ON sessao_estudo
+FOR EACH ROW EXECUTE FUNCTION contar_gamificacao();
+
+DROP TRIGGER IF EXISTS trg_pratica_peca_contar ON pratica_peca;
+CREATE TRIGGER trg_pratica_peca_contar
+AFTER INSERT OR DELETE ON pratica_peca
+FOR EACH ROW EXECUTE FUNCTION contar_gamificacao();
+
+-- 3. Backfill
+UPDATE perfil_juridico p
+SET
+    total_sessoes = (SELECT COUNT(*) FROM sessao_estudo s WHERE s.user_id = p.user_id),
+    total_pecas = (SELECT COUNT(*) FROM pratica_peca pp WHERE pp.user_id = p.user_id),
+    ultima_atividade = COALESCE(p.ultima_atividade, p.data_ultima_atualizacao_perfil),
+    streak_maximo = GREATEST(p.streak_maximo, p.sequencia_dias_consecutivos);
+
+-- Comentários
+COMMENT ON COLUMN perfil_juridico.total_sessoes IS 'Sessões de estudo do usuário (trigger em sessao_estudo)';
+COMMENT ON COLUMN perfil_juridico.total_pecas IS 'Peças praticadas pelo usuário (trigger em pratica_peca)';
+COMMENT ON FUNCTION contar_gamificacao() IS 'Mantém total_sessoes/total_pecas de perfil_juridico';
@@ -0,0 +1,98 @@
+-- Migration 022: Contadores de respostas e índice de prioridade em revisao_agendada
+-- Data: 2026-10-16
+-- Descrição: GET /revisao/{user_id}/pendentes agregava todo o interacao_questao
+--            do usuário a cada chamada e ordenava só por data_agendada no
+--            banco (o LIMIT cortava antes da ordenação por prioridade em
+--            Python). Agora:
+--            - total_revisoes/total_acertos/total_erros ficam no cartão,
+--              inicializados na criação e incrementados a cada resposta
+--            - a chave de prioridade inteira (data, ease factor,
+--              repetições) é servida por um índice parcial dos pendentes
+
+-- 1. Contadores
+ALTER TABLE revisao_agendada
+ADD COLUMN IF NOT EXISTS total_revisoes INTEGER DEFAULT 0 NOT NULL,
+ADD COLUMN IF NOT EXISTS total_acertos INTEGER DEFAULT 0 NOT NULL,
+ADD COLUMN IF NOT EXISTS total_erros INTEGER DEFAULT 0 NOT NULL;
+
+-- Cartões de uma questão do usuário (atualização a cada resposta)
+CREATE INDEX IF NOT EXISTS idx_revisao_user_questao
+    ON revisao_agendada (user_id, questao_id);
+
+-- Novo cartão: parte do histórico de respostas da questão
+CREATE OR REPLACE FUNCTION inicializar_contadores_revisao()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.questao_id IS NOT NULL THEN
+        SELECT
+            COUNT(*),
+            COUNT(*) FILTER (WHERE tipo_resposta = 'CORRETA'),
+            COUNT(*) FILTER (WHERE tipo_resposta = 'INCORRETA')
+        INTO NEW.total_revisoes, NEW.total_acertos, NEW.total_erros
+        FROM interacao_questao
+        WHERE user_id = NEW.user_id
+          AND questao_id = NEW.questao_id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_revisao_agendada_contadores ON revisao_agendada;
+CREATE TRIGGER trg_revisao_agendada_contadores
+BEFORE INSERT ON revisao_agendada
+FOR EACH ROW EXECUTE FUNCTION inicializar_contadores_revisao();
+
+-- Nova resposta: incrementa os cartões da questão
+CREATE OR REPLACE FUNCTION contar_resposta_revisao()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE revisao_agendada
+    SET
+        total_revisoes = total_revisoes + 1,
+        total_acertos = total_acertos + CASE WHEN NEW.tipo_resposta = 'CORRETA' THEN 1 ELSE 0 END,
+        total_erros = total_erros + CASE WHEN NEW.tipo_resposta = 'INCORRETA' THEN 1 ELSE 0 END
+    WHERE user_id = NEW.user_id
+      AND questao_id = NEW.questao_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_interacao_questao_revisao ON interacao_questao;
+CREATE TRIGGER trg_interacao_questao_revisao
+AFTER INSERT ON interacao_questao
+FOR EACH ROW EXECUTE FUNCTION contar_resposta_revisao();
+
+-- 2. Backfill (depois dos triggers: o lock do CREATE TRIGGER segura
+--    respostas concorrentes até o fim da migration)
+UPDATE revisao_agendada ra
+SET
+    total_revisoes = stats.total,
+    total_acertos = stats.acertos,
+    total_erros = stats.erros
+FROM (
+    SELECT
+        user_id,
+        questao_id,
+        COUNT(*) AS total,
+        COUNT(*) FILTER (WHERE tipo_resposta = 'CORRETA') AS acertos,
+        COUNT(*) FILTER (WHERE tipo_resposta = 'INCORRETA') AS erros
+    FROM interacao_questao
+    GROUP BY user_id, questao_id
+) stats
+WHERE ra.user_id = stats.user_id
+  AND ra.questao_id = stats.questao_id;
+
+-- 3. Pendentes na ordem de prioridade de ordenar_cartoes_prioridade
+--    (mesmos defaults de _cartao_de_linha: ease 2.5, 0 repetições)
+CREATE INDEX IF NOT EXISTS idx_revisao_pendentes_prioridade
+    ON revisao_agendada (
+        user_id,
+        data_agendada,
+        (COALESCE(NULLIF(fator_facilidade, 0), 2.5)),
+        (COALESCE(numero_revisao, 0))
+    )
+    WHERE concluida = FALSE;
+
+COMMENT ON COLUMN revisao_agendada.total_revisoes IS 'Respostas do usuário à questão (trigger em interacao_questao)';
+COMMENT ON COLUMN revisao_agendada.total_acertos IS 'Respostas corretas do usuário à questão';
+COMMENT ON COLUMN revisao_agendada.total_erros IS 'Respostas incorretas do usuário à questão';
@@ -17,10 +17,10 @@ from sqlalchemy import (
     Column, String, Integer, DateTime, Boolean, ForeignKey,
     Enum, DECIMAL, Text, CheckConstraint, Index, UniqueConstraint
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import uuid
 
 Base = declarative_base()
@@ -254,6 +254,12 @@ class PerfilJuridico(Base):
     sequencia_dias_consecutivos = Column(Integer, default=0, nullable=False)
     data_ultima_atualizacao_perfil = Column(DateTime, server_default=func.now())
 
+    # Contadores de gamificação (migration 021): FP sem o teto de
+    # pontuacao_global; sessões e peças mantidos por trigger
+    total_xp = Column(Integer, default=0, nullable=False)
+    total_sessoes = Column(Integer, default=0, nullable=False)
+    total_pecas = Column(Integer, default=0, nullable=False)
+
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -572,6 +578,11 @@ class RevisaoAgendada(Base):
     fator_facilidade = Column(DECIMAL(4, 3), default=0.5)
     proximo_intervalo_calculado = Column(Integer)
 
+    # Contadores de respostas à questão (migration 022, mantidos por trigger)
+    total_revisoes = Column(Integer, default=0, nullable=False)
+    total_acertos = Column(Integer, default=0, nullable=False)
+    total_erros = Column(Integer, default=0, nullable=False)
+
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
@@ -584,6 +595,16 @@ class RevisaoAgendada(Base):
         Index('idx_revisao_user', 'user_id'),
         Index('idx_revisao_data_agendada', 'data_agendada'),
         Index('idx_revisao_user_pendentes', 'user_id', 'concluida', 'data_agendada'),
+        Index('idx_revisao_user_questao', 'user_id', 'questao_id'),
+        # Pendentes na ordem de prioridade (mesmos defaults de _cartao_de_linha)
+        Index(
+            'idx_revisao_pendentes_prioridade',
+            'user_id',
+            'data_agendada',
+            text('(COALESCE(NULLIF(fator_facilidade, 0), 2.5))'),
+            text('(COALESCE(numero_revisao, 0))'),
+            postgresql_where=text('concluida = FALSE')
+        ),
     )
 
     def __repr__(self):
@@ -951,6 +972,33 @@ class Pagamento(Base):
         return f"<Pagamento(user_id={self.user_id}, valor={self.valor}, status={self.status})>"
 
 
+# ============================================================================
+# ANALYTICS (ROLLUPS)
+# ============================================================================
+
+class EstatisticaDisciplina(Base):
+    """
+    Rollup global de progresso_disciplina por disciplina.
+    Recalculado por atualizar_estatisticas_disciplina() (migration 017).
+    """
+    __tablename__ = 'estatisticas_disciplina'
+
+    # Histograma de taxa_acerto: 20 buckets de 5 pontos
+    NUM_BUCKETS = 20
+    LARGURA_BUCKET = 5.0
+
+    disciplina = Column(String(100), primary_key=True)
+
+    total_estudantes = Column(Integer, default=0, nullable=False)
+    media_taxa_acerto = Column(DECIMAL(5, 2), default=0.0, nullable=False)
+    histograma = Column(ARRAY(Integer), nullable=False)
+
+    atualizado_em = Column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<EstatisticaDisciplina(disciplina={self.disciplina}, estudantes={self.total_estudantes})>"
+
+
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
@@ -962,7 +1010,7 @@ def get_all_models():
         SessaoEstudo, InteracaoQuestao, AnaliseErro, PraticaPeca,
         ErroPeca, RevisaoAgendada, SnapshotCognitivo, MetricasTemporal,
         QuestaoBanco, LogSistema, Consentimento, PasswordResetToken, UserSettings,
-        Assinatura, Pagamento
+        Assinatura, Pagamento, EstatisticaDisciplina
     ]
 
 
@@ -13,8 +13,8 @@ Versão: 1.0.0
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from uuid import UUID
-from sqlalchemy import and_, or_, func, desc, asc, case
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, func, desc, asc, case, text
+from sqlalchemy.orm import Session, load_only, joinedload
 from sqlalchemy.exc import IntegrityError
 import logging
 
@@ -22,10 +22,12 @@ from database.models import (
     User, PerfilJuridico, ProgressoDisciplina, ProgressoTopico,
     SessaoEstudo, InteracaoQuestao, AnaliseErro, PraticaPeca, ErroPeca,
     RevisaoAgendada, SnapshotCognitivo, MetricasTemporal, QuestaoBanco,
-    LogSistema, Consentimento,
+    LogSistema, Consentimento, EstatisticaDisciplina,
     UserStatus, NivelDominio, TipoResposta, TipoErro, DificuldadeQuestao,
     TipoTriggerSnapshot, TipoConsentimento
 )
+from core.log_queue import fila_logs, destino_log_sistema
+from core.leaderboard import leaderboards
 
 logger = logging.getLogger(__name__)
 
@@ -240,6 +242,24 @@ class PerfilJuridicoRepository(BaseRepository):
         perfil.pontuacao_global = min(1000, perfil.pontuacao_global + points)
         self.session.flush()
 
+        leaderboards.registrar_apos_commit(
+            self.session, user_id, pontuacao_global=perfil.pontuacao_global
+        )
+        return perfil
+
+    def registrar_resposta(
+        self, perfil: PerfilJuridico, acertou: bool, tempo_minutos: int = 0
+    ) -> PerfilJuridico:
+        """Atualiza contadores e taxa de acerto de um perfil já carregado"""
+        perfil.total_questoes_respondidas += 1
+        if acertou:
+            perfil.total_questoes_corretas += 1
+        perfil.total_tempo_estudo_minutos += tempo_minutos
+        perfil.taxa_acerto_global = round(
+            (perfil.total_questoes_corretas / perfil.total_questoes_respondidas) * 100, 2
+        )
+        self.session.flush()
+
         return perfil
 
     def update_accuracy_rate(self, user_id: UUID) -> Optional[PerfilJuridico]:
@@ -262,11 +282,22 @@ class PerfilJuridicoRepository(BaseRepository):
         ).all()
 
     def get_top_scores(self, limit: int = 10) -> List[PerfilJuridico]:
-        """Retorna top perfis por pontuação (leaderboard)"""
-        return self.session.query(PerfilJuridico).order_by(
+        """Retorna top perfis por pontuação (fallback do leaderboard no Redis)"""
+        return self.session.query(PerfilJuridico).options(
+            joinedload(PerfilJuridico.user)
+        ).order_by(
             desc(PerfilJuridico.pontuacao_global)
         ).limit(limit).all()
 
+    def get_by_user_ids(self, user_ids: List[UUID]) -> Dict[UUID, PerfilJuridico]:
+        """Perfis (com usuário) de vários usuários numa consulta, por user_id"""
+        if not user_ids:
+            return {}
+        perfis = self.session.query(PerfilJuridico).options(
+            joinedload(PerfilJuridico.user)
+        ).filter(PerfilJuridico.user_id.in_(user_ids)).all()
+        return {perfil.user_id: perfil for perfil in perfis}
+
 
 class ProgressoDisciplinaRepository(BaseRepository):
     """Repositório de progresso por disciplina"""
@@ -343,6 +374,13 @@ class ProgressoDisciplinaRepository(BaseRepository):
         progresso.distribuicao_dificuldade = dist
 
         self.session.flush()
+
+        if acertou:
+            leaderboards.registrar_apos_commit(
+                self.session, user_id,
+                disciplina=disciplina,
+                corretas_disciplina=progresso.questoes_corretas
+            )
         return progresso
 
     def get_weakest_disciplines(
@@ -355,6 +393,59 @@ class ProgressoDisciplinaRepository(BaseRepository):
         ).order_by(asc(ProgressoDisciplina.taxa_acerto)).limit(limit).all()
 
 
+class EstatisticaDisciplinaRepository(BaseRepository):
+    """Repositório do rollup global por disciplina (analytics)"""
+
+    def __init__(self, session: Session):
+        super().__init__(session, EstatisticaDisciplina)
+
+    def get_all_map(self) -> Dict[str, EstatisticaDisciplina]:
+        """Retorna o rollup de todas as disciplinas, indexado por disciplina"""
+        return {
+            e.disciplina: e
+            for e in self.session.query(EstatisticaDisciplina).all()
+        }
+
+    def refresh(self) -> int:
+        """
+        Recalcula o rollup (atualizar_estatisticas_disciplina).
+
+        Returns:
+            Disciplinas atualizadas, ou -1 se outro worker já está recalculando
+        """
+        return self.session.execute(
+            text("SELECT atualizar_estatisticas_disciplina()")
+        ).scalar()
+
+    @staticmethod
+    def calcular_percentil(histograma: List[int], taxa_acerto: float) -> float:
+        """
+        Percentil de uma taxa de acerto a partir do histograma da disciplina.
+
+        Conta os estudantes nos buckets abaixo e interpola linearmente
+        dentro do bucket da taxa.
+
+        Args:
+            histograma: Contagens por bucket (EstatisticaDisciplina.NUM_BUCKETS)
+            taxa_acerto: Taxa de acerto do estudante (0-100)
+
+        Returns:
+            Percentil (0-100)
+        """
+        total = sum(histograma) if histograma else 0
+        if total == 0:
+            return 50.0
+
+        largura = EstatisticaDisciplina.LARGURA_BUCKET
+        bucket = min(int(taxa_acerto // largura), len(histograma) - 1)
+        bucket = max(bucket, 0)
+
+        abaixo = sum(histograma[:bucket])
+        fracao = min(1.0, max(0.0, (taxa_acerto - bucket * largura) / largura))
+
+        return round((abaixo + fracao * histograma[bucket]) / total * 100, 1)
+
+
 class ProgressoTopicoRepository(BaseRepository):
     """Repositório de progresso por tópico (granular)"""
 
@@ -417,13 +508,14 @@ class ProgressoTopicoRepository(BaseRepository):
         )
 
         # Atualizar fator de retenção (algoritmo SM-2 simplificado)
+        fator_retencao = float(progresso.fator_retencao)  # DECIMAL no banco
         if acertou:
-            progresso.fator_retencao = min(1.0, progresso.fator_retencao + 0.1)
+            progresso.fator_retencao = min(1.0, fator_retencao + 0.1)
             progresso.intervalo_revisao_dias = int(
                 progresso.intervalo_revisao_dias * (1 + progresso.fator_retencao)
             )
         else:
-            progresso.fator_retencao = max(0.3, progresso.fator_retencao - 0.2)
+            progresso.fator_retencao = max(0.3, fator_retencao - 0.2)
             progresso.intervalo_revisao_dias = 1  # Reset
 
         progresso.numero_revisoes += 1
@@ -606,6 +698,55 @@ class AnaliseErroRepository(BaseRepository):
         return analise
 
 
+class RevisaoAgendadaRepository(BaseRepository):
+    """Repositório de revisões agendadas (repetição espaçada)"""
+
+    def __init__(self, session: Session):
+        super().__init__(session, RevisaoAgendada)
+
+    def get_pending(
+        self, user_id: UUID, ate: Optional[datetime] = None, limit: int = 50
+    ) -> List[RevisaoAgendada]:
+        """Retorna revisões não concluídas com data até `ate` (default: agora)"""
+        return self.session.query(RevisaoAgendada).filter(
+            RevisaoAgendada.user_id == user_id,
+            RevisaoAgendada.concluida == False,
+            RevisaoAgendada.data_agendada <= (ate or datetime.utcnow())
+        ).order_by(asc(RevisaoAgendada.data_agendada)).limit(limit).all()
+
+
+class LogSistemaRepository(BaseRepository):
+    """Repositório de logs de auditoria (log_sistema)"""
+
+    def __init__(self, session: Session):
+        super().__init__(session, LogSistema)
+
+    def registrar(
+        self,
+        evento: str,
+        detalhes: Dict[str, Any],
+        user_id: Optional[UUID] = None,
+        sucesso: bool = True
+    ) -> None:
+        """
+        Registra um evento da unidade de trabalho.
+
+        O evento entra na fila de gravação assíncrona (core.log_queue) quando
+        a transação confirma e é descartado no rollback; o INSERT não
+        acontece na transação da requisição.
+        """
+        fila_logs.enfileirar_apos_commit(
+            self.session,
+            destino_log_sistema(self.session.get_bind()),
+            {
+                "user_id": user_id,
+                "evento": evento,
+                "detalhes": detalhes,
+                "sucesso": sucesso
+            }
+        )
+
+
 class SnapshotCognitivoRepository(BaseRepository):
     """Repositório de snapshots cognitivos"""
 
@@ -718,16 +859,45 @@ class QuestaoBancoRepository(BaseRepository):
         disciplina: Optional[str] = None,
         dificuldade: Optional[DificuldadeQuestao] = None
     ) -> List[QuestaoBanco]:
-        """Retorna questões aleatórias"""
-        query = self.session.query(QuestaoBanco).filter(QuestaoBanco.ativa == True)
+        """
+        Retorna questões aleatórias.
 
-        if disciplina:
-            query = query.filter(QuestaoBanco.disciplina == disciplina)
+        O sorteio é feito nos pools em memória (core.question_sampler) e as
+        questões são carregadas por chave primária, evitando ORDER BY RANDOM().
+        """
+        from core.question_sampler import question_sampler
 
-        if dificuldade:
-            query = query.filter(QuestaoBanco.dificuldade == dificuldade)
+        ids = question_sampler.amostrar(
+            count, disciplina=disciplina, dificuldade=dificuldade, session=self.session
+        )
+        return self.get_by_ids(ids)
 
-        return query.order_by(func.random()).limit(count).all()
+    def get_by_ids(
+        self, ids: List[Any], colunas: Optional[List[str]] = None
+    ) -> List[QuestaoBanco]:
+        """
+        Busca questões ativas por ID, preservando a ordem recebida.
+
+        Args:
+            ids: IDs das questões
+            colunas: Carregar apenas estas colunas (None = linha inteira)
+        """
+        if not ids:
+            return []
+
+        query = self.session.query(QuestaoBanco)
+        if colunas:
+            query = query.options(
+                load_only(*[getattr(QuestaoBanco, c) for c in colunas])
+            )
+
+        questoes = query.filter(
+            QuestaoBanco.id.in_([UUID(str(i)) for i in ids]),
+            QuestaoBanco.ativa == True
+        ).all()
+
+        por_id = {str(q.id): q for q in questoes}
+        return [por_id[str(i)] for i in ids if str(i) in por_id]
 
     def update_statistics(self, questao_id: UUID, acertou: bool) -> Optional[QuestaoBanco]:
         """Atualiza estatísticas globais da questão"""
@@ -823,6 +993,10 @@ class RepositoryFactory:
     def progressos_disciplina(self) -> ProgressoDisciplinaRepository:
         return ProgressoDisciplinaRepository(self.session)
 
+    @property
+    def estatisticas_disciplina(self) -> EstatisticaDisciplinaRepository:
+        return EstatisticaDisciplinaRepository(self.session)
+
     @property
     def progressos_topico(self) -> ProgressoTopicoRepository:
         return ProgressoTopicoRepository(self.session)
@@ -835,6 +1009,14 @@ class RepositoryFactory:
     def analises_erro(self) -> AnaliseErroRepository:
         return AnaliseErroRepository(self.session)
 
+    @property
+    def revisoes_agendadas(self) -> RevisaoAgendadaRepository:
+        return RevisaoAgendadaRepository(self.session)
+
+    @property
+    def logs(self) -> LogSistemaRepository:
+        return LogSistemaRepository(self.session)
+
     @property
     def snapshots(self) -> SnapshotCognitivoRepository:
         return SnapshotCognitivoRepository(self.session)
@@ -32,7 +32,7 @@ import logging
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database.connection import get_db_session
+from database.connection import get_db_session, usar_sessao
 from database.repositories import RepositoryFactory
 from database.models import (
     NivelDominio, TipoResposta, TipoErro, TipoTriggerSnapshot
@@ -92,7 +92,9 @@ class DecisionEngineDB:
         self,
         user_id: UUID,
         evento_tipo: str,
-        contexto: Dict[str, Any]
+        contexto: Dict[str, Any],
+        session=None,
+        perfil=None
     ) -> Dict:
         """
         Processa um evento e retorna ações recomendadas.
@@ -101,48 +103,25 @@ class DecisionEngineDB:
             user_id: ID do usuário
             evento_tipo: Tipo do evento
             contexto: Contexto adicional do evento
+            session: Sessão de quem chama (participa da mesma transação)
+            perfil: Perfil já carregado (evita reler perfil_juridico)
 
         Returns:
             Dict com ações priorizadas e justificativas
         """
         try:
-            with get_db_session() as session:
+            with usar_sessao(session) as session:
                 repos = RepositoryFactory(session)
 
                 # Buscar perfil
-                perfil = repos.perfis.get_by_user_id(user_id)
+                if perfil is None:
+                    perfil = repos.perfis.get_by_user_id(user_id)
                 if not perfil:
                     return {"erro": "Perfil não encontrado"}
 
-                # Analisar evento e gerar ações
-                acoes = self._analisar_e_gerar_acoes(
-                    session, repos, user_id, perfil, evento_tipo, contexto
-                )
-
-                # Persistir evento e decisões
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes)
-                    VALUES (:user_id, :evento, :detalhes)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "DECISAO_PROCESSADA",
-                        "detalhes": {
-                            "evento_tipo": evento_tipo,
-                            "contexto": contexto,
-                            "acoes_geradas": len(acoes),
-                            "acoes": [
-                                {
-                                    "tipo": a["tipo"],
-                                    "prioridade": a["prioridade"],
-                                    "justificativa": a["justificativa"]
-                                }
-                                for a in acoes
-                            ]
-                        }
-                    }
-                )
+                # Analisar evento, gerar ações e persistir decisões
+                acoes = self.decidir(perfil, evento_tipo, contexto)
+                self.registrar_decisao(repos, user_id, evento_tipo, contexto, acoes)
 
                 logger.info(
                     f"Evento processado: {evento_tipo} para user {user_id} - {len(acoes)} ações geradas"
@@ -159,21 +138,54 @@ class DecisionEngineDB:
             logger.error(f"Erro ao processar evento: {e}")
             return {"erro": str(e)}
 
+    def decidir(self, perfil, evento_tipo: str, contexto: Dict[str, Any]) -> List[Dict]:
+        """Ações para o evento a partir do perfil (sem acesso ao banco)"""
+        return self._analisar_e_gerar_acoes(perfil, evento_tipo, contexto)
+
+    def registrar_decisao(
+        self,
+        repos: RepositoryFactory,
+        user_id: UUID,
+        evento_tipo: str,
+        contexto: Dict[str, Any],
+        acoes: List[Dict]
+    ) -> None:
+        """Persiste evento e decisões no log_sistema (na sessão de `repos`)"""
+        repos.logs.registrar(
+            evento="DECISAO_PROCESSADA",
+            user_id=user_id,
+            detalhes={
+                "evento_tipo": evento_tipo,
+                "contexto": contexto,
+                "acoes_geradas": len(acoes),
+                "acoes": [
+                    {
+                        "tipo": a["tipo"],
+                        "prioridade": a["prioridade"],
+                        "justificativa": a["justificativa"]
+                    }
+                    for a in acoes
+                ]
+            }
+        )
+
     def avaliar_mudanca_nivel(
         self,
-        user_id: UUID
+        user_id: UUID,
+        session=None
     ) -> Dict:
         """
         Avalia se usuário deve mudar de nível e executa mudança se apropriado.
 
         Args:
             user_id: ID do usuário
+            session: Sessão de quem chama (participa da mesma transação)
 
         Returns:
             Dict com decisão e justificativa
         """
         try:
-            with get_db_session() as session:
+            with usar_sessao(session) as session:
                 repos = RepositoryFactory(session)
 
                 perfil = repos.perfis.get_by_user_id(user_id)
@@ -239,21 +251,15 @@ class DecisionEngineDB:
                     )
 
                     # Registrar decisão
-                    repos.session.execute(
-                        """
-                        INSERT INTO log_sistema (user_id, evento, detalhes)
-                        VALUES (:user_id, :evento, :detalhes)
-                        """,
-                        {
-                            "user_id": user_id,
-                            "evento": "MUDANCA_NIVEL",
-                            "detalhes": {
-                                "nivel_anterior": nivel_atual.value,
-                                "nivel_novo": novo_nivel.value,
-                                "justificativa": justificativa,
-                                "taxa_acerto": taxa_acerto,
-                                "total_questoes": perfil.total_questoes_respondidas
-                            }
+                    repos.logs.registrar(
+                        evento="MUDANCA_NIVEL",
+                        user_id=user_id,
+                        detalhes={
+                            "nivel_anterior": nivel_atual.value,
+                            "nivel_novo": novo_nivel.value,
+                            "justificativa": justificativa,
+                            "taxa_acerto": taxa_acerto,
+                            "total_questoes": perfil.total_questoes_respondidas
                         }
                     )
 
@@ -389,18 +395,12 @@ class DecisionEngineDB:
                 recomendacoes.sort(key=lambda r: r["prioridade"], reverse=True)
 
                 # Persistir geração de recomendações
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes)
-                    VALUES (:user_id, :evento, :detalhes)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "RECOMENDACOES_GERADAS",
-                        "detalhes": {
-                            "total_recomendacoes": len(recomendacoes),
-                            "recomendacoes": recomendacoes
-                        }
+                repos.logs.registrar(
+                    evento="RECOMENDACOES_GERADAS",
+                    user_id=user_id,
+                    detalhes={
+                        "total_recomendacoes": len(recomendacoes),
+                        "recomendacoes": recomendacoes
                     }
                 )
 
@@ -419,7 +419,7 @@ class DecisionEngineDB:
     # ========================================================================
 
     def _analisar_e_gerar_acoes(
-        self, session, repos, user_id: UUID, perfil, evento_tipo: str, contexto: Dict
+        self, perfil, evento_tipo: str, contexto: Dict
     ) -> List[Dict]:
         """Analisa evento e gera ações apropriadas"""
 
@@ -29,9 +29,11 @@ from uuid import UUID
 from datetime import datetime
 import logging
 
+from sqlalchemy import text
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database.connection import get_db_session
+from database.connection import get_db_session, usar_sessao
 from database.repositories import RepositoryFactory
 from database.models import (
     NivelDominio, TipoResposta, TipoErro
@@ -75,7 +77,9 @@ class ExplanationEngineDB:
         acertou: bool,
         alternativa_escolhida: Optional[str] = None,
         alternativa_correta: Optional[str] = None,
-        tipo_erro: Optional[TipoErro] = None
+        tipo_erro: Optional[TipoErro] = None,
+        session=None,
+        perfil=None
     ) -> Dict:
         """
         Gera explicação adaptada ao perfil do usuário e PERSISTE.
@@ -89,100 +93,130 @@ class ExplanationEngineDB:
             alternativa_escolhida: Alternativa escolhida pelo usuário
             alternativa_correta: Alternativa correta
             tipo_erro: Tipo de erro cometido (se errou)
+            session: Sessão de quem chama (participa da mesma transação)
+            perfil: Perfil já carregado (evita reler perfil_juridico)
 
         Returns:
             Dict com explicação gerada e metadata
         """
         try:
-            with get_db_session() as session:
+            with usar_sessao(session) as session:
                 repos = RepositoryFactory(session)
 
                 # Buscar perfil do usuário
-                perfil = repos.perfis.get_by_user_id(user_id)
+                if perfil is None:
+                    perfil = repos.perfis.get_by_user_id(user_id)
                 if not perfil:
                     return {"erro": "Perfil não encontrado"}
 
-                # Determinar nível ideal baseado no perfil
-                nivel_ideal = self._determinar_nivel_por_perfil(perfil.nivel_geral)
-
-                # Buscar se já existe explicação eficaz para este tópico
-                explicacao_existente = self._buscar_explicacao_reutilizavel(
-                    session, topico, nivel_ideal, tipo_erro
+                explicacao = self.preparar_explicacao(
+                    session, perfil, topico, contexto, acertou,
+                    alternativa_escolhida, tipo_erro
                 )
-
-                if explicacao_existente:
-                    # Reutilizar explicação eficaz
-                    conteudo = explicacao_existente
-                    reutilizada = True
-                else:
-                    # Gerar nova explicação
-                    conteudo = self._gerar_conteudo_explicacao(
-                        topico=topico,
-                        contexto=contexto,
-                        nivel=nivel_ideal,
-                        acertou=acertou,
-                        alternativa_errada=alternativa_escolhida if not acertou else None,
-                        tipo_erro=tipo_erro
-                    )
-                    reutilizada = False
-
-                # Persistir explicação no log do sistema
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes, sucesso)
-                    VALUES (:user_id, :evento, :detalhes, :sucesso)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "EXPLICACAO_GERADA",
-                        "detalhes": {
-                            "questao_id": str(questao_id),
-                            "topico": topico,
-                            "nivel": nivel_ideal,
-                            "acertou": acertou,
-                            "tipo_erro": tipo_erro.value if tipo_erro else None,
-                            "reutilizada": reutilizada,
-                            "tamanho_caracteres": len(conteudo)
-                        },
-                        "sucesso": True
-                    }
+                self.registrar_explicacao(
+                    repos, user_id, questao_id, topico, acertou, tipo_erro, explicacao
                 )
 
-                # Se errou, registrar conceitos faltantes
-                conceitos_faltantes = []
-                if not acertou and tipo_erro:
-                    conceitos_faltantes = self._identificar_conceitos_faltantes(
-                        topico, tipo_erro
-                    )
-
-                    # Atualizar análise de erro se existir
-                    analise = repos.session.query(repos.analises_erro.model_class).filter(
-                        repos.analises_erro.model_class.user_id == user_id
-                    ).order_by(
-                        repos.analises_erro.model_class.created_at.desc()
-                    ).first()
-
-                    if analise:
-                        analise.conceitos_faltantes = conceitos_faltantes
-
                 logger.info(
-                    f"Explicação gerada para user {user_id}: {topico} (nível {nivel_ideal})"
+                    f"Explicação gerada para user {user_id}: {topico} (nível {explicacao['nivel']})"
                 )
 
-                return {
-                    "status": "gerada",
-                    "nivel": nivel_ideal,
-                    "nivel_nome": self._nome_nivel(nivel_ideal),
-                    "conteudo": conteudo,
-                    "conceitos_faltantes": conceitos_faltantes if not acertou else [],
-                    "reutilizada": reutilizada,
-                    "perfil_nivel": perfil.nivel_geral.value
-                }
+                return explicacao
 
         except Exception as e:
             logger.error(f"Erro ao gerar explicação: {e}")
             return {"erro": str(e)}
 
+    def preparar_explicacao(
+        self,
+        session,
+        perfil,
+        topico: str,
+        contexto: str,
+        acertou: bool,
+        alternativa_escolhida: Optional[str] = None,
+        tipo_erro: Optional[TipoErro] = None
+    ) -> Dict:
+        """
+        Monta a explicação para o perfil, sem gravar nada.
+
+        O banco só é lido para reaproveitar explicação com bom feedback.
+        """
+        # Determinar nível ideal baseado no perfil
+        nivel_ideal = self._determinar_nivel_por_perfil(perfil.nivel_geral)
+
+        # Buscar se já existe explicação eficaz para este tópico
+        explicacao_existente = self._buscar_explicacao_reutilizavel(
+            session, topico, nivel_ideal, tipo_erro
+        )
+
+        if explicacao_existente:
+            # Reutilizar explicação eficaz
+            conteudo = explicacao_existente
+            reutilizada = True
+        else:
+            # Gerar nova explicação
+            conteudo = self._gerar_conteudo_explicacao(
+                topico=topico,
+                contexto=contexto,
+                nivel=nivel_ideal,
+                acertou=acertou,
+                alternativa_errada=alternativa_escolhida if not acertou else None,
+                tipo_erro=tipo_erro
+            )
+            reutilizada = False
+
+        # Se errou, identificar conceitos faltantes
+        conceitos_faltantes = []
+        if not acertou and tipo_erro:
+            conceitos_faltantes = self._identificar_conceitos_faltantes(topico, tipo_erro)
+
+        return {
+            "status": "gerada",
+            "nivel": nivel_ideal,
+            "nivel_nome": self._nome_nivel(nivel_ideal),
+            "conteudo": conteudo,
+            "conceitos_faltantes": conceitos_faltantes,
+            "reutilizada": reutilizada,
+            "perfil_nivel": perfil.nivel_geral.value
+        }
+
+    def registrar_explicacao(
+        self,
+        repos: RepositoryFactory,
+        user_id: UUID,
+        questao_id: UUID,
+        topico: str,
+        acertou: bool,
+        tipo_erro: Optional[TipoErro],
+        explicacao: Dict
+    ) -> None:
+        """Persiste a explicação no log e os conceitos faltantes na última análise de erro"""
+        repos.logs.registrar(
+            evento="EXPLICACAO_GERADA",
+            user_id=user_id,
+            detalhes={
+                "questao_id": str(questao_id),
+                "topico": topico,
+                "nivel": explicacao["nivel"],
+                "acertou": acertou,
+                "tipo_erro": tipo_erro.value if tipo_erro else None,
+                "reutilizada": explicacao["reutilizada"],
+                "tamanho_caracteres": len(explicacao["conteudo"])
+            }
+        )
+
+        if explicacao["conceitos_faltantes"]:
+            # Atualizar análise de erro se existir
+            analise = repos.session.query(repos.analises_erro.model_class).filter(
+                repos.analises_erro.model_class.user_id == user_id
+            ).order_by(
+                repos.analises_erro.model_class.created_at.desc()
+            ).first()
+
+            if analise:
+                analise.conceitos_faltantes = explicacao["conceitos_faltantes"]
+
     def explicar_erro_especifico(
         self,
         user_id: UUID,
@@ -411,23 +445,27 @@ class ExplanationEngineDB:
         Busca explicação já gerada e bem-sucedida para reutilização.
 
         Critério: explicação com feedback positivo (clareza >= 4)
+
+        Roda em savepoint: uma falha aqui não invalida a transação de quem
+        chama (a resposta do usuário é gravada na mesma sessão).
         """
         try:
             # Buscar nos logs explicações com bom feedback
-            resultado = session.execute(
-                """
-                SELECT detalhes->>'conteudo' as conteudo
-                FROM log_sistema
-                WHERE evento = 'FEEDBACK_EXPLICACAO'
-                  AND detalhes->>'topico' = :topico
-                  AND CAST(detalhes->>'nivel' AS INTEGER) = :nivel
-                  AND CAST(detalhes->>'clareza' AS INTEGER) >= 4
-                  AND CAST(detalhes->>'ajudou' AS BOOLEAN) = true
-                ORDER BY timestamp DESC
-                LIMIT 1
-                """,
-                {"topico": topico, "nivel": nivel}
-            ).first()
+            with session.begin_nested():
+                resultado = session.execute(
+                    text("""
+                    SELECT detalhes->>'conteudo' as conteudo
+                    FROM log_sistema
+                    WHERE evento = 'FEEDBACK_EXPLICACAO'
+                      AND detalhes->>'topico' = :topico
+                      AND CAST(detalhes->>'nivel' AS INTEGER) = :nivel
+                      AND CAST(detalhes->>'clareza' AS INTEGER) >= 4
+                      AND CAST(detalhes->>'ajudou' AS BOOLEAN) = true
+                    ORDER BY timestamp DESC
+                    LIMIT 1
+                    """),
+                    {"topico": topico, "nivel": nivel}
+                ).first()
 
             if resultado:
                 return resultado[0]
@@ -17,26 +17,34 @@ Data: 2025-12-17
 """
 
 import json
+import os
 import sys
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from datetime import datetime, timezone
 from uuid import UUID
 
+from sqlalchemy import text
+
 # Adiciona path para imports
 sys.path.append(str(Path(__file__).parent.parent))
 
 # Importa engines DATABASE-INTEGRATED
 from engines.explanation_engine_db import ExplanationEngineDB, criar_explanation_engine_db
 from engines.question_engine_db import QuestionEngineDB, criar_question_engine_db
-from engines.decision_engine_db import DecisionEngineDB, criar_decision_engine_db
+from engines.decision_engine_db import DecisionEngineDB, EventType, criar_decision_engine_db
 from engines.piece_engine_db import PieceEngineDB, PieceType, criar_piece_engine_db
 from engines.memory_engine_db import MemoryEngineDB, criar_memory_engine_db
 
 # Database imports
 from database.connection import get_db_session
 from database.repositories import RepositoryFactory
-from database.models import TipoErro
+from database.models import TipoErro, TipoResposta
+from core.seen_questions import seen_questions
+
+logger = logging.getLogger(__name__)
 
 
 # ============================================================
@@ -62,18 +70,25 @@ class JurisIADB:
     - Garantir persistência de TODAS as interações
     """
 
-    def __init__(self):
+    # Threads para as etapas adiadas de responder_questao
+    POS_RESPOSTA_WORKERS = int(os.getenv("POS_RESPOSTA_WORKERS", "2"))
+
+    def __init__(self, pos_resposta_em_segundo_plano: bool = True):
         """
         Inicializa o sistema JURIS_IA com engines database-integrated.
 
         IMPORTANTE: Sistema FALHA se database não disponível.
+
+        Args:
+            pos_resposta_em_segundo_plano: Executa as etapas não críticas de
+                responder_questao em threads (False: na própria chamada)
         """
         print("Inicializando JURIS_IA_CORE_V1 (DATABASE INTEGRATED)...")
 
         # Verifica conexão com database ANTES de inicializar
         try:
             with get_db_session() as session:
-                session.execute("SELECT 1")
+                session.execute(text("SELECT 1"))
             print("✓ Database PostgreSQL conectado")
         except Exception as e:
             print(f"✗ ERRO: Database PostgreSQL não disponível")
@@ -89,6 +104,13 @@ class JurisIADB:
         self.piece_engine = criar_piece_engine_db()
         self.memory_engine = criar_memory_engine_db()
 
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if pos_resposta_em_segundo_plano:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.POS_RESPOSTA_WORKERS,
+                thread_name_prefix="pos_resposta"
+            )
+
         print("✓ Explanation Engine (DB) carregado")
         print("✓ Question Engine (DB) carregado")
         print("✓ Decision Engine (DB) carregado")
@@ -177,6 +199,13 @@ class JurisIADB:
         Processa resposta de uma questão.
         PERSISTE interação completa no database.
 
+        Unidade de trabalho única: interação, progresso (tópico e
+        disciplina), contadores do perfil e decisão são gravados na mesma
+        transação, com questão e perfil lidos uma vez. A explicação é montada
+        nessa sessão e devolvida na resposta; gravar o log da explicação,
+        agendar a revisão e avaliar mudança de nível (snapshot) ficam para
+        _pos_resposta, fora do caminho da requisição.
+
         Args:
             user_id: UUID do usuário
             questao_id: UUID da questão
@@ -188,10 +217,12 @@ class JurisIADB:
             Dict com feedback completo + explicação adaptativa
         """
         try:
+            tipo_erro = TipoErro.CONCEITO_NAO_COMPREENDIDO if not acertou else None
+
             with get_db_session() as session:
                 repos = RepositoryFactory(session)
 
-                # 1. Busca questão no database
+                # 1. Questão e perfil (uma leitura cada)
                 questao = repos.questoes.get_by_id(questao_id)
                 if not questao:
                     return {
@@ -199,74 +230,82 @@ class JurisIADB:
                         "erro": "Questão não encontrada"
                     }
 
-                # 2. Registra interação no database
-                repos.interacoes_questao.create_interacao(
+                perfil = (
+                    repos.perfis.get_by_user_id(user_id)
+                    or repos.perfis.create_initial_profile(user_id)
+                )
+
+                # 2. Interação, progresso e perfil
+                repos.interacoes.create_interaction(
                     user_id=user_id,
                     questao_id=questao_id,
+                    disciplina=questao.disciplina,
+                    topico=questao.topico,
+                    tipo_resposta=TipoResposta.CORRETA if acertou else TipoResposta.INCORRETA,
                     alternativa_escolhida=alternativa_escolhida,
-                    acertou=acertou,
-                    tempo_segundos=tempo_segundos
+                    alternativa_correta=questao.alternativa_correta,
+                    tempo_resposta_segundos=tempo_segundos
                 )
 
-                # 3. Atualiza progresso (topico e disciplina)
-                repos.progressos_topico.atualizar_progresso(
+                tempo_minutos = round(tempo_segundos / 60)
+                repos.progressos_topico.update_after_interaction(
                     user_id=user_id,
+                    disciplina=questao.disciplina,
                     topico=questao.topico,
                     acertou=acertou
                 )
-
-                repos.progressos_disciplina.atualizar_progresso(
+                repos.progressos_disciplina.update_stats(
                     user_id=user_id,
                     disciplina=questao.disciplina,
-                    acertou=acertou
+                    acertou=acertou,
+                    tempo_minutos=tempo_minutos,
+                    dificuldade=questao.dificuldade
                 )
+                repos.perfis.registrar_resposta(perfil, acertou, tempo_minutos)
 
-                session.commit()
-
-            # 4. Processa evento via Decision Engine
-            evento_tipo = "ACERTO" if acertou else "ERRO"
-            evento_resultado = self.decision_engine.processar_evento(
-                user_id=user_id,
-                evento_tipo=evento_tipo,
-                contexto={
+                # 3. Decisão (sobre o perfil já carregado)
+                evento_tipo = EventType.ACERTO if acertou else EventType.ERRO
+                contexto = {
                     "questao_id": str(questao_id),
                     "disciplina": questao.disciplina,
                     "topico": questao.topico,
                     "tempo_segundos": tempo_segundos,
-                    "tipo_erro": "conceitual" if not acertou else None
+                    "tipo_erro": tipo_erro.value if tipo_erro else None
                 }
-            )
-
-            # 5. Gera explicação adaptativa
-            explicacao_resultado = self.explanation_engine.gerar_explicacao_adaptativa(
-                user_id=user_id,
-                questao_id=questao_id,
-                topico=questao.topico,
-                contexto=questao.enunciado[:200],  # Primeiros 200 chars
-                acertou=acertou,
-                alternativa_escolhida=alternativa_escolhida,
-                alternativa_correta=questao.gabarito,
-                tipo_erro=TipoErro.ERRO_CONCEITUAL if not acertou else None
-            )
+                acoes = self.decision_engine.decidir(perfil, evento_tipo, contexto)
+                self.decision_engine.registrar_decisao(
+                    repos, user_id, evento_tipo, contexto, acoes
+                )
 
-            # 6. Se errou, agenda revisão via Memory Engine
-            if not acertou:
-                self.memory_engine.adicionar_item(
-                    user_id=user_id,
+                # 4. Explicação adaptativa (persistida depois)
+                explicacao = self.explanation_engine.preparar_explicacao(
+                    session,
+                    perfil,
                     topico=questao.topico,
-                    disciplina=questao.disciplina,
-                    conceitos=[questao.topico],  # Simplificado
-                    artigos=[]
+                    contexto=questao.enunciado[:200],  # Primeiros 200 chars
+                    acertou=acertou,
+                    alternativa_escolhida=alternativa_escolhida,
+                    tipo_erro=tipo_erro
                 )
 
+                disciplina, topico = questao.disciplina, questao.topico
+
+            seen_questions.registrar(user_id, [questao_id])
+
+            # 5. Etapas não críticas (explicação, revisão, nível/snapshot)
+            self._adiar(
+                self._pos_resposta,
+                user_id, questao_id, disciplina, topico, acertou, tipo_erro, explicacao
+            )
+
             return {
                 "sucesso": True,
                 "resultado": "ACERTO" if acertou else "ERRO",
                 "questao_id": str(questao_id),
                 "tempo_segundos": tempo_segundos,
                 "feedback_tempo": self._feedback_tempo(tempo_segundos),
-                "explicacao": explicacao_resultado.get("explicacao", {}),
-                "proximas_acoes": evento_resultado.get("acoes", []),
+                "explicacao": explicacao,
+                "proximas_acoes": acoes,
                 "revisao_agendada": not acertou
             }
 
@@ -276,6 +315,73 @@ class JurisIADB:
                 "erro": f"Erro ao processar resposta: {str(e)}"
             }
 
+    def _pos_resposta(
+        self,
+        user_id: UUID,
+        questao_id: UUID,
+        disciplina: str,
+        topico: str,
+        acertou: bool,
+        tipo_erro: Optional[TipoErro],
+        explicacao: Dict
+    ) -> None:
+        """
+        Etapas adiadas de responder_questao, em uma transação própria.
+
+        Cada etapa roda em savepoint: a falha de uma é registrada em log e
+        não desfaz as demais.
+        """
+        etapas = [
+            ("explicacao", lambda session: self.explanation_engine.registrar_explicacao(
+                RepositoryFactory(session), user_id, questao_id, topico,
+                acertou, tipo_erro, explicacao
+            )),
+        ]
+        if not acertou:
+            etapas.append(("revisao", lambda session: self.memory_engine.adicionar_topico_memoria(
+                user_id=user_id,
+                disciplina=disciplina,
+                topico=topico,
+                acertou_na_introducao=False,
+                session=session
+            )))
+        etapas.append(("nivel", lambda session: self.decision_engine.avaliar_mudanca_nivel(
+            user_id, session=session
+        )))
+
+        with get_db_session() as session:
+            for nome, etapa in etapas:
+                try:
+                    with session.begin_nested():
+                        resultado = etapa(session)
+                        if isinstance(resultado, dict) and "erro" in resultado:
+                            raise RuntimeError(resultado["erro"])
+                except Exception as e:
+                    logger.warning(
+                        f"Pós-resposta '{nome}' falhou para user {user_id}, "
+                        f"questão {questao_id}: {e}"
+                    )
+
+    def _adiar(self, funcao: Callable, *args) -> None:
+        """Executa `funcao` no pool de pós-resposta (ou na hora, se desativado)"""
+        if self._executor is None:
+            try:
+                funcao(*args)
+            except Exception as e:
+                logger.error(f"Erro em tarefa adiada {funcao.__name__}: {e}")
+            return
+
+        def registrar_falha(futuro):
+            if futuro.exception() is not None:
+                logger.error(f"Erro em tarefa adiada {funcao.__name__}: {futuro.exception()}")
+
+        self._executor.submit(funcao, *args).add_done_callback(registrar_falha)
+
+    def encerrar(self, aguardar: bool = True) -> None:
+        """Encerra o pool de pós-resposta (aguardando as tarefas pendentes)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=aguardar)
+
     def finalizar_sessao_estudo(self, user_id: UUID) -> Dict:
         """
         Finaliza sessão de estudo e gera relatório.
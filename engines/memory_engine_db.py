@@ -29,7 +29,7 @@ import logging
 # Adicionar path do projeto
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from database.connection import get_db_session
+from database.connection import get_db_session, usar_sessao
 from database.repositories import RepositoryFactory
 from database.models import (
     NivelDominio, TipoResposta, TipoTriggerSnapshot
@@ -64,7 +64,8 @@ class MemoryEngineDB:
         user_id: UUID,
         disciplina: str,
         topico: str,
-        acertou_na_introducao: bool = True
+        acertou_na_introducao: bool = True,
+        session=None
     ) -> Dict:
         """
         Adiciona novo tópico para rastreamento de memória.
@@ -74,12 +75,13 @@ class MemoryEngineDB:
             disciplina: Disciplina jurídica
             topico: Tópico aprendido
             acertou_na_introducao: Se acertou na primeira exposição
+            session: Sessão de quem chama (participa da mesma transação)
 
         Returns:
             Dict com informações do tópico e cronograma
         """
         try:
-            with get_db_session() as session:
+            with usar_sessao(session) as session:
                 repos = RepositoryFactory(session)
 
                 # Buscar ou criar progresso do tópico
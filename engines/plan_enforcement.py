@@ -15,7 +15,8 @@ from enum import Enum
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
-from database.models import Assinatura, SessaoEstudo, PlanoStatus
+from database.models import Assinatura, PlanoStatus
+from core.entitlements import obter_direitos
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -98,14 +99,8 @@ class PlanEnforcementService:
                 'plano': assinatura.plano
             }
 
-        # Contar sessões de hoje
-        hoje = date.today()
-        sessoes_hoje = self.db.query(func.count(SessaoEstudo.id)).filter(
-            and_(
-                SessaoEstudo.aluno_id == user_id,
-                func.date(SessaoEstudo.data_inicio) == hoje
-            )
-        ).scalar() or 0
+        # Sessões de hoje: mesmo contador do enforcement (core.entitlements)
+        sessoes_hoje = obter_direitos().sessoes_hoje(user_id)
 
         if sessoes_hoje >= assinatura.sessoes_por_dia:
             raise EnforcementError(
@@ -307,14 +302,8 @@ class PlanEnforcementService:
                 'limites': {}
             }
 
-        # Contar uso de hoje
-        hoje = date.today()
-        sessoes_hoje = self.db.query(func.count(SessaoEstudo.id)).filter(
-            and_(
-                SessaoEstudo.aluno_id == user_id,
-                func.date(SessaoEstudo.data_inicio) == hoje
-            )
-        ).scalar() or 0
+        # Uso de hoje: mesmo contador do enforcement (core.entitlements)
+        sessoes_hoje = obter_direitos().sessoes_hoje(user_id)
 
         return {
             'plano': assinatura.plano,
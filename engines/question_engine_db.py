@@ -25,7 +25,7 @@ Versão: 2.0.0 (Database-Integrated)
 
 import sys
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Container, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 import random
@@ -38,6 +38,8 @@ from database.repositories import RepositoryFactory
 from database.models import (
     NivelDominio, DificuldadeQuestao, TipoResposta
 )
+from core.question_sampler import question_sampler
+from core.seen_questions import seen_questions, ExclusaoComposta
 
 logger = logging.getLogger(__name__)
 
@@ -87,40 +89,40 @@ class QuestionEngineDB:
                 if not perfil:
                     return {"erro": "Perfil não encontrado"}
 
+                # Questões já respondidas recentemente não entram no sorteio
+                vistas = seen_questions.obter(user_id, session)
+
                 # Determinar estratégia de seleção baseada no foco
                 if foco == "revisao":
-                    questoes = self._selecionar_para_revisao(
-                        session, user_id, quantidade, disciplina
+                    ids = self._selecionar_para_revisao(
+                        session, user_id, quantidade, disciplina, vistas
                     )
                 elif foco == "conceito":
-                    questoes = self._selecionar_conceituais(
-                        session, user_id, quantidade, disciplina
+                    ids = self._selecionar_conceituais(
+                        session, user_id, quantidade, disciplina, vistas
                     )
                 elif foco == "velocidade":
-                    questoes = self._selecionar_velocidade(
-                        session, user_id, quantidade, disciplina
+                    ids = self._selecionar_velocidade(
+                        session, user_id, quantidade, disciplina, vistas
                     )
                 else:  # adaptativo
-                    questoes = self._selecionar_adaptativo(
-                        session, user_id, perfil, quantidade, disciplina
+                    ids = self._selecionar_adaptativo(
+                        session, user_id, perfil, quantidade, disciplina, vistas
                     )
 
+                # Uma única busca por PK para todas as questões sorteadas
+                questoes = self._carregar_questoes_por_ids(session, ids)
+
                 # Persistir seleção
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes)
-                    VALUES (:user_id, :evento, :detalhes)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "QUESTOES_SELECIONADAS",
-                        "detalhes": {
-                            "foco": foco,
-                            "quantidade": len(questoes),
-                            "questoes_ids": [str(q["id"]) for q in questoes],
-                            "disciplina": disciplina,
-                            "nivel_perfil": perfil.nivel_geral.value
-                        }
+                repos.logs.registrar(
+                    evento="QUESTOES_SELECIONADAS",
+                    user_id=user_id,
+                    detalhes={
+                        "foco": foco,
+                        "quantidade": len(questoes),
+                        "questoes_ids": [str(q["id"]) for q in questoes],
+                        "disciplina": disciplina,
+                        "nivel_perfil": perfil.nivel_geral.value
                     }
                 )
 
@@ -189,30 +191,25 @@ class QuestionEngineDB:
                     topicos_fracos = [t.topico for t in topicos]
 
                 # Selecionar questões focadas nos pontos fracos
-                questoes = self._selecionar_por_topicos_fracos(
-                    session, topicos_fracos or [topico] if topico else [],
-                    disciplina, quantidade
+                ids = self._selecionar_por_topicos_fracos(
+                    session, topicos_fracos or ([topico] if topico else []),
+                    disciplina, quantidade, seen_questions.obter(user_id, session)
                 )
+                questoes = self._carregar_questoes_por_ids(session, ids)
 
                 # Criar drill no log
                 drill_id = f"drill_{user_id}_{datetime.utcnow().timestamp()}"
 
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes)
-                    VALUES (:user_id, :evento, :detalhes)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "DRILL_GERADO",
-                        "detalhes": {
-                            "drill_id": drill_id,
-                            "disciplina": disciplina,
-                            "topico": topico,
-                            "topicos_fracos": topicos_fracos,
-                            "quantidade_questoes": len(questoes),
-                            "questoes_ids": [str(q["id"]) for q in questoes]
-                        }
+                repos.logs.registrar(
+                    evento="DRILL_GERADO",
+                    user_id=user_id,
+                    detalhes={
+                        "drill_id": drill_id,
+                        "disciplina": disciplina,
+                        "topico": topico,
+                        "topicos_fracos": topicos_fracos,
+                        "quantidade_questoes": len(questoes),
+                        "questoes_ids": [str(q["id"]) for q in questoes]
                     }
                 )
 
@@ -280,13 +277,13 @@ class QuestionEngineDB:
                         "Ética e Estatuto": 1
                     }
 
-                # Selecionar questões por disciplina
-                todas_questoes = []
-                for disciplina, qtd in distribuicao.items():
-                    questoes_disc = self._selecionar_questoes_disciplina(
-                        session, disciplina, qtd
-                    )
-                    todas_questoes.extend(questoes_disc)
+                # Sortear questões de todas as disciplinas e carregar em uma query
+                sorteio = question_sampler.amostrar_distribuicao(
+                    distribuicao, session=session
+                )
+                todas_questoes = self._carregar_questoes_por_ids(
+                    session, [qid for ids in sorteio.values() for qid in ids]
+                )
 
                 # Embaralhar questões
                 random.shuffle(todas_questoes)
@@ -294,21 +291,15 @@ class QuestionEngineDB:
                 # Criar simulado
                 simulado_id = f"sim_{user_id}_{datetime.utcnow().timestamp()}"
 
-                repos.session.execute(
-                    """
-                    INSERT INTO log_sistema (user_id, evento, detalhes)
-                    VALUES (:user_id, :evento, :detalhes)
-                    """,
-                    {
-                        "user_id": user_id,
-                        "evento": "SIMULADO_GERADO",
-                        "detalhes": {
-                            "simulado_id": simulado_id,
-                            "tipo": tipo,
-                            "total_questoes": len(todas_questoes),
-                            "distribuicao": distribuicao,
-                            "questoes_ids": [str(q["id"]) for q in todas_questoes]
-                        }
+                repos.logs.registrar(
+                    evento="SIMULADO_GERADO",
+                    user_id=user_id,
+                    detalhes={
+                        "simulado_id": simulado_id,
+                        "tipo": tipo,
+                        "total_questoes": len(todas_questoes),
+                        "distribuicao": distribuicao,
+                        "questoes_ids": [str(q["id"]) for q in todas_questoes]
                     }
                 )
 
@@ -404,8 +395,9 @@ class QuestionEngineDB:
     # ========================================================================
 
     def _selecionar_adaptativo(
-        self, session, user_id: UUID, perfil, quantidade: int, disciplina: Optional[str]
-    ) -> List[Dict]:
+        self, session, user_id: UUID, perfil, quantidade: int, disciplina: Optional[str],
+        vistas: Optional[Container[str]] = None
+    ) -> List[str]:
         """Seleção adaptativa baseada no perfil completo"""
 
         # Determinar dificuldade ideal pelo nível
@@ -420,26 +412,27 @@ class QuestionEngineDB:
         qtd_alvo = int(quantidade * 0.6)
         qtd_variado = quantidade - qtd_alvo
 
-        questoes = []
+        escolhidos: Set[str] = set()
 
         # Questões da dificuldade alvo
-        questoes.extend(
-            self._buscar_questoes_por_dificuldade(
-                session, dificuldade_alvo, disciplina, qtd_alvo
-            )
+        ids = self._buscar_questoes_por_dificuldade(
+            session, dificuldade_alvo, disciplina, qtd_alvo, vistas, escolhidos
         )
 
-        # Questões variadas
-        questoes.extend(
-            self._buscar_questoes_variadas(session, disciplina, qtd_variado)
+        # Questões variadas (sem repetir as da dificuldade alvo)
+        ids.extend(
+            self._buscar_questoes_variadas(
+                session, disciplina, qtd_variado, vistas, escolhidos
+            )
         )
 
-        random.shuffle(questoes)
-        return questoes[:quantidade]
+        random.shuffle(ids)
+        return ids[:quantidade]
 
     def _selecionar_para_revisao(
-        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str]
-    ) -> List[Dict]:
+        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str],
+        vistas: Optional[Container[str]] = None
+    ) -> List[str]:
         """Seleciona questões de tópicos que precisam revisão"""
         repos = RepositoryFactory(session)
 
@@ -450,23 +443,24 @@ class QuestionEngineDB:
 
         if not topicos_revisao:
             # Se não há revisões pendentes, seleciona aleatório
-            return self._buscar_questoes_variadas(session, disciplina, quantidade)
+            return self._buscar_questoes_variadas(session, disciplina, quantidade, vistas)
 
         # Selecionar questões dos tópicos em revisão
         topicos = [t.topico for t in topicos_revisao]
         return self._selecionar_por_topicos_fracos(
-            session, topicos, disciplina, quantidade
+            session, topicos, disciplina, quantidade, vistas
         )
 
     def _selecionar_conceituais(
-        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str]
-    ) -> List[Dict]:
+        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str],
+        vistas: Optional[Container[str]] = None
+    ) -> List[str]:
         """Seleciona questões conceituais de tópicos fracos"""
         repos = RepositoryFactory(session)
 
         # Buscar tópicos com baixa taxa de acerto
         query = repos.progressos_topico.session.query(
-            repos.progressos_topico.model_class
+            repos.progressos_topico.model_class.topico
         ).filter(
             repos.progressos_topico.model_class.user_id == user_id,
             repos.progressos_topico.model_class.taxa_acerto < 60.0
@@ -484,148 +478,119 @@ class QuestionEngineDB:
         topicos = [t.topico for t in topicos_fracos]
 
         if not topicos:
-            return self._buscar_questoes_variadas(session, disciplina, quantidade)
+            return self._buscar_questoes_variadas(session, disciplina, quantidade, vistas)
 
         return self._selecionar_por_topicos_fracos(
-            session, topicos, disciplina, quantidade
+            session, topicos, disciplina, quantidade, vistas
         )
 
     def _selecionar_velocidade(
-        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str]
-    ) -> List[Dict]:
+        self, session, user_id: UUID, quantidade: int, disciplina: Optional[str],
+        vistas: Optional[Container[str]] = None
+    ) -> List[str]:
         """Seleciona questões fáceis para treinar velocidade"""
         return self._buscar_questoes_por_dificuldade(
-            session, DificuldadeQuestao.FACIL, disciplina, quantidade
+            session, DificuldadeQuestao.FACIL, disciplina, quantidade, vistas
         )
 
     def _selecionar_por_topicos_fracos(
-        self, session, topicos: List[str], disciplina: Optional[str], quantidade: int
-    ) -> List[Dict]:
-        """Seleciona questões de tópicos específicos"""
-        from database.models import QuestaoBanco
-
-        query = session.query(QuestaoBanco).filter(
-            QuestaoBanco.ativa == True
+        self, session, topicos: List[str], disciplina: Optional[str], quantidade: int,
+        vistas: Optional[Container[str]] = None, escolhidos: Optional[Set[str]] = None
+    ) -> List[str]:
+        """Sorteia IDs de questões de tópicos específicos"""
+        return self._sortear(
+            session, quantidade, vistas, escolhidos,
+            disciplina=disciplina, topicos=topicos or None
         )
 
-        if topicos:
-            query = query.filter(QuestaoBanco.topico.in_(topicos))
-
-        if disciplina:
-            query = query.filter(QuestaoBanco.disciplina == disciplina)
-
-        questoes_obj = query.limit(quantidade * 2).all()
-
-        # Converter para dict
-        questoes = []
-        for q in questoes_obj:
-            questoes.append({
-                "id": q.id,
-                "codigo": q.codigo_questao,
-                "enunciado": q.enunciado,
-                "alternativas": q.alternativas,
-                "alternativa_correta": q.alternativa_correta,
-                "disciplina": q.disciplina,
-                "topico": q.topico,
-                "dificuldade": q.dificuldade.value,
-                "explicacao": q.explicacao_detalhada
-            })
-
-        random.shuffle(questoes)
-        return questoes[:quantidade]
-
     def _buscar_questoes_por_dificuldade(
-        self, session, dificuldade: DificuldadeQuestao, disciplina: Optional[str], quantidade: int
-    ) -> List[Dict]:
-        """Busca questões por dificuldade"""
-        from database.models import QuestaoBanco
-
-        query = session.query(QuestaoBanco).filter(
-            QuestaoBanco.dificuldade == dificuldade,
-            QuestaoBanco.ativa == True
+        self, session, dificuldade: DificuldadeQuestao, disciplina: Optional[str], quantidade: int,
+        vistas: Optional[Container[str]] = None, escolhidos: Optional[Set[str]] = None
+    ) -> List[str]:
+        """Sorteia IDs de questões por dificuldade"""
+        return self._sortear(
+            session, quantidade, vistas, escolhidos,
+            disciplina=disciplina, dificuldade=dificuldade
         )
 
-        if disciplina:
-            query = query.filter(QuestaoBanco.disciplina == disciplina)
-
-        questoes_obj = query.limit(quantidade * 2).all()
-
-        questoes = []
-        for q in questoes_obj:
-            questoes.append({
-                "id": q.id,
-                "codigo": q.codigo_questao,
-                "enunciado": q.enunciado,
-                "alternativas": q.alternativas,
-                "alternativa_correta": q.alternativa_correta,
-                "disciplina": q.disciplina,
-                "topico": q.topico,
-                "dificuldade": q.dificuldade.value,
-                "explicacao": q.explicacao_detalhada
-            })
-
-        random.shuffle(questoes)
-        return questoes[:quantidade]
-
     def _buscar_questoes_variadas(
-        self, session, disciplina: Optional[str], quantidade: int
-    ) -> List[Dict]:
-        """Busca questões variadas (mix de dificuldades)"""
-        from database.models import QuestaoBanco
-
-        query = session.query(QuestaoBanco).filter(
-            QuestaoBanco.ativa == True
+        self, session, disciplina: Optional[str], quantidade: int,
+        vistas: Optional[Container[str]] = None, escolhidos: Optional[Set[str]] = None
+    ) -> List[str]:
+        """Sorteia IDs de questões variadas (mix de dificuldades)"""
+        return self._sortear(
+            session, quantidade, vistas, escolhidos, disciplina=disciplina
         )
 
-        if disciplina:
-            query = query.filter(QuestaoBanco.disciplina == disciplina)
-
-        questoes_obj = query.limit(quantidade * 3).all()
-
-        questoes = []
-        for q in questoes_obj:
-            questoes.append({
-                "id": q.id,
-                "codigo": q.codigo_questao,
-                "enunciado": q.enunciado,
-                "alternativas": q.alternativas,
-                "alternativa_correta": q.alternativa_correta,
-                "disciplina": q.disciplina,
-                "topico": q.topico,
-                "dificuldade": q.dificuldade.value,
-                "explicacao": q.explicacao_detalhada
-            })
-
-        random.shuffle(questoes)
-        return questoes[:quantidade]
-
     def _selecionar_questoes_disciplina(
         self, session, disciplina: str, quantidade: int
     ) -> List[Dict]:
         """Seleciona questões de uma disciplina específica"""
-        from database.models import QuestaoBanco
-
-        questoes_obj = session.query(QuestaoBanco).filter(
-            QuestaoBanco.disciplina == disciplina,
-            QuestaoBanco.ativa == True
-        ).limit(quantidade * 2).all()
-
-        questoes = []
-        for q in questoes_obj:
-            questoes.append({
-                "id": q.id,
-                "codigo": q.codigo_questao,
-                "enunciado": q.enunciado,
-                "alternativas": q.alternativas,
-                "alternativa_correta": q.alternativa_correta,
-                "disciplina": q.disciplina,
-                "topico": q.topico,
-                "dificuldade": q.dificuldade.value,
-                "explicacao": q.explicacao_detalhada
-            })
-
-        random.shuffle(questoes)
-        return questoes[:quantidade]
+        ids = question_sampler.amostrar(
+            quantidade, disciplina=disciplina, session=session
+        )
+        return self._carregar_questoes_por_ids(session, ids)
+
+    def _sortear(
+        self,
+        session,
+        quantidade: int,
+        vistas: Optional[Container[str]],
+        escolhidos: Optional[Set[str]],
+        **filtros
+    ) -> List[str]:
+        """
+        Sorteia IDs sobre todo o conjunto elegível, pulando questões vistas.
+
+        Se o usuário já viu quase todo o recorte, completa com questões vistas
+        (nunca com as já escolhidas nesta requisição).
+        """
+        if escolhidos is None:
+            escolhidos = set()
+
+        ids = question_sampler.amostrar(
+            quantidade, excluir=ExclusaoComposta(vistas, escolhidos),
+            session=session, **filtros
+        )
+        escolhidos.update(ids)
+
+        if len(ids) < quantidade and vistas is not None:
+            complemento = question_sampler.amostrar(
+                quantidade - len(ids), excluir=escolhidos, session=session, **filtros
+            )
+            escolhidos.update(complemento)
+            ids.extend(complemento)
+
+        return ids
+
+    # Colunas usadas por _questao_para_dict (evita carregar a linha inteira)
+    COLUNAS_QUESTAO = [
+        "id", "codigo_questao", "enunciado", "alternativas", "alternativa_correta",
+        "disciplina", "topico", "dificuldade", "explicacao_detalhada"
+    ]
+
+    def _carregar_questoes_por_ids(self, session, ids: List[str]) -> List[Dict]:
+        """Carrega questões sorteadas por chave primária (uma única query)"""
+        repos = RepositoryFactory(session)
+        return [
+            self._questao_para_dict(q)
+            for q in repos.questoes.get_by_ids(ids, colunas=self.COLUNAS_QUESTAO)
+        ]
+
+    @staticmethod
+    def _questao_para_dict(q) -> Dict:
+        """Converte QuestaoBanco para o dict retornado pelo engine"""
+        return {
+            "id": q.id,
+            "codigo": q.codigo_questao,
+            "enunciado": q.enunciado,
+            "alternativas": q.alternativas,
+            "alternativa_correta": q.alternativa_correta,
+            "disciplina": q.disciplina,
+            "topico": q.topico,
+            "dificuldade": q.dificuldade.value,
+            "explicacao": q.explicacao_detalhada
+        }
 
 
 def criar_question_engine_db() -> QuestionEngineDB:
@@ -9,12 +9,14 @@ Autor: JURIS_IA_CORE_V1
 Data: 2025-12-28
 """
 
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Sequence, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
 import math
 
+import numpy as np
+
 
 # ============================================================================
 # TIPOS E ESTRUTURAS IMUTÁVEIS
@@ -386,13 +388,15 @@ def calcular_nivel_dominio(cartao: CartaoRevisao) -> str:
 
 
 def calcular_estatisticas_globais(
-    cartoes: List[CartaoRevisao]
+    cartoes: List[CartaoRevisao],
+    agora: Optional[datetime] = None
 ) -> Dict[str, any]:
     """
     Função pura: calcula estatísticas globais dos cartões
 
     Args:
         cartoes: Lista de todos os cartões
+        agora: Referência das janelas de vencimento (padrão: datetime.now())
 
     Returns:
         Dict com estatísticas
@@ -407,7 +411,7 @@ def calcular_estatisticas_globais(
             "proximos_7d": 0,
         }
 
-    agora = datetime.now()
+    agora = agora or datetime.now()
     amanha = agora + timedelta(days=1)
     proxima_semana = agora + timedelta(days=7)
 
@@ -434,6 +438,313 @@ def calcular_estatisticas_globais(
     }
 
 
+# ============================================================================
+# PROCESSAMENTO EM LOTE - COLUNAR (NUMPY)
+# ============================================================================
+#
+# Mesmas regras das funções escalares acima, aplicadas a arrays com um
+# elemento por cartão: jobs noturnos e estatísticas processam milhares de
+# cartões por chamada sem criar um CartaoRevisao por linha. Os resultados
+# são idênticos aos escalares (mesma ordem das operações em float64;
+# truncamento de int() via np.trunc); datas são datetime64[us] sem fuso,
+# como as colunas do banco.
+
+# Ordem dos códigos de dificuldade nos arrays (índice = código)
+DIFICULDADES_LOTE: Tuple[DificuldadeResposta, ...] = tuple(DificuldadeResposta)
+_CODIGO_DIFICULDADE = {d: i for i, d in enumerate(DIFICULDADES_LOTE)}
+_MODIFICADORES_LOTE = np.array([EASE_MODIFICADORES[d] for d in DIFICULDADES_LOTE])
+
+_BLACKOUT = _CODIGO_DIFICULDADE[DificuldadeResposta.BLACKOUT]
+_DIFICIL = _CODIGO_DIFICULDADE[DificuldadeResposta.DIFICIL]
+_MUITO_FACIL = _CODIGO_DIFICULDADE[DificuldadeResposta.MUITO_FACIL]
+
+# Ordem dos códigos de nível em calcular_nivel_dominio_lote
+NIVEIS_DOMINIO: Tuple[str, ...] = ("NOVO", "APRENDENDO", "CONSOLIDANDO", "DOMINADO", "EXPERT")
+
+
+@dataclass(frozen=True)
+class LoteCartoes:
+    """Estado de N cartões em colunas (um elemento por cartão)"""
+    intervalo_dias: np.ndarray   # int64
+    repeticoes: np.ndarray       # int64
+    ease_factor: np.ndarray      # float64
+    proxima_revisao: np.ndarray  # datetime64[us]
+    total_revisoes: np.ndarray   # int64
+    total_acertos: np.ndarray    # int64
+    total_erros: np.ndarray      # int64
+    ultima_revisao: Optional[np.ndarray] = None  # datetime64[us] (NaT = nunca)
+
+    def __len__(self) -> int:
+        return len(self.intervalo_dias)
+
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+_NAT = np.iinfo(np.int64).min
+
+
+def _datas_lote(valores) -> np.ndarray:
+    if isinstance(valores, (np.ndarray, np.datetime64, datetime)):
+        return np.asarray(valores, dtype="datetime64[us]")
+    # Lista de datetime (None = NaT): aritmética inteira é ~10x mais rápida
+    # que a conversão elemento a elemento do NumPy
+    return np.fromiter(
+        (_NAT if d is None else (d - _EPOCA) // _MICROSSEGUNDO for d in valores),
+        dtype=np.int64,
+        count=len(valores)
+    ).view("datetime64[us]")
+
+
+def criar_lote(
+    intervalo_dias: Sequence[int],
+    repeticoes: Sequence[int],
+    ease_factor: Sequence[float],
+    proxima_revisao: Sequence,
+    total_revisoes: Sequence[int],
+    total_acertos: Sequence[int],
+    total_erros: Sequence[int],
+    ultima_revisao: Optional[Sequence] = None
+) -> LoteCartoes:
+    """
+    Monta um lote a partir de colunas (listas, arrays ou colunas do banco)
+
+    Datas aceitam datetime sem fuso (None = NaT) ou datetime64.
+    """
+    return LoteCartoes(
+        intervalo_dias=np.asarray(intervalo_dias, dtype=np.int64),
+        repeticoes=np.asarray(repeticoes, dtype=np.int64),
+        ease_factor=np.asarray(ease_factor, dtype=np.float64),
+        proxima_revisao=_datas_lote(proxima_revisao),
+        total_revisoes=np.asarray(total_revisoes, dtype=np.int64),
+        total_acertos=np.asarray(total_acertos, dtype=np.int64),
+        total_erros=np.asarray(total_erros, dtype=np.int64),
+        ultima_revisao=_datas_lote(ultima_revisao) if ultima_revisao is not None else None,
+    )
+
+
+def lote_de_cartoes(cartoes: List[CartaoRevisao]) -> LoteCartoes:
+    """Converte uma lista de CartaoRevisao em lote colunar"""
+    return criar_lote(
+        intervalo_dias=[c.intervalo_dias for c in cartoes],
+        repeticoes=[c.repeticoes for c in cartoes],
+        ease_factor=[c.ease_factor for c in cartoes],
+        proxima_revisao=[c.proxima_revisao for c in cartoes],
+        total_revisoes=[c.total_revisoes for c in cartoes],
+        total_acertos=[c.total_acertos for c in cartoes],
+        total_erros=[c.total_erros for c in cartoes],
+        ultima_revisao=[c.ultima_revisao for c in cartoes],
+    )
+
+
+def cartoes_de_lote(lote: LoteCartoes, modelos: List[CartaoRevisao]) -> List[CartaoRevisao]:
+    """
+    Reconstrói CartaoRevisao a partir do lote
+
+    Args:
+        lote: Lote com o estado a aplicar
+        modelos: Cartões de origem (identificação: questão, disciplina, tópico)
+    """
+    proximas = lote.proxima_revisao.astype(object)
+    ultimas = (
+        lote.ultima_revisao.astype(object) if lote.ultima_revisao is not None
+        else [c.ultima_revisao for c in modelos]
+    )
+    return [
+        CartaoRevisao(
+            questao_id=modelo.questao_id,
+            disciplina=modelo.disciplina,
+            topico=modelo.topico,
+            intervalo_dias=int(lote.intervalo_dias[i]),
+            repeticoes=int(lote.repeticoes[i]),
+            ease_factor=float(lote.ease_factor[i]),
+            ultima_revisao=ultimas[i],
+            proxima_revisao=proximas[i],
+            total_revisoes=int(lote.total_revisoes[i]),
+            total_acertos=int(lote.total_acertos[i]),
+            total_erros=int(lote.total_erros[i]),
+        )
+        for i, modelo in enumerate(modelos)
+    ]
+
+
+def codificar_dificuldades(dificuldades: Sequence[DificuldadeResposta]) -> np.ndarray:
+    """Converte dificuldades em códigos (índices de DIFICULDADES_LOTE)"""
+    return np.fromiter(
+        (_CODIGO_DIFICULDADE[DificuldadeResposta(d)] for d in dificuldades),
+        dtype=np.int8,
+        count=len(dificuldades)
+    )
+
+
+def calcular_novo_ease_factor_lote(ease_atual: np.ndarray, dificuldade: np.ndarray) -> np.ndarray:
+    """Versão em lote de calcular_novo_ease_factor (dificuldade em códigos)"""
+    novo_ease = ease_atual + _MODIFICADORES_LOTE[dificuldade]
+    return np.maximum(EASE_FACTOR_MINIMO, np.minimum(novo_ease, EASE_FACTOR_MAXIMO))
+
+
+def calcular_proximo_intervalo_lote(
+    intervalo_atual: np.ndarray,
+    repeticoes: np.ndarray,
+    ease_factor: np.ndarray,
+    acertou: np.ndarray,
+    dificuldade: np.ndarray
+) -> np.ndarray:
+    """Versão em lote de calcular_proximo_intervalo (dificuldade em códigos)"""
+    intervalo = intervalo_atual.astype(np.float64)
+    muito_facil = dificuldade == _MUITO_FACIL
+
+    # np.select usa a primeira condição verdadeira: mesma precedência dos ifs
+    return np.select(
+        [
+            ~acertou | (dificuldade == _BLACKOUT),
+            dificuldade == _DIFICIL,
+            repeticoes == 0,
+            (repeticoes == 1) & muito_facil,
+            repeticoes == 1,
+            muito_facil,
+        ],
+        [
+            INTERVALO_INICIAL,
+            np.maximum(INTERVALO_INICIAL, np.trunc(intervalo * 0.5)),
+            INTERVALO_INICIAL,
+            INTERVALO_FACIL,
+            INTERVALO_INICIAL + 2,
+            np.trunc(intervalo * ease_factor * 1.3),
+        ],
+        default=np.trunc(intervalo * ease_factor)
+    ).astype(np.int64)
+
+
+def processar_revisoes_lote(
+    lote: LoteCartoes,
+    acertou: np.ndarray,
+    dificuldade: np.ndarray,
+    timestamp: Union[datetime, np.ndarray]
+) -> LoteCartoes:
+    """
+    Versão em lote de processar_revisao: uma revisão por cartão
+
+    Args:
+        lote: Estado atual dos cartões
+        acertou: bool por cartão
+        dificuldade: Códigos de dificuldade (codificar_dificuldades)
+        timestamp: Momento da revisão (único ou um por cartão)
+
+    Returns:
+        Novo lote (os arrays de entrada não são alterados)
+    """
+    acertou = np.asarray(acertou, dtype=bool)
+    dificuldade = np.asarray(dificuldade)
+    momento = np.broadcast_to(_datas_lote(timestamp), lote.intervalo_dias.shape)
+
+    novo_ease = calcular_novo_ease_factor_lote(lote.ease_factor, dificuldade)
+
+    sucesso = acertou & (dificuldade != _BLACKOUT)
+    novas_repeticoes = np.where(sucesso, lote.repeticoes + 1, 0)
+
+    novo_intervalo = calcular_proximo_intervalo_lote(
+        lote.intervalo_dias,
+        lote.repeticoes,
+        novo_ease,
+        acertou,
+        dificuldade
+    )
+
+    acertos = acertou.astype(np.int64)
+
+    return LoteCartoes(
+        intervalo_dias=novo_intervalo,
+        repeticoes=novas_repeticoes,
+        ease_factor=novo_ease,
+        proxima_revisao=momento + novo_intervalo.astype("timedelta64[D]"),
+        total_revisoes=lote.total_revisoes + 1,
+        total_acertos=lote.total_acertos + acertos,
+        total_erros=lote.total_erros + (1 - acertos),
+        ultima_revisao=momento.copy(),
+    )
+
+
+def calcular_taxa_retencao_lote(lote: LoteCartoes) -> np.ndarray:
+    """Versão em lote de calcular_taxa_retencao"""
+    revisoes = lote.total_revisoes
+    return np.divide(
+        lote.total_acertos, revisoes,
+        out=np.zeros(len(lote), dtype=np.float64),
+        where=revisoes != 0
+    )
+
+
+def calcular_nivel_dominio_lote(lote: LoteCartoes) -> np.ndarray:
+    """
+    Versão em lote de calcular_nivel_dominio
+
+    Returns:
+        Códigos de nível (índices de NIVEIS_DOMINIO)
+    """
+    taxa = calcular_taxa_retencao_lote(lote)
+    repeticoes = lote.repeticoes
+    intervalo = lote.intervalo_dias
+
+    return np.select(
+        [
+            repeticoes == 0,
+            repeticoes < 3,
+            taxa < 0.7,
+            (repeticoes < 5) | (intervalo < 14),
+            (repeticoes >= 8) & (intervalo >= 30) & (taxa >= 0.9),
+        ],
+        [0, 1, 1, 2, 4],
+        default=3
+    ).astype(np.int8)
+
+
+def contar_vencimentos_lote(lote: LoteCartoes, limites: Sequence[datetime]) -> List[int]:
+    """Quantidade de cartões com proxima_revisao <= cada limite"""
+    return [int(np.count_nonzero(lote.proxima_revisao <= _datas_lote(limite))) for limite in limites]
+
+
+def calcular_estatisticas_globais_lote(
+    lote: LoteCartoes,
+    agora: Optional[datetime] = None
+) -> Dict[str, any]:
+    """Versão em lote de calcular_estatisticas_globais (mesmo dict)"""
+    if len(lote) == 0:
+        return {
+            "total_cartoes": 0,
+            "total_revisoes": 0,
+            "taxa_retencao_geral": 0.0,
+            "cartoes_por_nivel": {},
+            "proximas_24h": 0,
+            "proximos_7d": 0,
+        }
+
+    agora = agora or datetime.now()
+    proximas_24h, proximos_7d = contar_vencimentos_lote(
+        lote, [agora + timedelta(days=1), agora + timedelta(days=7)]
+    )
+
+    total_revisoes = int(lote.total_revisoes.sum())
+    total_acertos = int(lote.total_acertos.sum())
+
+    # Contagem por nível na ordem da primeira ocorrência (como o escalar)
+    codigos, primeiro, contagens = np.unique(
+        calcular_nivel_dominio_lote(lote), return_index=True, return_counts=True
+    )
+    niveis = {
+        NIVEIS_DOMINIO[codigos[i]]: int(contagens[i])
+        for i in np.argsort(primeiro)
+    }
+
+    return {
+        "total_cartoes": len(lote),
+        "total_revisoes": total_revisoes,
+        "taxa_retencao_geral": total_acertos / total_revisoes if total_revisoes > 0 else 0.0,
+        "cartoes_por_nivel": niveis,
+        "proximas_24h": proximas_24h,
+        "proximos_7d": proximos_7d,
+    }
+
+
 # ============================================================================
 # FUNÇÕES AUXILIARES - CONVERSÃO
 # ============================================================================
@@ -0,0 +1,172 @@
+"""
+================================================================================
+BENCHMARK: AMOSTRAGEM DE QUESTÕES (POOLS EM MEMÓRIA vs ORDER BY RANDOM())
+================================================================================
+Objetivo: Comparar a geração de simulado via pools em memória com o caminho SQL
+Data: 2026-10-16
+================================================================================
+
+MODOS:
+- memoria: só o sorteio em memória, com um banco sintético de N questões
+- sql:     contra o PostgreSQL (DATABASE_URL), comparando
+           (a) 1 query ORDER BY RANDOM() LIMIT n por disciplina
+           (b) sorteio nos pools + 1 query por chave primária
+
+USO:
+    python scripts/benchmarks/benchmark_amostragem_questoes.py --modo memoria --questoes 200000
+    python scripts/benchmarks/benchmark_amostragem_questoes.py --modo sql --repeticoes 50
+
+================================================================================
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.question_sampler import QuestionPoolSampler
+
+
+DISTRIBUICAO_COMPLETA = {
+    "Direito Civil": 12,
+    "Direito Penal": 10,
+    "Direito Constitucional": 10,
+    "Direito Processual Civil": 10,
+    "Direito Processual Penal": 8,
+    "Direito do Trabalho": 8,
+    "Direito Tributário": 6,
+    "Direito Empresarial": 6,
+    "Direito Administrativo": 5,
+    "Ética Profissional": 5
+}
+
+DIFICULDADES = ["FACIL", "MEDIO", "DIFICIL", "MUITO_DIFICIL"]
+
+
+def medir(funcao: Callable[[], object], repeticoes: int) -> Dict[str, float]:
+    """Executa `funcao` N vezes e retorna latências em ms (média, p50, p95)"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tempos.sort()
+    return {
+        "media_ms": statistics.mean(tempos),
+        "p50_ms": tempos[len(tempos) // 2],
+        "p95_ms": tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))],
+    }
+
+
+def imprimir(nome: str, resultado: Dict[str, float]) -> None:
+    print(
+        f"  {nome:<40} media={resultado['media_ms']:8.3f}ms "
+        f"p50={resultado['p50_ms']:8.3f}ms p95={resultado['p95_ms']:8.3f}ms"
+    )
+
+
+def benchmark_memoria(total_questoes: int, repeticoes: int) -> None:
+    """Sorteio puro em memória com banco sintético"""
+    sampler = QuestionPoolSampler(intervalo_atualizacao=10 ** 9)
+    disciplinas = list(DISTRIBUICAO_COMPLETA)
+
+    inicio = time.perf_counter()
+    for _ in range(total_questoes):
+        sampler.registrar_questao(
+            uuid.uuid4(), random.choice(disciplinas), random.choice(DIFICULDADES)
+        )
+    sampler._carregado = True
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"\nBanco sintético: {total_questoes} questões (carga {carga_ms:.0f}ms)")
+    imprimir(
+        "simulado completo (80 questões)",
+        medir(lambda: sampler.amostrar_distribuicao(DISTRIBUICAO_COMPLETA), repeticoes)
+    )
+    imprimir(
+        "10 questões, sem filtro",
+        medir(lambda: sampler.amostrar(10), repeticoes)
+    )
+    imprimir(
+        "10 questões, disciplina + dificuldade",
+        medir(lambda: sampler.amostrar(10, "Direito Civil", "MEDIO"), repeticoes)
+    )
+
+
+def benchmark_sql(repeticoes: int) -> None:
+    """Compara o caminho ORDER BY RANDOM() com pools + busca por PK"""
+    from sqlalchemy import create_engine, text
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL não configurada")
+        sys.exit(1)
+
+    engine = create_engine(database_url)
+    sampler = QuestionPoolSampler(intervalo_atualizacao=10 ** 9)
+
+    with engine.connect() as conn:
+        total = conn.execute(
+            text("SELECT COUNT(*) FROM questoes_banco WHERE ativa = true")
+        ).scalar()
+
+        inicio = time.perf_counter()
+        sampler.atualizar(conn)
+        carga_ms = (time.perf_counter() - inicio) * 1000
+
+        def via_order_by_random() -> List:
+            linhas = []
+            for disciplina, quantidade in DISTRIBUICAO_COMPLETA.items():
+                linhas.extend(conn.execute(
+                    text("""
+                        SELECT id, disciplina, enunciado, alternativas, dificuldade
+                        FROM questoes_banco
+                        WHERE disciplina = :disciplina AND ativa = true
+                        ORDER BY RANDOM()
+                        LIMIT :quantidade
+                    """),
+                    {"disciplina": disciplina, "quantidade": quantidade}
+                ).fetchall())
+            return linhas
+
+        def via_pools() -> List:
+            sorteio = sampler.amostrar_distribuicao(DISTRIBUICAO_COMPLETA)
+            ids = [qid for lista in sorteio.values() for qid in lista]
+            return conn.execute(
+                text("""
+                    SELECT id, disciplina, enunciado, alternativas, dificuldade
+                    FROM questoes_banco
+                    WHERE id = ANY(CAST(:ids AS uuid[])) AND ativa = true
+                """),
+                {"ids": ids}
+            ).fetchall()
+
+        print(f"\nquestoes_banco: {total} questões ativas (carga dos pools {carga_ms:.0f}ms)")
+        imprimir("ORDER BY RANDOM() por disciplina", medir(via_order_by_random, repeticoes))
+        imprimir("pools em memória + busca por PK", medir(via_pools, repeticoes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de amostragem de questões")
+    parser.add_argument("--modo", choices=["memoria", "sql"], default="memoria")
+    parser.add_argument("--questoes", type=int, default=100000, help="Tamanho do banco sintético")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.modo == "memoria":
+        benchmark_memoria(args.questoes, args.repeticoes)
+    else:
+        benchmark_sql(args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
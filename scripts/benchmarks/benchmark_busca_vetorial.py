@@ -0,0 +1,202 @@
+"""
+================================================================================
+BENCHMARK: BUSCA VETORIAL (RECALL x LATÊNCIA, HNSW vs IVFFLAT vs SEQ SCAN)
+================================================================================
+Objetivo: Escolher ef_search / probes para buscar_questoes_similares com base
+          em recall@k medido, não em palpite
+Data: 2026-10-16
+================================================================================
+
+CENÁRIO:
+- Tabela sintética (default 100k vetores, 128 dims) em clusters gaussianos
+  sobrepostos (--ruido), carregada via COPY
+- Gabarito exato calculado em NumPy (cosseno)
+- Para cada configuração: recall@k médio e latência p50/p95 por consulta,
+  usando a mesma consulta de IndiceVetorial.consulta_vizinhos()
+- Compara também o filtro de threshold antigo (dentro do WHERE) com o novo
+  (fora do ORDER BY ... LIMIT)
+
+USO:
+    DATABASE_URL=postgresql://... python scripts/benchmarks/benchmark_busca_vetorial.py
+    python scripts/benchmarks/benchmark_busca_vetorial.py --linhas 20000 --dimensoes 768
+    python scripts/benchmarks/benchmark_busca_vetorial.py --ef 20 40 80 --probes 5 10 --manter
+
+A tabela (bench_vetor_questao) é removida ao final, exceto com --manter.
+
+================================================================================
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from core.vector_index import IndiceVetorial
+
+TABELA = "bench_vetor_questao"
+
+
+def gerar_dados(linhas: int, dimensoes: int, clusters: int, consultas: int, ruido: float, semente: int):
+    rng = np.random.default_rng(semente)
+    centros = rng.normal(size=(clusters, dimensoes)).astype(np.float32)
+    dados = centros[rng.integers(0, clusters, linhas)] + ruido * rng.normal(size=(linhas, dimensoes)).astype(np.float32)
+    perguntas = centros[rng.integers(0, clusters, consultas)] + ruido * rng.normal(size=(consultas, dimensoes)).astype(np.float32)
+    return dados, perguntas
+
+
+def gabarito(dados: np.ndarray, perguntas: np.ndarray, k: int) -> List[set]:
+    """k vizinhos exatos por cosseno (ids começam em 1)"""
+    normalizados = dados / np.linalg.norm(dados, axis=1, keepdims=True)
+    resultado = []
+    for pergunta in perguntas:
+        similaridades = normalizados @ (pergunta / np.linalg.norm(pergunta))
+        melhores = np.argpartition(-similaridades, k)[:k]
+        resultado.append({int(i) + 1 for i in melhores})
+    return resultado
+
+
+def carregar(engine, dados: np.ndarray) -> float:
+    inicio = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABELA}"))
+        conn.execute(text(f"CREATE TABLE {TABELA} (id INTEGER PRIMARY KEY, embedding vector({dados.shape[1]}))"))
+
+    bruto = engine.raw_connection()
+    try:
+        cursor = bruto.cursor()
+        for inicio_lote in range(0, len(dados), 10_000):
+            buffer = io.StringIO()
+            for i, vetor in enumerate(dados[inicio_lote:inicio_lote + 10_000], start=inicio_lote + 1):
+                buffer.write(f"{i}\t[{','.join(f'{x:.5f}' for x in vetor)}]\n")
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {TABELA} (id, embedding) FROM STDIN", buffer)
+        bruto.commit()
+    finally:
+        bruto.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"VACUUM ANALYZE {TABELA}"))
+    return time.perf_counter() - inicio
+
+
+def percentil(valores: List[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(engine, indice: IndiceVetorial, perguntas: List[str], verdade: List[set], k: int,
+          ef_search: int = None, probes: int = None, exato: bool = False) -> Dict[str, float]:
+    latencias = []
+    acertos = 0
+    with engine.connect() as conn:
+        for pergunta, esperado in zip(perguntas, verdade):
+            with conn.begin():
+                if exato:
+                    conn.execute(text("SET LOCAL enable_indexscan = off"))
+                inicio = time.perf_counter()
+                distancia = indice.preparar_busca(conn, ef_search=ef_search, probes=probes, k=k)
+                ids = conn.execute(
+                    text(indice.consulta_vizinhos(distancia, colunas="id")),
+                    {"embedding": pergunta, "candidatos": k, "distancia_maxima": 2.0, "limite": k}
+                ).scalars().all()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+            acertos += len(esperado.intersection(ids))
+
+    return {
+        "recall": acertos / (k * len(perguntas)),
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+    }
+
+
+def plano(engine, indice: IndiceVetorial, pergunta: str, k: int, antigo: bool) -> str:
+    """Nó de acesso do plano (Index Scan / Seq Scan) para o filtro de threshold"""
+    with engine.connect() as conn, conn.begin():
+        distancia = indice.preparar_busca(conn, k=k)
+        if antigo:
+            sql = f"""
+                SELECT id FROM {TABELA}
+                WHERE 1 - ({distancia}) >= :threshold
+                ORDER BY {distancia} LIMIT :limite
+            """
+        else:
+            sql = indice.consulta_vizinhos(distancia, colunas="id")
+        linhas = conn.execute(
+            text(f"EXPLAIN {sql}"),
+            {"embedding": pergunta, "threshold": 0.5, "candidatos": k, "distancia_maxima": 0.5, "limite": k}
+        ).scalars().all()
+    nos = [linha.strip().lstrip("-> ").split("  ")[0] for linha in linhas if "Scan" in linha]
+    return " / ".join(nos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall x latência da busca vetorial")
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--dimensoes", type=int, default=128)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--consultas", type=int, default=100)
+    parser.add_argument("--ruido", type=float, default=1.0, help="Desvio dentro do cluster (maior = mais difícil)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef", type=int, nargs="*", default=[10, 20, 40, 80, 160])
+    parser.add_argument("--probes", type=int, nargs="*", default=[1, 5, 10, 20, 50])
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--manter", action="store_true", help="Não remove a tabela sintética")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        print("DATABASE_URL não configurado")
+        sys.exit(1)
+    engine = create_engine(database_url)
+
+    dados, perguntas = gerar_dados(args.linhas, args.dimensoes, args.clusters, args.consultas, args.ruido, args.semente)
+    verdade = gabarito(dados, perguntas, args.k)
+    literais = [f"[{','.join(f'{x:.5f}' for x in p)}]" for p in perguntas]
+
+    print(f"Carregando {args.linhas} vetores de {args.dimensoes} dims...")
+    print(f"  carga (COPY + VACUUM ANALYZE): {carregar(engine, dados):.1f}s\n")
+
+    indice = IndiceVetorial(args.dimensoes, tabela=TABELA)
+    print(f"  {'configuração':<28} {'recall@' + str(args.k):>10} {'p50':>9} {'p95':>9}")
+
+    def linha(nome: str, r: Dict[str, float]):
+        print(f"  {nome:<28} {r['recall']:10.3f} {r['p50_ms']:7.2f}ms {r['p95_ms']:7.2f}ms")
+
+    try:
+        linha("seq scan (exato)", medir(engine, indice, literais, verdade, args.k, exato=True))
+
+        inicio = time.perf_counter()
+        indice.criar(engine, "hnsw", m=args.m, ef_construction=args.ef_construction, concorrente=False)
+        print(f"  -- build HNSW (m={args.m}, ef_construction={args.ef_construction}): {time.perf_counter() - inicio:.1f}s")
+        for ef in args.ef:
+            linha(f"hnsw ef_search={ef}", medir(engine, indice, literais, verdade, args.k, ef_search=ef))
+
+        print(f"\n  plano threshold antigo (WHERE): {plano(engine, indice, literais[0], args.k, antigo=True)}")
+        print(f"  plano threshold novo (fora):    {plano(engine, indice, literais[0], args.k, antigo=False)}\n")
+        indice.remover(engine, "hnsw", concorrente=False)
+
+        inicio = time.perf_counter()
+        indice.criar(engine, "ivfflat", concorrente=False)
+        print(f"  -- build IVFFlat (lists={max(10, args.linhas // 1000)}): {time.perf_counter() - inicio:.1f}s")
+        for probes in args.probes:
+            linha(f"ivfflat probes={probes}", medir(engine, indice, literais, verdade, args.k, probes=probes))
+    finally:
+        if not args.manter:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {TABELA}"))
+
+
+if __name__ == "__main__":
+    main()
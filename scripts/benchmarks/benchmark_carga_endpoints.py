@@ -0,0 +1,172 @@
+"""
+================================================================================
+BENCHMARK: CARGA NOS ENDPOINTS QUENTES (THROUGHPUT POR WORKER)
+================================================================================
+Objetivo: Medir req/s e latência de /estudo, /revisao, /estudante e /gamificacao
+          com um único worker uvicorn, antes e depois da camada assíncrona
+Data: 2026-10-16
+================================================================================
+
+CENÁRIO:
+- C clientes concorrentes (default 50) durante D segundos por endpoint
+- Cada cliente repete a mesma requisição em loop (keep-alive)
+- Reporta req/s, p50/p95/p99 e erros (status >= 400 ou exceção)
+
+PROCEDIMENTO (mesmo banco, mesmo usuário, 1 worker):
+    # antes: checkout do commit anterior à camada assíncrona
+    uvicorn api.api_server:app --workers 1 --port 8000
+    python scripts/benchmarks/benchmark_carga_endpoints.py --usuario <uuid> > antes.txt
+
+    # depois: este commit
+    uvicorn api.api_server:app --workers 1 --port 8000
+    python scripts/benchmarks/benchmark_carga_endpoints.py --usuario <uuid> > depois.txt
+
+Com --escrita inclui os POSTs (gamificação e revisão), que alteram dados do
+usuário: use um usuário de teste.
+
+================================================================================
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import httpx
+
+
+def endpoints_leitura(usuario: str) -> List[Dict[str, Any]]:
+    return [
+        {"nome": "estudante/analytics", "metodo": "GET", "rota": f"/estudante/analytics/{usuario}"},
+        {"nome": "estudante/plano-estudos", "metodo": "GET", "rota": f"/estudante/plano-estudos/{usuario}"},
+        {"nome": "estudante/gerar-simulado", "metodo": "GET", "rota": f"/estudante/gerar-simulado/{usuario}?tipo=medio"},
+        {"nome": "estudante/painel", "metodo": "GET", "rota": f"/estudante/painel/{usuario}"},
+        {"nome": "gamificacao", "metodo": "GET", "rota": f"/gamificacao/{usuario}"},
+        {"nome": "revisao/pendentes", "metodo": "GET", "rota": f"/revisao/{usuario}/pendentes"},
+        {"nome": "revisao/estatisticas", "metodo": "GET", "rota": f"/revisao/{usuario}/estatisticas"},
+    ]
+
+
+def endpoints_escrita(usuario: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "nome": "gamificacao/acao",
+            "metodo": "POST",
+            "rota": f"/gamificacao/{usuario}/acao",
+            "json": {"tipo": "questao_correta", "valor": 1},
+        },
+        {
+            "nome": "estudo/iniciar",
+            "metodo": "POST",
+            "rota": "/estudo/iniciar",
+            "json": {"aluno_id": usuario, "tipo": "drill"},
+        },
+    ]
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+async def carga(
+    cliente: httpx.AsyncClient,
+    endpoint: Dict[str, Any],
+    concorrencia: int,
+    duracao: float
+) -> Dict[str, Any]:
+    """Executa `concorrencia` loops sobre o endpoint por `duracao` segundos"""
+    latencias: List[float] = []
+    erros = 0
+    ultimo_erro: Optional[str] = None
+    fim = time.perf_counter() + duracao
+
+    async def cliente_loop():
+        nonlocal erros, ultimo_erro
+        while time.perf_counter() < fim:
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.request(
+                    endpoint["metodo"], endpoint["rota"], json=endpoint.get("json")
+                )
+                if resposta.status_code >= 400:
+                    erros += 1
+                    ultimo_erro = f"HTTP {resposta.status_code}"
+                    continue
+            except httpx.HTTPError as e:
+                erros += 1
+                ultimo_erro = type(e).__name__
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio_total = time.perf_counter()
+    await asyncio.gather(*(cliente_loop() for _ in range(concorrencia)))
+    decorrido = time.perf_counter() - inicio_total
+
+    latencias.sort()
+    return {
+        "ok": len(latencias),
+        "erros": erros,
+        "ultimo_erro": ultimo_erro,
+        "rps": len(latencias) / decorrido,
+        "p50_ms": percentil(latencias, 50),
+        "p95_ms": percentil(latencias, 95),
+        "p99_ms": percentil(latencias, 99),
+    }
+
+
+async def executar(args) -> None:
+    endpoints = endpoints_leitura(args.usuario)
+    if args.escrita:
+        endpoints += endpoints_escrita(args.usuario)
+    if args.apenas:
+        endpoints = [e for e in endpoints if any(f in e["nome"] for f in args.apenas)]
+
+    limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=args.timeout) as cliente:
+        print(f"Servidor: {args.url} | concorrência={args.concorrencia} | {args.duracao:.0f}s por endpoint\n")
+        print(f"  {'endpoint':<26} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'ok':>7} {'erros':>6}")
+
+        total_ok = 0
+        total_tempo = 0.0
+        for endpoint in endpoints:
+            # Aquecimento (pools de conexão, caches em memória)
+            await carga(cliente, endpoint, min(args.concorrencia, 5), 1.0)
+
+            r = await carga(cliente, endpoint, args.concorrencia, args.duracao)
+            total_ok += r["ok"]
+            total_tempo += args.duracao
+            linha = (
+                f"  {endpoint['nome']:<26} {r['rps']:8.1f} {r['p50_ms']:7.1f}ms "
+                f"{r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms {r['ok']:7d} {r['erros']:6d}"
+            )
+            if r["erros"]:
+                linha += f"  ({r['ultimo_erro']})"
+            print(linha)
+
+        print(f"\n  média geral: {total_ok / total_tempo:.1f} req/s por worker")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints quentes")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--usuario", required=True, help="UUID de um usuário existente")
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos por endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--escrita", action="store_true", help="Inclui POSTs (altera dados)")
+    parser.add_argument("--apenas", nargs="*", help="Filtra endpoints pelo nome")
+    args = parser.parse_args()
+
+    asyncio.run(executar(args))
+
+
+if __name__ == "__main__":
+    main()
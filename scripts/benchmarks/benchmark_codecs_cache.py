@@ -0,0 +1,165 @@
+"""
+================================================================================
+BENCHMARK: CODECS DO CACHE (JSON LEGADO vs MSGPACK/ORJSON + COMPRESSÃO)
+================================================================================
+Objetivo: Comparar tamanho do payload e latência de (de)serialização dos codecs
+          de core/cache_codecs.py com o caminho JSON atual
+Data: 2026-10-16
+================================================================================
+
+PAYLOADS SINTÉTICOS:
+- questao:  uma questão (enunciado longo + 4 alternativas + metadados)
+- simulado: sessão com 80 questões
+- ranking:  top 100 usuários
+
+Com --redis, grava cada payload no REDIS_URL e mede MEMORY USAGE da chave.
+
+USO:
+    python scripts/benchmarks/benchmark_codecs_cache.py
+    REDIS_URL=redis://localhost:6379/15 python scripts/benchmarks/benchmark_codecs_cache.py --redis
+
+================================================================================
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+import statistics
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.cache_codecs import (
+    CacheCodec, CODEC_LEGADO, CODEC_JSON, CODEC_ORJSON, CODEC_MSGPACK,
+    COMPRESSAO_NENHUMA, COMPRESSAO_ZLIB, COMPRESSAO_LZ4,
+    MSGPACK_AVAILABLE, ORJSON_AVAILABLE, LZ4_AVAILABLE
+)
+
+
+VOCABULARIO = (
+    "direito contrato obrigação responsabilidade civil dano moral prescrição decadência "
+    "recurso apelação agravo sentença acórdão tribunal competência jurisdição processo "
+    "réu autor petição inicial citação intimação prazo preclusão coisa julgada tutela "
+    "urgência evidência liminar mandado segurança habeas corpus constituição federal "
+    "lei complementar ordinária tributo imposto contribuição fato gerador lançamento "
+    "crédito execução fiscal penhora empresa sociedade limitada anônima falência "
+    "recuperação judicial advogado ética estatuto ordem conselho seccional disciplina"
+).split()
+
+
+def texto(rng: random.Random, palavras: int) -> str:
+    return " ".join(rng.choice(VOCABULARIO) for _ in range(palavras)).capitalize() + "."
+
+
+def gerar_questao(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": uuid.UUID(int=rng.getrandbits(128)),
+        "codigo_questao": f"OAB-{rng.randint(1, 40)}-{rng.randint(1, 80):02d}",
+        "disciplina": "Direito Civil",
+        "topico": "Responsabilidade Civil",
+        "subtopico": None,
+        "enunciado": texto(rng, 180),
+        "alternativas": {letra: texto(rng, 30) for letra in "ABCD"},
+        "dificuldade": rng.choice(["FACIL", "MEDIO", "DIFICIL"]),
+        "tags": ["oab", "primeira_fase", "civil"],
+        "ano_prova": rng.randint(2010, 2025),
+        "created_at": datetime(2025, 1, 1, 12, 30),
+    }
+
+
+def gerar_payloads(seed: int = 42) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    return {
+        "questao": gerar_questao(rng),
+        "simulado": {
+            "sessao_id": uuid.UUID(int=rng.getrandbits(128)),
+            "user_id": uuid.UUID(int=rng.getrandbits(128)),
+            "tipo": "simulado",
+            "questoes": [gerar_questao(rng) for _ in range(80)],
+        },
+        "ranking": [
+            {
+                "posicao": i + 1,
+                "user_id": uuid.UUID(int=rng.getrandbits(128)),
+                "nome": f"Estudante {i + 1}",
+                "pontos": rng.randint(100, 50000),
+                "taxa_acerto": round(rng.uniform(30, 95), 2),
+            }
+            for i in range(100)
+        ],
+    }
+
+
+def codecs_disponiveis(limite: int) -> Dict[str, CacheCodec]:
+    codecs: Dict[str, CacheCodec] = {"json (legado)": CODEC_LEGADO}
+    combinacoes = [(CODEC_JSON, COMPRESSAO_ZLIB)]
+    if ORJSON_AVAILABLE:
+        combinacoes += [(CODEC_ORJSON, COMPRESSAO_NENHUMA), (CODEC_ORJSON, COMPRESSAO_ZLIB)]
+        if LZ4_AVAILABLE:
+            combinacoes.append((CODEC_ORJSON, COMPRESSAO_LZ4))
+    if MSGPACK_AVAILABLE:
+        combinacoes += [(CODEC_MSGPACK, COMPRESSAO_NENHUMA), (CODEC_MSGPACK, COMPRESSAO_ZLIB)]
+        if LZ4_AVAILABLE:
+            combinacoes.append((CODEC_MSGPACK, COMPRESSAO_LZ4))
+
+    for serializador, compressao in combinacoes:
+        nome = serializador if compressao == COMPRESSAO_NENHUMA else f"{serializador}+{compressao}"
+        codecs[nome] = CacheCodec(serializador, compressao, limite)
+    return codecs
+
+
+def medir_us(funcao, repeticoes: int) -> float:
+    """Mediana em microssegundos"""
+    tempos: List[float] = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1e6)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de codecs do cache")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--limite-compressao", type=int, default=1024)
+    parser.add_argument("--redis", action="store_true", help="Mede MEMORY USAGE no REDIS_URL")
+    args = parser.parse_args()
+
+    cliente = None
+    if args.redis:
+        import redis
+        cliente = redis.Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/15"))
+
+    payloads = gerar_payloads()
+    codecs = codecs_disponiveis(args.limite_compressao)
+
+    for nome_payload, valor in payloads.items():
+        base = None
+        print(f"\n{nome_payload}:")
+        for nome_codec, codec in codecs.items():
+            dados = codec.codificar(valor)
+            enc = medir_us(lambda: codec.codificar(valor), args.repeticoes)
+            dec = medir_us(lambda: CacheCodec.decodificar(dados), args.repeticoes)
+            base = base or (len(dados), enc, dec)
+
+            linha = (
+                f"  {nome_codec:<16} {len(dados):>8} B ({len(dados) / base[0]:5.0%})  "
+                f"encode={enc:9.1f}us  decode={dec:9.1f}us  "
+                f"total={(enc + dec) / (base[1] + base[2]):5.0%}"
+            )
+            if cliente is not None:
+                chave = f"juris_ia:bench:codec:{nome_payload}:{nome_codec}"
+                cliente.set(chave, dados, ex=300)
+                linha += f"  redis={cliente.memory_usage(chave)} B"
+                cliente.delete(chave)
+            print(linha)
+
+
+if __name__ == "__main__":
+    main()
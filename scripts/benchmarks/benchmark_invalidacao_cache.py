@@ -0,0 +1,160 @@
+"""
+================================================================================
+BENCHMARK: INVALIDAÇÃO DE CACHE (SCAN POR PADRÃO vs TAGS)
+================================================================================
+Objetivo: Medir o custo de invalidar "todas as sessões do usuário X" e
+          "todos os rankings" com o keyspace cheio
+Data: 2026-10-16
+================================================================================
+
+CENÁRIO:
+- N chaves de preenchimento (default 1.000.000) no mesmo banco Redis
+- Um usuário com S sessões em cache e R rankings
+- Compara delete_pattern (SCAN no keyspace) com invalidar_tag (set da tag)
+
+ATENÇÃO: escreve ~N chaves no banco do REDIS_URL e as remove ao final.
+Use um banco dedicado (ex: redis://localhost:6379/15).
+
+USO:
+    REDIS_URL=redis://localhost:6379/15 python scripts/benchmarks/benchmark_invalidacao_cache.py
+    python scripts/benchmarks/benchmark_invalidacao_cache.py --chaves 100000 --repeticoes 5
+
+================================================================================
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from core.cache_service import CacheService
+
+
+PREFIXO_PREENCHIMENTO = "juris_ia:bench:"
+LOTE_PIPELINE = 10000
+
+
+def medir(preparar: Callable[[], None], funcao: Callable[[], int], repeticoes: int) -> Dict[str, float]:
+    """Executa preparar() + funcao() N vezes, medindo apenas funcao(), em ms"""
+    tempos: List[float] = []
+    removidas = 0
+    for _ in range(repeticoes):
+        preparar()
+        inicio = time.perf_counter()
+        removidas = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+
+    tempos.sort()
+    return {
+        "media_ms": statistics.mean(tempos),
+        "p50_ms": tempos[len(tempos) // 2],
+        "max_ms": tempos[-1],
+        "removidas": removidas,
+    }
+
+
+def imprimir(nome: str, resultado: Dict[str, float]) -> None:
+    print(
+        f"  {nome:<36} media={resultado['media_ms']:10.3f}ms "
+        f"p50={resultado['p50_ms']:10.3f}ms max={resultado['max_ms']:10.3f}ms "
+        f"({resultado['removidas']} chaves)"
+    )
+
+
+def preencher(cache: CacheService, total: int) -> None:
+    """Cria `total` chaves de preenchimento com TTL de 1 hora"""
+    inicio = time.perf_counter()
+    for base in range(0, total, LOTE_PIPELINE):
+        pipe = cache.redis_client.pipeline(transaction=False)
+        for i in range(base, min(total, base + LOTE_PIPELINE)):
+            pipe.setex(f"{PREFIXO_PREENCHIMENTO}{i}", 3600, "x")
+        pipe.execute()
+    print(f"Preenchimento: {total} chaves em {time.perf_counter() - inicio:.1f}s")
+
+
+def limpar(cache: CacheService) -> None:
+    """Remove as chaves de preenchimento"""
+    lote: List[str] = []
+    for chave in cache.redis_client.scan_iter(match=f"{PREFIXO_PREENCHIMENTO}*", count=LOTE_PIPELINE):
+        lote.append(chave)
+        if len(lote) >= LOTE_PIPELINE:
+            cache.redis_client.delete(*lote)
+            lote = []
+    if lote:
+        cache.redis_client.delete(*lote)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de invalidação de cache")
+    parser.add_argument("--chaves", type=int, default=1000000, help="Chaves de preenchimento")
+    parser.add_argument("--sessoes", type=int, default=20, help="Sessões em cache do usuário")
+    parser.add_argument("--rankings", type=int, default=12, help="Rankings em cache")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    args = parser.parse_args()
+
+    cache = CacheService(redis_url=os.getenv("REDIS_URL"), l1_habilitado=False)
+    usuario_id = "bench-usuario"
+
+    def criar_sessoes() -> None:
+        for i in range(args.sessoes):
+            cache.set_sessao(f"bench-sessao-{i}", {"user_id": usuario_id, "i": i})
+
+    def criar_sessoes_padrao() -> None:
+        # Chaves no formato esperado pelo padrão antigo (sessao:*:usuario:<id>:*)
+        for i in range(args.sessoes):
+            cache.set(
+                cache._construir_chave(cache.PREFIX_SESSAO, f"{i}:usuario:{usuario_id}:x"),
+                {"i": i},
+                cache.TTL_SESSAO
+            )
+
+    def criar_rankings() -> None:
+        for i in range(args.rankings):
+            cache.set_ranking(f"bench_{i}", [{"posicao": 1}])
+
+    preencher(cache, args.chaves)
+    print(f"Keyspace: {cache.redis_client.dbsize()} chaves\n")
+
+    try:
+        print(f"Sessões de um usuário ({args.sessoes}):")
+        imprimir(
+            "SCAN (delete_pattern)",
+            medir(
+                criar_sessoes_padrao,
+                lambda: cache.delete_pattern(
+                    cache._construir_chave(cache.PREFIX_SESSAO, f"*:usuario:{usuario_id}:*")
+                ),
+                args.repeticoes
+            )
+        )
+        imprimir(
+            "tag (invalidar_sessoes_usuario)",
+            medir(criar_sessoes, lambda: cache.invalidar_sessoes_usuario(usuario_id), args.repeticoes)
+        )
+
+        print(f"\nTodos os rankings ({args.rankings}):")
+        imprimir(
+            "SCAN (delete_pattern)",
+            medir(
+                criar_rankings,
+                lambda: cache.delete_pattern(cache._construir_chave(cache.PREFIX_RANKING, "*")),
+                args.repeticoes
+            )
+        )
+        imprimir(
+            "tag (invalidar_todos_rankings)",
+            medir(criar_rankings, cache.invalidar_todos_rankings, args.repeticoes)
+        )
+    finally:
+        cache.invalidar_todos_rankings()
+        limpar(cache)
+
+
+if __name__ == "__main__":
+    main()
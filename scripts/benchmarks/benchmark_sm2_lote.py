@@ -0,0 +1,154 @@
+"""
+================================================================================
+BENCHMARK: SM-2 ESCALAR (CartaoRevisao) vs LOTE COLUNAR (NUMPY)
+================================================================================
+Objetivo: Medir o ganho das funções em lote de engines/spaced_repetition.py
+          sobre o laço de funções escalares, para filas de N cartões
+Data: 2026-10-16
+================================================================================
+
+OPERAÇÕES:
+- revisao:      processar_revisao por cartão vs processar_revisoes_lote
+- nivel:        calcular_nivel_dominio por cartão vs calcular_nivel_dominio_lote
+- estatisticas: calcular_estatisticas_globais vs calcular_estatisticas_globais_lote
+
+O lote é medido a partir de colunas prontas (como lidas do banco); a linha
+"conversao" mostra o custo de lote_de_cartoes quando só há CartaoRevisao.
+Os resultados de cada operação são conferidos contra o escalar.
+
+USO:
+    python scripts/benchmarks/benchmark_sm2_lote.py
+    python scripts/benchmarks/benchmark_sm2_lote.py --cartoes 1000 10000 100000 --repeticoes 5
+
+================================================================================
+"""
+
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+ROOT_DIR = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from engines.spaced_repetition import (
+    CartaoRevisao,
+    ResultadoRevisao,
+    DificuldadeResposta,
+    NIVEIS_DOMINIO,
+    processar_revisao,
+    calcular_nivel_dominio,
+    calcular_estatisticas_globais,
+    lote_de_cartoes,
+    cartoes_de_lote,
+    codificar_dificuldades,
+    processar_revisoes_lote,
+    calcular_nivel_dominio_lote,
+    calcular_estatisticas_globais_lote,
+)
+
+
+AGORA = datetime(2026, 10, 16, 3, 0)
+
+
+def gerar_cartoes(rng: random.Random, n: int) -> List[CartaoRevisao]:
+    cartoes = []
+    for i in range(n):
+        total = rng.randint(0, 40)
+        acertos = rng.randint(0, total)
+        cartoes.append(CartaoRevisao(
+            questao_id=f"q{i}",
+            disciplina=rng.choice(["Direito Civil", "Direito Penal", "Ética", "Constitucional"]),
+            topico="Tópico",
+            intervalo_dias=rng.randint(1, 180),
+            repeticoes=rng.randint(0, 12),
+            ease_factor=round(rng.uniform(1.3, 2.5), 3),
+            ultima_revisao=AGORA - timedelta(days=rng.randint(1, 60)),
+            proxima_revisao=AGORA + timedelta(hours=rng.randint(-240, 240)),
+            total_revisoes=total,
+            total_acertos=acertos,
+            total_erros=total - acertos,
+        ))
+    return cartoes
+
+
+def gerar_resultados(rng: random.Random, n: int) -> List[ResultadoRevisao]:
+    dificuldades = list(DificuldadeResposta)
+    return [
+        ResultadoRevisao(
+            acertou=rng.random() < 0.7,
+            dificuldade=rng.choice(dificuldades),
+            tempo_segundos=rng.randint(10, 300),
+            timestamp=AGORA,
+        )
+        for _ in range(n)
+    ]
+
+
+def medir_ms(funcao, repeticoes: int) -> float:
+    """Mediana em milissegundos"""
+    tempos: List[float] = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1e3)
+    return statistics.median(tempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SM-2 escalar vs lote")
+    parser.add_argument("--cartoes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    for n in args.cartoes:
+        cartoes = gerar_cartoes(rng, n)
+        resultados = gerar_resultados(rng, n)
+
+        lote = lote_de_cartoes(cartoes)
+        acertou = [r.acertou for r in resultados]
+        dificuldade = codificar_dificuldades([r.dificuldade for r in resultados])
+
+        # Conferência: o lote deve reproduzir o escalar
+        esperado = [processar_revisao(c, r) for c, r in zip(cartoes, resultados)]
+        novo_lote = processar_revisoes_lote(lote, acertou, dificuldade, AGORA)
+        assert cartoes_de_lote(novo_lote, cartoes) == esperado
+        assert [NIVEIS_DOMINIO[c] for c in calcular_nivel_dominio_lote(lote)] == \
+            [calcular_nivel_dominio(c) for c in cartoes]
+        assert calcular_estatisticas_globais_lote(lote, AGORA) == calcular_estatisticas_globais(cartoes, AGORA)
+
+        operacoes = {
+            "revisao": (
+                lambda: [processar_revisao(c, r) for c, r in zip(cartoes, resultados)],
+                lambda: processar_revisoes_lote(lote, acertou, dificuldade, AGORA),
+            ),
+            "nivel": (
+                lambda: [calcular_nivel_dominio(c) for c in cartoes],
+                lambda: calcular_nivel_dominio_lote(lote),
+            ),
+            "estatisticas": (
+                lambda: calcular_estatisticas_globais(cartoes, AGORA),
+                lambda: calcular_estatisticas_globais_lote(lote, AGORA),
+            ),
+        }
+
+        print(f"\n{n} cartões:")
+        for nome, (escalar, em_lote) in operacoes.items():
+            t_escalar = medir_ms(escalar, args.repeticoes)
+            t_lote = medir_ms(em_lote, args.repeticoes)
+            print(
+                f"  {nome:<13} escalar={t_escalar:9.2f}ms  lote={t_lote:8.2f}ms  "
+                f"({t_escalar / t_lote:6.1f}x)"
+            )
+        print(f"  {'conversao':<13} lote_de_cartoes={medir_ms(lambda: lote_de_cartoes(cartoes), args.repeticoes):8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
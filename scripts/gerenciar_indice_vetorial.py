@@ -0,0 +1,100 @@
+"""
+================================================================================
+SCRIPT: GERENCIAR ÍNDICE VETORIAL (HNSW / IVFFLAT) DE questao_oab
+================================================================================
+Objetivo: Criar, reconstruir e inspecionar o índice ANN dos embeddings
+Data: 2026-10-16
+================================================================================
+
+USO:
+    python gerenciar_indice_vetorial.py status
+    python gerenciar_indice_vetorial.py criar --metodo hnsw --m 16 --ef-construction 64
+    python gerenciar_indice_vetorial.py criar --metodo ivfflat --listas 100
+    python gerenciar_indice_vetorial.py reconstruir
+    python gerenciar_indice_vetorial.py remover --metodo ivfflat
+
+As dimensões são lidas da coluna (vector(N)); use --dimensoes se a coluna
+não tiver dimensão fixa.
+
+================================================================================
+"""
+
+import os
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import create_engine
+from core.vector_index import IndiceVetorial, METODOS, dimensoes_coluna
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerencia o índice vetorial de questao_oab")
+    parser.add_argument("acao", choices=["status", "criar", "reconstruir", "remover"])
+    parser.add_argument("--metodo", choices=METODOS, default="hnsw")
+    parser.add_argument("--m", type=int, default=16, help="HNSW: conexões por nó")
+    parser.add_argument("--ef-construction", type=int, default=64, help="HNSW: candidatos no build")
+    parser.add_argument("--listas", type=int, help="IVFFlat: número de listas (padrão: linhas/1000)")
+    parser.add_argument("--dimensoes", type=int, help="Dimensões (padrão: da coluna)")
+    parser.add_argument("--bloqueante", action="store_true", help="Sem CONCURRENTLY (mais rápido, bloqueia escritas)")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logger.error("DATABASE_URL não configurado")
+        sys.exit(1)
+
+    engine = create_engine(database_url)
+
+    with engine.connect() as conn:
+        dimensoes = args.dimensoes or dimensoes_coluna(conn)
+    if not dimensoes:
+        logger.error("Coluna embedding sem dimensão fixa: informe --dimensoes")
+        sys.exit(1)
+
+    indice = IndiceVetorial(dimensoes)
+    concorrente = not args.bloqueante
+
+    if args.acao == "criar":
+        indice.criar(
+            engine,
+            metodo=args.metodo,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            listas=args.listas,
+            concorrente=concorrente
+        )
+    elif args.acao == "reconstruir":
+        indice.reconstruir(engine, concorrente=concorrente)
+    elif args.acao == "remover":
+        indice.remover(engine, args.metodo, concorrente=concorrente)
+
+    with engine.connect() as conn:
+        status = indice.status(conn)
+
+    logger.info(f"pgvector: {status['pgvector']}")
+    logger.info(f"Dimensões: {status['dimensoes']}{' (halfvec)' if status['halfvec'] else ''}")
+    logger.info(f"Linhas (estimativa): {status['linhas_estimadas']}")
+    if not status["indices"]:
+        logger.warning("Nenhum índice ANN: buscas vetoriais fazem seq scan")
+    for item in status["indices"]:
+        logger.info(
+            f"- {item['nome']} [{item['metodo']}] {item['tamanho']}"
+            f"{'' if item['valido'] else ' (INVÁLIDO)'}"
+        )
+        logger.info(f"  {item['definicao']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,7 +9,8 @@ Data: 2025-12-17
 
 IMPORTANTE:
 - Requer OPENAI_API_KEY configurada
-- Processa em batches de 100 questões
+- Processa em batches de 100 questões (1 request por lote), com --concorrencia lotes em paralelo
+- Grava 1 UPDATE por lote; retoma do checkpoint se interrompido (--reiniciar descarta)
 - Custo estimado: ~$0.10 por 1000 questões
 - Pode ser executado múltiplas vezes (idempotente)
 
@@ -23,6 +24,7 @@ USO:
     python popular_embeddings.py --limite 100
     python popular_embeddings.py --all
     python popular_embeddings.py --stats-only
+    python popular_embeddings.py --all --concorrencia 8 --reiniciar
 
 ================================================================================
 """
@@ -127,7 +129,10 @@ def exibir_estatisticas(session) -> None:
 def popular_embeddings(
     limite: int = None,
     apenas_sem_embedding: bool = True,
-    stats_only: bool = False
+    stats_only: bool = False,
+    concorrencia: int = 4,
+    checkpoint: str = None,
+    atualizar_indice: bool = True
 ) -> None:
     """
     Popula embeddings das questões.
@@ -136,6 +141,9 @@ def popular_embeddings(
         limite: Limite de questões a processar (None = todas)
         apenas_sem_embedding: Se True, processa apenas questões sem embedding
         stats_only: Se True, apenas exibe estatísticas
+        concorrencia: Lotes processados simultaneamente
+        checkpoint: Arquivo de checkpoint (None = sem retomada)
+        atualizar_indice: Manter o índice vetorial após a carga
     """
     logger.info("=" * 80)
     logger.info("POPULAR EMBEDDINGS - QUESTÕES OAB")
@@ -229,7 +237,9 @@ def popular_embeddings(
         resultado = embedding_service.gerar_embeddings_batch(
             session=session,
             limite=limite,
-            apenas_sem_embedding=apenas_sem_embedding
+            apenas_sem_embedding=apenas_sem_embedding,
+            concorrencia=concorrencia,
+            checkpoint=checkpoint
         )
 
         # Exibir resultado
@@ -240,13 +250,14 @@ def popular_embeddings(
         logger.info(f"Sucessos: {resultado['sucessos']}")
         logger.info(f"Erros: {resultado['erros']}")
         logger.info(f"Tempo total: {resultado['tempo_total']:.2f}s")
+        logger.info(f"Lotes: {resultado['lotes']}")
+        logger.info(f"Reaproveitadas do cache: {resultado['cache_acertos']}")
 
         if resultado['sucessos'] > 0:
-            velocidade = resultado['sucessos'] / resultado['tempo_total']
-            logger.info(f"Velocidade: {velocidade:.2f} questões/segundo")
+            logger.info(f"Velocidade: {resultado['questoes_por_segundo']:.2f} questões/segundo")
 
-            # Custo real
-            custo_real = (resultado['sucessos'] * 300 * 0.00013) / 1000
+            # Custo real (questões reaproveitadas do cache não chamam a API)
+            custo_real = ((resultado['sucessos'] - resultado['cache_acertos']) * 300 * 0.00013) / 1000
             logger.info(f"Custo estimado: ${custo_real:.4f}")
 
         if resultado['erros'] > 0:
@@ -257,6 +268,11 @@ def popular_embeddings(
             if len(resultado['erros_detalhes']) > 10:
                 logger.warning(f"... e mais {len(resultado['erros_detalhes']) - 10} erros")
 
+        # Índice vetorial: cria HNSW se não existir, reconstrói IVFFlat
+        if resultado['sucessos'] > 0 and atualizar_indice:
+            logger.info("\nAtualizando índice vetorial...")
+            embedding_service.indice.apos_carga(engine)
+
         # Estatísticas finais
         logger.info("\n" + "=" * 80)
         logger.info("ESTATÍSTICAS FINAIS")
@@ -296,13 +312,45 @@ def main():
         help="Apenas exibir estatísticas (não processar)"
     )
 
+    parser.add_argument(
+        "--concorrencia",
+        type=int,
+        default=4,
+        help="Lotes processados simultaneamente (padrão: 4)"
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=str(Path(__file__).parent / ".checkpoint_embeddings_openai.json"),
+        help="Arquivo de checkpoint para retomar execuções interrompidas"
+    )
+
+    parser.add_argument(
+        "--reiniciar",
+        action="store_true",
+        help="Descarta o checkpoint e começa do início"
+    )
+
+    parser.add_argument(
+        "--sem-indice",
+        action="store_true",
+        help="Não criar/reconstruir o índice vetorial ao final"
+    )
+
     args = parser.parse_args()
 
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
     # Executar
     popular_embeddings(
         limite=args.limite,
         apenas_sem_embedding=not args.all,
-        stats_only=args.stats_only
+        stats_only=args.stats_only,
+        concorrencia=args.concorrencia,
+        checkpoint=args.checkpoint,
+        atualizar_indice=not args.sem_indice
     )
 
 
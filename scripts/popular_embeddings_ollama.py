@@ -11,7 +11,8 @@ IMPORTANTE:
 - Requer Ollama instalado e rodando
 - Requer modelo de embedding baixado (ollama pull nomic-embed-text)
 - Custo ZERO de API
-- Processa em batches de 50 questões
+- Processa em batches de 50 questões, com --concorrencia lotes em paralelo
+- Grava 1 UPDATE por lote; retoma do checkpoint se interrompido (--reiniciar descarta)
 - Pode ser executado múltiplas vezes (idempotente)
 
 MODELOS RECOMENDADOS:
@@ -23,6 +24,7 @@ USO:
     python popular_embeddings_ollama.py --modelo nomic-embed-text --limite 100
     python popular_embeddings_ollama.py --modelo mxbai-embed-large --all
     python popular_embeddings_ollama.py --stats-only
+    python popular_embeddings_ollama.py --all --concorrencia 8 --reiniciar
 
 ================================================================================
 """
@@ -44,7 +46,6 @@ from sqlalchemy.orm import sessionmaker
 from core.embedding_service_ollama import (
     EmbeddingServiceOllama,
     verificar_suporte_pgvector,
-    estatisticas_embeddings,
     listar_modelos_ollama
 )
 
@@ -114,18 +115,25 @@ def exibir_modelos_disponiveis() -> None:
         logger.info("• ollama pull all-minilm       (384 dims, ~120MB)")
 
 
-def exibir_estatisticas(session) -> None:
+def exibir_estatisticas(session, embedding_service: EmbeddingServiceOllama) -> None:
     """
     Exibe estatísticas atuais de embeddings.
 
+    Lê do backend em uso pelo serviço: questao_oab.embedding (pgvector) ou
+    índice vetorial local.
+
     Args:
         session: Sessão do SQLAlchemy
+        embedding_service: Serviço que decide o backend
     """
     logger.info("\n" + "=" * 80)
     logger.info("ESTATÍSTICAS DE EMBEDDINGS")
     logger.info("=" * 80)
 
-    stats = estatisticas_embeddings(session)
+    stats = embedding_service.estatisticas_cobertura(session)
+    if not stats:
+        logger.warning("Estatísticas indisponíveis")
+        return
 
     logger.info(f"Total de questões: {stats['total_questoes']}")
     logger.info(f"Questões com embedding: {stats['questoes_com_embedding']}")
@@ -134,26 +142,9 @@ def exibir_estatisticas(session) -> None:
 
     # Estatísticas por disciplina
     logger.info("\n--- Por Disciplina ---")
-    disciplinas = session.execute(
-        text("""
-            SELECT
-                disciplina,
-                COUNT(*) as total,
-                COUNT(embedding) as com_embedding,
-                ROUND(
-                    (COUNT(embedding)::FLOAT / NULLIF(COUNT(*), 0)) * 100,
-                    1
-                ) as percentual
-            FROM questao_oab
-            WHERE disciplina IS NOT NULL
-            GROUP BY disciplina
-            ORDER BY total DESC
-        """)
-    ).fetchall()
-
-    for disc in disciplinas:
+    for disc in stats["por_disciplina"]:
         logger.info(
-            f"{disc[0]}: {disc[2]}/{disc[1]} ({disc[3]}%)"
+            f"{disc['disciplina']}: {disc['com_embedding']}/{disc['total']} ({disc['percentual']}%)"
         )
 
 
@@ -206,7 +197,10 @@ def popular_embeddings(
     modelo: str = "nomic-embed-text",
     limite: int = None,
     apenas_sem_embedding: bool = True,
-    stats_only: bool = False
+    stats_only: bool = False,
+    concorrencia: int = 4,
+    checkpoint: str = None,
+    atualizar_indice: bool = True
 ) -> None:
     """
     Popula embeddings das questões usando Ollama.
@@ -216,6 +210,9 @@ def popular_embeddings(
         limite: Limite de questões a processar (None = todas)
         apenas_sem_embedding: Se True, processa apenas questões sem embedding
         stats_only: Se True, apenas exibe estatísticas
+        concorrencia: Lotes processados simultaneamente
+        checkpoint: Arquivo de checkpoint (None = sem retomada)
+        atualizar_indice: Manter o índice vetorial após a carga
     """
     logger.info("=" * 80)
     logger.info("POPULAR EMBEDDINGS - OLLAMA (IA PRÓPRIA)")
@@ -251,22 +248,12 @@ def popular_embeddings(
         logger.error(f"Erro ao conectar ao banco: {e}")
         sys.exit(1)
 
-    # Verificar pgvector
-    #     if not verificar_suporte_pgvector(session):
-    #         logger.error("✗ Extensão pgvector não instalada")
-    #         logger.error("Execute: CREATE EXTENSION IF NOT EXISTS vector;")
-    #         sys.exit(1)
-    else:
+    # Verificar pgvector (sem ele, embeddings vão para o índice vetorial local)
+    pgvector = verificar_suporte_pgvector(session)
+    if pgvector:
         logger.info("✓ pgvector instalado")
-
-    # Exibir estatísticas atuais
-    exibir_estatisticas(session)
-
-    # Se stats_only, encerrar aqui
-    if stats_only:
-        logger.info("\nModo stats-only. Nenhuma modificação realizada.")
-        session.close()
-        return
+    else:
+        logger.info("pgvector não instalado: usando o índice vetorial local")
 
     # Inicializar serviço de embeddings
     try:
@@ -282,11 +269,21 @@ def popular_embeddings(
         session.close()
         sys.exit(1)
 
-    # Ajustar coluna embedding
-    if not ajustar_coluna_embedding(session, embedding_service.embedding_dimensions):
-        logger.error("Erro ao ajustar coluna embedding")
+    # Ajustar coluna embedding (só com pgvector; antes do serviço decidir o backend)
+    if not stats_only and pgvector:
+        if not ajustar_coluna_embedding(session, embedding_service.embedding_dimensions):
+            logger.error("Erro ao ajustar coluna embedding")
+            session.close()
+            sys.exit(1)
+
+    # Exibir estatísticas atuais
+    exibir_estatisticas(session, embedding_service)
+
+    # Se stats_only, encerrar aqui
+    if stats_only:
+        logger.info("\nModo stats-only. Nenhuma modificação realizada.")
         session.close()
-        sys.exit(1)
+        return
 
     # Confirmação do usuário
     logger.info("\n" + "=" * 80)
@@ -310,8 +307,8 @@ def popular_embeddings(
     if limite:
         logger.info(f"- Tempo estimado: ~{limite * 0.5:.0f}s ({limite} questões)")
     else:
-        stats = estatisticas_embeddings(session)
-        sem_embedding = stats['questoes_sem_embedding']
+        stats = embedding_service.estatisticas_cobertura(session)
+        sem_embedding = stats.get('questoes_sem_embedding', 0)
         logger.info(f"- Tempo estimado: ~{sem_embedding * 0.5:.0f}s ({sem_embedding} questões)")
 
     resposta = input("\nDeseja continuar? (s/n): ")
@@ -330,7 +327,9 @@ def popular_embeddings(
         resultado = embedding_service.gerar_embeddings_batch(
             session=session,
             limite=limite,
-            apenas_sem_embedding=apenas_sem_embedding
+            apenas_sem_embedding=apenas_sem_embedding,
+            concorrencia=concorrencia,
+            checkpoint=checkpoint
         )
 
         # Exibir resultado
@@ -341,10 +340,11 @@ def popular_embeddings(
         logger.info(f"Sucessos: {resultado['sucessos']}")
         logger.info(f"Erros: {resultado['erros']}")
         logger.info(f"Tempo total: {resultado['tempo_total']:.2f}s")
+        logger.info(f"Lotes: {resultado['lotes']}")
+        logger.info(f"Reaproveitadas do cache: {resultado['cache_acertos']}")
 
         if resultado['sucessos'] > 0:
-            velocidade = resultado['sucessos'] / resultado['tempo_total']
-            logger.info(f"Velocidade: {velocidade:.2f} questões/segundo")
+            logger.info(f"Velocidade: {resultado['questoes_por_segundo']:.2f} questões/segundo")
 
         logger.info(f"\nModelo usado: {resultado['modelo']}")
         logger.info(f"Dimensões: {resultado['dimensoes']}")
@@ -358,11 +358,16 @@ def popular_embeddings(
             if len(resultado['erros_detalhes']) > 10:
                 logger.warning(f"... e mais {len(resultado['erros_detalhes']) - 10} erros")
 
+        # Índice vetorial: com pgvector cria HNSW se não existir, reconstrói IVFFlat
+        if resultado['sucessos'] > 0 and atualizar_indice:
+            logger.info("\nAtualizando índice vetorial...")
+            embedding_service.atualizar_indice(session)
+
         # Estatísticas finais
         logger.info("\n" + "=" * 80)
         logger.info("ESTATÍSTICAS FINAIS")
         logger.info("=" * 80)
-        exibir_estatisticas(session)
+        exibir_estatisticas(session, embedding_service)
 
     except Exception as e:
         logger.error(f"\nErro durante processamento: {e}")
@@ -404,14 +409,46 @@ def main():
         help="Apenas exibir estatísticas (não processar)"
     )
 
+    parser.add_argument(
+        "--concorrencia",
+        type=int,
+        default=4,
+        help="Lotes processados simultaneamente (padrão: 4)"
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=str(Path(__file__).parent / ".checkpoint_embeddings_ollama.json"),
+        help="Arquivo de checkpoint para retomar execuções interrompidas"
+    )
+
+    parser.add_argument(
+        "--reiniciar",
+        action="store_true",
+        help="Descarta o checkpoint e começa do início"
+    )
+
+    parser.add_argument(
+        "--sem-indice",
+        action="store_true",
+        help="Não criar/reconstruir o índice vetorial ao final"
+    )
+
     args = parser.parse_args()
 
+    if args.reiniciar and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
     # Executar
     popular_embeddings(
         modelo=args.modelo,
         limite=args.limite,
         apenas_sem_embedding=not args.all,
-        stats_only=args.stats_only
+        stats_only=args.stats_only,
+        concorrencia=args.concorrencia,
+        checkpoint=args.checkpoint,
+        atualizar_indice=not args.sem_indice
     )
 
 
@@ -0,0 +1,69 @@
+"""
+================================================================================
+SCRIPT: RECONCILIAR LEADERBOARDS (REDIS) COM O BANCO
+================================================================================
+Objetivo: Reconstruir os sorted sets global e por disciplina a partir de
+          perfil_juridico / progresso_disciplina
+Data: 2026-10-16
+================================================================================
+
+USO:
+    python reconciliar_leaderboards.py
+    python reconciliar_leaderboards.py --top 10
+
+A API já reconcilia na subida e a cada LEADERBOARD_RECONCILE_SECONDS; use
+este script após restaurar o Redis ou importar pontuações em massa.
+
+================================================================================
+"""
+
+import os
+import sys
+import argparse
+import logging
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from core.leaderboard import leaderboards
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcilia os leaderboards do Redis com o banco")
+    parser.add_argument("--top", type=int, default=0, help="Exibe o top-N global ao final")
+    args = parser.parse_args()
+
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        logger.error("DATABASE_URL não configurado")
+        sys.exit(1)
+
+    engine = create_engine(database_url)
+
+    with Session(engine) as session:
+        resultado = leaderboards.reconciliar(session)
+
+    if resultado is None:
+        logger.error("Redis indisponível ou reconciliação já em andamento em outro worker")
+        sys.exit(1)
+
+    for nome, membros in sorted(resultado.items()):
+        logger.info(f"{nome}: {membros} membros")
+
+    if args.top:
+        for posicao, (user_id, score) in enumerate(leaderboards.top(args.top) or [], start=1):
+            print(f"{posicao:>4}  {user_id}  {score:g}")
+
+
+if __name__ == "__main__":
+    main()
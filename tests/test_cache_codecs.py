@@ -0,0 +1,152 @@
+"""
+================================================================================
+TESTES - CODECS DE SERIALIZAÇÃO DO CACHE (core.cache_codecs)
+================================================================================
+- Ida e volta para cada par serializador/compressão disponível
+- Compressão só a partir do limite (e só se o resultado for menor)
+- JSON legado (primeiro byte >= 0x20) continua legível com
+  CACHE_CODEC_ENABLED ligado ou desligado
+- Versão de cabeçalho desconhecida vira miss no CacheService
+
+Redis: fakeredis. msgpack/orjson/lz4 são opcionais: pares indisponíveis
+são pulados.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import json
+
+import fakeredis
+import pytest
+
+import core.cache_codecs as codecs
+import core.cache_service as modulo
+from core.cache_codecs import CacheCodec, ErroCodec, criar_codec, CODEC_LEGADO
+from core.cache_service import CacheService
+
+
+VALOR = {
+    "id": "q-1",
+    "enunciado": "Texto da questão " * 20,
+    "alternativas": ["A", "B", "C", "D"],
+    "acertos": 3,
+    "taxa": 0.75,
+    "ativa": True,
+    "anulada": None,
+}
+
+SERIALIZADORES = [codecs.CODEC_JSON, codecs.CODEC_ORJSON, codecs.CODEC_MSGPACK]
+COMPRESSOES = [codecs.COMPRESSAO_NENHUMA, codecs.COMPRESSAO_ZLIB, codecs.COMPRESSAO_LZ4]
+
+
+def _disponivel(serializador, compressao):
+    return (
+        codecs._IDS_CODEC[serializador] in codecs._SERIALIZADORES
+        and codecs._IDS_COMPRESSAO[compressao] in codecs._COMPRESSORES
+    )
+
+
+# ============================================================================
+# Codec
+# ============================================================================
+
+@pytest.mark.parametrize("compressao", COMPRESSOES)
+@pytest.mark.parametrize("serializador", SERIALIZADORES)
+def test_ida_e_volta(serializador, compressao):
+    if not _disponivel(serializador, compressao):
+        pytest.skip(f"{serializador}/{compressao} indisponível")
+
+    codec = CacheCodec(serializador, compressao, limite_compressao=0)
+    payload = codec.codificar(VALOR)
+
+    assert payload[0] == codecs.VERSAO_FORMATO
+    assert payload[1] == codecs._IDS_CODEC[serializador]
+    assert payload[2] == codecs._IDS_COMPRESSAO[compressao]
+    assert CacheCodec.decodificar(payload) == VALOR
+
+
+def test_codec_legado_grava_json_puro():
+    payload = CODEC_LEGADO.codificar(VALOR)
+
+    assert payload == json.dumps(VALOR).encode()
+    assert criar_codec("legado") is CODEC_LEGADO
+    assert CacheCodec.decodificar(payload) == VALOR
+
+
+def test_compressao_so_a_partir_do_limite():
+    dados = len(json.dumps(VALOR).encode())
+    no_limite = CacheCodec(codecs.CODEC_JSON, codecs.COMPRESSAO_ZLIB, limite_compressao=dados)
+    acima = CacheCodec(codecs.CODEC_JSON, codecs.COMPRESSAO_ZLIB, limite_compressao=dados + 1)
+
+    comprimido = no_limite.codificar(VALOR)
+    assert comprimido[2] == codecs._IDS_COMPRESSAO[codecs.COMPRESSAO_ZLIB]
+    assert len(comprimido) < dados
+
+    sem_compressao = acima.codificar(VALOR)
+    assert sem_compressao[2] == 0
+    assert sem_compressao[3:] == json.dumps(VALOR).encode()
+
+    assert CacheCodec.decodificar(comprimido) == CacheCodec.decodificar(sem_compressao) == VALOR
+
+
+def test_compressao_que_nao_reduz_e_descartada():
+    codec = CacheCodec(codecs.CODEC_JSON, codecs.COMPRESSAO_ZLIB, limite_compressao=0)
+
+    payload = codec.codificar("x")
+    assert payload[2] == 0
+    assert CacheCodec.decodificar(payload) == "x"
+
+
+@pytest.mark.parametrize("legado", [b'{"a": 1}', b"[1, 2]", b'"texto"', b"42", b" {}", '{"a": 1}'])
+def test_decodificar_aceita_json_legado(legado):
+    assert CacheCodec.decodificar(legado) == json.loads(legado)
+
+
+@pytest.mark.parametrize("payload", [b"\x02\x00\x00{}", b"\x07\x02\x01", b"\x01\x00"])
+def test_versao_desconhecida_levanta_erro_codec(payload):
+    with pytest.raises(ErroCodec):
+        CacheCodec.decodificar(payload)
+
+
+# ============================================================================
+# CacheService
+# ============================================================================
+
+@pytest.fixture
+def servidor(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        modulo.redis, "Redis",
+        lambda connection_pool: fakeredis.FakeRedis(
+            server=servidor,
+            decode_responses=connection_pool.connection_kwargs.get("decode_responses", False)
+        )
+    )
+    return servidor
+
+
+@pytest.mark.parametrize("habilitado", ["true", "false"])
+def test_cache_le_json_legado_com_codec_ligado_ou_desligado(servidor, monkeypatch, habilitado):
+    monkeypatch.setenv("CACHE_CODEC_ENABLED", habilitado)
+    cache = CacheService(l1_habilitado=False)
+    assert bool(cache.codecs) is (habilitado == "true")
+
+    # Entrada gravada por um worker antigo (JSON texto, sem cabeçalho)
+    cache.redis_client.set("juris_ia:questao:legada", json.dumps(VALOR), ex=60)
+    assert cache.get("juris_ia:questao:legada") == VALOR
+    assert cache.get_many(["juris_ia:questao:legada"]) == {"juris_ia:questao:legada": VALOR}
+
+    # Escrita nova no formato da configuração, lida de volta
+    cache.set("juris_ia:questao:nova", VALOR, ttl=60)
+    bruto = cache.redis_binario.get("juris_ia:questao:nova")
+    assert (bruto[0] >= 0x20) is (habilitado == "false")
+    assert cache.get("juris_ia:questao:nova") == VALOR
+
+
+def test_cache_trata_versao_desconhecida_como_miss(servidor):
+    cache = CacheService(l1_habilitado=False, codecs_habilitados=True)
+    cache.redis_binario.set("juris_ia:questao:futura", b"\x02\x00\x00{}", ex=60)
+
+    assert cache.get("juris_ia:questao:futura") is None
+    assert cache.get_many(["juris_ia:questao:futura"]) == {}
@@ -0,0 +1,176 @@
+"""
+================================================================================
+TESTES - CACHE L1 EM PROCESSO (core.cache_service.CacheLocalLRU)
+================================================================================
+- Expiração pelo TTL do prefixo (limitado ao TTL da escrita) e despejo LRU
+- delete/set em uma instância remove a entrada do L1 de outra (pub/sub)
+- Uma instância ignora as próprias mensagens de invalidação
+
+Redis: fakeredis (servidor compartilhado entre as instâncias, como dois
+workers apontando para o mesmo Redis).
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import json
+import time
+
+import fakeredis
+import pytest
+
+import core.cache_service as modulo
+from core.cache_service import CacheLocalLRU, CacheService
+
+
+class Relogio:
+    """time.monotonic controlável"""
+
+    def __init__(self):
+        self.agora = 1000.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(modulo.time, "monotonic", relogio)
+    return relogio
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        modulo.redis, "Redis",
+        lambda connection_pool: fakeredis.FakeRedis(
+            server=servidor,
+            decode_responses=connection_pool.connection_kwargs.get("decode_responses", False)
+        )
+    )
+
+    criados = []
+
+    def criar():
+        cache = CacheService(l1_habilitado=True, codecs_habilitados=False)
+        assert cache.l1 is not None
+        criados.append(cache)
+        return cache
+
+    yield criar
+
+    for cache in criados:
+        cache._pubsub_thread.stop()
+
+
+def _aguardar(condicao, limite=5.0):
+    fim = time.time() + limite
+    while time.time() < fim:
+        if condicao():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+# ============================================================================
+# CacheLocalLRU
+# ============================================================================
+
+def test_expira_pelo_ttl_do_prefixo(relogio):
+    l1 = CacheLocalLRU(max_itens=10, ttls_por_prefixo={"questao": 600, "ranking": 30})
+
+    l1.set("juris_ia:questao:1", {"id": 1})
+    l1.set("juris_ia:ranking:geral", [1, 2], ttl=3600)
+    l1.set("juris_ia:questao:curta", {"id": 2}, ttl=5)
+    l1.set("juris_ia:sessao:1", {"x": 1})  # prefixo fora do L1
+
+    assert l1.get("juris_ia:sessao:1") == (False, None)
+    assert l1.get("juris_ia:questao:curta") == (True, {"id": 2})
+
+    relogio.agora += 6  # TTL da escrita menor que o do prefixo
+    assert l1.get("juris_ia:questao:curta") == (False, None)
+
+    relogio.agora += 25  # 31s: ranking expira, questão não
+    assert l1.get("juris_ia:ranking:geral") == (False, None)
+    assert l1.get("juris_ia:questao:1") == (True, {"id": 1})
+
+    relogio.agora += 600
+    assert l1.get("juris_ia:questao:1") == (False, None)
+    assert len(l1) == 0
+
+
+def test_despeja_o_menos_usado_recentemente(relogio):
+    l1 = CacheLocalLRU(max_itens=2, ttls_por_prefixo={"questao": 600})
+
+    l1.set("juris_ia:questao:1", 1)
+    l1.set("juris_ia:questao:2", 2)
+    assert l1.get("juris_ia:questao:1") == (True, 1)  # 2 vira o mais antigo
+
+    l1.set("juris_ia:questao:3", 3)
+
+    assert len(l1) == 2
+    assert l1.get("juris_ia:questao:2") == (False, None)
+    assert l1.get("juris_ia:questao:1") == (True, 1)
+    assert l1.get("juris_ia:questao:3") == (True, 3)
+
+
+# ============================================================================
+# Invalidação entre workers
+# ============================================================================
+
+def test_delete_em_um_worker_remove_do_l1_do_outro(workers):
+    a, b = workers(), workers()
+    chave = "juris_ia:questao:1"
+
+    a.set(chave, {"versao": 1}, ttl=60)
+    assert b.get(chave) == {"versao": 1}
+    assert b.l1.get(chave) == (True, {"versao": 1})
+
+    a.delete(chave)
+
+    assert _aguardar(lambda: b.l1.get(chave) == (False, None))
+    assert b.get(chave) is None
+
+
+def test_set_em_um_worker_remove_versao_antiga_do_outro(workers):
+    a, b = workers(), workers()
+    chave = "juris_ia:questao:1"
+
+    a.set(chave, {"versao": 1}, ttl=60)
+    assert b.get(chave) == {"versao": 1}
+
+    a.set(chave, {"versao": 2}, ttl=60)
+
+    assert _aguardar(lambda: b.l1.get(chave) == (False, None))
+    assert b.get(chave) == {"versao": 2}
+
+
+def test_worker_ignora_a_propria_invalidacao(workers):
+    a, b = workers(), workers()
+    chave = "juris_ia:questao:1"
+    b.get(chave)  # garante que b já processa o canal
+
+    a.set(chave, {"versao": 1}, ttl=60)
+    b.l1.set(chave, {"versao": 0})
+    assert _aguardar(lambda: b.l1.get(chave) == (False, None))
+
+    # Marcador publicado por b depois da mensagem de a: quando a o processa,
+    # já processou também a própria mensagem (entrega em ordem no canal)
+    marcador = "juris_ia:questao:marcador"
+    a.l1.set(marcador, {})
+    b.delete(marcador)
+    assert _aguardar(lambda: a.l1.get(marcador) == (False, None))
+    assert a.l1.get(chave) == (True, {"versao": 1})
+
+    # Mensagem com a própria origem não toca o L1
+    a._on_invalidacao({"data": json.dumps(
+        {"tipo": "chave", "valor": chave, "origem": a._id_instancia}
+    )})
+    assert a.l1.get(chave) == (True, {"versao": 1})
+
+    a._on_invalidacao({"data": json.dumps(
+        {"tipo": "chave", "valor": chave, "origem": b._id_instancia}
+    )})
+    assert a.l1.get(chave) == (False, None)
@@ -0,0 +1,135 @@
+"""
+================================================================================
+TESTES - OPERAÇÕES EM LOTE DO CACHE (get_many, set_many, @cached(batch_arg))
+================================================================================
+- set_many aplica o TTL de cada chave no pipeline (ttls sobrepõe o padrão)
+- get_many serve do L1 sem ir ao Redis e busca só o restante com um MGET
+- @cached(batch_arg=...) chama a função apenas com os itens ausentes e
+  devolve o resultado na ordem da entrada
+
+Redis: fakeredis.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import fakeredis
+import pytest
+
+import core.cache_service as modulo
+from core.cache_service import CacheService, cached
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        modulo.redis, "Redis",
+        lambda connection_pool: fakeredis.FakeRedis(
+            server=servidor,
+            decode_responses=connection_pool.connection_kwargs.get("decode_responses", False)
+        )
+    )
+    cache = CacheService(l1_habilitado=True, codecs_habilitados=True)
+    monkeypatch.setattr(modulo, "_cache_service", cache)
+    yield cache
+    cache._pubsub_thread.stop()
+
+
+@pytest.fixture
+def mgets(cache, monkeypatch):
+    """Registra as chaves de cada MGET enviado ao Redis"""
+    chamadas = []
+    original = cache.redis_binario.mget
+
+    def mget(chaves):
+        chamadas.append(list(chaves))
+        return original(chaves)
+
+    monkeypatch.setattr(cache.redis_binario, "mget", mget)
+    return chamadas
+
+
+# ============================================================================
+# set_many
+# ============================================================================
+
+def test_set_many_aplica_ttl_por_chave(cache):
+    cache.set_many(
+        {
+            "juris_ia:sessao:a": {"x": 1},
+            "juris_ia:sessao:b": {"x": 2},
+            "juris_ia:sessao:c": {"x": 3},
+        },
+        ttl=100,
+        ttls={"juris_ia:sessao:b": 10, "juris_ia:sessao:c": 0},
+    )
+
+    assert 90 < cache.redis_client.ttl("juris_ia:sessao:a") <= 100
+    assert 0 < cache.redis_client.ttl("juris_ia:sessao:b") <= 10
+    assert cache.redis_client.ttl("juris_ia:sessao:c") == -1  # 0 = sem expiração
+
+    assert cache.get_many(["juris_ia:sessao:a", "juris_ia:sessao:b", "juris_ia:sessao:c"]) == {
+        "juris_ia:sessao:a": {"x": 1},
+        "juris_ia:sessao:b": {"x": 2},
+        "juris_ia:sessao:c": {"x": 3},
+    }
+
+
+# ============================================================================
+# get_many
+# ============================================================================
+
+def test_get_many_serve_do_l1_sem_ir_ao_redis(cache, mgets):
+    cache.set_many({f"juris_ia:questao:{i}": {"id": i} for i in range(3)}, ttl=60)
+
+    resultado = cache.get_many([f"juris_ia:questao:{i}" for i in range(3)])
+
+    assert resultado == {f"juris_ia:questao:{i}": {"id": i} for i in range(3)}
+    assert mgets == []
+    assert cache.metricas["l1_hits"] == 3
+
+
+def test_get_many_busca_no_redis_so_o_que_falta_no_l1(cache, mgets):
+    cache.set("juris_ia:questao:1", {"id": 1}, ttl=60)
+    cache.set("juris_ia:sessao:1", {"s": 1}, ttl=60)  # prefixo fora do L1
+    cache.l1.clear()
+    cache.get("juris_ia:questao:1")  # volta ao L1
+    mgets.clear()
+
+    resultado = cache.get_many(
+        ["juris_ia:questao:1", "juris_ia:sessao:1", "juris_ia:questao:2", "juris_ia:questao:1"]
+    )
+
+    assert resultado == {"juris_ia:questao:1": {"id": 1}, "juris_ia:sessao:1": {"s": 1}}
+    assert mgets == [["juris_ia:sessao:1", "juris_ia:questao:2"]]
+
+
+# ============================================================================
+# @cached(batch_arg=...)
+# ============================================================================
+
+def test_cached_em_lote_calcula_so_os_ausentes_e_preserva_a_ordem(cache):
+    chamadas = []
+
+    @cached(prefix="questao", ttl=60, batch_arg="questoes_ids")
+    def buscar_questoes(questoes_ids, disciplina="civil"):
+        chamadas.append(list(questoes_ids))
+        return {qid: {"id": qid, "disciplina": disciplina} for qid in questoes_ids}
+
+    assert list(buscar_questoes([3, 1])) == [3, 1]
+    assert chamadas == [[3, 1]]
+
+    resultado = buscar_questoes([5, 1, 4, 3, 2])
+
+    assert chamadas[1] == [5, 4, 2]
+    assert list(resultado) == [5, 1, 4, 3, 2]
+    assert resultado[1] == {"id": 1, "disciplina": "civil"}
+
+    # Tudo em cache: a função não é chamada
+    assert list(buscar_questoes([2, 3, 5])) == [2, 3, 5]
+    assert len(chamadas) == 2
+
+    # Outro argumento compõe a chave: namespace separado
+    assert buscar_questoes([1], disciplina="penal") == {1: {"id": 1, "disciplina": "penal"}}
+    assert chamadas[2] == [1]
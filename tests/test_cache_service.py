@@ -0,0 +1,91 @@
+"""
+================================================================================
+TESTES - TAGS DE INVALIDAÇÃO DO CACHE (core.cache_service)
+================================================================================
+O set de uma tag precisa viver tanto quanto a chave mais longeva que ele
+referencia; senão invalidar_tag deixa de alcançar chaves ainda vivas
+(cópias stale do single-flight, chaves sem TTL).
+
+Redis: fakeredis.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import fakeredis
+import pytest
+
+import core.cache_service as modulo
+from core.cache_service import CacheService
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        modulo.redis, "Redis",
+        lambda connection_pool: fakeredis.FakeRedis(
+            server=servidor,
+            decode_responses=connection_pool.connection_kwargs.get("decode_responses", False)
+        )
+    )
+    return CacheService(l1_habilitado=False, codecs_habilitados=False)
+
+
+def _ttl_tag(cache, tag):
+    return cache.redis_client.ttl(cache._chave_tag(tag))
+
+
+def test_tag_nova_recebe_ttl_da_chave(cache):
+    cache.set("juris_ia:ranking:a", [1], ttl=60, tags=["ranking"])
+
+    assert 0 < _ttl_tag(cache, "ranking") <= 60
+
+
+def test_escrita_curta_nao_encurta_tag_das_copias_stale(cache):
+    cache.obter_ou_calcular("juris_ia:ranking:geral", lambda: [1, 2, 3], ttl=60, tags=["ranking"])
+    assert _ttl_tag(cache, "ranking") > 60
+
+    cache.set("juris_ia:ranking:semanal", [4], ttl=60, tags=["ranking"])
+    assert _ttl_tag(cache, "ranking") > 60
+
+    stale, delta = cache._chaves_single_flight("juris_ia:ranking:geral")
+    assert cache.invalidar_tag("ranking") == 4
+    assert not cache.redis_client.exists(stale, delta)
+
+
+def test_membro_sem_ttl_torna_a_tag_persistente(cache):
+    cache.set("juris_ia:sessao:a", {"x": 1}, ttl=30, tags=["sessao"])
+    cache.set("juris_ia:sessao:b", {"x": 2}, tags=["sessao"])
+    assert _ttl_tag(cache, "sessao") == -1
+
+    cache.set("juris_ia:sessao:c", {"x": 3}, ttl=30, tags=["sessao"])
+    assert _ttl_tag(cache, "sessao") == -1
+
+    assert cache.invalidar_tag("sessao") == 3
+
+
+# Payloads que não decodificam: versão desconhecida, codec ausente, zlib inválido
+ILEGIVEIS = [
+    b"\x07\x00\x00{}",
+    b"\x01\x09\x00{}",
+    bytes([0x01, 0x00, 0x01]) + b"nao-e-zlib",
+]
+
+
+@pytest.mark.parametrize("payload", ILEGIVEIS)
+def test_obter_ou_calcular_trata_payload_ilegivel_como_miss(cache, payload):
+    cache.redis_binario.set("juris_ia:ranking:geral", payload, ex=60)
+
+    assert cache.obter_ou_calcular("juris_ia:ranking:geral", lambda: [1, 2], ttl=60) == [1, 2]
+    assert cache.get("juris_ia:ranking:geral") == [1, 2]
+    assert cache.metricas["sf_recalculos"] == 1
+
+
+@pytest.mark.parametrize("payload", ILEGIVEIS)
+def test_get_many_ignora_payload_ilegivel(cache, payload):
+    cache.set("juris_ia:sessao:ok", {"x": 1}, ttl=60)
+    cache.redis_binario.set("juris_ia:sessao:ruim", payload, ex=60)
+
+    assert cache.get_many(["juris_ia:sessao:ok", "juris_ia:sessao:ruim"]) == {"juris_ia:sessao:ok": {"x": 1}}
+    assert cache.metricas["l2_misses"] == 1
@@ -0,0 +1,35 @@
+"""
+================================================================================
+TESTES - PIPELINE DE BACKFILL DE EMBEDDINGS (core.embedding_pipeline)
+================================================================================
+Sem destino para os vetores (sem pgvector e sem índice local) o pipeline
+não deve rodar: pagaria os embeddings e avançaria o checkpoint à toa.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import pytest
+
+from core.embedding_pipeline import PipelineEmbeddings
+
+
+def _pipeline(**kwargs):
+    return PipelineEmbeddings(
+        engine=None,
+        gerar_lote=lambda textos: [[0.0] * 3 for _ in textos],
+        construir_texto=lambda enunciado, alternativas: enunciado,
+        modelo="teste",
+        dimensoes=3,
+        **kwargs
+    )
+
+
+def test_sem_banco_e_sem_indice_local_e_erro_de_configuracao():
+    with pytest.raises(ValueError, match="Nenhum destino"):
+        _pipeline(gravar_banco=False, indice_local=None)
+
+
+def test_com_algum_destino_constroi():
+    assert _pipeline().gravar_banco is True
+    assert _pipeline(gravar_banco=False, indice_local=object()).indice_local is not None
@@ -16,6 +16,7 @@ from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
 
 from core.enforcement import LimitsEnforcement, ReasonCode
+from core.log_queue import fila_logs
 
 
 # ============================================================
@@ -510,6 +511,9 @@ def test_logging_block_event(enforcement, test_user_free, database_url):
 
     assert result.allowed is False
 
+    # Logs são gravados em lote pela fila; forçar a gravação pendente
+    fila_logs.descarregar()
+
     # Verificar se log foi criado
     log_count = session.execute(
         text("""
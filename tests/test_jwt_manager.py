@@ -0,0 +1,280 @@
+"""
+================================================================================
+TESTES - CAMINHO QUENTE DO JWT (auth.jwt_manager)
+================================================================================
+Cache de secrets por "kid" (ativo, período de graça, kid desconhecido),
+conjuntos de sessões e de revogação no Redis (jti, corte por usuário,
+sessão inexistente, reconstrução a partir do banco) e broadcast de
+rotação invalidando o cache local.
+
+Redis: fakeredis. Banco: get_db_session substituído por sessões em memória.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import json
+import time
+import importlib.util
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import fakeredis
+import jwt
+import pytest
+
+
+# conftest coloca api/ antes da raiz no sys.path: api/auth.py esconde o
+# pacote auth/, então o módulo é carregado pelo caminho do arquivo
+_spec = importlib.util.spec_from_file_location(
+    "auth_jwt_manager", Path(__file__).parent.parent / "auth" / "jwt_manager.py"
+)
+modulo = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(modulo)
+JWTManager = modulo.JWTManager
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    servidor = fakeredis.FakeServer()
+    cliente = fakeredis.FakeRedis(server=servidor, decode_responses=True)
+    monkeypatch.setattr(modulo, "_redis_cliente", cliente)
+    monkeypatch.setattr(modulo, "_redis_proxima_tentativa", 0.0)
+    modulo._cache_secrets.invalidar()
+    yield cliente
+    modulo._cache_secrets.invalidar()
+
+
+@pytest.fixture
+def manager(redis):
+    return JWTManager(revogacao_redis=True)
+
+
+class SecretsNoBanco:
+    """Substitui _carregar_secrets: devolve a lista atual e conta recargas"""
+
+    def __init__(self, lista):
+        self.lista = lista
+        self.cargas = 0
+
+    def __call__(self, tipo):
+        self.cargas += 1
+        return list(self.lista)
+
+
+def _secret(kid, ativo=True, valido_ate=None):
+    return {"kid": kid, "secret": f"segredo-{kid}" * 4, "ativo": ativo, "valido_ate": valido_ate}
+
+
+def _token(item, **payload):
+    agora = datetime.utcnow()
+    payload = {"sub": "u1", "jti": "j1", "iat": agora, "exp": agora + timedelta(minutes=15), **payload}
+    return jwt.encode(payload, item["secret"], algorithm=JWTManager.ALGORITHM, headers={"kid": item["kid"]})
+
+
+# ============================================================================
+# _decodificar
+# ============================================================================
+
+def test_decodificar_kid_ativo(manager, monkeypatch):
+    ativo = _secret("a")
+    banco = SecretsNoBanco([ativo])
+    monkeypatch.setattr(manager, "_carregar_secrets", banco)
+
+    assert manager._decodificar(_token(ativo), "access")["sub"] == "u1"
+    assert manager._decodificar(_token(ativo, jti="j2"), "access")["jti"] == "j2"
+    assert banco.cargas == 1
+
+
+def test_decodificar_kid_em_periodo_de_graca(manager, monkeypatch):
+    agora = datetime.utcnow()
+    rotacionado = _secret("antigo", ativo=False, valido_ate=agora - timedelta(minutes=5))
+    expirado = _secret("velho", ativo=False, valido_ate=agora - JWTManager.GRACA_ROTACAO - timedelta(minutes=1))
+    monkeypatch.setattr(manager, "_carregar_secrets", SecretsNoBanco([_secret("novo"), rotacionado, expirado]))
+
+    assert manager._decodificar(_token(rotacionado), "access")["sub"] == "u1"
+    with pytest.raises(jwt.InvalidSignatureError):
+        manager._decodificar(_token(expirado), "access")
+
+
+def test_decodificar_kid_desconhecido_recarrega_uma_vez(manager, monkeypatch):
+    banco = SecretsNoBanco([_secret("a")])
+    monkeypatch.setattr(manager, "_carregar_secrets", banco)
+    manager._secrets("access")
+
+    # Rotação feita em outro worker antes do broadcast chegar
+    novo = _secret("b")
+    banco.lista = [novo, _secret("a", ativo=False, valido_ate=datetime.utcnow())]
+    assert manager._decodificar(_token(novo), "access")["sub"] == "u1"
+    assert banco.cargas == 2
+
+    with pytest.raises(jwt.InvalidSignatureError):
+        manager._decodificar(_token(_secret("inexistente")), "access")
+    assert banco.cargas == 3
+
+
+# ============================================================================
+# _sessao_revogada
+# ============================================================================
+
+def _marcar_sincronizado(redis, *sessoes):
+    for chave in (JWTManager.CHAVE_SESSOES, JWTManager.CHAVE_REVOGADOS):
+        redis.zadd(chave, {JWTManager.MEMBRO_SINCRONIZADO: float("inf")})
+    if sessoes:
+        redis.zadd(JWTManager.CHAVE_SESSOES, {jti: time.time() + 600 for jti in sessoes})
+
+
+class BancoSessoes:
+    """Substitui get_db_session: sessao_usuario em memória, conta consultas"""
+
+    def __init__(self, linhas):
+        self.linhas = linhas  # {jti: (expira_em, ativa)}
+        self.consultas = []
+
+    @contextmanager
+    def __call__(self):
+        def execute(sql, parametros=None):
+            self.consultas.append(str(sql))
+            if parametros and "jti" in parametros:
+                linha = self.linhas.get(parametros["jti"])
+                return SimpleNamespace(fetchone=lambda: (linha[1],) if linha else None)
+            return SimpleNamespace(fetchall=lambda: [
+                (jti, expira_em, ativa) for jti, (expira_em, ativa) in self.linhas.items()
+            ])
+        yield SimpleNamespace(execute=execute)
+
+
+def test_jti_revogado(manager, redis):
+    _marcar_sincronizado(redis, "revogado", "valido")
+    redis.zadd(JWTManager.CHAVE_REVOGADOS, {"revogado": time.time() + 600})
+
+    assert manager._sessao_revogada({"sub": "u1", "jti": "revogado", "iat": time.time()}) is True
+    assert manager._sessao_revogada({"sub": "u1", "jti": "valido", "iat": time.time()}) is False
+
+
+def test_iat_anterior_ao_corte_do_usuario(manager, redis):
+    _marcar_sincronizado(redis, "j1", "j2", "j3")
+    corte = time.time()
+    redis.set(JWTManager.CHAVE_CORTE_USUARIO.format(usuario_id="u1"), corte)
+
+    assert manager._sessao_revogada({"sub": "u1", "jti": "j1", "iat": corte - 60}) is True
+    assert manager._sessao_revogada({"sub": "u1", "jti": "j2", "iat": corte}) is False
+    assert manager._sessao_revogada({"sub": "u2", "jti": "j3", "iat": corte - 60}) is False
+
+
+def test_sem_sincronizacao_reconstroi_do_banco(manager, redis, monkeypatch):
+    expira_em = datetime.utcnow() + timedelta(minutes=10)
+    banco = BancoSessoes({"finalizado": (expira_em, False), "ativo": (expira_em, True)})
+    monkeypatch.setattr(modulo, "get_db_session", banco)
+
+    assert manager._sessao_revogada({"sub": "u1", "jti": "finalizado", "iat": time.time()}) is True
+    assert len(banco.consultas) == 1
+
+    # Sincronizado: sem nova consulta ao banco
+    assert manager._sessao_revogada({"sub": "u1", "jti": "ativo", "iat": time.time()}) is False
+    assert len(banco.consultas) == 1
+
+
+def test_conjunto_perdido_forca_nova_sincronizacao(manager, redis, monkeypatch):
+    expira_em = datetime.utcnow() + timedelta(minutes=10)
+    banco = BancoSessoes({"finalizado": (expira_em, False), "ativo": (expira_em, True)})
+    monkeypatch.setattr(modulo, "get_db_session", banco)
+    assert manager._sessao_revogada({"sub": "u1", "jti": "ativo", "iat": time.time()}) is False
+
+    # Evicção só do conjunto de revogação: o sentinela vai junto
+    redis.delete(JWTManager.CHAVE_REVOGADOS)
+    assert manager._sessao_revogada({"sub": "u1", "jti": "finalizado", "iat": time.time()}) is True
+    assert len(banco.consultas) == 2
+
+
+def test_token_sem_sessao_no_banco_e_rejeitado(manager, redis, monkeypatch):
+    item = _secret("a")
+    monkeypatch.setattr(manager, "_carregar_secrets", SecretsNoBanco([item]))
+    banco = BancoSessoes({"ativo": (datetime.utcnow() + timedelta(minutes=10), True)})
+    monkeypatch.setattr(modulo, "get_db_session", banco)
+    _marcar_sincronizado(redis, "ativo")
+
+    valido, payload, _ = manager.validar_access_token(_token(item, type="access", jti="ativo"))
+    assert valido and payload["jti"] == "ativo"
+    assert banco.consultas == []
+
+    # Assinatura válida, mas nenhuma linha em sessao_usuario
+    valido, payload, erro = manager.validar_access_token(_token(item, type="access", jti="fantasma"))
+    assert (valido, payload, erro) == (False, None, "Sessão inválida ou expirada")
+    assert len(banco.consultas) == 1
+
+
+def test_salvar_sessao_registra_no_conjunto(manager, redis, monkeypatch):
+    @contextmanager
+    def sessao_falsa():
+        yield SimpleNamespace(execute=lambda *args: None, commit=lambda: None)
+
+    monkeypatch.setattr(modulo, "get_db_session", sessao_falsa)
+    _marcar_sincronizado(redis)
+
+    manager.salvar_sessao("u1", "novo", "r1", datetime.utcnow() + timedelta(minutes=15))
+    assert manager._sessao_revogada({"sub": "u1", "jti": "novo", "iat": time.time()}) is False
+
+
+def test_falha_ao_revogar_tira_sessao_do_conjunto(manager, redis, monkeypatch):
+    expira_em = datetime.utcnow() + timedelta(minutes=10)
+
+    @contextmanager
+    def sessao_falsa():
+        yield SimpleNamespace(
+            execute=lambda *args: SimpleNamespace(fetchall=lambda: [("j1", expira_em)]),
+            commit=lambda: None
+        )
+
+    monkeypatch.setattr(modulo, "get_db_session", sessao_falsa)
+    _marcar_sincronizado(redis, "j1", "j2")
+
+    gravar = manager._gravar_conjunto
+
+    def gravar_com_falha(pipe, chave, sessoes):
+        if chave == JWTManager.CHAVE_REVOGADOS:
+            raise ConnectionError("Redis caiu no meio da revogação")
+        gravar(pipe, chave, sessoes)
+
+    monkeypatch.setattr(manager, "_gravar_conjunto", gravar_com_falha)
+    manager.finalizar_sessao("j1")
+
+    # Sem o jti e o sentinela, a validação não aceita mais pelo conjunto
+    assert redis.zscore(JWTManager.CHAVE_SESSOES, "j1") is None
+    assert redis.zscore(JWTManager.CHAVE_SESSOES, JWTManager.MEMBRO_SINCRONIZADO) is None
+    assert redis.zscore(JWTManager.CHAVE_SESSOES, "j2") is not None
+
+
+# ============================================================================
+# Broadcast de rotação
+# ============================================================================
+
+def test_broadcast_de_rotacao_invalida_cache(redis, monkeypatch):
+    # Worker sem cliente ainda: _redis() conecta e assina o canal de rotação
+    monkeypatch.setattr(modulo, "_redis_cliente", None)
+    monkeypatch.setattr(
+        "core.cache_service.obter_cache_service",
+        lambda: SimpleNamespace(redis_client=fakeredis.FakeRedis(
+            server=redis.connection_pool.connection_kwargs["server"], decode_responses=True
+        ))
+    )
+    manager = JWTManager()
+    assert manager._redis() is not None
+
+    try:
+        modulo._cache_secrets.definir("access", [_secret("a")])
+        modulo._cache_secrets.definir("refresh", [_secret("r")])
+
+        # Rotação publicada por outro worker
+        redis.publish(JWTManager.CANAL_ROTACAO, json.dumps({"tipo": "access"}))
+
+        limite = time.monotonic() + 5
+        while modulo._cache_secrets.obter("access") is not None and time.monotonic() < limite:
+            time.sleep(0.05)
+
+        assert modulo._cache_secrets.obter("access") is None
+        assert modulo._cache_secrets.obter("refresh") is not None
+    finally:
+        modulo._assinatura_rotacao.stop()
@@ -0,0 +1,66 @@
+"""
+================================================================================
+TESTES - ATUALIZAÇÃO DOS LEADERBOARDS APÓS O COMMIT (core.leaderboard)
+================================================================================
+ZADD/ZINCRBY agendados numa transação só chegam ao Redis quando a
+transação externa confirma; SAVEPOINTs liberados ou desfeitos não
+antecipam nem perdem atualizações feitas fora deles.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from core.leaderboard import leaderboards
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    cliente = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(leaderboards, "_cliente", cliente)
+    return cliente
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE dado (id INTEGER PRIMARY KEY)"))
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        yield session
+    engine.dispose()
+
+
+def _semanal(redis):
+    return redis.zrange(leaderboards.chave("semanal"), 0, -1, withscores=True)
+
+
+def test_savepoint_liberado_nao_aplica_se_a_transacao_externa_desfaz(redis, session):
+    leaderboards.registrar_apos_commit(session, "u1", pontuacao_global=100, delta=10)
+    with session.begin_nested():
+        session.execute(text("SELECT 1"))
+    session.rollback()
+
+    assert redis.zscore(leaderboards.chave("global"), "u1") is None
+    assert _semanal(redis) == []
+
+
+def test_savepoint_desfeito_preserva_atualizacoes_anteriores(redis, session):
+    leaderboards.registrar_apos_commit(
+        session, "u1", disciplina="Direito Civil", corretas_disciplina=7
+    )
+    savepoint = session.begin_nested()
+    leaderboards.registrar_apos_commit(session, "u1", delta=50)
+    savepoint.rollback()
+    leaderboards.registrar_apos_commit(session, "u1", delta=5)
+    assert redis.zscore(leaderboards.chave("disciplina", "Direito Civil"), "u1") is None
+
+    session.commit()
+
+    assert redis.zscore(leaderboards.chave("disciplina", "Direito Civil"), "u1") == 7
+    assert _semanal(redis) == [("u1", 5.0)]
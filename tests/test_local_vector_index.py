@@ -0,0 +1,68 @@
+"""
+================================================================================
+TESTES - ÍNDICE VETORIAL LOCAL (core.local_vector_index)
+================================================================================
+compactar() troca vetores e metadados com dois os.replace; um leitor de
+outro processo/instância que recarrega nesse intervalo não pode ficar com
+a matriz nova e os metadados antigos (desalinhamento permanente).
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import core.local_vector_index as modulo
+from core.local_vector_index import IndiceVetorialLocal
+
+pytestmark = pytest.mark.skipif(not modulo.FCNTL_AVAILABLE, reason="requer fcntl (flock)")
+
+
+def _vetor(i, dimensoes=4):
+    vetor = np.zeros(dimensoes, dtype=np.float32)
+    vetor[i % dimensoes] = 1.0
+    vetor[(i + 1) % dimensoes] = 0.1 * (i + 1)
+    return vetor
+
+
+def test_leitor_durante_compactacao_fica_alinhado(tmp_path, monkeypatch):
+    escritor = IndiceVetorialLocal("teste", 4, diretorio=str(tmp_path))
+    escritor.adicionar([(f"q{i}", _vetor(i), {"disciplina": "Civil"}) for i in range(6)])
+    # Regrava q0..q2: as linhas antigas ficam inativas e compactar() as remove
+    escritor.adicionar([(f"q{i}", _vetor(i + 10), {"disciplina": "Penal"}) for i in range(3)])
+
+    leitor = IndiceVetorialLocal("teste", 4, diretorio=str(tmp_path))
+    assert len(leitor.ids()) == 6
+
+    replace_original = os.replace
+    leitura = {}
+
+    def replace_com_leitor(origem, destino):
+        replace_original(origem, destino)
+        if destino == escritor.caminho_vetores:
+            # Entre a troca dos vetores e a dos metadados
+            thread = threading.Thread(
+                target=lambda: leitura.update(vetores=leitor.vetores(["q0", "q5"]))
+            )
+            thread.start()
+            thread.join(0.3)
+            leitura.update(bloqueado=thread.is_alive(), thread=thread)
+
+    monkeypatch.setattr(modulo.os, "replace", replace_com_leitor)
+    assert escritor.compactar() == 3
+    monkeypatch.setattr(modulo.os, "replace", replace_original)
+
+    leitura["thread"].join(5)
+    assert leitura["bloqueado"]
+
+    esperados = {"q0": _vetor(10), "q5": _vetor(5)}
+    for vetores in (leitura["vetores"], leitor.vetores(["q0", "q5"])):
+        for questao_id, vetor in esperados.items():
+            np.testing.assert_allclose(vetores[questao_id], modulo.normalizar(vetor), rtol=1e-6)
+
+    resultado = leitor.buscar(_vetor(10), k=1)[0][0]
+    assert (resultado["id"], resultado["disciplina"]) == ("q0", "Penal")
@@ -0,0 +1,112 @@
+"""
+================================================================================
+TESTES - FILA DE LOGS APÓS O COMMIT (core.log_queue / core.apos_commit)
+================================================================================
+Logs feitos dentro de uma transação só entram na fila quando a transação
+externa confirma. SAVEPOINTs (session.begin_nested()) não publicam nem
+descartam o que foi registrado fora deles.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import pytest
+from sqlalchemy import String, create_engine, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column
+
+from core.log_queue import DestinoLog, fila_logs
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE dado (id INTEGER PRIMARY KEY)"))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def enfileirados(monkeypatch):
+    eventos = []
+    monkeypatch.setattr(
+        fila_logs, "enfileirar",
+        lambda destino, registro: eventos.append(registro["evento"]) or True
+    )
+    return eventos
+
+
+def _registrar(session, destino, evento):
+    fila_logs.enfileirar_apos_commit(session, destino, {"evento": evento})
+
+
+def _destino(engine):
+    return DestinoLog("log_teste", engine, [column("evento", String)])
+
+
+def test_commit_publica_e_rollback_descarta(engine, enfileirados):
+    destino = _destino(engine)
+
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        _registrar(session, destino, "CONFIRMADO")
+        assert enfileirados == []
+        session.commit()
+
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        _registrar(session, destino, "DESFEITO")
+        session.rollback()
+
+        _registrar(session, destino, "FECHADO_SEM_COMMIT")
+
+    assert enfileirados == ["CONFIRMADO"]
+
+
+def test_savepoint_liberado_nao_publica_antes_da_transacao_externa(engine, enfileirados):
+    destino = _destino(engine)
+
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        _registrar(session, destino, "DECISAO_PROCESSADA")
+        with session.begin_nested():
+            session.execute(text("SELECT 1"))
+        assert enfileirados == []
+        session.rollback()
+
+    assert enfileirados == []
+
+
+def test_savepoint_desfeito_preserva_logs_anteriores(engine, enfileirados):
+    destino = _destino(engine)
+
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        _registrar(session, destino, "DECISAO_PROCESSADA")
+        savepoint = session.begin_nested()
+        _registrar(session, destino, "DENTRO_DO_SAVEPOINT")
+        savepoint.rollback()
+        _registrar(session, destino, "DEPOIS_DO_SAVEPOINT")
+        session.commit()
+
+    assert enfileirados == ["DECISAO_PROCESSADA", "DEPOIS_DO_SAVEPOINT"]
+
+
+def test_savepoints_aninhados(engine, enfileirados):
+    destino = _destino(engine)
+
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO dado DEFAULT VALUES"))
+        externo = session.begin_nested()
+        _registrar(session, destino, "EXTERNO")
+        interno = session.begin_nested()
+        _registrar(session, destino, "INTERNO_LIBERADO")
+        interno.commit()
+        desfeito = session.begin_nested()
+        _registrar(session, destino, "INTERNO_DESFEITO")
+        desfeito.rollback()
+        externo.commit()
+        assert enfileirados == []
+        session.commit()
+
+    assert enfileirados == ["EXTERNO", "INTERNO_LIBERADO"]
@@ -0,0 +1,204 @@
+"""
+================================================================================
+TESTES - POOL DE HASH DE SENHAS (auth.password_hasher)
+================================================================================
+Verificação de bcrypt e do formato legado (SHA-256 hex do admin), rehash só
+quando o custo é menor ou o formato é legado, truncamento em 72 bytes,
+controle de admissão (HasherSobrecarregado -> 503) e o login do admin
+regravando um hash SHA-256 em bcrypt.
+
+Custo bcrypt mínimo (4 rounds) para os testes rodarem rápido.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import sys
+import asyncio
+import hashlib
+import threading
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+
+# conftest coloca api/ antes da raiz no sys.path: api/auth.py esconde o
+# pacote auth/, então o módulo é carregado pelo caminho do arquivo e
+# registrado com o nome que api/auth.py importa
+_spec = importlib.util.spec_from_file_location(
+    "auth.password_hasher", Path(__file__).parent.parent / "auth" / "password_hasher.py"
+)
+modulo = sys.modules.setdefault("auth.password_hasher", importlib.util.module_from_spec(_spec))
+if not hasattr(modulo, "HasherSenhas"):
+    _spec.loader.exec_module(modulo)
+HasherSenhas = modulo.HasherSenhas
+HasherSobrecarregado = modulo.HasherSobrecarregado
+
+
+@pytest.fixture
+def hasher():
+    return HasherSenhas(rounds=4, workers=2, max_fila=4)
+
+
+def _sha256(senha):
+    return hashlib.sha256(senha.encode("utf-8")).hexdigest()
+
+
+# ============================================================================
+# Verificação e rehash
+# ============================================================================
+
+def test_hash_bcrypt_verifica(hasher):
+    senha_hash = hasher.hash("senha-correta")
+
+    assert senha_hash.startswith("$2b$04$")
+    assert hasher.verificar("senha-correta", senha_hash) is True
+    assert hasher.verificar("senha-errada", senha_hash) is False
+
+
+def test_hash_vazio_ou_corrompido_nao_verifica(hasher):
+    assert hasher.verificar("qualquer", "") is False
+    assert hasher.verificar("qualquer", "$2b$04$corrompido") is False
+
+
+def test_sha256_legado_aceito_e_regravado(hasher):
+    legado = _sha256("senha-antiga")
+
+    assert hasher.verificar("senha-antiga", legado) is True
+    assert hasher.verificar("outra", legado) is False
+
+    correta, novo_hash = hasher.verificar_e_atualizar("senha-antiga", legado)
+    assert correta is True
+    assert novo_hash.startswith("$2b$04$")
+    assert hasher.verificar("senha-antiga", novo_hash) is True
+
+    # Senha errada nunca gera hash novo
+    assert hasher.verificar_e_atualizar("outra", legado) == (False, None)
+
+
+def test_rehash_so_com_custo_menor(hasher):
+    mais_caro = HasherSenhas(rounds=5, workers=1)
+    hash_custo_4 = hasher.hash("senha")
+    hash_custo_5 = mais_caro.hash("senha")
+
+    assert hasher.precisa_rehash(hash_custo_4) is False
+    assert hasher.precisa_rehash(hash_custo_5) is False
+    assert mais_caro.precisa_rehash(hash_custo_4) is True
+    assert hasher.precisa_rehash(_sha256("senha")) is True
+    assert hasher.precisa_rehash("") is True
+
+    assert hasher.verificar_e_atualizar("senha", hash_custo_4) == (True, None)
+
+    correta, novo_hash = mais_caro.verificar_e_atualizar("senha", hash_custo_4)
+    assert correta is True and novo_hash.startswith("$2b$05$")
+    assert mais_caro.metricas()["rehashes"] == 1
+
+
+def test_async_rehash(hasher):
+    correta, novo_hash = asyncio.run(hasher.verificar_e_atualizar_async("senha", _sha256("senha")))
+    assert correta is True
+    assert asyncio.run(hasher.verificar_async("senha", novo_hash)) is True
+    assert asyncio.run(hasher.verificar_e_atualizar_async("senha", novo_hash)) == (True, None)
+
+
+def test_senha_maior_que_72_bytes_e_truncada(hasher):
+    base = "ç" * 36  # 72 bytes em UTF-8
+    senha_hash = hasher.hash(base + "fim-1")
+
+    # Só os primeiros 72 bytes contam (sem erro do bcrypt >= 5)
+    assert hasher.verificar(base + "fim-2", senha_hash) is True
+    assert hasher.verificar(base[:-1], senha_hash) is False
+
+
+# ============================================================================
+# Controle de admissão
+# ============================================================================
+
+def test_fila_cheia_rejeita_na_hora():
+    hasher = HasherSenhas(rounds=4, workers=1, max_fila=1)
+    liberar = threading.Event()
+
+    ocupado = hasher._submeter(liberar.wait)
+    na_fila = hasher._submeter(liberar.wait)
+    try:
+        with pytest.raises(HasherSobrecarregado) as erro:
+            hasher.hash("senha")
+        assert (erro.value.aguardando, erro.value.limite) == (1, 1)
+    finally:
+        liberar.set()
+
+    ocupado.result(timeout=5)
+    na_fila.result(timeout=5)
+    assert hasher.metricas()["rejeitados"] == 1
+
+    # Fila liberada: volta a aceitar
+    assert hasher.verificar("senha", hasher.hash("senha")) is True
+
+
+def test_fila_cheia_vira_503(monkeypatch):
+    import api.auth
+
+    hasher = HasherSenhas(rounds=4, workers=1, max_fila=1)
+    monkeypatch.setattr(api.auth, "hasher_senhas", hasher)
+    liberar = threading.Event()
+    ocupados = [hasher._submeter(liberar.wait) for _ in range(2)]
+
+    try:
+        with pytest.raises(HTTPException) as erro:
+            asyncio.run(api.auth.verify_password_async("senha", _sha256("senha")))
+        assert erro.value.status_code == 503
+        assert erro.value.headers == {"Retry-After": "1"}
+    finally:
+        liberar.set()
+        for ocupado in ocupados:
+            ocupado.result(timeout=5)
+
+
+# ============================================================================
+# Login do admin (api/endpoints/admin.py)
+# ============================================================================
+
+def test_login_admin_regrava_hash_sha256(monkeypatch):
+    import api.auth
+    from api.endpoints import admin
+    from database.models import UserStatus
+
+    hasher = HasherSenhas(rounds=4, workers=1)
+    monkeypatch.setattr(api.auth, "hasher_senhas", hasher)
+
+    usuario = SimpleNamespace(
+        id=uuid4(), nome="Admin", email="admin@jurisia.com",
+        password_hash=_sha256("senha-admin"), status=UserStatus.ATIVO,
+        data_ultimo_acesso=None
+    )
+    commits = []
+    db = SimpleNamespace(
+        query=lambda modelo: SimpleNamespace(
+            filter=lambda *args: SimpleNamespace(first=lambda: usuario)
+        ),
+        commit=lambda: commits.append(usuario.password_hash),
+        close=lambda: None
+    )
+    monkeypatch.setattr(
+        admin, "DatabaseManager",
+        lambda: SimpleNamespace(get_session_factory=lambda: lambda: db)
+    )
+
+    resposta = asyncio.run(admin.login_user(
+        admin.LoginRequest(email=usuario.email, senha="senha-admin")
+    ))
+
+    assert resposta.success is True
+    assert commits == [usuario.password_hash]
+    assert usuario.password_hash.startswith("$2b$04$")
+    assert hasher.verificar("senha-admin", usuario.password_hash) is True
+
+    # Senha errada: 401 e nada é gravado
+    with pytest.raises(HTTPException) as erro:
+        asyncio.run(admin.login_user(admin.LoginRequest(email=usuario.email, senha="errada")))
+    assert erro.value.status_code == 401
+    assert len(commits) == 1
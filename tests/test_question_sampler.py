@@ -0,0 +1,167 @@
+"""
+================================================================================
+TESTES - AMOSTRADOR DE QUESTÕES (core.question_sampler)
+================================================================================
+Atualização incremental dos pools: linhas confirmadas com updated_at anterior
+à marca (transação longa) ainda entram, e exclusões físicas ou desativações
+sem mudança de updated_at saem dos pools na conferência dos IDs ativos,
+que roda só a cada intervalo_conferencia (a atualização periódica lê
+apenas a janela de updated_at).
+
+Banco: SQLite em memória com a mesma tabela questoes_banco (colunas usadas).
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+import core.question_sampler as modulo
+from core.question_sampler import QuestionPoolSampler
+
+sqlite3.register_adapter(datetime, lambda valor: valor.isoformat(" "))
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://", connect_args={"detect_types": sqlite3.PARSE_DECLTYPES})
+    with Session(engine) as sessao:
+        sessao.execute(text("""
+            CREATE TABLE questoes_banco (
+                id TEXT PRIMARY KEY,
+                disciplina TEXT,
+                topico TEXT,
+                dificuldade TEXT,
+                ativa BOOLEAN,
+                updated_at TIMESTAMP
+            )
+        """))
+        yield sessao
+
+
+def _inserir(session, questao_id, updated_at, ativa=True, disciplina="Civil"):
+    session.execute(
+        text("INSERT INTO questoes_banco VALUES (:id, :disciplina, 'Contratos', 'MEDIO', :ativa, :updated_at)"),
+        {"id": questao_id, "disciplina": disciplina, "ativa": ativa, "updated_at": updated_at},
+    )
+
+
+def _ids(sampler, session):
+    return set(sampler.amostrar(100, session=session))
+
+
+def test_linha_confirmada_depois_da_marca_entra(session):
+    agora = datetime(2026, 10, 16, 12, 0, 0)
+    _inserir(session, "q1", agora)
+    sampler = QuestionPoolSampler(intervalo_atualizacao=0)
+    sampler.atualizar(session)
+
+    # Transação iniciada antes de q1 (updated_at = NOW() do início) confirmada depois
+    _inserir(session, "q2", agora - timedelta(seconds=30))
+    sampler.atualizar(session)
+
+    assert _ids(sampler, session) == {"q1", "q2"}
+    assert sampler.estatisticas()["marca_atualizacao"] == agora.isoformat()
+
+
+def test_reclassificacao_tardia_dentro_da_margem(session):
+    agora = datetime(2026, 10, 16, 12, 0, 0)
+    _inserir(session, "q1", agora)
+    _inserir(session, "q2", agora - timedelta(minutes=1))
+    sampler = QuestionPoolSampler(intervalo_atualizacao=0)
+    sampler.atualizar(session)
+
+    session.execute(
+        text("UPDATE questoes_banco SET disciplina = 'Penal', updated_at = :t WHERE id = 'q2'"),
+        {"t": agora - timedelta(seconds=10)},
+    )
+    sampler.atualizar(session)
+
+    assert sampler.amostrar(10, disciplina="Penal", session=session) == ["q2"]
+    assert sampler.amostrar(10, disciplina="Civil", session=session) == ["q1"]
+
+
+def test_exclusao_e_desativacao_sem_updated_at_saem_dos_pools(session):
+    antigo = datetime(2026, 1, 1)
+    for questao_id in ("q1", "q2", "q3"):
+        _inserir(session, questao_id, antigo)
+    sampler = QuestionPoolSampler(intervalo_atualizacao=0, intervalo_conferencia=0)
+    sampler.atualizar(session)
+    assert _ids(sampler, session) == {"q1", "q2", "q3"}
+
+    session.execute(text("DELETE FROM questoes_banco WHERE id = 'q1'"))
+    session.execute(text("UPDATE questoes_banco SET ativa = 0 WHERE id = 'q2'"))
+
+    assert sampler.atualizar(session) == 2
+    assert _ids(sampler, session) == {"q3"}
+    assert sampler.estatisticas()["total_questoes"] == 1
+
+    # Nada mudou: reaplicar a janela não altera os pools
+    assert sampler.atualizar(session) == 0
+    assert _ids(sampler, session) == {"q3"}
+
+
+def test_queries_rodam_fora_do_lock(session, monkeypatch):
+    antigo = datetime(2026, 1, 1)
+    _inserir(session, "q1", antigo)
+    sampler = QuestionPoolSampler(intervalo_atualizacao=0, intervalo_conferencia=0)
+    execute_original = session.execute
+
+    def execute(*args, **kwargs):
+        # Outra thread (ou o event loop) consegue sortear durante a query
+        assert sampler._lock.acquire(blocking=False)
+        sampler._lock.release()
+        return execute_original(*args, **kwargs)
+
+    monkeypatch.setattr(session, "execute", execute)
+
+    sampler.atualizar(session)
+    # q2 fora da janela de updated_at: entra pela conferência dos ativos
+    _inserir(session, "q2", antigo - timedelta(days=30))
+    assert sampler.atualizar(session) == 1
+    assert _ids(sampler, session) == {"q1", "q2"}
+
+
+def test_conferencia_dos_ativos_so_no_intervalo_longo(session, monkeypatch):
+    antigo = datetime(2026, 1, 1)
+    for questao_id in ("q1", "q2"):
+        _inserir(session, questao_id, antigo)
+    agora = [time.monotonic()]
+    monkeypatch.setattr(modulo.time, "monotonic", lambda: agora[0])
+    sampler = QuestionPoolSampler(intervalo_atualizacao=0, intervalo_conferencia=3600)
+    sampler.atualizar(session)
+
+    consultas = []
+    execute_original = session.execute
+
+    def execute(sql, *args, **kwargs):
+        consultas.append(" ".join(str(sql).split()))
+        return execute_original(sql, *args, **kwargs)
+
+    monkeypatch.setattr(session, "execute", execute)
+    session.execute(text("DELETE FROM questoes_banco WHERE id = 'q1'"))
+    consultas.clear()
+
+    # Atualização periódica: só a janela de updated_at
+    agora[0] += 60
+    assert sampler.atualizar(session) == 0
+    assert len(consultas) == 1 and "updated_at >= :marca" in consultas[0]
+    assert _ids(sampler, session) == {"q1", "q2"}
+
+    # Intervalo da conferência vencido: varre os IDs ativos
+    agora[0] += 3600
+    assert sampler.atualizar(session) == 1
+    assert "SELECT id FROM questoes_banco WHERE ativa = true" in consultas
+    assert _ids(sampler, session) == {"q2"}
+
+    # Conferência recém-feita: volta a ler só a janela
+    consultas.clear()
+    agora[0] += 60
+    assert sampler.atualizar(session) == 0
+    assert len(consultas) == 1
@@ -0,0 +1,193 @@
+"""
+================================================================================
+TESTES - UNIDADE DE TRABALHO DE JurisIADB.responder_questao
+================================================================================
+- Interação, progresso, contadores do perfil e log da decisão confirmam ou
+  desfazem juntos (uma transação de get_db_session)
+- _pos_resposta: cada etapa em savepoint; a falha de registrar_explicacao
+  não desfaz adicionar_topico_memoria
+- pos_resposta_em_segundo_plano=False executa as etapas adiadas na chamada
+  (com o pool, elas só rodam depois de a resposta voltar)
+
+Banco: SQLite em arquivo atrás do get_db_session real (commit/rollback),
+com uma tabela de diário onde os repositórios e engines falsos gravam cada
+etapa pela sessão recebida.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+import database.connection
+import engines.juris_ia_db as modulo
+from engines.juris_ia_db import JurisIADB
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'juris.db'}")
+
+    # pysqlite só emite SAVEPOINT corretamente com BEGIN explícito
+    @event.listens_for(engine, "connect")
+    def _conectar(conexao_dbapi, _registro):
+        conexao_dbapi.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _iniciar(conexao):
+        conexao.exec_driver_sql("BEGIN")
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE diario (etapa TEXT)"))
+
+    fabrica = sessionmaker(bind=engine)
+    monkeypatch.setattr(
+        database.connection, "DatabaseManager",
+        lambda: SimpleNamespace(get_session_factory=lambda: fabrica)
+    )
+    monkeypatch.setattr(modulo, "seen_questions", SimpleNamespace(registrar=lambda *args: None))
+    yield engine
+    engine.dispose()
+
+
+def _gravar(session, etapa):
+    session.execute(text("INSERT INTO diario (etapa) VALUES (:etapa)"), {"etapa": etapa})
+
+
+def _diario(engine):
+    with engine.connect() as conn:
+        return sorted(linha[0] for linha in conn.execute(text("SELECT etapa FROM diario")))
+
+
+class RepositoriosFalsos:
+    """RepositoryFactory que grava no diário pela sessão da unidade de trabalho"""
+
+    def __init__(self, session):
+        questao = SimpleNamespace(
+            disciplina="Direito Civil", topico="Contratos", alternativa_correta="A",
+            dificuldade="MEDIO", enunciado="Enunciado da questão"
+        )
+        gravar = lambda etapa: lambda *args, **kwargs: _gravar(session, etapa)
+
+        self.session = session
+        self.questoes = SimpleNamespace(get_by_id=lambda questao_id: questao)
+        self.perfis = SimpleNamespace(
+            get_by_user_id=lambda user_id: SimpleNamespace(user_id=user_id),
+            create_initial_profile=gravar("perfil_criado"),
+            registrar_resposta=gravar("perfil"),
+        )
+        self.interacoes = SimpleNamespace(create_interaction=gravar("interacao"))
+        self.progressos_topico = SimpleNamespace(update_after_interaction=gravar("progresso_topico"))
+        self.progressos_disciplina = SimpleNamespace(update_stats=gravar("progresso_disciplina"))
+
+
+class DecisaoFalsa:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+
+    def decidir(self, perfil, evento_tipo, contexto):
+        return [{"tipo": "CONTINUAR"}]
+
+    def registrar_decisao(self, repos, user_id, evento_tipo, contexto, acoes):
+        if self.falhar:
+            raise RuntimeError("falha ao registrar decisão")
+        _gravar(repos.session, "decisao")
+
+    def avaliar_mudanca_nivel(self, user_id, session):
+        _gravar(session, "nivel")
+
+
+class ExplicacaoFalsa:
+    def __init__(self, falhar_registro=False):
+        self.falhar_registro = falhar_registro
+
+    def preparar_explicacao(self, session, perfil, **kwargs):
+        return {"texto": "explicação"}
+
+    def registrar_explicacao(self, repos, *args):
+        _gravar(repos.session, "explicacao")
+        if self.falhar_registro:
+            raise RuntimeError("falha ao registrar explicação")
+
+
+class MemoriaFalsa:
+    def adicionar_topico_memoria(self, session, **kwargs):
+        _gravar(session, "revisao")
+
+
+def _sistema(monkeypatch, decisao=None, explicacao=None, em_segundo_plano=False):
+    monkeypatch.setattr(modulo, "RepositoryFactory", RepositoriosFalsos)
+    sistema = JurisIADB.__new__(JurisIADB)
+    sistema.decision_engine = decisao or DecisaoFalsa()
+    sistema.explanation_engine = explicacao or ExplicacaoFalsa()
+    sistema.memory_engine = MemoriaFalsa()
+    sistema._executor = None
+    if em_segundo_plano:
+        sistema._executor = ThreadPoolExecutor(max_workers=1)
+    return sistema
+
+
+def _responder(sistema, acertou=False):
+    return sistema.responder_questao(uuid4(), uuid4(), "B", 90, acertou)
+
+
+# ============================================================================
+# Unidade de trabalho
+# ============================================================================
+
+def test_resposta_confirma_tudo_junto(engine, monkeypatch):
+    resultado = _responder(_sistema(monkeypatch), acertou=True)
+
+    assert resultado["sucesso"] is True
+    assert resultado["explicacao"] == {"texto": "explicação"}
+    assert _diario(engine) == sorted([
+        "interacao", "progresso_topico", "progresso_disciplina", "perfil", "decisao",
+        # pós-resposta na própria chamada (acerto: sem revisão)
+        "explicacao", "nivel",
+    ])
+
+
+def test_falha_na_decisao_desfaz_a_unidade_de_trabalho(engine, monkeypatch):
+    resultado = _responder(_sistema(monkeypatch, decisao=DecisaoFalsa(falhar=True)))
+
+    assert resultado["sucesso"] is False
+    assert "falha ao registrar decisão" in resultado["erro"]
+    # Interação, progresso e perfil foram desfeitos; nada foi adiado
+    assert _diario(engine) == []
+
+
+# ============================================================================
+# Pós-resposta
+# ============================================================================
+
+def test_falha_da_explicacao_nao_desfaz_a_revisao(engine, monkeypatch):
+    sistema = _sistema(monkeypatch, explicacao=ExplicacaoFalsa(falhar_registro=True))
+    resultado = _responder(sistema, acertou=False)
+
+    assert resultado["sucesso"] is True
+    diario = _diario(engine)
+    assert "explicacao" not in diario  # savepoint da explicação desfeito
+    assert "revisao" in diario and "nivel" in diario
+    assert "interacao" in diario
+
+
+def test_pos_resposta_em_segundo_plano_nao_roda_na_chamada(engine, monkeypatch):
+    sistema = _sistema(monkeypatch, em_segundo_plano=True)
+    liberar = threading.Event()
+    sistema._executor.submit(liberar.wait)  # ocupa o único worker
+
+    try:
+        assert _responder(sistema)["sucesso"] is True
+        assert "revisao" not in _diario(engine)
+    finally:
+        liberar.set()
+        sistema.encerrar()
+
+    assert {"explicacao", "revisao", "nivel"} <= set(_diario(engine))
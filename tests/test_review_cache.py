@@ -0,0 +1,39 @@
+"""
+================================================================================
+TESTES - CACHE DE RECOMENDAÇÕES DE REVISÃO (core.review_cache)
+================================================================================
+Entradas são separadas por origem (modelo, dimensões, backend): um serviço
+nunca recebe as recomendações calculadas por outro.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+import pytest
+
+from core.review_cache import CacheRecomendacoesRevisao
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = CacheRecomendacoesRevisao(ttl_segundos=3600, max_usuarios=10)
+    monkeypatch.setattr(CacheRecomendacoesRevisao, "versao", staticmethod(lambda session, usuario_id: 1))
+    return cache
+
+
+def test_origens_diferentes_nao_compartilham_entrada(cache):
+    openai = cache.obter("u1", None, 2, lambda: [{"id": "a"}], origem="text-embedding-3-large:3072:pgvector")
+    ollama = cache.obter("u1", None, 2, lambda: [{"id": "b"}], origem="nomic-embed-text:768:local")
+
+    assert (openai, ollama) == ([{"id": "a"}], [{"id": "b"}])
+    assert cache.obter("u1", None, 2, lambda: [], origem="nomic-embed-text:768:local") == [{"id": "b"}]
+    assert cache.obter("u1", None, 2, lambda: [], origem="nomic-embed-text:768:pgvector") == []
+    assert cache.estatisticas() == {"acertos": 1, "faltas": 3, "usuarios": 1}
+
+
+def test_invalidar_descarta_todas_as_origens(cache):
+    cache.obter("u1", None, 1, lambda: [{"id": "a"}], origem="m:1:pgvector")
+    cache.obter("u1", None, 1, lambda: [{"id": "b"}], origem="m:1:local")
+    cache.invalidar("u1")
+
+    assert cache.obter("u1", None, 1, lambda: [{"id": "c"}], origem="m:1:local") == [{"id": "c"}]
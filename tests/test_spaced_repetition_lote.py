@@ -0,0 +1,173 @@
+"""
+================================================================================
+TESTES DE PARIDADE - SM-2 EM LOTE (engines.spaced_repetition)
+================================================================================
+As funções colunares (NumPy) devem produzir exatamente o mesmo resultado
+que as funções escalares para qualquer cartão: intervalos, ease factor,
+datas, contadores, nível de domínio, retenção e estatísticas globais.
+
+Propriedades verificadas com hypothesis sobre cartões arbitrários.
+
+Data: 2026-10-16
+================================================================================
+"""
+
+from datetime import datetime, timedelta
+
+from hypothesis import example, given, settings, strategies as st
+
+from engines.spaced_repetition import (
+    CartaoRevisao,
+    ResultadoRevisao,
+    DificuldadeResposta,
+    NIVEIS_DOMINIO,
+    processar_revisao,
+    calcular_nivel_dominio,
+    calcular_taxa_retencao,
+    calcular_estatisticas_globais,
+    lote_de_cartoes,
+    cartoes_de_lote,
+    codificar_dificuldades,
+    processar_revisoes_lote,
+    calcular_nivel_dominio_lote,
+    calcular_taxa_retencao_lote,
+    calcular_estatisticas_globais_lote,
+)
+
+
+DATAS = st.datetimes(min_value=datetime(2000, 1, 1), max_value=datetime(2100, 1, 1))
+
+
+def _cartao(repeticoes, intervalo_dias, total_revisoes, total_acertos):
+    return CartaoRevisao(
+        questao_id="q", disciplina="Direito Civil", topico="Tópico",
+        intervalo_dias=intervalo_dias, repeticoes=repeticoes, ease_factor=2.5,
+        ultima_revisao=None, proxima_revisao=datetime(2026, 1, 1),
+        total_revisoes=total_revisoes, total_acertos=total_acertos,
+        total_erros=total_revisoes - total_acertos,
+    )
+
+
+# Cartões exatamente nas fronteiras de calcular_nivel_dominio
+FRONTEIRAS_NIVEL = [
+    _cartao(3, 14, 10, 7),     # taxa == 0.7
+    _cartao(5, 14, 10, 7),     # repetições e intervalo mínimos de DOMINADO
+    _cartao(4, 30, 10, 10),
+    _cartao(8, 30, 10, 9),     # taxa == 0.9, limites de EXPERT
+    _cartao(8, 29, 10, 9),
+    _cartao(7, 30, 10, 10),
+    _cartao(2, 100, 0, 0),
+]
+
+
+@st.composite
+def cartoes(draw):
+    # Contagens pequenas tornam frequentes as taxas exatas (0.7, 0.9)
+    total_revisoes = draw(st.integers(0, 20) | st.integers(0, 500))
+    total_acertos = draw(st.integers(0, total_revisoes))
+    return CartaoRevisao(
+        questao_id=str(draw(st.uuids())),
+        disciplina=draw(st.sampled_from(["Direito Civil", "Direito Penal", "Ética"])),
+        topico="Tópico",
+        intervalo_dias=draw(st.integers(0, 3650)),
+        repeticoes=draw(st.integers(0, 20)),
+        # Inclui valores fora de 1.3-2.5 (fator_facilidade do banco tem default 0.5)
+        ease_factor=draw(st.floats(0.1, 3.0, allow_nan=False)),
+        ultima_revisao=draw(st.none() | DATAS),
+        proxima_revisao=draw(DATAS),
+        total_revisoes=total_revisoes,
+        total_acertos=total_acertos,
+        total_erros=total_revisoes - total_acertos,
+    )
+
+
+# int(50 * 1.8 * 1.3) != int(50 * (1.8 * 1.3)) em float64: o lote precisa
+# multiplicar na mesma ordem que o escalar (ease 1.65 + 0.15 = 1.7999...)
+DIVERGENCIA_ARREDONDAMENTO = [(
+    CartaoRevisao(
+        questao_id="q", disciplina="Direito Civil", topico="Tópico",
+        intervalo_dias=50, repeticoes=3, ease_factor=1.65,
+        ultima_revisao=None, proxima_revisao=datetime(2026, 1, 1),
+        total_revisoes=3, total_acertos=3, total_erros=0,
+    ),
+    ResultadoRevisao(
+        acertou=True, dificuldade=DificuldadeResposta.MUITO_FACIL,
+        tempo_segundos=30, timestamp=datetime(2026, 1, 1, 8, 0),
+    ),
+)]
+
+
+resultados = st.builds(
+    ResultadoRevisao,
+    acertou=st.booleans(),
+    dificuldade=st.sampled_from(DificuldadeResposta),
+    tempo_segundos=st.integers(0, 600),
+    timestamp=DATAS,
+)
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(st.tuples(cartoes(), resultados), min_size=1, max_size=50))
+@example(DIVERGENCIA_ARREDONDAMENTO)
+def test_processar_revisoes_lote_igual_ao_escalar(pares):
+    originais = [cartao for cartao, _ in pares]
+    respostas = [resultado for _, resultado in pares]
+
+    novo_lote = processar_revisoes_lote(
+        lote_de_cartoes(originais),
+        acertou=[r.acertou for r in respostas],
+        dificuldade=codificar_dificuldades([r.dificuldade for r in respostas]),
+        timestamp=[r.timestamp for r in respostas],
+    )
+
+    esperado = [processar_revisao(c, r) for c, r in pares]
+    assert cartoes_de_lote(novo_lote, originais) == esperado
+
+
+@settings(max_examples=100, deadline=None)
+@given(st.lists(cartoes(), min_size=1, max_size=50), resultados)
+def test_timestamp_unico_para_o_lote(lista, resultado):
+    novo_lote = processar_revisoes_lote(
+        lote_de_cartoes(lista),
+        acertou=[resultado.acertou] * len(lista),
+        dificuldade=codificar_dificuldades([resultado.dificuldade] * len(lista)),
+        timestamp=resultado.timestamp,
+    )
+
+    assert cartoes_de_lote(novo_lote, lista) == [processar_revisao(c, resultado) for c in lista]
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(cartoes(), min_size=1, max_size=100))
+@example(FRONTEIRAS_NIVEL)
+def test_nivel_e_retencao_iguais_ao_escalar(lista):
+    lote = lote_de_cartoes(lista)
+
+    niveis = [NIVEIS_DOMINIO[codigo] for codigo in calcular_nivel_dominio_lote(lote)]
+    assert niveis == [calcular_nivel_dominio(c) for c in lista]
+    assert calcular_taxa_retencao_lote(lote).tolist() == [calcular_taxa_retencao(c) for c in lista]
+
+
+@settings(max_examples=300, deadline=None)
+@given(st.lists(cartoes(), max_size=100), DATAS)
+def test_estatisticas_globais_iguais_ao_escalar(lista, agora):
+    # Vencimentos concentrados perto de `agora` para exercitar as janelas
+    lista = [
+        CartaoRevisao(**{
+            **c.__dict__,
+            "proxima_revisao": agora + timedelta(hours=(i * 37) % 240 - 24),
+        })
+        for i, c in enumerate(lista)
+    ]
+
+    esperado = calcular_estatisticas_globais(lista, agora)
+    obtido = calcular_estatisticas_globais_lote(lote_de_cartoes(lista), agora)
+
+    assert obtido == esperado
+    assert list(obtido["cartoes_por_nivel"]) == list(esperado["cartoes_por_nivel"])
+
+
+@settings(max_examples=100, deadline=None)
+@given(st.lists(cartoes(), max_size=50))
+def test_conversao_ida_e_volta(lista):
+    assert cartoes_de_lote(lote_de_cartoes(lista), lista) == lista